@@ -0,0 +1,63 @@
+"""Add page_id and chunk_ordinal to manual_chunks
+
+Revision ID: a7b8c9d0e1f2
+Revises: f1a2b3c4d5e6
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7b8c9d0e1f2'
+down_revision: Union[str, None] = 'f1a2b3c4d5e6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    columns = {
+        row[0] for row in conn.execute(sa.text(
+            "SELECT column_name FROM information_schema.columns WHERE table_name='manual_chunks'"
+        ))
+    }
+    if 'page_id' not in columns:
+        op.add_column('manual_chunks', sa.Column('page_id', sa.String(36), nullable=True))
+        # Existing rows are whole pages: each is its own page until re-indexed
+        op.execute("UPDATE manual_chunks SET page_id = id WHERE page_id IS NULL")
+        op.create_index('ix_manual_chunks_page_id', 'manual_chunks', ['page_id'])
+    if 'chunk_ordinal' not in columns:
+        op.add_column(
+            'manual_chunks',
+            sa.Column('chunk_ordinal', sa.Integer(), nullable=False, server_default='0'),
+        )
+
+    # The upsert key gains the ordinal: one row per chunk of a page
+    op.execute("DROP INDEX IF EXISTS uq_manual_chunk_key")
+    op.execute("""
+        CREATE UNIQUE INDEX uq_manual_chunk_key ON manual_chunks (
+            vehicle_make, vehicle_model, vehicle_year, section_path, scope,
+            COALESCE(engine_id, ''),
+            COALESCE(transmission_id, ''),
+            chunk_ordinal
+        )
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DELETE FROM manual_chunks WHERE chunk_ordinal > 0")
+    op.execute("DROP INDEX IF EXISTS uq_manual_chunk_key")
+    op.execute("""
+        CREATE UNIQUE INDEX uq_manual_chunk_key ON manual_chunks (
+            vehicle_make, vehicle_model, vehicle_year, section_path, scope,
+            COALESCE(engine_id, ''),
+            COALESCE(transmission_id, '')
+        )
+    """)
+    op.drop_index('ix_manual_chunks_page_id', table_name='manual_chunks')
+    op.drop_column('manual_chunks', 'chunk_ordinal')
+    op.drop_column('manual_chunks', 'page_id')
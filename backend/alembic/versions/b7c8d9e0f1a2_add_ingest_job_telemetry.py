@@ -0,0 +1,51 @@
+"""Add per-stage timing and throughput telemetry to ingest_jobs
+
+Revision ID: b7c8d9e0f1a2
+Revises: aeb58a5f361c
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7c8d9e0f1a2'
+down_revision: Union[str, None] = 'aeb58a5f361c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _columns() -> list[sa.Column]:
+    return [
+        sa.Column('started_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('stage_timings', sa.JSON(), nullable=True),
+        sa.Column('bytes_downloaded', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('files_extracted', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('pages_parsed', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('vision_calls', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('upsert_batches', sa.Integer(), nullable=False, server_default='0'),
+    ]
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+
+    def has_column(table: str, column: str) -> bool:
+        row = conn.execute(sa.text(
+            "SELECT 1 FROM information_schema.columns "
+            "WHERE table_name=:t AND column_name=:c"
+        ), {"t": table, "c": column}).fetchone()
+        return row is not None
+
+    for column in _columns():
+        if not has_column("ingest_jobs", column.name):
+            op.add_column("ingest_jobs", column)
+
+
+def downgrade() -> None:
+    for column in reversed(_columns()):
+        op.drop_column("ingest_jobs", column.name)
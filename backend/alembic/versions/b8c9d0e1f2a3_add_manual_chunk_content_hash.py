@@ -0,0 +1,46 @@
+"""Add content_hash to manual_chunks and skip/remove counters to ingest_jobs
+
+Revision ID: b8c9d0e1f2a3
+Revises: a7b8c9d0e1f2
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8c9d0e1f2a3'
+down_revision: Union[str, None] = 'a7b8c9d0e1f2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _columns() -> list[tuple[str, sa.Column]]:
+    return [
+        ('manual_chunks', sa.Column('content_hash', sa.String(64), nullable=True)),
+        ('ingest_jobs', sa.Column('pages_skipped', sa.Integer(), nullable=False, server_default='0')),
+        ('ingest_jobs', sa.Column('pages_removed', sa.Integer(), nullable=False, server_default='0')),
+    ]
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+
+    def has_column(table: str, column: str) -> bool:
+        row = conn.execute(sa.text(
+            "SELECT 1 FROM information_schema.columns "
+            "WHERE table_name=:t AND column_name=:c"
+        ), {"t": table, "c": column}).fetchone()
+        return row is not None
+
+    for table, column in _columns():
+        if not has_column(table, column.name):
+            op.add_column(table, column)
+
+
+def downgrade() -> None:
+    for table, column in reversed(_columns()):
+        op.drop_column(table, column.name)
@@ -0,0 +1,37 @@
+"""Add diagram_assets table for content-addressed manual diagrams
+
+Revision ID: c8d9e0f1a2b3
+Revises: b7c8d9e0f1a2
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c8d9e0f1a2b3'
+down_revision: Union[str, None] = 'b7c8d9e0f1a2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+
+    if not conn.dialect.has_table(conn, 'diagram_assets'):
+        op.create_table(
+            'diagram_assets',
+            sa.Column('content_hash', sa.String(64), primary_key=True),
+            sa.Column('storage_key', sa.String(300), nullable=False),
+            sa.Column('url', sa.String(2000), nullable=False),
+            sa.Column('content_type', sa.String(100), nullable=False, server_default='image/png'),
+            sa.Column('size_bytes', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        )
+
+
+def downgrade() -> None:
+    op.drop_table('diagram_assets')
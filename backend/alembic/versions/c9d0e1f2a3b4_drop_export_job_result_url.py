@@ -0,0 +1,32 @@
+"""Drop export_jobs.result_url (export ZIPs are served through an authenticated route)
+
+Revision ID: c9d0e1f2a3b4
+Revises: b8c9d0e1f2a3
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c9d0e1f2a3b4'
+down_revision: Union[str, None] = 'b8c9d0e1f2a3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    row = conn.execute(sa.text(
+        "SELECT 1 FROM information_schema.columns "
+        "WHERE table_name='export_jobs' AND column_name='result_url'"
+    )).fetchone()
+    if row is not None:
+        op.drop_column('export_jobs', 'result_url')
+
+
+def downgrade() -> None:
+    op.add_column('export_jobs', sa.Column('result_url', sa.String(2000), nullable=True))
@@ -0,0 +1,47 @@
+"""Add mesh triangle counts and LOD URLs to engines and vehicles
+
+Revision ID: d9e0f1a2b3c4
+Revises: c8d9e0f1a2b3
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd9e0f1a2b3c4'
+down_revision: Union[str, None] = 'c8d9e0f1a2b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _columns() -> list[tuple[str, sa.Column]]:
+    return [
+        ('engines', sa.Column('mesh_triangle_count', sa.Integer(), nullable=True)),
+        ('engines', sa.Column('mesh_lod_urls', sa.JSON(), nullable=True)),
+        ('vehicles', sa.Column('bay_scan_triangle_count', sa.Integer(), nullable=True)),
+        ('vehicles', sa.Column('bay_scan_lod_urls', sa.JSON(), nullable=True)),
+    ]
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+
+    def has_column(table: str, column: str) -> bool:
+        row = conn.execute(sa.text(
+            "SELECT 1 FROM information_schema.columns "
+            "WHERE table_name=:t AND column_name=:c"
+        ), {"t": table, "c": column}).fetchone()
+        return row is not None
+
+    for table, column in _columns():
+        if not has_column(table, column.name):
+            op.add_column(table, column)
+
+
+def downgrade() -> None:
+    for table, column in reversed(_columns()):
+        op.drop_column(table, column.name)
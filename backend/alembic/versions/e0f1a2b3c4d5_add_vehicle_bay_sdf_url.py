@@ -0,0 +1,32 @@
+"""Add bay scan signed distance field URL to vehicles
+
+Revision ID: e0f1a2b3c4d5
+Revises: d9e0f1a2b3c4
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e0f1a2b3c4d5'
+down_revision: Union[str, None] = 'd9e0f1a2b3c4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    row = conn.execute(sa.text(
+        "SELECT 1 FROM information_schema.columns "
+        "WHERE table_name='vehicles' AND column_name='bay_sdf_url'"
+    )).fetchone()
+    if row is None:
+        op.add_column('vehicles', sa.Column('bay_sdf_url', sa.String(length=500), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('vehicles', 'bay_sdf_url')
@@ -0,0 +1,49 @@
+"""Add export_jobs table for bulk build exports
+
+Revision ID: f1a2b3c4d5e6
+Revises: e0f1a2b3c4d5
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1a2b3c4d5e6'
+down_revision: Union[str, None] = 'e0f1a2b3c4d5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+
+    if not conn.dialect.has_table(conn, 'export_jobs'):
+        op.create_table(
+            'export_jobs',
+            sa.Column('job_id', sa.String(36), primary_key=True),
+            sa.Column('user_id', sa.String(36), sa.ForeignKey('users.id'), nullable=False),
+            sa.Column('status', sa.String(20), nullable=False, server_default='pending'),
+            sa.Column('stage', sa.String(50), nullable=False, server_default='queued'),
+            sa.Column('build_ids', sa.JSON(), nullable=False),
+            sa.Column('include_pdf', sa.Boolean(), nullable=False, server_default=sa.true()),
+            sa.Column('builds_total', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('builds_done', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('error', sa.Text(), nullable=True),
+            sa.Column('result_key', sa.String(300), nullable=True),
+            sa.Column('result_url', sa.String(2000), nullable=True),
+            sa.Column('started_at', sa.DateTime(timezone=True), nullable=True),
+            sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+            sa.Column('stage_timings', sa.JSON(), nullable=True),
+            sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+            sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        )
+        op.create_index('ix_export_jobs_user_id', 'export_jobs', ['user_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_export_jobs_user_id', table_name='export_jobs')
+    op.drop_table('export_jobs')
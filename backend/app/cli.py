@@ -0,0 +1,588 @@
+"""
+Command-line tools (run from backend/).
+
+    python -m app.cli manuals reindex     [--full] [common options]
+    python -m app.cli manuals prepopulate [common options]
+
+    common options: [--dry-run] [-j/--concurrency N] [--checkpoint FILE]
+                    [--restart] [--summary FILE] [--no-progress]
+
+Data flow (manuals):
+  discover work
+    reindex:     manual directories under {MANUALS_STORAGE_PATH}/extracted
+                 ("{Make}_{Year}_{Model}")
+    prepopulate: seeded vehicles, engines and transmissions (engine and
+                 transmission manuals come from their donor vehicle) that have
+                 no chunks yet
+  → drop manuals the checkpoint records as done (an interrupted or failed run
+    resumes where it stopped; --restart ignores the checkpoint)
+  → run up to MANUAL_CLI_CONCURRENCY manuals at once; work that reads the same
+    charm.li manual runs one after another
+      reindex:     RAGIndexer.index_manual() → clear_stale_chunks()
+      prepopulate: ManualIngestor.run_pipeline(), followed through job_events;
+                   charm.li requests are throttled per host in CharmDownloader
+  → progress table on stderr, redrawn as manuals advance
+  → checkpoint rewritten after every finished manual, removed once a run
+    finishes without failures
+  → JSON summary (counts, totals, throughput) on stdout or --summary FILE
+
+Exits 1 if any manual failed.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Optional, TextIO
+
+os.environ.setdefault("LOCAL_DEV", "true")  # skip Supabase auth for standalone use
+
+from app.config import get_settings  # noqa: E402
+
+settings = get_settings()
+
+# Progress table: redraw at most this often, and list this many finished manuals
+_REDRAW_SECONDS = 0.25
+_RECENT_ROWS = 5
+
+
+@dataclass
+class ManualWork:
+    key: str  # checkpoint key
+    label: str
+    manual: str  # charm.li manual read ("{Make}_{Year}_{Model}"); work sharing one runs serially
+    params: dict = field(default_factory=dict)
+
+
+@dataclass
+class ManualRun:
+    """One manual's outcome and counters (a progress-table row and a summary entry)."""
+    key: str
+    label: str
+    status: str = "queued"  # queued | running | ok | failed | skipped
+    stage: str = ""
+    chunks: int = 0
+    pages_parsed: int = 0
+    pages_skipped: int = 0
+    pages_removed: int = 0
+    bytes_downloaded: int = 0
+    seconds: float = 0.0
+    error: Optional[str] = None
+    started: float = field(default=0.0, repr=False)
+
+
+# ---------------------------------------------------------------------------
+# Checkpoint
+# ---------------------------------------------------------------------------
+
+class Checkpoint:
+    """Manuals finished by an earlier, incomplete run of the same command and
+    options. Written atomically (temp file + rename) after every manual."""
+
+    def __init__(self, path: Path, command: str, options: dict):
+        self.path = path
+        self.command = command
+        self.options = options
+        self.done: dict[str, dict] = {}
+
+    def load(self) -> None:
+        try:
+            data = json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            return
+        if data.get("command") == self.command and data.get("options") == self.options:
+            self.done = dict(data.get("done") or {})
+
+    def record(self, run: ManualRun) -> None:
+        self.done[run.key] = {k: v for k, v in asdict(run).items() if k != "started"}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(json.dumps(
+            {"command": self.command, "options": self.options, "done": self.done}, indent=2,
+        ))
+        tmp.replace(self.path)
+
+    def clear(self) -> None:
+        self.path.unlink(missing_ok=True)
+
+
+# ---------------------------------------------------------------------------
+# Progress table
+# ---------------------------------------------------------------------------
+
+def _fmt_bytes(n: int) -> str:
+    return f"{n / 1e6:.1f} MB" if n else "-"
+
+
+def _running_seconds(run: ManualRun) -> float:
+    return time.perf_counter() - run.started if run.started else 0.0
+
+
+class ProgressTable:
+    """Live status of every manual. On a terminal the table is redrawn in place;
+    otherwise (logs, CI) one line is printed per manual started or finished."""
+
+    def __init__(self, runs: list[ManualRun], out: TextIO = sys.stderr, live: Optional[bool] = None):
+        self.runs = runs
+        self.out = out
+        self.live = out.isatty() if live is None else live
+        self.started = time.perf_counter()
+        self._drawn = 0
+        self._last_draw = 0.0
+
+    def changed(self, run: ManualRun, force: bool = False) -> None:
+        if not self.live:
+            if force and run.status == "running":
+                print(f"[{run.label}] started", file=self.out, flush=True)
+            elif force:
+                detail = f"{run.chunks} chunks, {run.pages_parsed} pages parsed, {run.seconds:.1f}s"
+                if run.error:
+                    detail = run.error
+                print(f"[{run.label}] {run.status.upper()} — {detail}", file=self.out, flush=True)
+            return
+        now = time.perf_counter()
+        if force or now - self._last_draw >= _REDRAW_SECONDS:
+            self.draw()
+
+    def lines(self) -> list[str]:
+        counts = defaultdict(int)
+        for run in self.runs:
+            counts[run.status] += 1
+        finished = counts["ok"] + counts["failed"] + counts["skipped"]
+        elapsed = time.perf_counter() - self.started
+        chunks = sum(r.chunks for r in self.runs)
+        lines = [
+            f"{finished}/{len(self.runs)} manuals  ok {counts['ok']}  failed {counts['failed']}  "
+            f"skipped {counts['skipped']}  running {counts['running']}  "
+            f"{chunks:,} chunks  {elapsed:.0f}s",
+            f"  {'manual':<40} {'status':<12} {'stage':<12} {'chunks':>8} {'pages':>7} {'download':>10} {'time':>7}",
+        ]
+        active = [r for r in self.runs if r.status == "running"]
+        recent = sorted(
+            (r for r in self.runs if r.status in ("ok", "failed", "skipped")),
+            key=lambda r: r.started + r.seconds,
+        )[-_RECENT_ROWS:]
+        for run in active + recent:
+            seconds = _running_seconds(run) if run.status == "running" else run.seconds
+            lines.append(
+                f"  {run.label[:40]:<40} {run.status:<12} {run.stage[:12]:<12} {run.chunks:>8,} "
+                f"{run.pages_parsed:>7,} {_fmt_bytes(run.bytes_downloaded):>10} {seconds:>6.0f}s"
+            )
+        return lines
+
+    def draw(self) -> None:
+        lines = self.lines()
+        if self._drawn:
+            # Back to the top of the previous table, clearing to the end of the screen
+            self.out.write(f"\x1b[{self._drawn}F\x1b[J")
+        self.out.write("\n".join(lines) + "\n")
+        self.out.flush()
+        self._drawn = len(lines)
+        self._last_draw = time.perf_counter()
+
+
+# ---------------------------------------------------------------------------
+# Runner
+# ---------------------------------------------------------------------------
+
+Worker = Callable[[ManualWork, ManualRun, Callable[[], None]], Awaitable[None]]
+
+
+async def run_manuals(
+    work: list[ManualWork],
+    worker: Worker,
+    concurrency: int,
+    checkpoint: Optional[Checkpoint] = None,
+    table: Optional[ProgressTable] = None,
+    runs: Optional[list[ManualRun]] = None,
+) -> list[ManualRun]:
+    """Run worker over every manual, at most `concurrency` at once.
+
+    The worker fills in its ManualRun (stage and counters; status "skipped" if
+    there was nothing to do) and calls the given callback whenever it changed.
+    An exception marks the run failed; the other manuals carry on.
+    """
+    runs = runs or [ManualRun(w.key, w.label) for w in work]
+    slots = asyncio.Semaphore(max(1, concurrency))
+    manual_locks: dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+
+    def _changed(run: ManualRun, force: bool = False) -> None:
+        if table is not None:
+            table.changed(run, force)
+
+    async def _one(item: ManualWork, run: ManualRun) -> None:
+        # Same-manual lock first, so waiting on it never holds a slot
+        async with manual_locks[item.manual], slots:
+            run.status = "running"
+            run.started = time.perf_counter()
+            _changed(run, force=True)
+            try:
+                await worker(item, run, lambda: _changed(run))
+                if run.status == "running":
+                    run.status = "ok"
+            except Exception as exc:
+                run.status = "failed"
+                run.error = str(exc) or type(exc).__name__
+            run.seconds = round(time.perf_counter() - run.started, 3)
+            run.stage = "done" if run.status == "ok" else run.stage
+            if checkpoint is not None and run.status == "ok":
+                checkpoint.record(run)
+            _changed(run, force=True)
+
+    await asyncio.gather(*(_one(item, run) for item, run in zip(work, runs)))
+    return runs
+
+
+def summarize(
+    command: str,
+    runs: list[ManualRun],
+    started_at: datetime,
+    elapsed: float,
+    concurrency: int,
+    resumed: int = 0,
+) -> dict:
+    """JSON summary of a run: counts, totals and throughput."""
+    done = [r for r in runs if r.status in ("ok", "failed", "skipped")]
+    totals = {
+        k: sum(getattr(r, k) for r in runs)
+        for k in ("chunks", "pages_parsed", "pages_skipped", "pages_removed", "bytes_downloaded")
+    }
+    busy = sum(r.seconds for r in runs)
+    per_second = (lambda n: round(n / elapsed, 3)) if elapsed > 0 else (lambda n: 0.0)
+    return {
+        "command": command,
+        "started_at": started_at.isoformat(),
+        "elapsed_seconds": round(elapsed, 3),
+        "concurrency": concurrency,
+        "manuals": {
+            "total": len(runs) + resumed,
+            "ok": sum(r.status == "ok" for r in runs),
+            "failed": sum(r.status == "failed" for r in runs),
+            "skipped": sum(r.status == "skipped" for r in runs),
+            "resumed": resumed,
+        },
+        **totals,
+        "throughput": {
+            "manuals_per_minute": round(per_second(len(done)) * 60, 2),
+            "chunks_per_second": per_second(totals["chunks"]),
+            "pages_per_second": per_second(totals["pages_parsed"] + totals["pages_skipped"]),
+            "download_mb_per_second": round(per_second(totals["bytes_downloaded"]) / 1e6, 3),
+            # Sum of per-manual time over wall time: how much the concurrency bought
+            "parallelism": round(busy / elapsed, 2) if elapsed > 0 else 0.0,
+        },
+        "results": [{k: v for k, v in asdict(r).items() if k != "started"} for r in runs],
+    }
+
+
+# ---------------------------------------------------------------------------
+# manuals reindex
+# ---------------------------------------------------------------------------
+
+def reindex_work(extracted_root: Path) -> list[ManualWork]:
+    """One item per "{Make}_{Year}_{Model}" directory; others are reported and skipped."""
+    work = []
+    for manual_dir in sorted(d for d in extracted_root.iterdir() if d.is_dir()):
+        parts = manual_dir.name.split("_", 2)
+        if len(parts) < 3 or not parts[1].isdigit():
+            print(f"[SKIP] Cannot parse make/year/model from: {manual_dir.name}", file=sys.stderr)
+            continue
+        make, year, model = parts[0], int(parts[1]), parts[2]
+        work.append(ManualWork(
+            key=f"reindex:{manual_dir.name}",
+            label=f"{year} {make} {model}",
+            manual=manual_dir.name.lower(),
+            params={"manual_dir": manual_dir, "make": make, "model": model, "year": year},
+        ))
+    return work
+
+
+def _storage_service():
+    """StorageService for diagram uploads, or None (diagrams indexed as stubs)."""
+    if not (settings.supabase_url and settings.supabase_anon_key):
+        print("Supabase not configured — diagrams will be indexed as stubs.", file=sys.stderr)
+        return None
+    try:
+        from app.services.storage import StorageService
+        return StorageService()
+    except Exception as e:
+        print(f"Warning: Could not connect to Supabase Storage: {e}", file=sys.stderr)
+        return None
+
+
+def reindex_worker(full: bool, storage_service=None) -> Worker:
+    """Safe re-index of one manual: index_manual() (unchanged pages skipped by
+    content hash), then clear_stale_chunks() only once that succeeded."""
+    from app.services.rag_indexer import IndexStats, RAGIndexer
+
+    indexer = RAGIndexer()
+
+    async def _reindex(item: ManualWork, run: ManualRun, changed: Callable[[], None]) -> None:
+        from app.database import worker_session_maker
+
+        p = item.params
+        stats = IndexStats()
+
+        def _progress(count: int) -> None:
+            run.chunks = count
+            run.pages_parsed = stats.pages_parsed
+            run.pages_skipped = stats.pages_skipped
+            changed()
+
+        run.stage = "indexing"
+        async with worker_session_maker() as db:
+            run.chunks = await indexer.index_manual(
+                p["manual_dir"], p["make"], p["model"], p["year"],
+                vehicle_id=None,
+                db=db,
+                scope="chassis",
+                storage_service=storage_service,
+                session_factory=worker_session_maker,
+                stats=stats,
+                progress=_progress,
+                full=full,
+            )
+        run.pages_parsed = stats.pages_parsed
+        run.pages_skipped = stats.pages_skipped
+        run.pages_removed = stats.pages_removed
+
+        run.stage = "clearing"
+        changed()
+        async with worker_session_maker() as db:
+            # Old 'pages > NNN' chunks, only after the index above succeeded
+            run.pages_removed += await indexer.clear_stale_chunks(
+                p["make"], p["model"], p["year"], db, scope="chassis",
+            )
+
+    return _reindex
+
+
+# ---------------------------------------------------------------------------
+# manuals prepopulate
+# ---------------------------------------------------------------------------
+
+async def _already_indexed(db, scope: str, **match) -> bool:
+    """True if any chunk exists for this scope/component."""
+    from sqlalchemy import func, select
+    from app.models.manual_chunk import ManualChunk
+
+    filters = [ManualChunk.scope == scope]
+    if scope == "chassis":
+        filters += [
+            func.lower(ManualChunk.vehicle_make) == match["make"].lower(),
+            func.lower(ManualChunk.vehicle_model) == match["model"].lower(),
+            ManualChunk.vehicle_year == match["year"],
+        ]
+    elif scope == "engine":
+        filters.append(ManualChunk.engine_id == match["engine_id"])
+    elif scope == "transmission":
+        filters.append(ManualChunk.transmission_id == match["transmission_id"])
+    result = await db.execute(select(ManualChunk.id).where(*filters).limit(1))
+    return result.first() is not None
+
+
+async def prepopulate_work() -> tuple[list[ManualWork], int]:
+    """Seeded components without chunks, and how many already have some."""
+    from sqlalchemy import select
+    from app.database import worker_session_maker
+    from app.models.engine import Engine
+    from app.models.transmission import Transmission
+    from app.models.vehicle import Vehicle
+
+    async with worker_session_maker() as db:
+        vehicles = (await db.execute(select(Vehicle))).scalars().all()
+        engines = (await db.execute(
+            select(Engine).where(Engine.origin_year.is_not(None))
+        )).scalars().all()
+        transmissions = (await db.execute(
+            select(Transmission).where(Transmission.origin_year.is_not(None))
+        )).scalars().all()
+
+        candidates = [
+            ManualWork(
+                key=f"chassis:{v.id}",
+                label=f"{v.year} {v.make} {v.model}",
+                manual=f"{v.make}_{v.year}_{v.model}".lower(),
+                params={"year": v.year, "make": v.make, "model": v.model,
+                        "vehicle_id": str(v.id), "scope": "chassis"},
+            )
+            for v in vehicles
+        ] + [
+            ManualWork(
+                key=f"engine:{e.id}",
+                label=f"{e.make} {e.model} ← {e.origin_year} {e.origin_make} {e.origin_model}",
+                manual=f"{e.origin_make}_{e.origin_year}_{e.origin_model}".lower(),
+                params={"year": e.origin_year, "make": e.origin_make, "model": e.origin_model,
+                        "vehicle_id": None, "scope": "engine", "engine_id": str(e.id)},
+            )
+            for e in engines
+        ] + [
+            ManualWork(
+                key=f"transmission:{t.id}",
+                label=f"{t.make} {t.model} ← {t.origin_year} {t.origin_make} {t.origin_model}",
+                manual=f"{t.origin_make}_{t.origin_year}_{t.origin_model}".lower(),
+                params={"year": t.origin_year, "make": t.origin_make, "model": t.origin_model,
+                        "vehicle_id": None, "scope": "transmission", "transmission_id": str(t.id)},
+            )
+            for t in transmissions
+        ]
+
+        work = []
+        for item in candidates:
+            if not await _already_indexed(db, **item.params):
+                work.append(item)
+    return work, len(candidates) - len(work)
+
+
+def _apply_job(run: ManualRun, status: dict) -> None:
+    run.stage = status.get("stage") or run.stage
+    run.chunks = status.get("chunks_indexed") or 0
+    run.pages_parsed = status.get("pages_parsed") or 0
+    run.pages_skipped = status.get("pages_skipped") or 0
+    run.bytes_downloaded = status.get("bytes_downloaded") or 0
+
+
+async def prepopulate_item(item: ManualWork, run: ManualRun, changed: Callable[[], None]) -> None:
+    """Download → extract → analyze → fill → index one component's manual."""
+    from app.database import worker_session_maker
+    from app.services.job_events import job_events
+    from app.services.manual_ingestor import ManualIngestor, job_status
+
+    p = dict(item.params)
+    year, make, model, vehicle_id = p.pop("year"), p.pop("make"), p.pop("model"), p.pop("vehicle_id")
+    ingestor = ManualIngestor()
+    async with worker_session_maker() as db:
+        job_id = await ingestor.start_ingest(year, make, model, vehicle_id, db)
+
+    # run_pipeline publishes every stage and indexing batch; follow them for the table
+    events = job_events.subscribe(job_id)
+
+    async def _follow():
+        while True:
+            _apply_job(run, await events.get())
+            changed()
+
+    follower = asyncio.create_task(_follow())
+    try:
+        await ingestor.run_pipeline(job_id, year, make, model, vehicle_id, worker_session_maker, **p)
+    finally:
+        follower.cancel()
+        job_events.unsubscribe(job_id, events)
+
+    async with worker_session_maker() as db:
+        job = await ingestor.get_status(job_id, db)
+    if job is None:
+        raise RuntimeError(f"ingest job {job_id} disappeared")
+    _apply_job(run, job_status(job).model_dump())
+    if job.status != "complete":
+        raise RuntimeError(job.error or f"ingest ended {job.status}")
+
+
+# ---------------------------------------------------------------------------
+# Entry point
+# ---------------------------------------------------------------------------
+
+def _parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="SwapSpec command-line tools.")
+    groups = parser.add_subparsers(dest="group", required=True)
+    manuals = groups.add_parser("manuals", help="Bulk manual indexing")
+    commands = manuals.add_subparsers(dest="command", required=True)
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--dry-run", action="store_true", help="list the manuals that would run, change nothing")
+    common.add_argument("-j", "--concurrency", type=int, default=settings.manual_cli_concurrency,
+                        help="manuals processed at once (default: MANUAL_CLI_CONCURRENCY)")
+    common.add_argument("--checkpoint", type=Path, default=None,
+                        help="progress file for resuming (default: under MANUALS_STORAGE_PATH)")
+    common.add_argument("--restart", action="store_true", help="ignore the checkpoint and redo every manual")
+    common.add_argument("--summary", type=Path, default=None, help="write the JSON summary here instead of stdout")
+    common.add_argument("--no-progress", action="store_true", help="no progress output on stderr")
+
+    reindex = commands.add_parser("reindex", parents=[common],
+                                  help="re-index every extracted manual (unchanged pages are skipped)")
+    reindex.add_argument("--full", action="store_true", help="re-process every page, not just changed ones")
+    commands.add_parser("prepopulate", parents=[common],
+                        help="download and index manuals for every seeded vehicle, engine and transmission")
+    return parser
+
+
+async def _manuals(args: argparse.Namespace) -> int:
+    options: dict[str, Any] = {}
+    if args.command == "reindex":
+        extracted_root = Path(settings.manuals_storage_path) / "extracted"
+        if not extracted_root.exists():
+            print(f"No extracted manuals directory found at: {extracted_root}", file=sys.stderr)
+            return 0
+        work = reindex_work(extracted_root)
+        options["full"] = args.full
+        already = 0
+    else:
+        from app.database import init_db
+        await init_db()
+        work, already = await prepopulate_work()
+        if already:
+            print(f"{already} components already indexed — skipping.", file=sys.stderr)
+
+    if args.dry_run:
+        print(f"=== DRY RUN — {len(work)} manuals would run ===", file=sys.stderr)
+        for item in work:
+            detail = ""
+            if "manual_dir" in item.params:
+                detail = f"  ({sum(1 for _ in item.params['manual_dir'].rglob('*.html'))} HTML files)"
+            print(f"  {item.label}{detail}", file=sys.stderr)
+        return 0
+
+    checkpoint = Checkpoint(
+        args.checkpoint or Path(settings.manuals_storage_path) / f".cli_{args.command}_checkpoint.json",
+        args.command, options,
+    )
+    if args.restart:
+        checkpoint.clear()
+    checkpoint.load()
+    resumed = sum(1 for item in work if item.key in checkpoint.done)
+    if resumed:
+        print(f"Resuming: {resumed} manuals already done per {checkpoint.path}", file=sys.stderr)
+    work = [item for item in work if item.key not in checkpoint.done]
+
+    if args.command == "reindex":
+        worker = reindex_worker(args.full, _storage_service())
+    else:
+        worker = prepopulate_item
+
+    runs = [ManualRun(w.key, w.label) for w in work]
+    table = None if args.no_progress else ProgressTable(runs)
+    started_at = datetime.now(timezone.utc)
+    t0 = time.perf_counter()
+    await run_manuals(work, worker, args.concurrency, checkpoint, table, runs)
+    elapsed = time.perf_counter() - t0
+    if table is not None and table.live:
+        table.draw()
+
+    summary = summarize(args.command, runs, started_at, elapsed, args.concurrency, resumed)
+    summary["manuals"]["total"] += already
+    summary["manuals"]["skipped"] += already
+    failed = summary["manuals"]["failed"]
+    if not failed:
+        checkpoint.clear()
+
+    text = json.dumps(summary, indent=2)
+    if args.summary:
+        args.summary.write_text(text + "\n")
+    else:
+        print(text)
+    return 1 if failed else 0
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    args = _parser().parse_args(argv)
+    return asyncio.run(_manuals(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
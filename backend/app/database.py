@@ -1,20 +1,143 @@
+import contextvars
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from fastapi import Request
+
+from sqlalchemy import event, exc as sa_exc, text
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from app.config import get_settings
 
 settings = get_settings()
 
-_connect_args = {}
-if "asyncpg" in settings.database_url:
-    # Disable prepared statement caching for pgBouncer (Supabase pooler)
-    # 10s connect timeout prevents hanging on DB startup
-    _connect_args = {"statement_cache_size": 0, "timeout": 10}
+
+# ---------------------------------------------------------------------------
+# Pool instrumentation
+# ---------------------------------------------------------------------------
+
+# Upper bounds (seconds) for the checkout-wait histogram
+CHECKOUT_WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, float("inf"))
+
+
+class PoolStats:
+    """Checkout-wait counters for one engine's pool."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.bucket_counts = [0] * len(CHECKOUT_WAIT_BUCKETS)
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float, timed_out: bool = False) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+                return
+            self.checkouts += 1
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+            for i, bound in enumerate(CHECKOUT_WAIT_BUCKETS):
+                if seconds <= bound:
+                    self.bucket_counts[i] += 1
+                    break
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_seconds_total": round(self.wait_seconds_total, 6),
+                "wait_seconds_max": round(self.wait_seconds_max, 6),
+                "wait_buckets": {
+                    ("+Inf" if b == float("inf") else str(b)): c
+                    for b, c in zip(CHECKOUT_WAIT_BUCKETS, self.bucket_counts)
+                },
+            }
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool that records how long each checkout waited.
+
+    A subclass is minted per profile (see _timed_pool_class) so the stats survive
+    Pool.recreate(), which re-instantiates self.__class__ without extra kwargs.
+    """
+
+    stats: PoolStats
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except sa_exc.TimeoutError:
+            self.stats.observe(time.perf_counter() - start, timed_out=True)
+            raise
+        self.stats.observe(time.perf_counter() - start)
+        return conn
+
+
+pool_stats: dict[str, PoolStats] = {}
+
+
+def _timed_pool_class(name: str) -> type:
+    stats = pool_stats.setdefault(name, PoolStats(name))
+    return type(f"TimedQueuePool_{name}", (TimedQueuePool,), {"stats": stats})
+
+
+# ---------------------------------------------------------------------------
+# Engine profiles
+# ---------------------------------------------------------------------------
+
+def _engine_kwargs(url: str, profile: str, statement_cache: bool) -> dict:
+    """Build create_async_engine kwargs for the 'api' or 'worker' pool profile.
+
+    api    — many short request transactions; through the Supabase pooler
+             (pgBouncer transaction mode) the asyncpg statement cache must be off.
+    worker — few long-lived ingest/bulk connections; small pool, aggressive
+             recycle. When DATABASE_DIRECT_URL bypasses the pooler, prepared
+             statements are safe and the cache is re-enabled.
+    """
+    kwargs: dict = {"echo": False, "future": True}
+    if url.startswith("sqlite") and ":memory:" in url:
+        return kwargs
+
+    kwargs["poolclass"] = _timed_pool_class(profile)
+    if "asyncpg" in url:
+        # 10s connect timeout prevents hanging on DB startup
+        connect_args: dict = {"timeout": 10}
+        if not statement_cache:
+            # Disable prepared statement caching for pgBouncer (Supabase pooler)
+            connect_args["statement_cache_size"] = 0
+        kwargs["connect_args"] = connect_args
+
+    if url.startswith("sqlite"):
+        return kwargs
+
+    if profile == "worker":
+        kwargs.update(
+            pool_size=settings.db_worker_pool_size,
+            max_overflow=settings.db_worker_max_overflow,
+            pool_recycle=settings.db_worker_pool_recycle,
+        )
+    else:
+        kwargs.update(
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_recycle=settings.db_pool_recycle,
+        )
+    kwargs.update(pool_pre_ping=settings.db_pool_pre_ping, pool_timeout=settings.db_pool_timeout)
+    return kwargs
+
 
 engine = create_async_engine(
     settings.database_url,
-    echo=False,
-    future=True,
-    connect_args=_connect_args,
+    **_engine_kwargs(settings.database_url, "api", statement_cache=not settings.database_pgbouncer),
 )
 
 async_session_maker = async_sessionmaker(
@@ -23,6 +146,173 @@ async_session_maker = async_sessionmaker(
     expire_on_commit=False,
 )
 
+# Background ingests, bulk exports and CLI scripts use a separate pool so a long
+# job can never starve request handlers of connections. With a direct
+# (non-pooler) URL the worker also gets asyncpg's prepared statement cache.
+_worker_url = settings.database_direct_url or settings.database_url
+worker_engine = create_async_engine(
+    _worker_url,
+    **_engine_kwargs(
+        _worker_url, "worker",
+        statement_cache=bool(settings.database_direct_url) or not settings.database_pgbouncer,
+    ),
+)
+
+worker_session_maker = async_sessionmaker(
+    worker_engine,
+    class_=AsyncSession,
+    expire_on_commit=False,
+)
+
+
+# ---------------------------------------------------------------------------
+# Read replica
+# ---------------------------------------------------------------------------
+
+# Optional streaming replica for read-only routes (search, catalog lists, chat
+# history). Without DATABASE_READ_URL every "read" session is a primary session.
+if settings.database_read_url:
+    read_engine = create_async_engine(
+        settings.database_read_url,
+        **_engine_kwargs(settings.database_read_url, "read", statement_cache=not settings.database_pgbouncer),
+    )
+    read_session_maker = async_sessionmaker(read_engine, class_=AsyncSession, expire_on_commit=False)
+else:
+    read_engine = engine
+    read_session_maker = async_session_maker
+
+
+# A caught-up replica has no lag, however old its last replayed transaction is
+# (a quiet primary sends nothing to replay); the replay timestamp only measures
+# lag while WAL is received but not yet applied. NULL (nothing replayed yet, so
+# no timestamp) reads as unknown.
+REPLICA_LAG_SQL = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END
+""")
+
+
+# Set on the response to any request that wrote to the primary. While the
+# client holds it, its replica-eligible reads go to the primary instead, in
+# whichever worker serves them (read-your-writes per client, not per process).
+PRIMARY_COOKIE = "swapspec_primary"
+
+
+@dataclass
+class RequestWrites:
+    wrote: bool = False
+
+
+_request_writes: contextvars.ContextVar[Optional[RequestWrites]] = contextvars.ContextVar(
+    "swapspec_request_writes", default=None
+)
+
+
+class ReplicaRouter:
+    """Decides per request whether a read may go to the replica.
+
+    Falls back to the primary when:
+      - the client wrote within the last ``write_window`` seconds: a request
+        that writes gets a PRIMARY_COOKIE lasting that long, so a client that
+        just created/updated something and immediately lists it never gets a
+        stale replica answer, or
+      - the replica reports replay lag above ``max_lag`` (PostgreSQL only,
+        sampled at most every ``lag_check_interval`` seconds), or the lag
+        can't be measured.
+    Other clients' writes (and background tasks') don't affect anyone's reads.
+    """
+
+    def __init__(self, enabled: bool, write_window: float, max_lag: float, lag_check_interval: float):
+        self.enabled = enabled
+        self.write_window = write_window
+        self.max_lag = max_lag
+        self.lag_check_interval = lag_check_interval
+        self._lag: Optional[float] = 0.0
+        self._lag_checked_at: Optional[float] = None
+
+    def start_request(self) -> tuple[RequestWrites, contextvars.Token]:
+        writes = RequestWrites()
+        return writes, _request_writes.set(writes)
+
+    def finish_request(self, token: contextvars.Token) -> None:
+        _request_writes.reset(token)
+
+    def note_write(self) -> None:
+        writes = _request_writes.get()
+        if writes is not None:
+            writes.wrote = True
+
+    def pin_cookie(self, writes: RequestWrites) -> Optional[dict]:
+        """set_cookie() arguments for a request that wrote, or None."""
+        if not (self.enabled and writes.wrote):
+            return None
+        return {
+            "key": PRIMARY_COOKIE, "value": "1", "max_age": max(1, round(self.write_window)),
+            "httponly": True, "samesite": "lax",
+        }
+
+    async def replica_lag(self) -> Optional[float]:
+        """Replay lag in seconds (0 for non-PostgreSQL replicas); None if the probe
+        failed or the replica can't tell (it has never replayed a transaction)."""
+        now = time.monotonic()
+        if self._lag_checked_at is not None and now - self._lag_checked_at < self.lag_check_interval:
+            return self._lag
+        self._lag_checked_at = now
+        if read_engine.dialect.name != "postgresql":
+            self._lag = 0.0
+            return self._lag
+        try:
+            async with read_engine.connect() as conn:
+                lag = (await conn.execute(REPLICA_LAG_SQL)).scalar()
+            self._lag = None if lag is None else max(float(lag), 0.0)
+        except Exception:
+            self._lag = None
+        return self._lag
+
+    async def use_replica(self, pinned: bool = False) -> bool:
+        if not self.enabled or pinned:
+            return False
+        lag = await self.replica_lag()
+        return lag is not None and lag <= self.max_lag
+
+
+replica_router = ReplicaRouter(
+    enabled=bool(settings.database_read_url),
+    write_window=settings.read_replica_write_window_seconds,
+    max_lag=settings.read_replica_max_lag_seconds,
+    lag_check_interval=settings.read_replica_lag_check_seconds,
+)
+
+_WRITE_PREFIXES = ("INSERT", "UPDATE", "DELETE", "MERGE")
+
+
+@event.listens_for(engine.sync_engine, "after_cursor_execute")
+def _record_primary_write(conn, cursor, statement, parameters, context, executemany):
+    # Request-path writes only; ingest workers write through worker_engine and
+    # never pin anyone's reads to the primary.
+    if statement.lstrip()[:6].upper().startswith(_WRITE_PREFIXES):
+        replica_router.note_write()
+
+
+def pool_status() -> dict:
+    """Current size/usage and checkout-wait stats for each engine's pool."""
+    status = {}
+    engines = [("api", engine), ("worker", worker_engine)]
+    if read_engine is not engine:
+        engines.append(("read", read_engine))
+    for name, eng in engines:
+        pool = eng.sync_engine.pool
+        entry = {"class": type(pool).__name__}
+        if isinstance(pool, AsyncAdaptedQueuePool):
+            entry.update(size=pool.size(), checked_out=pool.checkedout(), overflow=pool.overflow())
+        if name in pool_stats:
+            entry.update(pool_stats[name].snapshot())
+        status[name] = entry
+    return status
+
 
 class Base(DeclarativeBase):
     pass
@@ -36,6 +326,17 @@ async def get_db():
             await session.close()
 
 
+async def get_read_db(request: Request):
+    """Session for read-only routes: the replica when safe, otherwise the primary."""
+    pinned = PRIMARY_COOKIE in request.cookies
+    maker = read_session_maker if await replica_router.use_replica(pinned) else async_session_maker
+    async with maker() as session:
+        try:
+            yield session
+        finally:
+            await session.close()
+
+
 async def init_db():
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
@@ -1,8 +1,17 @@
 import logging
+import os
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from app.database import init_db
+from fastapi.responses import PlainTextResponse
+from fastapi.staticfiles import StaticFiles
+from app.config import get_settings
+from app.database import init_db, engine, worker_engine, read_engine, replica_router
+from app.services import metrics
+from app.services.job_events import job_events, listen_dsn
+from app.services.pdf_ingestor import shutdown_extract_pool
+from app.services.pdf_service import shutdown_render_pool
+from app.services.storage import PUBLIC_BUCKETS
 
 logger = logging.getLogger(__name__)
 from app.routers import (
@@ -17,6 +26,7 @@ from app.routers import (
     specs_router,
     manuals_router,
     admin_router,
+    fitment_router,
 )
 
 
@@ -27,7 +37,13 @@ async def lifespan(app: FastAPI):
         logger.info("Database initialized successfully")
     except Exception as e:
         logger.error(f"Database initialization failed (app will still start): {e}")
+    dsn = listen_dsn()
+    if dsn:
+        await job_events.start(dsn)
     yield
+    await job_events.stop()
+    shutdown_render_pool()
+    shutdown_extract_pool()
 
 
 app = FastAPI(
@@ -53,6 +69,39 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+metrics.install_db_instrumentation({"api": engine, "worker": worker_engine, "read": read_engine})
+
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Per-route latency, status and DB query count/time (see app/services/metrics.py)."""
+    stats, token = metrics.start_request()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        # Label by route template, not raw path, to keep cardinality bounded
+        route = request.scope.get("route")
+        route_path = getattr(route, "path", None) or "unmatched"
+        metrics.finish_request(stats, token, request.method, route_path, status_code)
+
+
+@app.middleware("http")
+async def read_your_writes(request: Request, call_next):
+    """Pin a client's reads to the primary for a moment after it writes (see ReplicaRouter)."""
+    writes, token = replica_router.start_request()
+    try:
+        response = await call_next(request)
+    finally:
+        replica_router.finish_request(token)
+    cookie = replica_router.pin_cookie(writes)
+    if cookie:
+        response.set_cookie(**cookie)
+    return response
+
+
 # Include routers
 app.include_router(auth_router)
 app.include_router(engines_router)
@@ -65,6 +114,21 @@ app.include_router(files_router)
 app.include_router(specs_router)
 app.include_router(manuals_router)
 app.include_router(admin_router)
+app.include_router(fitment_router)
+
+def mount_local_storage(app: FastAPI, root: str, base_url: str) -> None:
+    """Serve the local storage backend's public buckets. Private buckets (bulk
+    exports) stay behind their authenticated routes, as they do on Supabase."""
+    for bucket in PUBLIC_BUCKETS:
+        directory = os.path.join(root, bucket)
+        os.makedirs(directory, exist_ok=True)
+        app.mount(f"{base_url.rstrip('/')}/{bucket}", StaticFiles(directory=directory), name=f"storage-{bucket}")
+
+
+# Local storage backend (STORAGE_BACKEND=local) serves its files itself
+settings = get_settings()
+if settings.storage_backend == "local":
+    mount_local_storage(app, settings.storage_local_path, settings.storage_local_url)
 
 
 @app.get("/")
@@ -84,12 +148,20 @@ async def health_check():
 @app.get("/health/db")
 async def db_health_check():
     import asyncio
-    from app.database import engine
+    from app.database import engine, pool_status
     from sqlalchemy import text
     try:
         async with asyncio.timeout(5):
             async with engine.connect() as conn:
                 await conn.execute(text("SELECT 1"))
-        return {"db": "connected"}
+        return {"db": "connected", "pools": pool_status()}
     except Exception as e:
-        return {"db": f"error: {str(e)}"}
+        return {"db": f"error: {str(e)}", "pools": pool_status()}
+
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    return PlainTextResponse(
+        metrics.render_prometheus(),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
+    )
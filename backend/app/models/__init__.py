@@ -6,5 +6,7 @@ from app.models.build import Build
 from app.models.chat_message import ChatMessage
 from app.models.manual_chunk import ManualChunk
 from app.models.ingest_job import IngestJob
+from app.models.diagram_asset import DiagramAsset
+from app.models.export_job import ExportJob
 
-__all__ = ["Engine", "Transmission", "Vehicle", "User", "Build", "ChatMessage", "ManualChunk", "IngestJob"]
+__all__ = ["Engine", "Transmission", "Vehicle", "User", "Build", "ChatMessage", "ManualChunk", "IngestJob", "DiagramAsset", "ExportJob"]
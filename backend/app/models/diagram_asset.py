@@ -0,0 +1,24 @@
+from datetime import datetime, timezone
+from sqlalchemy import String, Integer, DateTime
+from sqlalchemy.orm import Mapped, mapped_column
+from app.database import Base
+
+
+def _utc_now():
+    return datetime.now(timezone.utc)
+
+
+class DiagramAsset(Base):
+    """One stored manual diagram, keyed by the sha256 of its bytes.
+
+    The same wiring diagram appears in many trims/years of a manual; every
+    ManualChunk that shows it points at the single object recorded here.
+    """
+    __tablename__ = "diagram_assets"
+
+    content_hash: Mapped[str] = mapped_column(String(64), primary_key=True)
+    storage_key: Mapped[str] = mapped_column(String(300), nullable=False)
+    url: Mapped[str] = mapped_column(String(2000), nullable=False)
+    content_type: Mapped[str] = mapped_column(String(100), nullable=False, default="image/png")
+    size_bytes: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=_utc_now)
@@ -28,6 +28,9 @@ class Engine(Base):
     power_hp: Mapped[int] = mapped_column(Integer, nullable=True)
     torque_lb_ft: Mapped[int] = mapped_column(Integer, nullable=True)
     mesh_file_url: Mapped[str] = mapped_column(String(500), nullable=True)
+    # Filled by the mesh LOD pipeline (app/services/mesh_processor.py)
+    mesh_triangle_count: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    mesh_lod_urls: Mapped[Optional[dict]] = mapped_column(JSON, nullable=True)
     mount_points: Mapped[dict] = mapped_column(JSON, nullable=True)
 
     # Internal specs
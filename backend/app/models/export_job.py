@@ -0,0 +1,35 @@
+import uuid
+from datetime import datetime, timezone
+from typing import Optional
+from sqlalchemy import String, Integer, Boolean, DateTime, Text, JSON, ForeignKey
+from sqlalchemy.orm import Mapped, mapped_column
+from app.database import Base
+
+
+def _utc_now():
+    return datetime.now(timezone.utc)
+
+
+class ExportJob(Base):
+    """Bulk build export (ZIP of PDFs + combined JSON), polled like IngestJob."""
+    __tablename__ = "export_jobs"
+
+    job_id: Mapped[str] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    user_id: Mapped[str] = mapped_column(String(36), ForeignKey("users.id"), nullable=False, index=True)
+    status: Mapped[str] = mapped_column(String(20), nullable=False, default="pending")
+    stage: Mapped[str] = mapped_column(String(50), nullable=False, default="queued")
+    build_ids: Mapped[list] = mapped_column(JSON, nullable=False)
+    include_pdf: Mapped[bool] = mapped_column(Boolean, nullable=False, default=True)
+    builds_total: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    builds_done: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    # The finished ZIP in the private "exports" bucket; cleared once expired
+    result_key: Mapped[Optional[str]] = mapped_column(String(300), nullable=True)
+
+    # Telemetry — {stage: {"started_at", "finished_at", "seconds"}}
+    started_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    stage_timings: Mapped[Optional[dict]] = mapped_column(JSON, nullable=True)
+
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=_utc_now)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=_utc_now, onupdate=_utc_now)
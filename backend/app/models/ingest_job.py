@@ -1,7 +1,7 @@
 import uuid
 from datetime import datetime, timezone
 from typing import Optional
-from sqlalchemy import String, Integer, DateTime, Text
+from sqlalchemy import String, Integer, BigInteger, DateTime, Text, JSON
 from sqlalchemy.orm import Mapped, mapped_column
 from app.database import Base
 
@@ -19,5 +19,18 @@ class IngestJob(Base):
     chunks_indexed: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
     gaps_filled: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
     error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+
+    # Telemetry — {stage: {"started_at", "finished_at", "seconds"}} plus throughput counters
+    started_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    stage_timings: Mapped[Optional[dict]] = mapped_column(JSON, nullable=True)
+    bytes_downloaded: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    files_extracted: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    pages_parsed: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    pages_skipped: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    pages_removed: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    vision_calls: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    upsert_batches: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=_utc_now)
     updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=_utc_now, onupdate=_utc_now)
@@ -31,6 +31,15 @@ class ManualChunk(Base):
     # Extracted plain text from the HTML file
     content: Mapped[str] = mapped_column(Text, nullable=False)
 
+    # Pages are split into chunks (app/services/chunker.py): every chunk of a
+    # page shares its page_id and section_path, numbered from 0 by chunk_ordinal
+    page_id: Mapped[Optional[str]] = mapped_column(String(36), nullable=True, index=True)
+    chunk_ordinal: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+    # sha256 of the source page (manual_index.page_hash); re-indexing skips
+    # pages whose hash is unchanged. NULL for uploads and gap-filled chunks.
+    content_hash: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
+
     # "charm_li" | "gap_filled_ai" | "gap_filled_web"
     data_source: Mapped[str] = mapped_column(String(50), nullable=False, default="charm_li")
 
@@ -32,6 +32,11 @@ class Vehicle(Base):
     engine_cylinders: Mapped[int] = mapped_column(Integer, nullable=True)
     vin_pattern: Mapped[str] = mapped_column(String(50), nullable=True)
     bay_scan_mesh_url: Mapped[str] = mapped_column(String(500), nullable=True)
+    # Filled by the mesh LOD pipeline (app/services/mesh_processor.py)
+    bay_scan_triangle_count: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    bay_scan_lod_urls: Mapped[Optional[dict]] = mapped_column(JSON, nullable=True)
+    # Filled by the bay SDF job (app/services/bay_sdf.py)
+    bay_sdf_url: Mapped[Optional[str]] = mapped_column(String(500), nullable=True)
     contributor_id: Mapped[str] = mapped_column(String(36), ForeignKey("users.id"), nullable=True)
     quality_status: Mapped[QualityStatus] = mapped_column(
         Enum(QualityStatus), default=QualityStatus.pending
@@ -9,6 +9,7 @@ from app.routers.files import router as files_router
 from app.routers.specs import router as specs_router
 from app.routers.manuals import router as manuals_router
 from app.routers.admin import router as admin_router
+from app.routers.fitment import router as fitment_router
 
 __all__ = [
     "auth_router",
@@ -22,4 +23,5 @@ __all__ = [
     "specs_router",
     "manuals_router",
     "admin_router",
+    "fitment_router",
 ]
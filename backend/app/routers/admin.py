@@ -10,12 +10,15 @@ from app.models.vehicle import Vehicle, QualityStatus
 from app.models.engine import Engine
 from app.models.transmission import Transmission
 from app.models.build import Build
+from app.models.ingest_job import IngestJob
 from app.schemas.vehicle import VehicleCreate, VehicleResponse, VehicleList
 from app.schemas.engine import EngineCreate, EngineResponse, EngineList
 from app.schemas.transmission import TransmissionCreate, TransmissionResponse, TransmissionList
 from app.schemas.build import BuildResponse, BuildList
 from app.schemas.user import UserResponse
-from app.utils.auth import get_admin_user
+from app.services.recommendations import SPEC_ATTRS, rule_counts
+from app.utils.auth import get_admin_user, invalidate_user
+from app.utils.http_cache import response_cache
 
 router = APIRouter(prefix="/api/admin", tags=["Admin"])
 
@@ -40,6 +43,41 @@ class AdminStats(BaseModel):
     total_builds: int
 
 
+class RecommendationStats(BaseModel):
+    builds: int
+    # Rule name → number of builds it fires for
+    rules: dict[str, int]
+
+
+class StageDurationStats(BaseModel):
+    count: int
+    mean_seconds: float
+    p50_seconds: float
+    p95_seconds: float
+
+
+class IngestStats(BaseModel):
+    jobs: int
+    stages: dict[str, StageDurationStats]
+    totals: Optional[StageDurationStats] = None
+
+
+def _percentile(sorted_values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of an already-sorted list."""
+    rank = max(1, -(-len(sorted_values) * pct // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def _duration_stats(values: list[float]) -> StageDurationStats:
+    values = sorted(values)
+    return StageDurationStats(
+        count=len(values),
+        mean_seconds=round(sum(values) / len(values), 3),
+        p50_seconds=round(_percentile(values, 50), 3),
+        p95_seconds=round(_percentile(values, 95), 3),
+    )
+
+
 # ---------- Dashboard ----------
 
 @router.get("/stats", response_model=AdminStats)
@@ -69,6 +107,57 @@ async def get_stats(
     )
 
 
+@router.get("/ingest/stats", response_model=IngestStats)
+async def get_ingest_stats(
+    limit: int = Query(200, ge=1, le=5000),
+    db: AsyncSession = Depends(get_db),
+    _: User = Depends(get_admin_user),
+):
+    """p50/p95 duration of each ingest stage over the most recent finished jobs."""
+    jobs = (await db.execute(
+        select(IngestJob)
+        .where(IngestJob.finished_at.is_not(None))
+        .order_by(IngestJob.finished_at.desc())
+        .limit(limit)
+    )).scalars().all()
+
+    per_stage: dict[str, list[float]] = {}
+    totals: list[float] = []
+    for job in jobs:
+        for stage, timing in (job.stage_timings or {}).items():
+            if timing.get("seconds") is not None:
+                per_stage.setdefault(stage, []).append(float(timing["seconds"]))
+        if job.started_at and job.finished_at:
+            totals.append((job.finished_at - job.started_at).total_seconds())
+
+    return IngestStats(
+        jobs=len(jobs),
+        stages={stage: _duration_stats(v) for stage, v in per_stage.items()},
+        totals=_duration_stats(totals) if totals else None,
+    )
+
+
+@router.get("/recommendations/stats", response_model=RecommendationStats)
+async def get_recommendation_stats(
+    db: AsyncSession = Depends(get_db),
+    _: User = Depends(get_admin_user),
+):
+    """How many builds each fitment recommendation rule fires for.
+    Selects only the spec columns the rules read and evaluates every build in one pass."""
+    models = {"engine": Engine, "vehicle": Vehicle, "transmission": Transmission}
+    columns = [getattr(models[entity], attr) for entity, attrs in SPEC_ATTRS.items() for attr in attrs]
+    rows = (await db.execute(
+        select(*columns)
+        .select_from(Build)
+        .outerjoin(Engine, Engine.id == Build.engine_id)
+        .outerjoin(Vehicle, Vehicle.id == Build.vehicle_id)
+        .outerjoin(Transmission, Transmission.id == Build.transmission_id)
+    )).all()
+    # spec_vector() semantics: falsy specs count as missing
+    vectors = [tuple(v or None for v in row) for row in rows]
+    return RecommendationStats(builds=len(vectors), rules=rule_counts(vectors))
+
+
 # ---------- Vehicle approval + CRUD ----------
 
 @router.get("/vehicles", response_model=VehicleList)
@@ -107,6 +196,7 @@ async def update_vehicle_status(
     vehicle.quality_status = body.quality_status
     await db.commit()
     await db.refresh(vehicle)
+    response_cache.invalidate(f"vehicle:{vehicle_id}")
     return vehicle
 
 
@@ -144,6 +234,7 @@ async def admin_update_vehicle(
         setattr(vehicle, field, value)
     await db.commit()
     await db.refresh(vehicle)
+    response_cache.invalidate(f"vehicle:{vehicle_id}")
     return vehicle
 
 
@@ -169,6 +260,7 @@ async def admin_delete_vehicle(
         )
     await db.delete(vehicle)
     await db.commit()
+    response_cache.invalidate(f"vehicle:{vehicle_id}")
 
 
 # ---------- Engine approval + CRUD ----------
@@ -204,6 +296,7 @@ async def update_engine_status(
     engine.quality_status = body.quality_status
     await db.commit()
     await db.refresh(engine)
+    response_cache.invalidate(f"engine:{engine_id}")
     return engine
 
 
@@ -238,6 +331,7 @@ async def admin_update_engine(
         setattr(engine, field, value)
     await db.commit()
     await db.refresh(engine)
+    response_cache.invalidate(f"engine:{engine_id}")
     return engine
 
 
@@ -262,6 +356,7 @@ async def admin_delete_engine(
         )
     await db.delete(engine)
     await db.commit()
+    response_cache.invalidate(f"engine:{engine_id}")
 
 
 # ---------- Transmission approval + CRUD ----------
@@ -297,6 +392,7 @@ async def update_transmission_status(
     tx.quality_status = body.quality_status
     await db.commit()
     await db.refresh(tx)
+    response_cache.invalidate(f"transmission:{transmission_id}")
     return tx
 
 
@@ -330,6 +426,7 @@ async def admin_update_transmission(
         setattr(tx, field, value)
     await db.commit()
     await db.refresh(tx)
+    response_cache.invalidate(f"transmission:{transmission_id}")
     return tx
 
 
@@ -354,6 +451,7 @@ async def admin_delete_transmission(
         )
     await db.delete(tx)
     await db.commit()
+    response_cache.invalidate(f"transmission:{transmission_id}")
 
 
 # ---------- User management ----------
@@ -418,6 +516,7 @@ async def admin_update_user(
 
     await db.commit()
     await db.refresh(user)
+    invalidate_user(user_id)
     return user
 
 
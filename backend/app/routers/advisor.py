@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app.models.build import Build
 from app.models.user import User
 from app.models.chat_message import ChatMessage as ChatMessageModel
@@ -56,7 +56,7 @@ async def _persist_message(db: AsyncSession, build_id: str, role: str, content:
 @router.get("/chat/{build_id}/history", response_model=ChatHistoryResponse)
 async def get_chat_history(
     build_id: str,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user),
 ):
     """Get the chat history for a build."""
@@ -105,6 +105,7 @@ async def clear_chat_history(
 async def chat_with_advisor(
     request: AdvisorRequest,
     db: AsyncSession = Depends(get_db),
+    read_db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user),
 ):
     """Send a message to the AI Build Advisor and get a response.
@@ -123,6 +124,7 @@ async def chat_with_advisor(
     # Get AI response
     response_text, sources = await advisor_service.chat(
         db=db,
+        read_db=read_db,
         build_id=request.build_id,
         message=request.message,
         conversation_history=conversation_history,
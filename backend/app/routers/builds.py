@@ -1,16 +1,24 @@
 import logging
 from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, Query
-from fastapi.responses import Response
+from fastapi.responses import Response, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
-from app.database import get_db, async_session_maker
+from app.database import get_db, worker_session_maker
 from app.models.build import Build
+from app.models.export_job import ExportJob
 from app.models.engine import Engine
 from app.models.vehicle import Vehicle
 from app.models.transmission import Transmission
 from app.models.user import User
-from app.schemas.build import BuildCreate, BuildResponse, BuildUpdate, BuildList, BuildExport
+from app.schemas.build import (
+    BuildCreate, BuildResponse, BuildUpdate, BuildList, BuildExport, BulkExportRequest, ExportJobResponse,
+)
+from app.services.build_export import (
+    EXPORT_BUCKET, build_export, export_expired, purge_expired_exports, report_filename, run_export_job,
+)
+from app.services.clearance import ClearanceUnavailable, compute_build_clearance
 from app.services.pdf_service import PDFService
+from app.services.storage import StorageService
 from app.services.manual_ingestor import ManualIngestor
 from app.services.vin_decoder import VINDecoderService
 from app.utils.auth import get_current_user
@@ -18,6 +26,8 @@ from app.utils.auth import get_current_user
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/builds", tags=["Builds"])
 pdf_service = PDFService()
+# Builds per bulk export job
+MAX_EXPORT_BUILDS = 200
 _ingestor = ManualIngestor()
 
 
@@ -140,7 +150,7 @@ async def create_build(
         background_tasks.add_task(
             _ingestor.run_pipeline,
             job_id_chassis, vehicle.year, vehicle.make, vehicle.model,
-            build_data.vehicle_id, async_session_maker, None, drive_type, cylinders,
+            build_data.vehicle_id, worker_session_maker, None, drive_type, cylinders,
             scope="chassis",
         )
         logger.info(
@@ -158,7 +168,7 @@ async def create_build(
             _ingestor.run_pipeline,
             job_id_engine,
             engine_obj.origin_year, engine_obj.origin_make, engine_obj.origin_model,
-            None, async_session_maker, None, None, None,
+            None, worker_session_maker, None, None, None,
             scope="engine",
             engine_id=str(engine_obj.id),
             variant_hint=engine_obj.origin_variant,
@@ -180,7 +190,7 @@ async def create_build(
             job_id_trans,
             transmission_obj.origin_year, transmission_obj.origin_make,
             transmission_obj.origin_model,
-            None, async_session_maker, None, None, None,
+            None, worker_session_maker, None, None, None,
             scope="transmission",
             transmission_id=str(transmission_obj.id),
             variant_hint=transmission_obj.origin_variant,
@@ -217,83 +227,64 @@ async def update_build(
     for field, value in update_data.items():
         setattr(build, field, value)
 
+    # A moved engine gets fresh clearance (incremental after the first evaluation),
+    # unless the client supplied its own collision_data
+    if "engine_position" in update_data and "collision_data" not in update_data:
+        await _refresh_clearance(build, db)
+
     await db.commit()
     await db.refresh(build)
     return build
 
 
-def _build_engine_export(engine: Engine) -> dict:
-    """Build engine export dict with expanded spec fields."""
-    if not engine:
-        return {}
-    return {
-        "id": engine.id,
-        "make": engine.make,
-        "model": engine.model,
-        "variant": engine.variant,
-        "power_hp": engine.power_hp,
-        "torque_lb_ft": engine.torque_lb_ft,
-        "fuel_pressure_psi": engine.fuel_pressure_psi,
-        "fuel_flow_lph": engine.fuel_flow_lph,
-        "cooling_btu_min": engine.cooling_btu_min,
-        "displacement_liters": engine.displacement_liters,
-        "compression_ratio": engine.compression_ratio,
-        "valve_train": engine.valve_train,
-        "bore_mm": engine.bore_mm,
-        "stroke_mm": engine.stroke_mm,
-        "balance_type": engine.balance_type,
-        "redline_rpm": engine.redline_rpm,
-        "can_bus_protocol": engine.can_bus_protocol,
-        "oil_pan_depth_in": engine.oil_pan_depth_in,
-        "engine_family": engine.engine_family,
-        "origin_year": engine.origin_year,
-        "origin_make": engine.origin_make,
-        "origin_model": engine.origin_model,
-        "origin_variant": engine.origin_variant,
-        "data_sources": engine.data_sources,
-    }
-
-
-def _build_vehicle_export(vehicle: Vehicle) -> dict:
-    """Build vehicle export dict with expanded spec fields."""
-    if not vehicle:
-        return {}
-    return {
-        "id": vehicle.id,
-        "year": vehicle.year,
-        "make": vehicle.make,
-        "model": vehicle.model,
-        "trim": vehicle.trim,
-        "curb_weight_lbs": vehicle.curb_weight_lbs,
-        "engine_bay_length_in": vehicle.engine_bay_length_in,
-        "engine_bay_width_in": vehicle.engine_bay_width_in,
-        "engine_bay_height_in": vehicle.engine_bay_height_in,
-        "stock_ground_clearance_in": vehicle.stock_ground_clearance_in,
-        "driveline_angle_deg": vehicle.driveline_angle_deg,
-        "data_sources": vehicle.data_sources,
-    }
-
-
-def _build_transmission_export(transmission: Transmission) -> dict | None:
-    """Build transmission export dict with expanded spec fields."""
-    if not transmission:
-        return None
-    return {
-        "id": transmission.id,
-        "make": transmission.make,
-        "model": transmission.model,
-        "bellhousing_pattern": transmission.bellhousing_pattern,
-        "trans_type": transmission.trans_type,
-        "gear_count": transmission.gear_count,
-        "gear_ratios": transmission.gear_ratios,
-        "max_torque_capacity_lb_ft": transmission.max_torque_capacity_lb_ft,
-        "input_shaft_spline": transmission.input_shaft_spline,
-        "origin_year": transmission.origin_year,
-        "origin_make": transmission.origin_make,
-        "origin_model": transmission.origin_model,
-        "origin_variant": transmission.origin_variant,
-        "data_sources": transmission.data_sources,
-    }
+async def _refresh_clearance(build: Build, db: AsyncSession) -> None:
+    """Best-effort clearance update for a position change; builds without meshes are left as-is."""
+    engine = await db.get(Engine, build.engine_id)
+    vehicle = await db.get(Vehicle, build.vehicle_id)
+    transmission = await db.get(Transmission, build.transmission_id) if build.transmission_id else None
+    if not engine or not vehicle:
+        return
+    try:
+        build.collision_data = await compute_build_clearance(build, engine, transmission, vehicle)
+    except ClearanceUnavailable:
+        pass
+    except Exception as e:
+        logger.warning(f"Clearance update failed for build {build.id}: {e}")
+
+
+@router.post("/{build_id}/clearance", response_model=BuildResponse)
+async def compute_clearance(
+    build_id: str,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Compute engine/transmission clearance against the bay scan at the build's
+    engine_position and store the result in collision_data."""
+    result = await db.execute(
+        select(Build).where(Build.id == build_id, Build.user_id == current_user.id)
+    )
+    build = result.scalar_one_or_none()
+    if not build:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Build not found",
+        )
+
+    vehicle = await db.get(Vehicle, build.vehicle_id)
+    engine = await db.get(Engine, build.engine_id)
+    transmission = await db.get(Transmission, build.transmission_id) if build.transmission_id else None
+
+    try:
+        build.collision_data = await compute_build_clearance(build, engine, transmission, vehicle)
+    except ClearanceUnavailable as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
+
+    await db.commit()
+    await db.refresh(build)
+    return build
 
 
 @router.get("/{build_id}/export", response_model=BuildExport)
@@ -328,16 +319,7 @@ async def export_build(
         )
         transmission = trans_result.scalar_one_or_none()
 
-    # Generate recommendations based on build data
-    recommendations = _generate_recommendations(engine, vehicle, transmission, build)
-
-    return BuildExport(
-        build=build,
-        vehicle=_build_vehicle_export(vehicle),
-        engine=_build_engine_export(engine),
-        transmission=_build_transmission_export(transmission),
-        recommendations=recommendations,
-    )
+    return build_export(build, vehicle, engine, transmission)
 
 
 @router.get("/{build_id}/export/pdf")
@@ -372,17 +354,8 @@ async def export_build_pdf(
         )
         transmission = trans_result.scalar_one_or_none()
 
-    # Generate recommendations
-    recommendations = _generate_recommendations(engine, vehicle, transmission, build)
-
     # Create export data
-    export_data = BuildExport(
-        build=build,
-        vehicle=_build_vehicle_export(vehicle),
-        engine=_build_engine_export(engine),
-        transmission=_build_transmission_export(transmission),
-        recommendations=recommendations,
-    )
+    export_data = build_export(build, vehicle, engine, transmission)
 
     # Generate PDF
     try:
@@ -393,9 +366,7 @@ async def export_build_pdf(
             detail=str(e),
         )
 
-    # Generate filename
-    vehicle_name = f"{vehicle.year}_{vehicle.make}_{vehicle.model}" if vehicle else "build"
-    filename = f"swapspec_{vehicle_name}_report.pdf".replace(" ", "_")
+    filename = report_filename(vehicle)
 
     return Response(
         content=pdf_bytes,
@@ -404,132 +375,110 @@ async def export_build_pdf(
     )
 
 
-def _generate_recommendations(
-    engine: Engine,
-    vehicle: Vehicle,
-    transmission: Transmission,
-    build: Build,
-) -> list[str]:
-    """Generate recommendations based on engine specs, vehicle specs, and build data."""
-    recommendations = []
-
-    if engine:
-        # Fuel system recommendations
-        if engine.fuel_pressure_psi and engine.fuel_pressure_psi > 40:
-            recommendations.append(
-                f"High-pressure fuel system required: {engine.fuel_pressure_psi} psi. "
-                "Consider returnless fuel system with proper regulator."
-            )
-
-        if engine.fuel_flow_lph and engine.fuel_flow_lph > 200:
-            recommendations.append(
-                f"High fuel flow requirement: {engine.fuel_flow_lph} lph. "
-                "Upgrade fuel pump and verify fuel line sizing."
-            )
-
-        # Cooling recommendations
-        if engine.cooling_btu_min and engine.cooling_btu_min > 10000:
-            recommendations.append(
-                f"Significant cooling capacity needed: {engine.cooling_btu_min} BTU/min. "
-                "Consider aluminum radiator with electric fans."
-            )
-
-        # Weight/balance recommendations
-        if engine.weight and engine.weight > 500:
-            recommendations.append(
-                f"Engine weight: {engine.weight} lbs. "
-                "Verify frame mounting and consider weight distribution."
-            )
-
-        # External balance warning
-        if engine.balance_type and engine.balance_type.lower() == "external":
-            recommendations.append(
-                "CRITICAL: Engine uses external balance. Flywheel/flexplate MUST match "
-                "the engine's external balance specification. Using the wrong one will "
-                "cause severe vibration and potential crankshaft damage."
-            )
+def _export_job_status(job: ExportJob) -> ExportJobResponse:
+    return ExportJobResponse(
+        job_id=job.job_id,
+        status=job.status,
+        stage=job.stage,
+        builds_total=job.builds_total or 0,
+        builds_done=job.builds_done or 0,
+        error=job.error,
+        download_url=(
+            f"{router.prefix}/export-jobs/{job.job_id}/download"
+            if job.status == "complete" and not export_expired(job) else None
+        ),
+        started_at=job.started_at,
+        finished_at=job.finished_at,
+        stage_timings=job.stage_timings,
+    )
 
-        # Compression ratio / fuel octane
-        if engine.compression_ratio and engine.compression_ratio > 10.5:
-            recommendations.append(
-                f"Compression ratio: {engine.compression_ratio}:1. Premium fuel (91+ octane) "
-                "recommended to prevent detonation."
-            )
 
-        # CAN bus protocol
-        if engine.can_bus_protocol:
-            recommendations.append(
-                f"CAN bus protocol: {engine.can_bus_protocol}. Wiring harness must be "
-                "compatible or a standalone ECU/CAN translator may be needed."
-            )
+@router.post("/export-jobs", response_model=ExportJobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def create_export_job(
+    body: BulkExportRequest,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Queue a bulk export: a ZIP with one PDF per build plus a combined builds.json.
+    Takes explicit build_ids, or exports every build matching the filters.
+    Poll GET /api/builds/export-jobs/{job_id} for progress and the download URL.
+    Also purges other exports past export_retention_hours."""
+    if body.include_pdf and not pdf_service.is_available:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="PDF generation is not available (WeasyPrint system dependencies are missing); "
+                   "retry with include_pdf=false for a JSON-only export",
+        )
 
-        # Oil pan clearance vs vehicle ground clearance
-        if engine.oil_pan_depth_in and vehicle and vehicle.stock_ground_clearance_in:
-            if engine.oil_pan_depth_in > vehicle.stock_ground_clearance_in * 0.6:
-                recommendations.append(
-                    f"Oil pan depth ({engine.oil_pan_depth_in}\") may conflict with "
-                    f"vehicle ground clearance ({vehicle.stock_ground_clearance_in}\"). "
-                    "Consider a low-profile oil pan or crossmember modification."
-                )
-
-    # Driveline angle check
-    if vehicle and vehicle.driveline_angle_deg and vehicle.driveline_angle_deg > 3.0:
-        recommendations.append(
-            f"Driveline angle: {vehicle.driveline_angle_deg}°. Angles over 3° may cause "
-            "U-joint vibration. Consider an adjustable crossmember or transmission mount."
+    query = select(Build.id).where(Build.user_id == current_user.id)
+    if body.build_ids:
+        query = query.where(Build.id.in_(body.build_ids))
+    if body.status:
+        query = query.where(Build.status == body.status)
+    if body.vehicle_id:
+        query = query.where(Build.vehicle_id == body.vehicle_id)
+    found = set((await db.execute(query.limit(MAX_EXPORT_BUILDS + 1))).scalars().all())
+    if not found:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No matching builds")
+    if len(found) > MAX_EXPORT_BUILDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {MAX_EXPORT_BUILDS} builds per export; narrow the filters",
         )
+    # Keep the caller's order for explicit ids
+    build_ids = [b for b in dict.fromkeys(body.build_ids) if b in found] if body.build_ids else sorted(found)
 
-    # Engine bay fitment math
-    if engine and vehicle:
-        if (engine.dimensions_l and vehicle.engine_bay_length_in and
-                engine.dimensions_l > vehicle.engine_bay_length_in - 1.0):
-            recommendations.append(
-                f"Tight length fitment: engine is {engine.dimensions_l}\" vs bay "
-                f"{vehicle.engine_bay_length_in}\". May need firewall or radiator "
-                "support modifications."
-            )
-        if (engine.dimensions_w and vehicle.engine_bay_width_in and
-                engine.dimensions_w > vehicle.engine_bay_width_in - 1.0):
-            recommendations.append(
-                f"Tight width fitment: engine is {engine.dimensions_w}\" vs bay "
-                f"{vehicle.engine_bay_width_in}\". Check header/exhaust manifold clearance "
-                "to frame rails and steering components."
-            )
+    job = ExportJob(
+        user_id=current_user.id,
+        build_ids=build_ids,
+        include_pdf=body.include_pdf,
+        builds_total=len(build_ids),
+    )
+    db.add(job)
+    await db.commit()
+    background_tasks.add_task(run_export_job, job.job_id)
+    background_tasks.add_task(purge_expired_exports)
+    return _export_job_status(job)
 
-    # Torque capacity check
-    if (engine and transmission and
-            engine.torque_lb_ft and transmission.max_torque_capacity_lb_ft):
-        ratio = engine.torque_lb_ft / transmission.max_torque_capacity_lb_ft
-        if ratio > 0.85:
-            recommendations.append(
-                f"Engine torque ({engine.torque_lb_ft} lb-ft) is at "
-                f"{int(ratio * 100)}% of transmission capacity "
-                f"({transmission.max_torque_capacity_lb_ft} lb-ft). "
-                "Consider upgrading internals or choosing a higher-capacity unit."
-            )
 
-    # Data completeness check
-    if engine:
-        missing_critical = []
-        if not engine.displacement_liters:
-            missing_critical.append("displacement")
-        if not engine.compression_ratio:
-            missing_critical.append("compression ratio")
-        if not engine.valve_train:
-            missing_critical.append("valve train type")
-        if not engine.can_bus_protocol:
-            missing_critical.append("CAN bus protocol")
-        if missing_critical:
-            recommendations.append(
-                f"Missing critical engine specs: {', '.join(missing_critical)}. "
-                "Consider using the Enrich endpoint or adding these manually for "
-                "more accurate recommendations."
-            )
+@router.get("/export-jobs/{job_id}", response_model=ExportJobResponse)
+async def get_export_job(
+    job_id: str,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Poll bulk export job status."""
+    job = await db.get(ExportJob, job_id)
+    if not job or job.user_id != current_user.id:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return _export_job_status(job)
 
-    # Collision-based recommendations
-    if build.collision_data:
-        collisions = build.collision_data.get("collisions", [])
-        for collision in collisions[:3]:  # Limit to top 3
-            recommendations.append(f"Fitment issue detected: {collision}")
 
-    return recommendations
+@router.get("/export-jobs/{job_id}/download")
+async def download_export_job(
+    job_id: str,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Stream a finished bulk export ZIP. Only its owner can download it, until
+    export_retention_hours after it finished."""
+    job = await db.get(ExportJob, job_id)
+    if not job or job.user_id != current_user.id:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if export_expired(job):
+        raise HTTPException(status_code=status.HTTP_410_GONE, detail="Export expired; queue it again")
+    if job.status != "complete" or not job.result_key:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Export is {job.status}")
+
+    storage = StorageService()
+    if not await storage.file_exists(job.result_key, bucket=EXPORT_BUCKET):
+        raise HTTPException(status_code=status.HTTP_410_GONE, detail="Export expired; queue it again")
+    return StreamingResponse(
+        storage.stream_file(job.result_key, bucket=EXPORT_BUCKET),
+        media_type="application/zip",
+        headers={
+            "Content-Disposition": f'attachment; filename="swapspec_export_{job.job_id[:8]}.zip"',
+            "Cache-Control": "private, no-store",
+        },
+    )
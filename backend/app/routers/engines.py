@@ -1,11 +1,11 @@
 import json
 import logging
 import os
-from fastapi import APIRouter, Depends, HTTPException, status, Query, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, status, Query, BackgroundTasks, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, or_
 from typing import Optional, List
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app.models.engine import Engine
 from app.models.user import User
 from app.models.vehicle import QualityStatus
@@ -14,6 +14,8 @@ from app.schemas.engine import (
     EngineFamily, EngineFamilyVariant, EngineIdentifyResponse, EngineIdentifySuggestion,
 )
 from app.utils.auth import get_current_user, get_optional_user
+from app.services.metrics import record_llm_usage, track_external
+from app.utils.http_cache import cached_json, response_cache
 from app.services.spec_lookup import SpecLookupService
 
 logger = logging.getLogger(__name__)
@@ -29,7 +31,7 @@ async def list_engines(
     max_hp: Optional[int] = Query(None, description="Maximum horsepower"),
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: Optional[User] = Depends(get_optional_user),
 ):
     """List engines. Authenticated users see approved engines + their own pending engines."""
@@ -69,7 +71,7 @@ async def list_engines(
 @router.get("/families", response_model=List[EngineFamily])
 async def list_engine_families(
     make: Optional[str] = Query(None, description="Filter by engine make"),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """Return all engines grouped by engine_family for drill-down selection."""
     query = select(Engine)
@@ -127,11 +129,13 @@ async def identify_engine(
                 "This is the donor car, NOT the engine name. origin_variant is the engine code (e.g., 'LS1', '2JZ-GTE').\n\n"
                 "Respond ONLY with valid JSON array, no markdown."
             )
-            msg = client.messages.create(
-                model="claude-haiku-4-5-20251001",
-                max_tokens=512,
-                messages=[{"role": "user", "content": prompt}],
-            )
+            with track_external("anthropic"):
+                msg = client.messages.create(
+                    model="claude-haiku-4-5-20251001",
+                    max_tokens=512,
+                    messages=[{"role": "user", "content": prompt}],
+                )
+            record_llm_usage("anthropic", "claude-haiku-4-5-20251001", msg)
             raw = msg.content[0].text.strip()
             # Strip markdown code fences if present
             if raw.startswith("```"):
@@ -176,16 +180,19 @@ async def identify_engine(
 
 
 @router.get("/{engine_id}", response_model=EngineResponse)
-async def get_engine(engine_id: str, db: AsyncSession = Depends(get_db)):
-    """Get engine details by ID."""
-    result = await db.execute(select(Engine).where(Engine.id == engine_id))
-    engine = result.scalar_one_or_none()
-    if not engine:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Engine not found",
-        )
-    return engine
+async def get_engine(engine_id: str, request: Request, db: AsyncSession = Depends(get_db)):
+    """Get engine details by ID. Served with an ETag; honors If-None-Match."""
+    async def _load() -> EngineResponse:
+        result = await db.execute(select(Engine).where(Engine.id == engine_id))
+        engine = result.scalar_one_or_none()
+        if not engine:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Engine not found",
+            )
+        return EngineResponse.model_validate(engine)
+
+    return await cached_json(request, f"engine:{engine_id}", _load)
 
 
 @router.post("", response_model=EngineResponse, status_code=status.HTTP_201_CREATED)
@@ -219,6 +226,7 @@ async def create_engine(
     except Exception:
         pass  # enrichment is best-effort
 
+    response_cache.invalidate(f"engine:{engine.id}")
     return engine
 
 
@@ -235,4 +243,5 @@ async def enrich_engine(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Engine not found",
         )
+    response_cache.invalidate(f"engine:{engine_id}")
     return engine
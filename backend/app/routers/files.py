@@ -1,8 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, status
-from app.models.user import User
+from pathlib import Path
+from typing import Optional
+
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, UploadFile, File, Form, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_db
+from app.models.engine import Engine
+from app.models.user import User, UserRole
+from app.models.vehicle import Vehicle
 from app.schemas.files import FileUploadResponse
+from app.services.mesh_processor import PROCESSABLE_EXTENSIONS, process_uploaded_mesh
 from app.services.storage import StorageService
 from app.utils.auth import get_current_user, get_admin_user
+from app.utils.uploads import spool_upload
 
 router = APIRouter(prefix="/api/files", tags=["Files"])
 
@@ -13,41 +22,59 @@ def _get_storage():
 # Allowed mesh file extensions
 MESH_EXTENSIONS = {".obj", ".stl", ".fbx", ".gltf", ".glb"}
 
+MAX_FILE_BYTES = 50 * 1024 * 1024    # 50 MB
+MAX_MESH_BYTES = 250 * 1024 * 1024   # 250 MB — dense bay scans run large
+
 
 @router.post("/upload", response_model=FileUploadResponse)
 async def upload_file(
     file: UploadFile = File(...),
     current_user: User = Depends(get_current_user),
 ):
-    """Upload a single file to Supabase Storage. Requires authentication."""
+    """Upload a single file to Supabase Storage. Requires authentication.
+
+    The body is spooled to disk in chunks and streamed to storage, so memory
+    use does not grow with file size.
+    """
     if not file.filename:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="No filename provided",
         )
 
-    content = await file.read()
-    size_bytes = len(content)
-    await file.seek(0)
-
-    storage = _get_storage()
-    stored_path = await storage.save_file(file, bucket="uploads")
+    upload = await spool_upload(file, MAX_FILE_BYTES, suffix=Path(file.filename).suffix)
+    try:
+        storage = _get_storage()
+        stored_path = await storage.save_spooled(upload, bucket="uploads")
+    finally:
+        upload.unlink()
     url = storage.get_url(stored_path, bucket="uploads")
 
     return FileUploadResponse(
         filename=file.filename,
         stored_path=stored_path,
         url=url,
-        size_bytes=size_bytes,
+        size_bytes=upload.size_bytes,
+        sha256=upload.sha256,
     )
 
 
 @router.post("/upload/mesh", response_model=FileUploadResponse)
 async def upload_mesh_file(
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
+    engine_id: Optional[str] = Form(None),
+    vehicle_id: Optional[str] = Form(None),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    """Upload a mesh file (3D scan) to Supabase Storage. Requires authentication."""
+    """Upload a mesh file (3D scan) to Supabase Storage. Requires authentication.
+
+    With engine_id (engine mesh) or vehicle_id (bay scan), .obj/.stl/.glb
+    uploads are decimated to the PRD triangle budget in the background and
+    full/50%/25% LOD .glb files are recorded on that row (lod_status="queued").
+    Only the row's contributor or an admin may attach a mesh.
+    """
     if not file.filename:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -61,19 +88,44 @@ async def upload_mesh_file(
             detail=f"Invalid mesh file type. Allowed: {', '.join(MESH_EXTENSIONS)}",
         )
 
-    content = await file.read()
-    size_bytes = len(content)
-    await file.seek(0)
-
-    storage = _get_storage()
-    stored_path = await storage.save_file(file, bucket="meshes")
+    if engine_id and vehicle_id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Pass engine_id or vehicle_id, not both",
+        )
+    if engine_id or vehicle_id:
+        target = await db.get(Engine, engine_id) if engine_id else await db.get(Vehicle, vehicle_id)
+        if target is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Engine not found" if engine_id else "Vehicle not found")
+        if current_user.role != UserRole.admin and target.contributor_id != current_user.id:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not allowed to attach a mesh to this record")
+
+    process = bool(engine_id or vehicle_id) and ext in PROCESSABLE_EXTENSIONS
+    upload = await spool_upload(file, MAX_MESH_BYTES, suffix=ext)
+    try:
+        storage = _get_storage()
+        stored_path = await storage.save_spooled(upload, bucket="meshes")
+    except BaseException:
+        upload.unlink()
+        raise
     url = storage.get_url(stored_path, bucket="meshes")
 
+    if process:
+        # The background task owns (and deletes) the spooled copy
+        background_tasks.add_task(
+            process_uploaded_mesh, upload.path, stored_path, url,
+            engine_id=engine_id, vehicle_id=vehicle_id,
+        )
+    else:
+        upload.unlink()
+
     return FileUploadResponse(
         filename=file.filename,
         stored_path=stored_path,
         url=url,
-        size_bytes=size_bytes,
+        size_bytes=upload.size_bytes,
+        sha256=upload.sha256,
+        lod_status="queued" if process else None,
     )
 
 
@@ -84,7 +136,7 @@ async def delete_file(
 ):
     """Delete a file by its path. Requires admin role."""
     storage = _get_storage()
-    deleted = storage.delete_file(path)
+    deleted = await storage.delete_file(path)
     if not deleted:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
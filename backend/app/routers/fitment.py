@@ -0,0 +1,66 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, or_
+from typing import Optional
+from app.database import get_read_db
+from app.models.engine import Engine
+from app.models.transmission import Transmission
+from app.models.user import User
+from app.models.vehicle import Vehicle, QualityStatus
+from app.schemas.fitment import FitmentScreenRequest, FitmentScreenResponse
+from app.services.fitment import ENGINE_COLUMNS, EngineColumns, screen_engines
+from app.utils.auth import get_optional_user
+
+router = APIRouter(prefix="/api/fitment", tags=["Fitment"])
+
+
+@router.post("/screen", response_model=FitmentScreenResponse)
+async def screen_fitment(
+    body: FitmentScreenRequest,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: Optional[User] = Depends(get_optional_user),
+):
+    """Rank every engine matching the filters by how well it fits one chassis.
+    Engines ruled out by a failed check are dropped unless include_no_fit is set."""
+    vehicle = await db.get(Vehicle, body.vehicle_id)
+    if not vehicle:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Vehicle not found")
+    transmission = None
+    if body.transmission_id:
+        transmission = await db.get(Transmission, body.transmission_id)
+        if not transmission:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Transmission not found")
+
+    # Same visibility as GET /api/engines; only the columns the checks need
+    query = select(*(getattr(Engine, c) for c in ENGINE_COLUMNS))
+    if current_user:
+        query = query.where(
+            or_(
+                Engine.quality_status == QualityStatus.approved,
+                (Engine.quality_status == QualityStatus.pending) & (Engine.contributor_id == current_user.id),
+            )
+        )
+    else:
+        query = query.where(Engine.quality_status == QualityStatus.approved)
+
+    if body.make:
+        query = query.where(Engine.make.ilike(f"%{body.make}%"))
+    if body.engine_family:
+        query = query.where(Engine.engine_family == body.engine_family)
+    if body.min_hp:
+        query = query.where(Engine.power_hp >= body.min_hp)
+    if body.max_hp:
+        query = query.where(Engine.power_hp <= body.max_hp)
+    if body.max_weight_lbs:
+        query = query.where(Engine.weight <= body.max_weight_lbs)
+
+    result = await db.execute(query)
+    screen = screen_engines(EngineColumns.from_rows(result.all()), vehicle, transmission)
+
+    return FitmentScreenResponse(
+        vehicle_id=vehicle.id,
+        transmission_id=transmission.id if transmission else None,
+        screened=len(screen.engines),
+        candidates=int((~screen.ruled_out).sum()),
+        results=screen.ranked(body.limit, body.include_no_fit),
+    )
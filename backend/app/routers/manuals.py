@@ -1,14 +1,15 @@
 import asyncio
 import json
-import tempfile
 from pathlib import Path
+from typing import Optional
 
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, UploadFile, File, Form
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request, UploadFile, File, Form
 from fastapi.responses import StreamingResponse
 from sqlalchemy import select, and_, func
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_db, async_session_maker
+from app.config import get_settings
+from app.database import get_db, get_read_db, async_session_maker, worker_session_maker
 from app.models.manual_chunk import ManualChunk
 from app.models.ingest_job import IngestJob
 from app.schemas.manual import (
@@ -19,9 +20,20 @@ from app.schemas.manual import (
     ManualSearchResponse,
     ManualUploadResponse,
 )
-from app.services.manual_ingestor import ManualIngestor
-from app.services.manual_search import search_chunks
+from app.services.job_events import job_events
+from app.services.manual_ingestor import (
+    ManualIngestor,
+    begin_stage,
+    commit_job,
+    finish_job,
+    job_status,
+    publish_job,
+    record_index_stats,
+)
+from app.services.manual_search import chunk_neighbors, search_snippets
 from app.utils.auth import get_current_user, get_optional_user
+from app.utils.http_cache import CACHE_SHORT, cached_json, response_cache
+from app.utils.uploads import spool_upload
 
 router = APIRouter(prefix="/api/manuals", tags=["Manuals"])
 _ingestor = ManualIngestor()
@@ -29,15 +41,9 @@ _ingestor = ManualIngestor()
 MAX_UPLOAD_BYTES = 150 * 1024 * 1024  # 150 MB
 
 
-def _job_to_response(job: IngestJob) -> IngestStatusResponse:
-    return IngestStatusResponse(
-        job_id=job.job_id,
-        status=job.status,
-        stage=job.stage,
-        chunks_indexed=job.chunks_indexed,
-        gaps_filled=job.gaps_filled,
-        error=job.error,
-    )
+def _invalidate_chunk_cache(vehicle_id) -> None:
+    """Drop cached /chunks pages after an ingest wrote new rows."""
+    response_cache.invalidate(f"manual_chunks:{vehicle_id}:" if vehicle_id else "manual_chunks:")
 
 
 @router.post("/ingest", response_model=IngestStatusResponse)
@@ -92,7 +98,7 @@ async def ingest_manual(
         request.make,
         request.model,
         request.vehicle_id,
-        async_session_maker,   # background task opens its own sessions
+        worker_session_maker,  # background task opens its own sessions (worker pool)
         None, None, None,
         scope,
         engine_id,
@@ -126,7 +132,7 @@ async def ingest_local_manual(
         request.make,
         request.model,
         request.vehicle_id,
-        async_session_maker,
+        worker_session_maker,
         manual_dir_override=request.manual_dir,
     )
     return IngestStatusResponse(
@@ -151,11 +157,13 @@ async def upload_manual(
     vehicle_id: str = Form(None),
     engine_id: str = Form(None),
     transmission_id: str = Form(None),
+    detect_headings: bool = Form(False),
 ):
     """Upload a PDF, ZIP, or image spec sheet / manual fragment and ingest it.
 
     Accepted file types:
     - PDF  (.pdf)  — pages extracted via pypdf, stored as ManualChunk rows
+      (detect_headings: section_path from page headings, not just "Page N")
     - ZIP  (.zip)  — processed through the standard ManualIngestor pipeline
     - Image (.png/.jpg/.jpeg) — vision-extracted via Claude Haiku and stored as a single chunk
 
@@ -167,28 +175,22 @@ async def upload_manual(
     filename = file.filename or "upload"
     suffix = Path(filename).suffix.lower()
 
-    content = await file.read()
-    if len(content) > MAX_UPLOAD_BYTES:
-        raise HTTPException(status_code=413, detail="File too large (max 150 MB)")
-
-    tmp = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
-    try:
-        tmp.write(content)
-        tmp.flush()
-        tmp_path = Path(tmp.name)
-    finally:
-        tmp.close()
+    # Spooled to disk in 1 MB chunks — the 150 MB payload is never held in memory
+    upload = await spool_upload(file, MAX_UPLOAD_BYTES, suffix=suffix)
+    tmp_path = upload.path
 
     # --- PDF ---
     if suffix == ".pdf":
-        async def _run_pdf(path: Path, _scope, _make, _model, _year, _vid, _eid, _tid):
+        async def _run_pdf(path: Path, _scope, _make, _model, _year, _vid, _eid, _tid, _headings):
             try:
                 from app.services.pdf_ingestor import PDFIngestor
-                async with async_session_maker() as session:
+                async with worker_session_maker() as session:
                     ingestor = PDFIngestor()
                     await ingestor.ingest_pdf(
-                        path, _make, _model, _year, _scope, _vid, _eid, _tid, session
+                        path, _make, _model, _year, _scope, _vid, _eid, _tid, session,
+                        detect_headings=_headings,
                     )
+                _invalidate_chunk_cache(_vid)
             finally:
                 try:
                     path.unlink()
@@ -197,7 +199,7 @@ async def upload_manual(
 
         background_tasks.add_task(
             _run_pdf, tmp_path, scope, make, model, year,
-            vehicle_id, engine_id, transmission_id,
+            vehicle_id, engine_id, transmission_id, detect_headings,
         )
         return ManualUploadResponse(
             job_id=None,
@@ -220,7 +222,7 @@ async def upload_manual(
                 extractor = ManualExtractor()
                 manual_dir = extractor.extract_and_clean(path, extract_dir)
                 await _ingestor.run_pipeline(
-                    _jid, _year, _make, _model, _vid, async_session_maker,
+                    _jid, _year, _make, _model, _vid, worker_session_maker,
                     manual_dir_override=str(manual_dir),
                     scope=_scope, engine_id=_eid, transmission_id=_tid,
                 )
@@ -252,7 +254,7 @@ async def upload_manual(
                 extracted = vision.extract(path, section_path, vehicle_str)
                 if not extracted:
                     extracted = f"[Uploaded image: {path.name}] — no text could be extracted."
-                async with async_session_maker() as session:
+                async with worker_session_maker() as session:
                     from app.models.manual_chunk import ManualChunk
                     from app.services.rag_indexer import SOURCE_RANK
                     chunk = ManualChunk(
@@ -272,6 +274,7 @@ async def upload_manual(
                     )
                     session.add(chunk)
                     await session.commit()
+                _invalidate_chunk_cache(_vid)
             finally:
                 try:
                     path.unlink()
@@ -309,57 +312,69 @@ async def reindex_manual(
     scope: str = "chassis",
     engine_id: str = None,
     transmission_id: str = None,
+    full: bool = False,
 ):
     """Re-index an already-extracted manual directory using the safe re-index pattern.
 
-    Writes new semantic-path chunks first (via upsert), then deletes stale
-    numeric-path chunks AFTER the index completes — no data loss window.
+    Incremental: pages whose content hash is unchanged are skipped, changed and
+    new pages are upserted, and pages no longer in the directory are deleted
+    once the walk completes — no data loss window. full=true re-processes
+    every page (e.g. after replacing diagram images in place).
     """
     import uuid as _uuid
     job_id = str(_uuid.uuid4())
     await _ingestor.create_job(job_id, db)
 
     async def _run_reindex(_job_id, _manual_dir, _make, _model, _year, _vehicle_id,
-                           _scope, _engine_id, _transmission_id):
-        async with async_session_maker() as session:
+                           _scope, _engine_id, _transmission_id, _full):
+        async with worker_session_maker() as session:
             job = await session.get(IngestJob, _job_id)
             if not job:
                 return
             job.status = "running"
-            job.stage = "indexing"
-            await session.commit()
+            begin_stage(job, "indexing")
+            await commit_job(session, job)
             try:
-                from app.services.rag_indexer import RAGIndexer
+                from app.services.rag_indexer import IndexStats, RAGIndexer
                 manual_dir = Path(_manual_dir)
                 if not manual_dir.exists():
-                    job.status = "failed"
-                    job.error = f"Directory not found: {_manual_dir}"
-                    await session.commit()
+                    finish_job(job, "failed", f"Directory not found: {_manual_dir}")
+                    await commit_job(session, job)
                     return
                 indexer = RAGIndexer()
+                stats = IndexStats()
+
+                def _progress(indexed: int) -> None:
+                    job.chunks_indexed = indexed
+                    record_index_stats(job, stats)
+                    publish_job(job)
+
                 count = await indexer.index_manual(
                     manual_dir, _make, _model, _year, _vehicle_id, session,
                     scope=_scope, engine_id=_engine_id, transmission_id=_transmission_id,
-                    session_factory=async_session_maker,
+                    session_factory=worker_session_maker,
+                    stats=stats,
+                    progress=_progress,
+                    full=_full,
                 )
                 job.chunks_indexed = count
-                job.stage = "cleanup"
-                await session.commit()
+                record_index_stats(job, stats)
+                begin_stage(job, "cleanup")
+                await commit_job(session, job)
                 await indexer.clear_stale_chunks(
                     _make, _model, _year, session,
                     scope=_scope, engine_id=_engine_id, transmission_id=_transmission_id,
                 )
-                job.status = "complete"
-                job.stage = "done"
-                await session.commit()
+                finish_job(job, "complete")
+                await commit_job(session, job)
+                _invalidate_chunk_cache(_vehicle_id)
             except Exception as exc:
-                job.status = "failed"
-                job.error = str(exc)
-                await session.commit()
+                finish_job(job, "failed", str(exc))
+                await commit_job(session, job)
 
     background_tasks.add_task(
         _run_reindex, job_id, request.manual_dir, request.make, request.model,
-        request.year, request.vehicle_id, scope, engine_id, transmission_id,
+        request.year, request.vehicle_id, scope, engine_id, transmission_id, full,
     )
     return IngestStatusResponse(
         job_id=job_id,
@@ -380,7 +395,7 @@ async def get_ingest_status(
     job = await _ingestor.get_status(job_id, db)
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
-    return _job_to_response(job)
+    return job_status(job)
 
 
 @router.get("/status/{job_id}/stream")
@@ -390,32 +405,46 @@ async def stream_ingest_status(
 ):
     """Server-Sent Events stream for real-time ingest job status.
 
-    Emits one JSON event per second with the current job state.
-    Closes automatically when status is 'complete' or 'failed'.
+    Reads the job once on connect, then pushes every update the pipeline
+    publishes (same shape as GET /status/{job_id}) as it happens. The job is
+    re-read every sse_heartbeat_seconds without an update; if it hasn't changed
+    a ": ping" comment keeps proxies from closing the idle connection. Closes automatically when status is 'complete' or 'failed'.
 
     Usage (JavaScript):
         const es = new EventSource('/api/manuals/status/{job_id}/stream');
         es.onmessage = (e) => { const job = JSON.parse(e.data); ... };
     """
+    heartbeat = get_settings().sse_heartbeat_seconds
+
+    async def _load() -> Optional[dict]:
+        async with async_session_maker() as session:
+            job = await session.get(IngestJob, job_id)
+        return job_status(job).model_dump(mode="json") if job else None
+
     async def _generate():
-        while True:
-            async with async_session_maker() as session:
-                job = await session.get(IngestJob, job_id)
-            if job is None:
+        # Subscribe before the initial read so no update can slip in between
+        queue = job_events.subscribe(job_id)
+        try:
+            payload = await _load()
+            if payload is None:
                 yield f"data: {json.dumps({'error': 'job not found'})}\n\n"
-                break
-            payload = {
-                "job_id": job.job_id,
-                "status": job.status,
-                "stage": job.stage,
-                "chunks_indexed": job.chunks_indexed,
-                "gaps_filled": job.gaps_filled,
-                "error": job.error,
-            }
+                return
             yield f"data: {json.dumps(payload)}\n\n"
-            if job.status in ("complete", "failed"):
-                break
-            await asyncio.sleep(1)
+            while payload["status"] not in ("complete", "failed"):
+                try:
+                    payload = await asyncio.wait_for(queue.get(), timeout=heartbeat)
+                except asyncio.TimeoutError:
+                    # NOTIFY only comes from processes running the listener (not
+                    # the CLI or prepopulate scripts) and is lost while it
+                    # reconnects, so re-read the job once per heartbeat anyway
+                    fresh = await _load() or payload
+                    if fresh == payload:
+                        yield ": ping\n\n"
+                        continue
+                    payload = fresh
+                yield f"data: {json.dumps(payload)}\n\n"
+        finally:
+            job_events.unsubscribe(job_id, queue)
 
     return StreamingResponse(_generate(), media_type="text/event-stream")
 
@@ -430,10 +459,11 @@ async def search_manual_chunks(
     scope: str = None,
     engine_id: str = None,
     transmission_id: str = None,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user=Depends(get_optional_user),
 ):
-    """Full-text search over indexed manual chunks.
+    """Full-text search over indexed manual chunks, each with a snippet of
+    the passages around the matched terms.
 
     Optional scope filtering (scope, engine_id, transmission_id) matches how
     the advisor's search_manual tool works internally — use them to avoid
@@ -454,8 +484,29 @@ async def search_manual_chunks(
     if transmission_id:
         base_filter = and_(base_filter, ManualChunk.transmission_id == transmission_id)
 
-    chunks = await search_chunks(db, q, base_filter, limit=limit)
+    hits = await search_snippets(db, q, base_filter, limit=limit)
 
+    return ManualSearchResponse(
+        chunks=[
+            ManualChunkResponse.model_validate(hit.chunk).model_copy(update={"snippet": hit.snippet})
+            for hit in hits
+        ],
+        total=len(hits),
+    )
+
+
+@router.get("/chunks/{chunk_id}/neighbors", response_model=ManualSearchResponse)
+async def get_chunk_neighbors(
+    chunk_id: str,
+    radius: int = 1,
+    db: AsyncSession = Depends(get_read_db),
+    current_user=Depends(get_optional_user),
+):
+    """A search result expanded to its page context: the chunk plus up to
+    `radius` (max 5) chunks before and after it on the same page, in order."""
+    chunks = await chunk_neighbors(db, chunk_id, min(max(radius, 0), 5))
+    if not chunks:
+        raise HTTPException(status_code=404, detail="Chunk not found")
     return ManualSearchResponse(
         chunks=[ManualChunkResponse.model_validate(c) for c in chunks],
         total=len(chunks),
@@ -465,27 +516,32 @@ async def search_manual_chunks(
 @router.get("/chunks/{vehicle_id}", response_model=ManualSearchResponse)
 async def list_chunks_for_vehicle(
     vehicle_id: str,
+    http_request: Request,
     offset: int = 0,
     limit: int = 50,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user=Depends(get_optional_user),
 ):
-    """List all indexed chunks for a vehicle_id, paginated."""
-    count_result = await db.execute(
-        select(func.count(ManualChunk.id)).where(ManualChunk.vehicle_id == vehicle_id)
-    )
-    total = count_result.scalar() or 0
-
-    result = await db.execute(
-        select(ManualChunk)
-        .where(ManualChunk.vehicle_id == vehicle_id)
-        .order_by(ManualChunk.section_path)
-        .offset(offset)
-        .limit(limit)
-    )
-    chunks = result.scalars().all()
+    """List all indexed chunks for a vehicle_id, paginated. Served with an ETag."""
+    async def _load() -> ManualSearchResponse:
+        count_result = await db.execute(
+            select(func.count(ManualChunk.id)).where(ManualChunk.vehicle_id == vehicle_id)
+        )
+        total = count_result.scalar() or 0
+
+        result = await db.execute(
+            select(ManualChunk)
+            .where(ManualChunk.vehicle_id == vehicle_id)
+            .order_by(ManualChunk.section_path, ManualChunk.chunk_ordinal)
+            .offset(offset)
+            .limit(limit)
+        )
+        chunks = result.scalars().all()
 
-    return ManualSearchResponse(
-        chunks=[ManualChunkResponse.model_validate(c) for c in chunks],
-        total=total,
-    )
+        return ManualSearchResponse(
+            chunks=[ManualChunkResponse.model_validate(c) for c in chunks],
+            total=total,
+        )
+
+    key = f"manual_chunks:{vehicle_id}:{offset}:{limit}"
+    return await cached_json(http_request, key, _load, CACHE_SHORT)
@@ -1,12 +1,19 @@
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, Query, Request
 from typing import Optional
 from pydantic import BaseModel
 from app.services.spec_lookup import SpecLookupService
+from app.utils.http_cache import CACHE_LONG, cached_json
 
 router = APIRouter(prefix="/api/specs", tags=["Spec Lookup"])
 spec_lookup = SpecLookupService()
 
 
+def _found_specs(response: "SpecLookupResponse") -> bool:
+    # The lookup clients swallow network errors, so an upstream outage looks
+    # like an empty result; never cache one (here or in proxies) for an hour
+    return bool(response.specs)
+
+
 class SpecLookupResponse(BaseModel):
     specs: dict
     sources: dict
@@ -15,6 +22,7 @@ class SpecLookupResponse(BaseModel):
 
 @router.get("/lookup/engine", response_model=SpecLookupResponse)
 async def lookup_engine_specs(
+    request: Request,
     make: str = Query(..., description="Engine manufacturer"),
     model: str = Query(..., description="Engine model name"),
     year: Optional[int] = Query(None, description="Model year for lookup"),
@@ -22,16 +30,21 @@ async def lookup_engine_specs(
 ):
     """Look up engine specs from external APIs without saving.
     Returns available specs from CarQuery + NHTSA."""
-    result = await spec_lookup.lookup_engine_specs(make, model, year, trim)
-    return SpecLookupResponse(
-        specs=result.specs,
-        sources=result.sources,
-        confidence=result.confidence,
-    )
+    async def _lookup() -> SpecLookupResponse:
+        result = await spec_lookup.lookup_engine_specs(make, model, year, trim)
+        return SpecLookupResponse(
+            specs=result.specs,
+            sources=result.sources,
+            confidence=result.confidence,
+        )
+
+    key = f"specs:engine:{make.lower()}|{model.lower()}|{year}|{(trim or '').lower()}"
+    return await cached_json(request, key, _lookup, CACHE_LONG, cacheable=_found_specs)
 
 
 @router.get("/lookup/vehicle", response_model=SpecLookupResponse)
 async def lookup_vehicle_specs(
+    request: Request,
     make: str = Query(..., description="Vehicle manufacturer"),
     model: str = Query(..., description="Vehicle model"),
     year: int = Query(..., description="Model year"),
@@ -40,9 +53,13 @@ async def lookup_vehicle_specs(
 ):
     """Look up vehicle specs from external APIs without saving.
     Returns available specs from NHTSA + CarQuery."""
-    result = await spec_lookup.lookup_vehicle_specs(make, model, year, vin, trim)
-    return SpecLookupResponse(
-        specs=result.specs,
-        sources=result.sources,
-        confidence=result.confidence,
-    )
+    async def _lookup() -> SpecLookupResponse:
+        result = await spec_lookup.lookup_vehicle_specs(make, model, year, vin, trim)
+        return SpecLookupResponse(
+            specs=result.specs,
+            sources=result.sources,
+            confidence=result.confidence,
+        )
+
+    key = f"specs:vehicle:{make.lower()}|{model.lower()}|{year}|{(vin or '').upper()}|{(trim or '').lower()}"
+    return await cached_json(request, key, _lookup, CACHE_LONG, cacheable=_found_specs)
@@ -1,11 +1,11 @@
 import json
 import logging
 import os
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, or_
 from typing import Optional, List
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app.models.transmission import Transmission
 from app.models.engine import Engine
 from app.models.vehicle import Vehicle, QualityStatus
@@ -15,6 +15,8 @@ from app.schemas.transmission import (
     TransmissionGroups, TransmissionIdentifyResponse, TransmissionIdentifySuggestion,
 )
 from app.utils.auth import get_current_user, get_optional_user
+from app.services.metrics import record_llm_usage, track_external
+from app.utils.http_cache import cached_json
 
 logger = logging.getLogger(__name__)
 
@@ -27,7 +29,7 @@ async def list_transmissions(
     bellhousing_pattern: Optional[str] = Query(None, description="Filter by bellhousing pattern"),
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: Optional[User] = Depends(get_optional_user),
 ):
     """List transmissions. Authenticated users see approved + their own pending."""
@@ -65,7 +67,7 @@ async def list_transmissions(
 @router.get("/compatible/{engine_id}", response_model=TransmissionList)
 async def get_compatible_transmissions(
     engine_id: str,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """Get transmissions compatible with a specific engine based on bellhousing pattern."""
     # First get the engine to determine the bellhousing pattern
@@ -117,7 +119,7 @@ async def get_compatible_transmissions(
 async def get_transmissions_for_build(
     engine_id: str = Query(..., description="Engine ID"),
     vehicle_id: Optional[str] = Query(None, description="Vehicle ID for chassis-original info"),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """Return transmissions in 3 groups: stock-for-engine, chassis-original, other-compatible."""
     engine_result = await db.execute(select(Engine).where(Engine.id == engine_id))
@@ -224,11 +226,13 @@ async def identify_transmission(
                 "drivetrain_type should be one of: FWD, RWD, AWD, 4WD.\n\n"
                 "Respond ONLY with valid JSON array, no markdown."
             )
-            msg = client.messages.create(
-                model="claude-haiku-4-5-20251001",
-                max_tokens=512,
-                messages=[{"role": "user", "content": prompt}],
-            )
+            with track_external("anthropic"):
+                msg = client.messages.create(
+                    model="claude-haiku-4-5-20251001",
+                    max_tokens=512,
+                    messages=[{"role": "user", "content": prompt}],
+                )
+            record_llm_usage("anthropic", "claude-haiku-4-5-20251001", msg)
             raw = msg.content[0].text.strip()
             if raw.startswith("```"):
                 raw = "\n".join(raw.split("\n")[1:])
@@ -271,16 +275,19 @@ async def identify_transmission(
 
 
 @router.get("/{transmission_id}", response_model=TransmissionResponse)
-async def get_transmission(transmission_id: str, db: AsyncSession = Depends(get_db)):
-    """Get transmission details by ID."""
-    result = await db.execute(select(Transmission).where(Transmission.id == transmission_id))
-    transmission = result.scalar_one_or_none()
-    if not transmission:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Transmission not found",
-        )
-    return transmission
+async def get_transmission(transmission_id: str, request: Request, db: AsyncSession = Depends(get_db)):
+    """Get transmission details by ID. Served with an ETag; honors If-None-Match."""
+    async def _load() -> TransmissionResponse:
+        result = await db.execute(select(Transmission).where(Transmission.id == transmission_id))
+        transmission = result.scalar_one_or_none()
+        if not transmission:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Transmission not found",
+            )
+        return TransmissionResponse.model_validate(transmission)
+
+    return await cached_json(request, f"transmission:{transmission_id}", _load)
 
 
 @router.post("", response_model=TransmissionResponse, status_code=status.HTTP_201_CREATED)
@@ -1,15 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, Query, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, or_
 from typing import Optional
-from app.database import get_db
+from app.config import get_settings
+from app.database import get_db, get_read_db
 from app.models.vehicle import Vehicle, QualityStatus
-from app.models.user import User
-from app.schemas.vehicle import VehicleCreate, VehicleResponse, VehicleList, VINDecodeResponse
+from app.models.user import User, UserRole
+from app.schemas.vehicle import (
+    PointClearanceRequest,
+    PointClearanceResponse,
+    VehicleCreate,
+    VehicleResponse,
+    VehicleList,
+    VINDecodeResponse,
+)
 from app.utils.auth import get_current_user, get_optional_user
+from app.utils.http_cache import cached_json, response_cache
 from app.services.vin_decoder import VINDecoderService
 from app.services.spec_lookup import SpecLookupService
+from app.services.bay_sdf import generate_bay_sdf
+from app.services.clearance import ClearanceUnavailable, full_lod_url, load_bay_sdf, severity
 
+settings = get_settings()
 router = APIRouter(prefix="/api/vehicles", tags=["Vehicles"])
 vin_decoder = VINDecoderService()
 spec_lookup = SpecLookupService()
@@ -34,7 +46,7 @@ async def list_vehicles(
     body_style: Optional[str] = Query(None, description="Filter by body style"),
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: Optional[User] = Depends(get_optional_user),
 ):
     """List vehicles with visibility filtering.
@@ -85,16 +97,19 @@ async def decode_vin(vin: str):
 
 
 @router.get("/{vehicle_id}", response_model=VehicleResponse)
-async def get_vehicle(vehicle_id: str, db: AsyncSession = Depends(get_db)):
-    """Get vehicle details by ID."""
-    result = await db.execute(select(Vehicle).where(Vehicle.id == vehicle_id))
-    vehicle = result.scalar_one_or_none()
-    if not vehicle:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Vehicle not found",
-        )
-    return vehicle
+async def get_vehicle(vehicle_id: str, request: Request, db: AsyncSession = Depends(get_db)):
+    """Get vehicle details by ID. Served with an ETag; honors If-None-Match."""
+    async def _load() -> VehicleResponse:
+        result = await db.execute(select(Vehicle).where(Vehicle.id == vehicle_id))
+        vehicle = result.scalar_one_or_none()
+        if not vehicle:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Vehicle not found",
+            )
+        return VehicleResponse.model_validate(vehicle)
+
+    return await cached_json(request, f"vehicle:{vehicle_id}", _load)
 
 
 @router.post("", response_model=VehicleResponse, status_code=status.HTTP_201_CREATED)
@@ -150,6 +165,7 @@ async def create_vehicle(
     except Exception:
         pass
 
+    response_cache.invalidate(f"vehicle:{vehicle.id}")
     return vehicle
 
 
@@ -166,4 +182,61 @@ async def enrich_vehicle(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Vehicle not found",
         )
+    response_cache.invalidate(f"vehicle:{vehicle_id}")
     return vehicle
+
+
+@router.post("/{vehicle_id}/bay-sdf", status_code=status.HTTP_202_ACCEPTED)
+async def rebuild_bay_sdf(
+    vehicle_id: str,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Queue (re)generation of the bay scan's signed distance field.
+    New bay scan uploads queue this automatically; use it for older scans."""
+    vehicle = await db.get(Vehicle, vehicle_id)
+    if not vehicle:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Vehicle not found")
+    if current_user.role != UserRole.admin and vehicle.contributor_id != current_user.id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not allowed to modify this vehicle")
+    if not vehicle.bay_scan_mesh_url:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Vehicle has no bay scan mesh")
+    background_tasks.add_task(generate_bay_sdf, vehicle_id)
+    return {"status": "queued"}
+
+
+@router.post("/{vehicle_id}/clearance", response_model=PointClearanceResponse)
+async def point_clearance(
+    vehicle_id: str,
+    body: PointClearanceRequest,
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Signed clearance (inches) from each point to the bay scan.
+    Points are metres in the bay scan frame; values are read from the
+    precomputed distance field, so any point set answers in milliseconds."""
+    vehicle = await db.get(Vehicle, vehicle_id)
+    if not vehicle:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Vehicle not found")
+    scan_url = full_lod_url(vehicle.bay_scan_lod_urls, vehicle.bay_scan_mesh_url)
+    if not scan_url:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Vehicle has no bay scan mesh")
+    try:
+        sdf = await load_bay_sdf(vehicle.bay_sdf_url) if vehicle.bay_sdf_url else None
+    except ClearanceUnavailable as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if sdf is None or sdf.source_url != scan_url:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Bay distance field is not ready yet for this scan",
+        )
+
+    clearance = sdf.clearance_inches(body.points, settings.clearance_max_inches)
+    worst = int(clearance.argmin())
+    return PointClearanceResponse(
+        min_clearance_inches=round(float(clearance[worst]), 2),
+        min_index=worst,
+        severity=severity(float(clearance[worst])),
+        clearance_inches=[round(float(c), 2) for c in clearance],
+        max_inches=settings.clearance_max_inches,
+    )
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field
 from datetime import datetime
 from typing import Optional
 from app.models.build import BuildStatus
@@ -45,3 +45,26 @@ class BuildExport(BaseModel):
     engine: dict
     transmission: Optional[dict] = None
     recommendations: Optional[list[str]] = None
+
+
+class BulkExportRequest(BaseModel):
+    # Explicit builds, or (when omitted) all of the user's builds matching the filters
+    build_ids: Optional[list[str]] = Field(None, min_length=1, max_length=200)
+    status: Optional[BuildStatus] = None
+    vehicle_id: Optional[str] = None
+    include_pdf: bool = True
+
+
+class ExportJobResponse(BaseModel):
+    job_id: str
+    status: str
+    stage: str
+    builds_total: int
+    builds_done: int
+    error: Optional[str] = None
+    # Authenticated route streaming the ZIP of pdf/*.pdf plus builds.json, once
+    # status is "complete"; status becomes "expired" after export_retention_hours
+    download_url: Optional[str] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    stage_timings: Optional[dict[str, dict]] = None
@@ -77,6 +77,9 @@ class EngineResponse(EngineBase):
     quality_status: Optional[QualityStatus] = None
     contributor_id: Optional[str] = None
     created_at: datetime
+    # Server-generated LODs: {"full": url, "50": url, "25": url}
+    mesh_triangle_count: Optional[int] = None
+    mesh_lod_urls: Optional[dict[str, str]] = None
 
 
 class EngineList(BaseModel):
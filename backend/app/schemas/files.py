@@ -1,3 +1,5 @@
+from typing import Optional
+
 from pydantic import BaseModel
 
 
@@ -7,3 +9,6 @@ class FileUploadResponse(BaseModel):
     stored_path: str
     url: str
     size_bytes: int
+    sha256: Optional[str] = None
+    # "queued" when mesh LOD generation was scheduled for this upload
+    lod_status: Optional[str] = None
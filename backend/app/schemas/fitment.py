@@ -0,0 +1,48 @@
+from pydantic import BaseModel, Field
+from typing import Optional
+
+
+class FitmentScreenRequest(BaseModel):
+    vehicle_id: str
+    # Adds the torque vs capacity check when set
+    transmission_id: Optional[str] = None
+
+    # Candidate filters
+    make: Optional[str] = None
+    engine_family: Optional[str] = None
+    min_hp: Optional[int] = None
+    max_hp: Optional[int] = None
+    max_weight_lbs: Optional[float] = None
+
+    include_no_fit: bool = False
+    limit: int = Field(50, ge=1, le=500)
+
+
+class FitmentCandidate(BaseModel):
+    engine_id: str
+    make: str
+    model: str
+    variant: Optional[str] = None
+    engine_family: Optional[str] = None
+    power_hp: Optional[int] = None
+    torque_lb_ft: Optional[int] = None
+    # fits | unverified | tight | no_fit
+    status: str
+    # Check name → ok | tight | fail | unknown
+    checks: dict[str, str]
+    length_margin_in: Optional[float] = None
+    width_margin_in: Optional[float] = None
+    # Room left under the ground-clearance limit for the oil pan
+    oil_pan_margin_in: Optional[float] = None
+    # Engine torque / transmission capacity
+    torque_ratio: Optional[float] = None
+
+
+class FitmentScreenResponse(BaseModel):
+    vehicle_id: str
+    transmission_id: Optional[str] = None
+    # Engines that matched the filters and were screened
+    screened: int
+    # Of those, engines that are not ruled out by a failed check
+    candidates: int
+    results: list[FitmentCandidate]
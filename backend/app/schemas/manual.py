@@ -1,4 +1,5 @@
 from pydantic import BaseModel
+from datetime import datetime
 from typing import Optional
 
 
@@ -27,6 +28,17 @@ class IngestStatusResponse(BaseModel):
     chunks_indexed: int
     gaps_filled: int
     error: Optional[str] = None
+    # Telemetry: {stage: {"started_at", "finished_at", "seconds"}} and throughput counters
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    stage_timings: Optional[dict[str, dict]] = None
+    bytes_downloaded: int = 0
+    files_extracted: int = 0
+    pages_parsed: int = 0
+    pages_skipped: int = 0
+    pages_removed: int = 0
+    vision_calls: int = 0
+    upsert_batches: int = 0
 
 
 class ManualChunkResponse(BaseModel):
@@ -35,6 +47,10 @@ class ManualChunkResponse(BaseModel):
     content: str
     data_source: str
     confidence: str
+    page_id: Optional[str] = None
+    chunk_ordinal: int = 0
+    # /search only: passages around the matched terms, terms in **bold**
+    snippet: Optional[str] = None
 
     class Config:
         from_attributes = True
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field
 from datetime import datetime
 from typing import Optional
 from app.models.vehicle import QualityStatus
@@ -52,6 +52,26 @@ class VehicleResponse(VehicleBase):
     contributor_id: Optional[str] = None
     quality_status: QualityStatus
     created_at: datetime
+    # Server-generated LODs: {"full": url, "50": url, "25": url}
+    bay_scan_triangle_count: Optional[int] = None
+    bay_scan_lod_urls: Optional[dict[str, str]] = None
+    # Precomputed signed distance field of the bay scan (see /api/vehicles/{id}/clearance)
+    bay_sdf_url: Optional[str] = None
+
+
+class PointClearanceRequest(BaseModel):
+    # [x, y, z] in metres, bay scan frame
+    points: list[tuple[float, float, float]] = Field(..., min_length=1, max_length=100_000)
+
+
+class PointClearanceResponse(BaseModel):
+    min_clearance_inches: float
+    # Index into points of the tightest point
+    min_index: int
+    severity: str
+    # Signed, capped at max_inches; negative = behind the bay surface
+    clearance_inches: list[float]
+    max_inches: float
 
 
 class VehicleList(BaseModel):
@@ -8,6 +8,7 @@ from app.models.vehicle import Vehicle
 from app.models.transmission import Transmission
 from app.models.manual_chunk import ManualChunk
 from app.schemas.advisor import ChatMessage
+from app.services.metrics import record_llm_usage, track_external
 
 settings = get_settings()
 
@@ -29,6 +30,10 @@ CHUNK_SOURCE_LABELS = {
     "user_uploaded": "USER_UPLOADED_MANUAL",
 }
 
+# Chunks are bounded by MANUAL_CHUNK_TOKENS; this only caps pages indexed
+# before chunking (whole pages, until their manual is re-indexed)
+MAX_CHUNK_CHARS = 2400
+
 
 class AdvisorService:
     def __init__(self):
@@ -52,7 +57,16 @@ class AdvisorService:
         build_id: str,
         message: str,
         conversation_history: Optional[list[ChatMessage]] = None,
+        read_db: Optional[AsyncSession] = None,
     ) -> tuple[str, list[str]]:
+        """Answer a chat message for a build.
+
+        Manual-chunk searches (tool calls and Gemini pre-fetch) go through
+        read_db when given — typically a replica session from get_read_db —
+        while build context is always loaded from the primary session.
+        """
+        search_db = read_db or db
+
         # Load build context
         build_result = await db.execute(select(Build).where(Build.id == build_id))
         build = build_result.scalar_one_or_none()
@@ -83,7 +97,7 @@ class AdvisorService:
                 manual_context = ""
                 if vehicle:
                     manual_context = await self._retrieve_manual_context(
-                        db, vehicle.make, vehicle.model, vehicle.year, message
+                        search_db, vehicle.make, vehicle.model, vehicle.year, message
                     )
                 system_prompt = self._build_system_prompt(build, engine, vehicle, transmission, manual_context)
                 messages = []
@@ -96,10 +110,12 @@ class AdvisorService:
                 for msg in messages[:-1]:
                     full_prompt += f"{msg['role'].upper()}: {msg['content']}\n\n"
                 full_prompt += f"USER: {messages[-1]['content']}"
-                response = self.client.models.generate_content(
-                    model="gemini-2.0-flash",
-                    contents=full_prompt,
-                )
+                with track_external("gemini"):
+                    response = self.client.models.generate_content(
+                        model="gemini-2.0-flash",
+                        contents=full_prompt,
+                    )
+                record_llm_usage("gemini", "gemini-2.0-flash", response)
                 reply = response.text
                 sources = self._extract_sources(engine, vehicle, transmission)
                 return reply, sources
@@ -107,7 +123,7 @@ class AdvisorService:
             else:
                 # Anthropic: tool-use loop with build-scoped search_manual tool
                 return await self._anthropic_tool_loop(
-                    db, build, engine, vehicle, transmission,
+                    search_db, build, engine, vehicle, transmission,
                     message, conversation_history,
                 )
 
@@ -130,6 +146,7 @@ class AdvisorService:
     ) -> tuple[str, list[str]]:
         search_tool = await self._build_search_tool(build, engine, vehicle, transmission, db)
         fetch_diagram_tool = self._build_fetch_diagram_tool()
+        expand_chunk_tool = self._build_expand_chunk_tool()
         system_prompt = self._build_system_prompt(build, engine, vehicle, transmission)
 
         messages = []
@@ -140,13 +157,15 @@ class AdvisorService:
 
         max_iterations = 5
         for _ in range(max_iterations):
-            response = self.client.messages.create(
-                model="claude-sonnet-4-20250514",
-                max_tokens=1024,
-                system=system_prompt,
-                tools=[search_tool, fetch_diagram_tool],
-                messages=messages,
-            )
+            with track_external("anthropic"):
+                response = self.client.messages.create(
+                    model="claude-sonnet-4-20250514",
+                    max_tokens=1024,
+                    system=system_prompt,
+                    tools=[search_tool, fetch_diagram_tool, expand_chunk_tool],
+                    messages=messages,
+                )
+            record_llm_usage("anthropic", "claude-sonnet-4-20250514", response)
 
             if response.stop_reason == "end_turn":
                 reply = next(
@@ -164,6 +183,12 @@ class AdvisorService:
                                 block.input.get("image_url", ""),
                                 block.input.get("question", ""),
                             )
+                        elif block.name == "expand_chunk":
+                            content = await self._execute_expand_chunk(
+                                block.input.get("chunk_id", ""),
+                                block.input.get("radius", 1),
+                                db,
+                            )
                         else:
                             text_result = await self._execute_search_tool(
                                 block.input.get("query", ""),
@@ -304,6 +329,48 @@ class AdvisorService:
             },
         }
 
+    def _build_expand_chunk_tool(self) -> dict:
+        return {
+            "name": "expand_chunk",
+            "description": (
+                "Read the text around a search_manual result: the chunks just before and "
+                "after it on the same manual page, in order. Use this when a result is cut "
+                "off mid-procedure or mid-table."
+            ),
+            "input_schema": {
+                "type": "object",
+                "properties": {
+                    "chunk_id": {
+                        "type": "string",
+                        "description": "The chunk_id from a search_manual result",
+                    },
+                    "radius": {
+                        "type": "integer",
+                        "description": "How many chunks to include on each side (1-3)",
+                    },
+                },
+                "required": ["chunk_id"],
+            },
+        }
+
+    async def _execute_expand_chunk(self, chunk_id: str, radius, db: AsyncSession) -> str:
+        """Execute an expand_chunk tool call and return the page's neighbouring chunks."""
+        from app.services.manual_search import chunk_neighbors
+
+        try:
+            radius = min(max(int(radius), 1), 3)
+        except (TypeError, ValueError):
+            radius = 1
+        chunks = await chunk_neighbors(db, chunk_id, radius)
+        if not chunks:
+            return f"No manual chunk found with chunk_id: {chunk_id}"
+
+        lines = [f"[{CHUNK_SOURCE_LABELS.get(chunks[0].data_source, 'MANUAL')}] {chunks[0].section_path}"]
+        for chunk in chunks:
+            lines.append(f"--- part {chunk.chunk_ordinal + 1} (chunk_id: {chunk.id})")
+            lines.append(chunk.content[:MAX_CHUNK_CHARS])
+        return "\n".join(lines)
+
     async def _execute_fetch_diagram(self, image_url: str, question: str) -> str:
         """Fetch image from Supabase Storage (SSRF-safe) and vision-analyze it.
 
@@ -342,7 +409,8 @@ class AdvisorService:
             import base64
             import httpx
 
-            async with httpx.AsyncClient(timeout=15, follow_redirects=False) as client:
+            async with httpx.AsyncClient(timeout=15, follow_redirects=False) as client, \
+                    track_external("diagram_fetch"):
                 resp = await client.get(image_url)
                 resp.raise_for_status()
                 data = resp.content
@@ -354,33 +422,35 @@ class AdvisorService:
             # Use a separate vision call (Haiku for cost efficiency)
             import anthropic as _anthropic
             vision_client = _anthropic.Anthropic(api_key=settings.anthropic_api_key)
-            vision_response = vision_client.messages.create(
-                model="claude-haiku-4-5-20251001",
-                max_tokens=512,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "image",
-                                "source": {
-                                    "type": "base64",
-                                    "media_type": "image/png",
-                                    "data": b64,
+            with track_external("anthropic"):
+                vision_response = vision_client.messages.create(
+                    model="claude-haiku-4-5-20251001",
+                    max_tokens=512,
+                    messages=[
+                        {
+                            "role": "user",
+                            "content": [
+                                {
+                                    "type": "image",
+                                    "source": {
+                                        "type": "base64",
+                                        "media_type": "image/png",
+                                        "data": b64,
+                                    },
                                 },
-                            },
-                            {
-                                "type": "text",
-                                "text": (
-                                    f"This is a page from a vehicle service manual. "
-                                    f"Describe what this diagram shows in technical detail. "
-                                    f"Question: {question}"
-                                ),
-                            },
-                        ],
-                    }
-                ],
-            )
+                                {
+                                    "type": "text",
+                                    "text": (
+                                        f"This is a page from a vehicle service manual. "
+                                        f"Describe what this diagram shows in technical detail. "
+                                        f"Question: {question}"
+                                    ),
+                                },
+                            ],
+                        }
+                    ],
+                )
+            record_llm_usage("anthropic", "claude-haiku-4-5-20251001", vision_response)
             return next(
                 (b.text for b in vision_response.content if hasattr(b, "text")),
                 "Could not extract description from diagram.",
@@ -395,8 +465,9 @@ class AdvisorService:
         build: Build,
         db: AsyncSession,
     ) -> str:
-        """Execute a search_manual tool call and return formatted results."""
-        from app.services.manual_search import search_chunks
+        """Execute a search_manual tool call and return formatted results:
+        per hit, the passages around the matched terms (not the whole chunk)."""
+        from app.services.manual_search import search_snippets
 
         if component == "chassis":
             scope_filter = and_(
@@ -420,18 +491,20 @@ class AdvisorService:
                 and_(ManualChunk.scope == "transmission", ManualChunk.transmission_id == build.transmission_id),
             )
 
-        chunks = await search_chunks(db, query, scope_filter, limit=5)
+        hits = await search_snippets(db, query, scope_filter, limit=5)
 
-        if not chunks:
+        if not hits:
             return f"No results found in {component} manual for: {query}"
 
         lines = []
-        for chunk in chunks:
+        for hit in hits:
+            chunk = hit.chunk
             label = CHUNK_SOURCE_LABELS.get(chunk.data_source, "MANUAL")
             lines.append(f"[{label}] {chunk.section_path}")
+            lines.append(f"  chunk_id: {chunk.id}")
             if chunk.source_url:
                 lines.append(f"  image_url: {chunk.source_url}")
-            lines.append(chunk.content[:600])
+            lines.append(hit.snippet)
             lines.append("")
         return "\n".join(lines).strip()
 
@@ -537,6 +610,9 @@ Use `search_manual` whenever you need:
 - Any other factory documentation
 
 Call it up to 3 times with targeted queries before responding.
+Each result shows the passages around your search terms (in **bold**) from one
+section of a manual page; if that stops short of what you need, call
+`expand_chunk` with its chunk_id to read the full text around it.
 If the user's question is ambiguous about which component they mean (e.g. "the sensor"),
 ask one clarifying question before searching.
 The build context tells you exactly which car, engine, and transmission are being used —
@@ -746,8 +822,9 @@ Guidelines:
         year: int,
         user_question: str,
     ) -> str:
-        """Pre-fetch RAG used by Gemini path. Uses the shared FTS search helper."""
-        from app.services.manual_search import search_chunks
+        """Pre-fetch RAG used by Gemini path. Uses the shared FTS search helper;
+        with no follow-up tool calls here, each hit gets one more passage."""
+        from app.services.manual_search import SNIPPET_FRAGMENTS, search_snippets
         from sqlalchemy import func as sqla_func
 
         scope_filter = and_(
@@ -755,16 +832,18 @@ Guidelines:
             sqla_func.lower(ManualChunk.vehicle_model) == model.lower(),
             ManualChunk.vehicle_year == year,
         )
-        chunks = await search_chunks(db, user_question, scope_filter, limit=5)
+        hits = await search_snippets(
+            db, user_question, scope_filter, limit=5, max_fragments=SNIPPET_FRAGMENTS + 1,
+        )
 
-        if not chunks:
+        if not hits:
             return ""
 
         lines = []
-        for chunk in chunks:
-            label = CHUNK_SOURCE_LABELS.get(chunk.data_source, "MANUAL")
-            lines.append(f"[{label}] {chunk.section_path}")
-            lines.append(chunk.content[:800])
+        for hit in hits:
+            label = CHUNK_SOURCE_LABELS.get(hit.chunk.data_source, "MANUAL")
+            lines.append(f"[{label}] {hit.chunk.section_path}")
+            lines.append(hit.snippet)
             lines.append("")
         return "\n".join(lines).strip()
 
@@ -0,0 +1,363 @@
+"""
+Precomputed sparse signed distance fields for bay scans.
+
+Data flow:
+  process_uploaded_mesh (new bay scan) or POST /api/vehicles/{id}/bay-sdf
+    → BackgroundTask: generate_bay_sdf(vehicle_id)
+        → bay scan full LOD (parsed mesh cache shared with clearance)
+        → BaySDF.build(): orient the scan, TriangleBVH, narrow-band samples in bricks
+        → compressed .npz → meshes/sdf/{sha16}.npz
+    → Vehicle.bay_sdf_url
+  compute_build_clearance / POST /api/vehicles/{id}/clearance
+    → load_bay_sdf(url) (app/services/clearance.py: in-process LRU + local .npz)
+    → BaySDF.sample(points): trilinear interpolation, no triangle tests
+
+Layout: the scan's bounds, padded by the band, are cut into voxels of
+bay_sdf_voxel_mm. Voxel corners are grouped into bricks of BRICK³ samples that
+share their last layer with the next brick, so every lookup reads a single
+brick. Only bricks within the band of the surface store samples (int16, scaled
+to ±band); every other brick is one entry in the brick index recording which
+side of the surface it is on. Values are clamped to ±band.
+
+Sign: the bay scan is an open surface, so the sign comes from the
+pseudo-normal of the face, edge or vertex holding the nearest point. Each connected
+piece of the scan is first wound so its normals face into the bay (towards
+the centre of the scan's bounds, area-weighted). Points in the bay are
+positive; points behind the scanned sheet metal are negative.
+
+Building is exact BVH queries, but only where the answer can matter: the
+distance field is 1-Lipschitz, so a sample whose brick centre is at distance
+dc satisfies d ≥ dc − |offset|. Samples that bound rules out of the band are
+clamped with the centre's sign (the segment between them cannot cross the
+surface) and never queried; shared lattice points are queried once.
+"""
+from __future__ import annotations
+
+import hashlib
+import io
+import logging
+from typing import Optional
+
+import numpy as np
+
+from app.config import get_settings
+from app.services.clearance import (
+    INCH,
+    MARGIN_INCHES,
+    ClearanceUnavailable,
+    TriangleBVH,
+    connected_components,
+    full_lod_url,
+    load_mesh_part,
+    nearest_barycentric,
+)
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Samples per brick edge (BRICK - 1 voxels, the last layer shared with the next brick)
+BRICK = 8
+# Brick index entries for bricks with no stored samples
+FAR_OUTSIDE = -1
+FAR_INSIDE = -2
+QUANT = 32767
+FORMAT_VERSION = 1
+# Points per BVH query while building (bounds the descent's working set)
+QUERY_CHUNK = 16384
+# Laplacian passes applied to the copy of the scan the sign normals come from
+SMOOTHING_ITERATIONS = 4
+
+_CORNERS = np.array([(dx * BRICK + dy) * BRICK + dz for dx in (0, 1) for dy in (0, 1) for dz in (0, 1)])
+
+
+def orient_faces(vertices: np.ndarray, faces: np.ndarray) -> np.ndarray:
+    """Faces rewound so each connected piece's normals face the centre of the mesh bounds."""
+    vertices = np.asarray(vertices, dtype=np.float64)
+    labels = connected_components(np.ones(len(vertices), dtype=bool), vertices, faces)[faces[:, 0]]
+    a, b, c = vertices[faces[:, 0]], vertices[faces[:, 1]], vertices[faces[:, 2]]
+    centre = (vertices.min(axis=0) + vertices.max(axis=0)) / 2
+    # |cross| is twice the area, so this is an area-weighted vote per piece
+    vote = np.einsum("ij,ij->i", np.cross(b - a, c - a), centre - (a + b + c) / 3)
+    _, piece = np.unique(labels, return_inverse=True)
+    piece = piece.reshape(-1)
+    flip = (np.bincount(piece, weights=vote) < 0)[piece]
+    oriented = faces.copy()
+    oriented[flip, 1], oriented[flip, 2] = faces[flip, 2], faces[flip, 1]
+    return oriented
+
+
+def _scatter_sum(index: np.ndarray, values: np.ndarray, n: int) -> np.ndarray:
+    return np.stack([np.bincount(index, weights=values[:, k], minlength=n) for k in range(3)], axis=1)
+
+
+def _smooth(vertices: np.ndarray, edges: np.ndarray, iterations: int = SMOOTHING_ITERATIONS) -> np.ndarray:
+    """Laplacian-smoothed copy of the vertices (half-step towards the neighbour mean)."""
+    n = len(vertices)
+    degree = np.bincount(edges.ravel(), minlength=n)[:, None]
+    out = vertices
+    for _ in range(iterations):
+        total = _scatter_sum(edges[:, 0], out[edges[:, 1]], n) + _scatter_sum(edges[:, 1], out[edges[:, 0]], n)
+        out = np.where(degree > 0, 0.5 * out + 0.5 * total / np.maximum(degree, 1), out)
+    return out
+
+
+class _OrientedScan:
+    """The scan's BVH plus pseudo-normals, for inside/outside tests.
+
+    The side of a point is taken against the angle-weighted pseudo-normal of
+    the feature holding its nearest point (Bærentzen & Aanæs 2005): the face
+    normal inside a triangle, the sum of both face normals on an edge, and the
+    angle-weighted vertex normal at a corner. A single face normal is unreliable
+    there — on a noisy scan the nearest point is very often a vertex, and the
+    triangle the BVH happened to return can face well away from the point.
+
+    The normals are taken from a lightly smoothed copy of the scan: scan noise
+    folds the odd triangle over, and a folded neighbour can flip an edge or
+    vertex normal and with it the sign of every sample whose nearest point lands
+    there. Smoothing can only misjudge points within about the noise amplitude
+    of the surface, where the distance is that small anyway.
+    """
+
+    def __init__(self, vertices: np.ndarray, faces: np.ndarray):
+        vertices = np.asarray(vertices, dtype=np.float64)
+        oriented = orient_faces(vertices, faces)
+        self.bvh = TriangleBVH(vertices, oriented)
+
+        # Edges in (ab, bc, ca) order per face
+        edges = np.sort(oriented[:, [0, 1, 1, 2, 2, 0]].reshape(-1, 2), axis=1)
+        unique_edges, edge_id = np.unique(edges, axis=0, return_inverse=True)
+        edge_id = edge_id.reshape(-1)
+        smoothed = _smooth(vertices, unique_edges)
+
+        corners = smoothed[oriented]
+        normals = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+        length = np.linalg.norm(normals, axis=1, keepdims=True)
+        normals = np.divide(normals, length, out=np.zeros_like(normals), where=length > 0)
+
+        vertex_sum = np.zeros((len(vertices), 3))
+        for k in range(3):
+            e1 = corners[:, (k + 1) % 3] - corners[:, k]
+            e2 = corners[:, (k + 2) % 3] - corners[:, k]
+            cos = np.einsum("ij,ij->i", e1, e2) / np.maximum(
+                np.linalg.norm(e1, axis=1) * np.linalg.norm(e2, axis=1), 1e-30
+            )
+            vertex_sum += _scatter_sum(oriented[:, k], normals * np.arccos(np.clip(cos, -1, 1))[:, None], len(vertices))
+
+        # Shared edges sum both faces' normals
+        edge_sum = _scatter_sum(edge_id, np.repeat(normals, 3, axis=0), edge_id.max() + 1)
+
+        # Per BVH row (padding rows repeat the last real triangle)
+        face = self.bvh.order[np.minimum(np.arange(len(self.bvh.frames)), self.bvh.triangle_count - 1)]
+        self.face_normals = normals[face]
+        self.vertex_normals = vertex_sum[oriented[face]]
+        self.edge_normals = edge_sum[edge_id.reshape(-1, 3)[face]]
+
+    def signs(self, points: np.ndarray, tri: np.ndarray) -> np.ndarray:
+        fr = self.bvh.frames[tri].astype(np.float64)
+        ab, ac = fr[:, 3:6], fr[:, 6:9]
+        ap = points - fr[:, 0:3]
+        v, w = nearest_barycentric(ap, ab, ac, fr[:, 9], fr[:, 10], fr[:, 11])
+        u = 1 - v - w
+        eps = 1e-9
+        at = [(v <= eps) & (w <= eps), v >= 1 - eps, w >= 1 - eps]
+        corner = at[0] | at[1] | at[2]
+        on = [~corner & (w <= eps), ~corner & (u <= eps), ~corner & (v <= eps)]
+
+        normals = self.face_normals[tri]
+        for k in range(3):
+            normals = np.where(on[k][:, None], self.edge_normals[tri, k], normals)
+            normals = np.where(at[k][:, None], self.vertex_normals[tri, k], normals)
+        to_point = ap - ab * v[:, None] - ac * w[:, None]
+        return np.where(np.einsum("ij,ij->i", to_point, normals) < 0, -1.0, 1.0)
+
+    def signed_distances(self, points: np.ndarray, band: float, reach: float) -> np.ndarray:
+        """Exact signed distance of each point, clamped to ±band.
+
+        Points with nothing within band are re-queried out to reach (which must
+        bound their true distance) to find which side they are on.
+        """
+        signed = np.empty(len(points))
+        for start in range(0, len(points), QUERY_CHUNK):
+            chunk = points[start:start + QUERY_CHUNK]
+            dist, _, tri = self.bvh.closest(chunk, band, return_triangles=True)
+            missed = np.flatnonzero(tri < 0)
+            if len(missed):
+                _, _, tri[missed] = self.bvh.closest(chunk[missed], reach, return_triangles=True)
+            signed[start:start + QUERY_CHUNK] = np.minimum(dist, band) * self.signs(chunk, tri)
+        return signed
+
+
+class BaySDF:
+    """Narrow-band signed distance field of a bay scan, sampled by trilinear interpolation."""
+
+    def __init__(self, index: np.ndarray, bricks: np.ndarray, origin: np.ndarray, voxel: float,
+                 band: float, triangle_count: int = 0, source_url: Optional[str] = None):
+        self.index = index
+        self.bricks = bricks
+        self.origin = np.asarray(origin, dtype=np.float64)
+        self.voxel = float(voxel)
+        self.band = float(band)
+        self.triangle_count = int(triangle_count)
+        self.source_url = source_url
+        self.cells = np.array(index.shape) * (BRICK - 1)
+        self._flat = bricks.reshape(-1)
+
+    @classmethod
+    def build(
+        cls,
+        vertices: np.ndarray,
+        faces: np.ndarray,
+        band: float,
+        voxel: float,
+        source_url: Optional[str] = None,
+    ) -> "BaySDF":
+        """Sample the scan's signed distance around its surface. CPU-bound — run in a thread."""
+        vertices = np.asarray(vertices, dtype=np.float64)
+        scan = _OrientedScan(vertices, faces)
+        span = BRICK - 1
+        origin = vertices.min(axis=0) - band
+        cells = np.maximum(np.ceil((vertices.max(axis=0) + band - origin) / voxel).astype(int), 1)
+        shape = tuple(-(-cells // span))
+        brick_edge = span * voxel
+        half_diagonal = brick_edge * np.sqrt(3) / 2
+
+        coords = np.indices(shape).reshape(3, -1).T
+        centres = origin + (coords + 0.5) * brick_edge
+        # Bricks whose centre is farther than band + half a diagonal hold no in-band
+        # sample; they only need a side, hence the unbounded query
+        centre_dist = np.empty(len(coords))
+        centre_sign = np.empty(len(coords))
+        for start in range(0, len(coords), QUERY_CHUNK):
+            chunk = slice(start, start + QUERY_CHUNK)
+            dist, _, tri = scan.bvh.closest(centres[chunk], np.inf, return_triangles=True)
+            centre_dist[chunk] = dist
+            centre_sign[chunk] = scan.signs(centres[chunk], tri)
+        near = centre_dist < band + half_diagonal
+
+        index = np.where(centre_sign < 0, FAR_INSIDE, FAR_OUTSIDE).astype(np.int32)
+        index[near] = np.arange(near.sum(), dtype=np.int32)
+
+        local = np.indices((BRICK,) * 3).reshape(3, -1).T
+        lattice = (coords[near] * span)[:, None, :] + local
+        offset = np.linalg.norm((local + 0.5 - BRICK / 2) * voxel, axis=1)
+        signed = np.repeat(centre_sign[near, None] * band, BRICK ** 3, axis=1)
+        need = centre_dist[near, None] - offset < band
+        dims = tuple(cells + BRICK)
+        unique_ids, inverse = np.unique(np.ravel_multi_index(tuple(lattice[need].T), dims), return_inverse=True)
+        points = origin + np.stack(np.unravel_index(unique_ids, dims), axis=1) * voxel
+        signed[need] = scan.signed_distances(points, band, band + 3 * half_diagonal)[inverse.reshape(-1)]
+
+        bricks = np.round(signed / band * QUANT).astype(np.int16).reshape(-1, BRICK, BRICK, BRICK)
+        return cls(index.reshape(shape), bricks, origin, voxel, band, len(faces), source_url)
+
+    def sample(self, points: np.ndarray) -> np.ndarray:
+        """Signed distance in metres at each point, clamped to ±band.
+
+        Points outside the field read the nearest boundary value.
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        g = (points - self.origin) / self.voxel
+        cell = np.clip(np.floor(g), 0, self.cells - 1).astype(np.int64)
+        frac = np.clip(g - cell, 0.0, 1.0)
+        brick = cell // (BRICK - 1)
+        lx, ly, lz = (cell - brick * (BRICK - 1)).T
+        slot = self.index[tuple(brick.T)]
+
+        out = np.where(slot == FAR_INSIDE, -self.band, self.band)
+        stored = np.flatnonzero(slot >= 0)
+        if len(stored):
+            base = slot[stored].astype(np.int64) * BRICK ** 3 + (lx[stored] * BRICK + ly[stored]) * BRICK + lz[stored]
+            corners = self._flat[base[:, None] + _CORNERS].astype(np.float64)
+            fx, fy, fz = frac[stored].T
+            wx = np.stack([1 - fx, fx], axis=1)
+            wy = np.stack([1 - fy, fy], axis=1)
+            wz = np.stack([1 - fz, fz], axis=1)
+            # Same (dx, dy, dz) order as _CORNERS
+            weights = (wx[:, :, None, None] * wy[:, None, :, None] * wz[:, None, None, :]).reshape(-1, 8)
+            out[stored] = (corners * weights).sum(axis=1) * (self.band / QUANT)
+        return out
+
+    def clearance_inches(self, points, max_inches: float) -> np.ndarray:
+        """Signed clearance in inches per point, capped at max_inches."""
+        return np.minimum(self.sample(np.asarray(points, dtype=np.float64)), max_inches * INCH) / INCH
+
+    @property
+    def stored_bricks(self) -> int:
+        return len(self.bricks)
+
+    def to_bytes(self) -> bytes:
+        buf = io.BytesIO()
+        np.savez_compressed(
+            buf,
+            index=self.index,
+            bricks=self.bricks,
+            origin=self.origin,
+            params=np.array([FORMAT_VERSION, BRICK, self.voxel, self.band, self.triangle_count]),
+            source_url=np.array(self.source_url or ""),
+        )
+        return buf.getvalue()
+
+    @classmethod
+    def from_file(cls, path) -> "BaySDF":
+        with np.load(path) as data:
+            version, brick, voxel, band, triangles = data["params"]
+            if int(version) != FORMAT_VERSION or int(brick) != BRICK:
+                raise ValueError(f"Unsupported bay SDF format {int(version)} / brick {int(brick)}")
+            return cls(
+                data["index"], data["bricks"], data["origin"], voxel, band,
+                int(triangles), str(data["source_url"]) or None,
+            )
+
+
+async def generate_bay_sdf(vehicle_id: str) -> Optional[str]:
+    """Background task: build the vehicle's bay SDF and record Vehicle.bay_sdf_url.
+
+    Returns the SDF URL, or None if the vehicle has no bay scan or the scan was
+    replaced while the field was being built. Failures are logged — clearance
+    uses exact BVH queries until an SDF exists.
+    """
+    import asyncio
+    from app.database import worker_session_maker
+    from app.models.vehicle import Vehicle
+    from app.services.storage import StorageService
+    from app.utils.http_cache import response_cache
+
+    def _scan_url(vehicle: Vehicle) -> Optional[str]:
+        return full_lod_url(vehicle.bay_scan_lod_urls, vehicle.bay_scan_mesh_url)
+
+    try:
+        async with worker_session_maker() as db:
+            vehicle = await db.get(Vehicle, vehicle_id)
+            mesh_url = _scan_url(vehicle) if vehicle else None
+        if not mesh_url:
+            return None
+
+        scan = await load_mesh_part("bay", mesh_url)
+        band = (settings.clearance_max_inches + MARGIN_INCHES) * INCH
+        voxel = settings.bay_sdf_voxel_mm / 1000
+
+        def _build() -> tuple[BaySDF, bytes]:
+            built = BaySDF.build(scan.vertices, scan.faces, band, voxel, source_url=mesh_url)
+            return built, built.to_bytes()
+
+        sdf, data = await asyncio.to_thread(_build)
+        key = f"sdf/{hashlib.sha256(data).hexdigest()[:16]}.npz"
+        url = await StorageService().upload_bytes(key, data, "application/octet-stream", bucket="meshes")
+
+        async with worker_session_maker() as db:
+            vehicle = await db.get(Vehicle, vehicle_id)
+            if vehicle is None or _scan_url(vehicle) != mesh_url:
+                return None
+            vehicle.bay_sdf_url = url
+            await db.commit()
+        response_cache.invalidate(f"vehicle:{vehicle_id}")
+        logger.info(
+            f"Bay SDF for vehicle {vehicle_id}: {sdf.stored_bricks} of {sdf.index.size} bricks stored, "
+            f"{len(data) / 1e6:.1f} MB"
+        )
+        return url
+    except ClearanceUnavailable as exc:
+        logger.warning(f"Bay SDF not built for vehicle {vehicle_id}: {exc}")
+    except Exception as exc:
+        logger.error(f"Bay SDF generation failed for vehicle {vehicle_id}: {exc}")
+    return None
@@ -0,0 +1,269 @@
+"""
+Build export payloads: single builds and bulk export jobs.
+
+Data flow (single):
+  GET /api/builds/{id}/export[/pdf] → build_export(build, vehicle, engine, transmission)
+    → BuildExport (spec dicts + recommendations_for()) → JSON, or PDFService
+
+Data flow (bulk):
+  POST /api/builds/export-jobs → ExportJob row (build ids resolved up front)
+    → BackgroundTask: run_export_job(job_id)
+        loading:   load_exports() — builds, vehicles, engines and transmissions
+                   in one outer-joined SELECT
+        rendering: every PDF submitted at once to PDFService (its process pool
+                   caps concurrency; cached reports come straight back);
+                   builds_done is committed as each one finishes
+        packaging: builds.json + pdf/*.pdf zipped in a worker thread
+        uploading: exports/{user_id}/{job_id}.zip → ExportJob.result_key
+  GET /api/builds/export-jobs/{job_id} polls it, like GET /api/manuals/status/{job_id}.
+  GET /api/builds/export-jobs/{job_id}/download streams the ZIP to its owner only;
+  the bucket is never linked publicly.
+  purge_expired_exports() (queued with every new job) deletes ZIPs older than
+  export_retention_hours and marks their jobs "expired".
+"""
+import asyncio
+import json
+import logging
+import tempfile
+import zipfile
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.models.build import Build
+from app.models.engine import Engine
+from app.models.export_job import ExportJob
+from app.models.transmission import Transmission
+from app.models.vehicle import Vehicle
+from app.schemas.build import BuildExport, BuildResponse
+from app.services.manual_ingestor import begin_stage, finish_job
+from app.services.recommendations import recommendations_for
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+EXPORT_BUCKET = "exports"
+# Commit progress at most this often while rendering (one commit per build is chatty on big jobs)
+PROGRESS_EVERY = 5
+
+
+def engine_export(engine: Engine) -> dict:
+    """Build engine export dict with expanded spec fields."""
+    if not engine:
+        return {}
+    return {
+        "id": engine.id,
+        "make": engine.make,
+        "model": engine.model,
+        "variant": engine.variant,
+        "power_hp": engine.power_hp,
+        "torque_lb_ft": engine.torque_lb_ft,
+        "fuel_pressure_psi": engine.fuel_pressure_psi,
+        "fuel_flow_lph": engine.fuel_flow_lph,
+        "cooling_btu_min": engine.cooling_btu_min,
+        "displacement_liters": engine.displacement_liters,
+        "compression_ratio": engine.compression_ratio,
+        "valve_train": engine.valve_train,
+        "bore_mm": engine.bore_mm,
+        "stroke_mm": engine.stroke_mm,
+        "balance_type": engine.balance_type,
+        "redline_rpm": engine.redline_rpm,
+        "can_bus_protocol": engine.can_bus_protocol,
+        "oil_pan_depth_in": engine.oil_pan_depth_in,
+        "engine_family": engine.engine_family,
+        "origin_year": engine.origin_year,
+        "origin_make": engine.origin_make,
+        "origin_model": engine.origin_model,
+        "origin_variant": engine.origin_variant,
+        "data_sources": engine.data_sources,
+    }
+
+
+def vehicle_export(vehicle: Vehicle) -> dict:
+    """Build vehicle export dict with expanded spec fields."""
+    if not vehicle:
+        return {}
+    return {
+        "id": vehicle.id,
+        "year": vehicle.year,
+        "make": vehicle.make,
+        "model": vehicle.model,
+        "trim": vehicle.trim,
+        "curb_weight_lbs": vehicle.curb_weight_lbs,
+        "engine_bay_length_in": vehicle.engine_bay_length_in,
+        "engine_bay_width_in": vehicle.engine_bay_width_in,
+        "engine_bay_height_in": vehicle.engine_bay_height_in,
+        "stock_ground_clearance_in": vehicle.stock_ground_clearance_in,
+        "driveline_angle_deg": vehicle.driveline_angle_deg,
+        "data_sources": vehicle.data_sources,
+    }
+
+
+def transmission_export(transmission: Transmission) -> dict | None:
+    """Build transmission export dict with expanded spec fields."""
+    if not transmission:
+        return None
+    return {
+        "id": transmission.id,
+        "make": transmission.make,
+        "model": transmission.model,
+        "bellhousing_pattern": transmission.bellhousing_pattern,
+        "trans_type": transmission.trans_type,
+        "gear_count": transmission.gear_count,
+        "gear_ratios": transmission.gear_ratios,
+        "max_torque_capacity_lb_ft": transmission.max_torque_capacity_lb_ft,
+        "input_shaft_spline": transmission.input_shaft_spline,
+        "origin_year": transmission.origin_year,
+        "origin_make": transmission.origin_make,
+        "origin_model": transmission.origin_model,
+        "origin_variant": transmission.origin_variant,
+        "data_sources": transmission.data_sources,
+    }
+
+
+def build_export(
+    build: Build,
+    vehicle: Optional[Vehicle],
+    engine: Optional[Engine],
+    transmission: Optional[Transmission],
+) -> BuildExport:
+    """Assemble the export payload (specs + recommendations) for one build."""
+    return BuildExport(
+        build=BuildResponse.model_validate(build),
+        vehicle=vehicle_export(vehicle),
+        engine=engine_export(engine),
+        transmission=transmission_export(transmission),
+        recommendations=recommendations_for(engine, vehicle, transmission, build),
+    )
+
+
+def report_filename(vehicle: Optional[Vehicle]) -> str:
+    vehicle_name = f"{vehicle.year}_{vehicle.make}_{vehicle.model}" if vehicle else "build"
+    return f"swapspec_{vehicle_name}_report.pdf".replace(" ", "_")
+
+
+async def load_exports(db: AsyncSession, user_id: str, build_ids: list[str]) -> list[BuildExport]:
+    """Export payloads for the user's builds, in build_ids order, from one query."""
+    rows = (await db.execute(
+        select(Build, Vehicle, Engine, Transmission)
+        .outerjoin(Vehicle, Vehicle.id == Build.vehicle_id)
+        .outerjoin(Engine, Engine.id == Build.engine_id)
+        .outerjoin(Transmission, Transmission.id == Build.transmission_id)
+        .where(Build.user_id == user_id, Build.id.in_(build_ids))
+    )).all()
+    by_id = {row[0].id: build_export(*row) for row in rows}
+    return [by_id[build_id] for build_id in build_ids if build_id in by_id]
+
+
+def _write_zip(path: Path, exports: list[BuildExport], pdfs: list[Optional[bytes]]) -> None:
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        combined = [export.model_dump(mode="json") for export in exports]
+        zf.writestr("builds.json", json.dumps(combined, indent=2))
+        for n, (export, pdf) in enumerate(zip(exports, pdfs), start=1):
+            if pdf is None:
+                continue
+            vehicle = export.vehicle or {}
+            vehicle_name = "_".join(str(vehicle[k]) for k in ("year", "make", "model") if vehicle.get(k)) or "build"
+            name = f"pdf/{n:03d}_{vehicle_name}_{export.build.id[:8]}.pdf".replace(" ", "_")
+            # PDFs are already compressed
+            zf.writestr(name, pdf, compress_type=zipfile.ZIP_STORED)
+
+
+async def run_export_job(job_id: str) -> None:
+    """Background task: render, zip and upload one bulk export job."""
+    from app.database import worker_session_maker
+    from app.services.pdf_service import PDFService
+    from app.services.storage import StorageService
+
+    async with worker_session_maker() as session:
+        job = await session.get(ExportJob, job_id)
+        if not job:
+            return
+        job.status = "running"
+        begin_stage(job, "loading")
+        await session.commit()
+        try:
+            exports = await load_exports(session, job.user_id, list(job.build_ids))
+            job.builds_total = len(exports)
+
+            pdfs: list[Optional[bytes]] = [None] * len(exports)
+            if job.include_pdf and exports:
+                begin_stage(job, "rendering")
+                await session.commit()
+                service = PDFService()
+
+                async def _render(i: int) -> int:
+                    pdfs[i] = await service.generate_build_report(exports[i])
+                    return i
+
+                for done in asyncio.as_completed([_render(i) for i in range(len(exports))]):
+                    await done
+                    job.builds_done += 1
+                    if job.builds_done % PROGRESS_EVERY == 0:
+                        await session.commit()
+            job.builds_done = len(exports)
+
+            begin_stage(job, "packaging")
+            await session.commit()
+            with tempfile.TemporaryDirectory(prefix="swapspec_export_") as tmp:
+                archive = Path(tmp) / "export.zip"
+                await asyncio.to_thread(_write_zip, archive, exports, pdfs)
+
+                begin_stage(job, "uploading")
+                await session.commit()
+                key = f"{job.user_id}/{job.job_id}.zip"
+                storage = StorageService()
+                await storage.upload_path(key, archive, "application/zip", bucket=EXPORT_BUCKET, upsert=True)
+            job.result_key = key
+            finish_job(job, "complete")
+            await session.commit()
+            logger.info(f"Export job {job_id}: {len(exports)} builds")
+        except Exception as e:
+            logger.error(f"Export job {job_id} failed: {e}")
+            await session.rollback()
+            job = await session.get(ExportJob, job_id)
+            finish_job(job, "failed", str(e))
+            await session.commit()
+
+
+def _expiry_cutoff() -> datetime:
+    return datetime.now(timezone.utc) - timedelta(hours=settings.export_retention_hours)
+
+
+def export_expired(job: ExportJob) -> bool:
+    """True once a finished job's ZIP is past export_retention_hours (purged or not yet)."""
+    if job.status == "expired":
+        return True
+    if job.finished_at is None:
+        return False
+    finished = job.finished_at
+    if finished.tzinfo is None:  # SQLite drops the offset
+        finished = finished.replace(tzinfo=timezone.utc)
+    return finished < _expiry_cutoff()
+
+
+async def purge_expired_exports() -> int:
+    """Background task: delete ZIPs older than export_retention_hours from the
+    exports bucket and mark their jobs "expired". Returns the number purged."""
+    from app.database import worker_session_maker
+    from app.services.storage import StorageService
+
+    async with worker_session_maker() as session:
+        jobs = (await session.execute(
+            select(ExportJob).where(ExportJob.status == "complete", ExportJob.finished_at < _expiry_cutoff())
+        )).scalars().all()
+        if not jobs:
+            return 0
+        storage = StorageService()
+        for job in jobs:
+            if job.result_key:
+                await storage.delete_file(job.result_key, bucket=EXPORT_BUCKET)
+            job.status = "expired"
+            job.result_key = None
+        await session.commit()
+    logger.info(f"Purged {len(jobs)} expired export(s)")
+    return len(jobs)
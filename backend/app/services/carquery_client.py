@@ -6,6 +6,7 @@ Docs: https://www.carqueryapi.com/documentation/api-usage/
 import httpx
 import logging
 from typing import Optional
+from app.services.metrics import track_external
 
 logger = logging.getLogger(__name__)
 
@@ -16,7 +17,7 @@ class CarQueryClient:
     async def get_trims(self, make: str, model: str, year: int) -> list[dict]:
         """Search for matching trims to find model_id."""
         try:
-            async with httpx.AsyncClient() as client:
+            async with httpx.AsyncClient() as client, track_external("carquery"):
                 response = await client.get(
                     self.BASE_URL,
                     params={
@@ -37,7 +38,7 @@ class CarQueryClient:
     async def get_model(self, model_id: int) -> Optional[dict]:
         """Get full specs for a specific model_id."""
         try:
-            async with httpx.AsyncClient() as client:
+            async with httpx.AsyncClient() as client, track_external("carquery"):
                 response = await client.get(
                     self.BASE_URL,
                     params={"cmd": "getModel", "model": str(model_id)},
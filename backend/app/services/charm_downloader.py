@@ -1,11 +1,55 @@
 import asyncio
 import difflib
 import re
+import weakref
 import zipfile
+from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import Optional
+from typing import AsyncIterator, Optional
+from urllib.parse import urlsplit
 import httpx
 
+from app.config import get_settings
+from app.services.metrics import track_external
+
+settings = get_settings()
+
+
+class HostThrottle:
+    """Politeness limit for one host: at most ``max_concurrency`` requests in
+    flight, each started at least ``min_interval`` seconds after the previous one."""
+
+    def __init__(self, max_concurrency: int, min_interval: float):
+        self._slots = asyncio.Semaphore(max(1, max_concurrency))
+        self._lock = asyncio.Lock()
+        self._min_interval = max(0.0, min_interval)
+        self._next_start = 0.0
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        async with self._slots:
+            async with self._lock:
+                loop = asyncio.get_running_loop()
+                delay = self._next_start - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                self._next_start = loop.time() + self._min_interval
+            yield
+
+
+_throttles: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[str, HostThrottle]]" = weakref.WeakKeyDictionary()
+
+
+def host_throttle(url: str) -> HostThrottle:
+    """The process-wide throttle for url's host (one set per event loop), shared
+    by every download — concurrent ingests queue here instead of hammering charm.li."""
+    loop = asyncio.get_running_loop()
+    hosts = _throttles.setdefault(loop, {})
+    host = urlsplit(url).netloc.lower()
+    if host not in hosts:
+        hosts[host] = HostThrottle(settings.charm_max_concurrency, settings.charm_min_interval_seconds)
+    return hosts[host]
+
 
 class CharmDownloader:
     BASE = "https://charm.li"
@@ -53,7 +97,6 @@ class CharmDownloader:
         if not best:
             return None
 
-        await asyncio.sleep(1)
         return await self._download_zip(make_url, year, best, dest_dir)
 
     async def _fetch_year_index(self, make: str, year: int) -> list[str]:
@@ -61,7 +104,9 @@ class CharmDownloader:
         url = f"{self.BASE}/{make}/{year}/"
         async with httpx.AsyncClient(follow_redirects=True, timeout=30) as client:
             try:
-                resp = await client.get(url)
+                async with host_throttle(url).slot():
+                    with track_external("charm_li"):
+                        resp = await client.get(url)
                 resp.raise_for_status()
             except httpx.HTTPError:
                 return []
@@ -161,7 +206,8 @@ class CharmDownloader:
 
         async with httpx.AsyncClient(follow_redirects=True, timeout=300) as client:
             try:
-                async with client.stream("GET", url) as resp:
+                async with host_throttle(url).slot(), track_external("charm_li_download"), \
+                        client.stream("GET", url) as resp:
                     resp.raise_for_status()
                     with open(zip_path, "wb") as f:
                         async for chunk in resp.aiter_bytes(chunk_size=65536):
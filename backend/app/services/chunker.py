@@ -0,0 +1,356 @@
+"""Split manual pages into search-sized chunks.
+
+Data flow:
+  charm.li HTML → html_blocks()      ┐
+  PDF page text → text_blocks()      ┴→ [Block(heading | table | text)]
+    → chunk_blocks(): pack blocks into chunks of ≤ MANUAL_CHUNK_TOKENS
+        - a heading starts a new chunk (unless the current one is still under
+          a quarter full) and is repeated at the top of every chunk that
+          continues its section
+        - a table stays whole when it fits; longer tables split by rows,
+          each part repeating the header row
+        - long text splits at sentence boundaries; a chunk closed for size
+          carries its last ~MANUAL_CHUNK_OVERLAP_TOKENS into the next one
+    → split_page(): one chunk_data dict per chunk, sharing the page's page_id
+      and numbered by chunk_ordinal (RAGIndexer.upsert_chunks writes them)
+
+Token counts are approximate (words and punctuation marks), which tracks
+LLM tokenizers closely enough for sizing chunks without a tokenizer dependency.
+"""
+from __future__ import annotations
+
+import re
+import uuid
+from dataclasses import dataclass
+from html.parser import HTMLParser
+from typing import Optional
+
+from app.config import get_settings
+
+settings = get_settings()
+
+# Stable page ids: the same page re-indexed keeps its id (and its chunks' keys)
+_PAGE_NAMESPACE = uuid.UUID("6f1f4d1e-5b7a-4c2e-9a8e-3c1d2b0a9f57")
+
+_TOKEN = re.compile(r"\w+|[^\w\s]")
+_SENTENCE_END = re.compile(r"(?<=[.!?;])\s+")
+
+# Heading lines: short, and either numbered ("6.2 Cooling System",
+# "SECTION 6A - ENGINE") or all caps ("FUEL PUMP REMOVAL")
+_HEADING_MAX_CHARS = 60
+_NUMBERED_HEADING = re.compile(r"^(?:section\s+)?\d+[A-Z]?(?:\.\d+)*\.?\s*[-–:]?\s+[A-Z][\w/&,()' -]*$", re.IGNORECASE)
+_PAGE_FOOTER = re.compile(r"^(?:page\s+)?\d+(?:\s*(?:of|/)\s*\d+)?$", re.IGNORECASE)
+# PDF text table rows: three or more cells separated by tabs or runs of spaces
+_TABLE_ROW = re.compile(r"\S(?:\t+| {2,})\S.*(?:\t+| {2,})\S")
+
+
+@dataclass
+class Block:
+    kind: str  # "heading" | "table" | "text"
+    text: str
+
+
+def count_tokens(text: str) -> int:
+    return len(_TOKEN.findall(text))
+
+
+def is_heading(line: str) -> bool:
+    line = line.strip()
+    if not line or len(line) > _HEADING_MAX_CHARS or line.endswith((".", ",", ";")) or _PAGE_FOOTER.match(line):
+        return False
+    letters = [c for c in line if c.isalpha()]
+    if len(letters) < 4:
+        return False
+    return bool(_NUMBERED_HEADING.match(line)) or all(c.isupper() for c in letters)
+
+
+def page_id(chunk_data: dict) -> str:
+    """Deterministic id of the page a chunk belongs to (its upsert key minus the ordinal)."""
+    key = "|".join(str(chunk_data.get(k) or "") for k in (
+        "vehicle_make", "vehicle_model", "vehicle_year", "scope",
+        "engine_id", "transmission_id", "section_path",
+    ))
+    return str(uuid.uuid5(_PAGE_NAMESPACE, key))
+
+
+# ---------------------------------------------------------------------------
+# Blocks
+# ---------------------------------------------------------------------------
+
+def _clean(text: str) -> str:
+    text = "".join(c for c in text if ord(c) >= 32 or c in "\n\t")
+    return re.sub(r"\s+", " ", text).strip()
+
+
+class _BlockExtractor(HTMLParser):
+    """HTML → blocks: h1–h6 become headings, outermost <table>s become
+    "cell | cell" rows, and block-level tags end a text block."""
+
+    _SKIP = {"script", "style", "head"}
+    _HEADINGS = {"h1", "h2", "h3", "h4", "h5", "h6"}
+    _BREAKS = {"p", "div", "br", "li", "ul", "ol", "dl", "dt", "dd", "pre", "section", "article", "blockquote", "hr"}
+
+    def __init__(self):
+        super().__init__()
+        self.blocks: list[Block] = []
+        self._text: list[str] = []
+        self._in_skip = 0
+        self._in_heading = False
+        self._table_depth = 0
+        self._rows: list[list[str]] = []
+        self._cell: Optional[list[str]] = None
+
+    def _flush(self, kind: str = "text") -> None:
+        text = _clean(" ".join(self._text))
+        self._text = []
+        if text:
+            self.blocks.append(Block(kind, text))
+
+    def _end_cell(self) -> None:
+        if self._cell is not None and self._rows:
+            self._rows[-1].append(_clean(" ".join(self._cell)))
+        self._cell = None
+
+    def handle_starttag(self, tag, attrs):
+        tag = tag.lower()
+        if tag in self._SKIP:
+            self._in_skip += 1
+        elif tag == "table":
+            if self._table_depth == 0:
+                self._flush()
+                self._rows = []
+            self._table_depth += 1
+        elif self._table_depth == 1 and tag == "tr":
+            self._end_cell()
+            self._rows.append([])
+        elif self._table_depth == 1 and tag in ("td", "th"):
+            self._end_cell()
+            if not self._rows:
+                self._rows.append([])
+            self._cell = []
+        elif self._table_depth == 0 and tag in self._HEADINGS:
+            self._flush()
+            self._in_heading = True
+        elif self._table_depth == 0 and tag in self._BREAKS:
+            self._flush()
+
+    def handle_endtag(self, tag):
+        tag = tag.lower()
+        if tag in self._SKIP and self._in_skip > 0:
+            self._in_skip -= 1
+        elif tag == "table" and self._table_depth > 0:
+            self._table_depth -= 1
+            if self._table_depth == 0:
+                self._end_cell()
+                rows = [" | ".join(c for c in row if c) for row in self._rows]
+                rows = [r for r in rows if r]
+                if rows:
+                    self.blocks.append(Block("table", "\n".join(rows)))
+                self._rows = []
+        elif self._table_depth == 1 and tag in ("td", "th"):
+            self._end_cell()
+        elif self._table_depth == 0 and tag in self._HEADINGS and self._in_heading:
+            self._flush("heading")
+            self._in_heading = False
+        elif self._table_depth == 0 and tag in self._BREAKS:
+            self._flush()
+
+    def handle_data(self, data):
+        if self._in_skip:
+            return
+        if self._table_depth:
+            if self._cell is not None:
+                self._cell.append(data)
+            elif data.strip():
+                # Text directly inside <table>/<tr> (e.g. a caption) — its own cell
+                if not self._rows:
+                    self._rows.append([])
+                self._rows[-1].append(_clean(data))
+        else:
+            self._text.append(data)
+
+    def close(self):
+        super().close()
+        self._flush("heading" if self._in_heading else "text")
+
+
+def html_blocks(raw: str) -> list[Block]:
+    parser = _BlockExtractor()
+    try:
+        parser.feed(raw)
+        parser.close()
+    except Exception:
+        pass
+    return parser.blocks
+
+
+def text_blocks(text: str) -> list[Block]:
+    """Plain (PDF) text → blocks: heading lines, runs of column-aligned lines
+    as tables, and paragraphs split at blank lines."""
+    blocks: list[Block] = []
+    lines: list[str] = []
+    kind = "text"
+
+    def _flush():
+        nonlocal lines
+        if lines:
+            if kind == "table":
+                blocks.append(Block("table", "\n".join(re.sub(r"\t+| {2,}", " | ", l.strip()) for l in lines)))
+            else:
+                blocks.append(Block("text", _clean(" ".join(lines))))
+        lines = []
+
+    for line in text.splitlines():
+        if not line.strip():
+            _flush()
+        elif is_heading(line):
+            _flush()
+            blocks.append(Block("heading", _clean(line)))
+        else:
+            line_kind = "table" if _TABLE_ROW.search(line) else "text"
+            if line_kind != kind:
+                _flush()
+                kind = line_kind
+            lines.append(line)
+    _flush()
+    return blocks
+
+
+# ---------------------------------------------------------------------------
+# Packing
+# ---------------------------------------------------------------------------
+
+def _sentences(text: str, max_tokens: int) -> list[str]:
+    """Sentences of text, with any sentence over max_tokens cut into word runs."""
+    out = []
+    for sentence in _SENTENCE_END.split(text):
+        if count_tokens(sentence) <= max_tokens:
+            out.append(sentence)
+            continue
+        words, size = [], 0
+        for word in sentence.split():
+            n = count_tokens(word)
+            if words and size + n > max_tokens:
+                out.append(" ".join(words))
+                words, size = [], 0
+            words.append(word)
+            size += n
+        if words:
+            out.append(" ".join(words))
+    return out
+
+
+class _Packer:
+    def __init__(self, max_tokens: int, overlap_tokens: int):
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+        self.chunks: list[str] = []
+        self.heading: Optional[str] = None
+        # (separator before the unit, text, tokens); the first `prefix` units
+        # are the repeated heading, the rest is this chunk's body
+        self.units: list[tuple[str, str, int]] = []
+        self.prefix = 0
+        self.fresh = False  # body holds something not already in the previous chunk
+
+    @property
+    def size(self) -> int:
+        return sum(n for _, _, n in self.units)
+
+    def close(self, overlap: bool = False) -> None:
+        tail: list[tuple[str, str, int]] = []
+        if self.fresh:
+            self.chunks.append("".join(
+                (sep if i else "") + text for i, (sep, text, _) in enumerate(self.units)
+            ))
+            if overlap:
+                budget = self.overlap_tokens
+                for unit in reversed(self.units[self.prefix:]):
+                    if unit[2] > budget:
+                        break
+                    tail.insert(0, unit)
+                    budget -= unit[2]
+        self.units = []
+        self.prefix = 0
+        if self.heading:
+            self.units.append(("\n", self.heading, count_tokens(self.heading)))
+            self.prefix = 1
+        if tail:
+            tail[0] = ("\n",) + tail[0][1:]
+        self.units += tail
+        self.fresh = False
+
+    def add(self, text: str, sep: str) -> None:
+        n = count_tokens(text)
+        if self.fresh and self.size + n > self.max_tokens:
+            self.close(overlap=True)
+            if self.size + n > self.max_tokens:
+                # The overlap alone leaves no room; start from the heading
+                self.close()
+        self.units.append((sep, text, n))
+        self.fresh = True
+
+    def start_section(self, heading: str) -> None:
+        if self.fresh and self.size + count_tokens(heading) <= self.max_tokens // 4:
+            # Too little so far for a chunk of its own (e.g. a breadcrumb)
+            self.add(heading, "\n")
+            self.heading = heading
+            return
+        self.heading = None
+        self.close()
+        self.heading = heading
+        self.close()
+
+    def add_table(self, text: str) -> None:
+        if count_tokens(text) + count_tokens(self.heading or "") <= self.max_tokens:
+            if self.fresh and self.size + count_tokens(text) > self.max_tokens:
+                self.close()
+            self.add(text, "\n")
+            return
+        # Too long for one chunk: rows in groups, each repeating the header row
+        self.close()
+        header, *rows = text.split("\n")
+        group: list[str] = []
+        budget = self.max_tokens - self.size - count_tokens(header)
+        for row in rows:
+            n = count_tokens(row)
+            if group and n > budget:
+                self.add("\n".join([header, *group]), "\n")
+                self.close()
+                group, budget = [], self.max_tokens - self.size - count_tokens(header)
+            group.append(row)
+            budget -= n
+        self.add("\n".join([header, *group]), "\n")
+        self.close()
+
+
+def chunk_blocks(
+    blocks: list[Block],
+    max_tokens: Optional[int] = None,
+    overlap_tokens: Optional[int] = None,
+) -> list[str]:
+    max_tokens = max(16, max_tokens or settings.manual_chunk_tokens)
+    overlap_tokens = settings.manual_chunk_overlap_tokens if overlap_tokens is None else overlap_tokens
+    packer = _Packer(max_tokens, max(0, min(overlap_tokens, max_tokens // 2)))
+    for block in blocks:
+        if block.kind == "heading":
+            packer.start_section(block.text)
+        elif block.kind == "table":
+            packer.add_table(block.text)
+        else:
+            for i, sentence in enumerate(_sentences(block.text, max_tokens // 2)):
+                packer.add(sentence, " " if i else "\n")
+    packer.close()
+    if not packer.chunks and packer.heading:
+        # A page that is only a heading still gets its one chunk
+        packer.chunks.append(packer.heading)
+    return packer.chunks
+
+
+def split_page(chunk_data: dict, texts: list[str]) -> list[dict]:
+    """chunk_data for one page + its chunk_blocks() texts → one chunk_data per chunk."""
+    pid = page_id(chunk_data)
+    texts = texts or [chunk_data["content"]]
+    return [
+        {**chunk_data, "content": text, "page_id": pid, "chunk_ordinal": i}
+        for i, text in enumerate(texts)
+    ]
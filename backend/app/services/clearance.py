@@ -0,0 +1,871 @@
+"""
+Server-side clearance and collision analysis for a build.
+
+Data flow:
+  POST /api/builds/{id}/clearance, or PUT /api/builds/{id} with engine_position
+    → compute_build_clearance(build, engine, transmission, vehicle)
+        → the build's ClearanceSession (in-process LRU), rebuilt when any mesh
+          URL changed:
+            → parts: engine full LOD (else mesh_file_url), transmission
+              mesh_file_url — parsed once, persisted as .npz
+            → Vehicle.bay_sdf_url when it was built from the current scan
+              (app/services/bay_sdf.py): a precomputed signed distance field
+            → otherwise a BayField for the bay scan full LOD (else
+              bay_scan_mesh_url): TriangleBVH + coarse distance grid, persisted as .npz
+        → session.evaluate(Build.engine_position): SDF reads for every vertex,
+          or BVH re-queries of only the vertices the move could have brought
+          within the cap
+        → per-vertex signed clearance (inches, capped at clearance_max_inches)
+        → collision zones: connected runs of red/yellow vertices
+        → per-vertex clearances uploaded as int16 to meshes/clearance/{build}/…
+    → Build.collision_data
+
+Clearance is the distance from each engine/transmission vertex to the nearest
+point of the bay surface. The bay scan is an open surface, so the sign comes
+from the engine side: a nearest bay point well behind the vertex's outward
+normal (more than 120° away) means that vertex has passed through the bay
+surface (negative = penetration). Inward-wound meshes are detected by their
+signed volume and their normals flipped.
+
+The BVH is an implicit, Morton-ordered complete binary tree stored as
+per-level box arrays, so both the build and the queries are whole-array numpy
+operations: all query points descend level by level together, pruned against
+the clearance cap, and the surviving leaves are then visited nearest-first in
+vectorised rounds that stop once no closer leaf remains for any point.
+
+Units: meshes are glTF metres (+Y up, +Z front, +X left); engine_position
+x/y/z are metres in the bay scan frame, rotation_deg is driveline pitch
+(positive tilts the transmission end down), with optional yaw_deg / roll_deg.
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import tempfile
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional
+from urllib.parse import urlparse
+
+import numpy as np
+
+from app.config import get_settings
+from app.services.mesh_processor import MeshFormatError, load_mesh, vertex_normals
+
+if TYPE_CHECKING:
+    from app.models.build import Build
+    from app.services.bay_sdf import BaySDF
+    from app.models.engine import Engine
+    from app.models.transmission import Transmission
+    from app.models.vehicle import Vehicle
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+INCH = 0.0254
+LEAF_SIZE = 8
+# PRD FR 3.3: red < 0", yellow 0–0.5", green > 1". Nothing under 1" is reported
+# green, so the unspecified 0.5–1" band is treated as yellow.
+GREEN_ABOVE_INCHES = 1.0
+MAX_ZONES = 25
+# The nearest bay point must be clearly behind the vertex to count as penetration;
+# near-perpendicular directions are vertices beside a surface, not through it
+PENETRATION_COS = -0.5
+WELD_METRES = 1e-4
+# Distances are tracked this far past the cap so small moves need no re-query
+MARGIN_INCHES = 1.0
+MAX_MESH_DOWNLOAD_BYTES = 250 * 1024 * 1024
+
+
+class ClearanceUnavailable(ValueError):
+    """The build is missing a mesh (or a mesh URL we are willing to fetch)."""
+
+
+# ---------------------------------------------------------------------------
+# Geometry
+# ---------------------------------------------------------------------------
+
+def _spread_bits(x: np.ndarray) -> np.ndarray:
+    x = x.astype(np.uint32) & 0x3FF
+    x = (x | (x << 16)) & 0x030000FF
+    x = (x | (x << 8)) & 0x0300F00F
+    x = (x | (x << 4)) & 0x030C30C3
+    x = (x | (x << 2)) & 0x09249249
+    return x
+
+
+def _morton_codes(points: np.ndarray) -> np.ndarray:
+    lo, hi = points.min(axis=0), points.max(axis=0)
+    scaled = (points - lo) / np.maximum(hi - lo, 1e-12) * 1023
+    return _spread_bits(scaled[:, 0]) << 2 | _spread_bits(scaled[:, 1]) << 1 | _spread_bits(scaled[:, 2])
+
+
+def _box_dist2(points: np.ndarray, lo: np.ndarray, hi: np.ndarray) -> np.ndarray:
+    d = np.maximum(np.maximum(lo - points, points - hi), 0.0)
+    return np.einsum("ij,ij->i", d, d)
+
+
+def nearest_barycentric(ap, ab, ac, d00, d01, d11) -> tuple[np.ndarray, np.ndarray]:
+    """(v, w) of the point a + v·ab + w·ac nearest to a + ap on each triangle.
+
+    Ericson, Real-Time Collision Detection §5.1.5, with the six dot products
+    reduced to two by the per-triangle constants d00 = ab·ab, d01 = ab·ac, d11 = ac·ac.
+    """
+    d1, d2 = (ab * ap).sum(-1), (ac * ap).sum(-1)
+    d3, d4, d5, d6 = d1 - d00, d2 - d01, d1 - d01, d2 - d11
+    va, vb, vc = d3 * d6 - d5 * d4, d5 * d2 - d1 * d6, d1 * d4 - d3 * d2
+
+    def _safe(den):
+        return np.where(den == 0, 1.0, den)
+
+    denom = _safe(va + vb + vc)
+    v, w = vb / denom, vc / denom
+
+    # Later assignments win, so regions are applied in reverse priority order
+    w_bc = (d4 - d3) / _safe((d4 - d3) + (d5 - d6))
+    on_bc = (va <= 0) & (d4 - d3 >= 0) & (d5 - d6 >= 0)
+    v, w = np.where(on_bc, 1 - w_bc, v), np.where(on_bc, w_bc, w)
+    on_ac = (vb <= 0) & (d2 >= 0) & (d6 <= 0)
+    v, w = np.where(on_ac, 0.0, v), np.where(on_ac, d2 / _safe(d2 - d6), w)
+    at_c = (d6 >= 0) & (d5 <= d6)
+    v, w = np.where(at_c, 0.0, v), np.where(at_c, 1.0, w)
+    on_ab = (vc <= 0) & (d1 >= 0) & (d3 <= 0)
+    v, w = np.where(on_ab, d1 / _safe(d1 - d3), v), np.where(on_ab, 0.0, w)
+    at_b = (d3 >= 0) & (d4 <= d3)
+    v, w = np.where(at_b, 1.0, v), np.where(at_b, 0.0, w)
+    at_a = (d1 <= 0) & (d2 <= 0)
+    return np.where(at_a, 0.0, v), np.where(at_a, 0.0, w)
+
+
+def _triangle_frames(tri: np.ndarray) -> np.ndarray:
+    """Per-triangle [a, ab, ac, ab·ab, ab·ac, ac·ac] rows (…, 12)."""
+    a = tri[..., 0, :]
+    ab, ac = tri[..., 1, :] - a, tri[..., 2, :] - a
+    dots = np.stack([(ab * ab).sum(-1), (ab * ac).sum(-1), (ac * ac).sum(-1)], axis=-1)
+    return np.concatenate([a, ab, ac, dots], axis=-1)
+
+
+def closest_points_on_triangles(p: np.ndarray, tri: np.ndarray) -> np.ndarray:
+    """Closest point on each triangle to p; p is (..., 3) and tri (..., 3, 3), broadcast together."""
+    fr = _triangle_frames(tri)
+    a, ab, ac = fr[..., 0:3], fr[..., 3:6], fr[..., 6:9]
+    v, w = nearest_barycentric(p - a, ab, ac, fr[..., 9], fr[..., 10], fr[..., 11])
+    return a + ab * v[..., None] + ac * w[..., None]
+
+
+class TriangleBVH:
+    """Bounding volume hierarchy over a triangle mesh for capped nearest-point queries."""
+
+    def __init__(self, vertices: np.ndarray, faces: np.ndarray, leaf_size: int = LEAF_SIZE):
+        tris = np.asarray(vertices, dtype=np.float64)[faces]
+        # frames row i (i < triangle_count) is faces[order[i]]
+        self.order = np.argsort(_morton_codes(tris.mean(axis=1)), kind="stable")
+        order = self.order
+        n_leaves = -(-len(tris) // leaf_size)
+        self.depth = max(0, int(np.ceil(np.log2(n_leaves))))
+        self.leaf_size = leaf_size
+        self.triangle_count = len(tris)
+
+        # Pad to a complete tree: a partial last leaf repeats its final triangle,
+        # wholly empty leaves get inverted (never-hit) boxes
+        padded = np.empty(((1 << self.depth) * leaf_size, 3, 3))
+        padded[: len(tris)] = tris[order]
+        padded[len(tris):] = tris[order[-1]]
+        # Exact distances are computed in float32 (sub-micron error at bay scale) from
+        # precomputed per-triangle frames
+        self.frames = _triangle_frames(padded).astype(np.float32)
+
+        corners = padded.reshape(1 << self.depth, leaf_size * 3, 3)
+        lo, hi = corners.min(axis=1), corners.max(axis=1)
+        lo[n_leaves:], hi[n_leaves:] = np.inf, -np.inf
+        self.lo, self.hi = [lo], [hi]
+        for _ in range(self.depth):
+            self.lo.insert(0, np.minimum(self.lo[0][0::2], self.lo[0][1::2]))
+            self.hi.insert(0, np.maximum(self.hi[0][0::2], self.hi[0][1::2]))
+        # First corner of each node's first triangle: a point known to lie on the surface
+        self.rep = [
+            padded[np.arange(1 << level) * (leaf_size << (self.depth - level)), 0]
+            for level in range(self.depth + 1)
+        ]
+
+    def to_arrays(self) -> dict[str, np.ndarray]:
+        arrays = {
+            "frames": self.frames,
+            "order": self.order,
+            "meta": np.array([self.depth, self.leaf_size, self.triangle_count]),
+        }
+        for level in range(self.depth + 1):
+            arrays[f"lo{level}"], arrays[f"hi{level}"] = self.lo[level], self.hi[level]
+            arrays[f"rep{level}"] = self.rep[level]
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays) -> "TriangleBVH":
+        bvh = cls.__new__(cls)
+        bvh.depth, bvh.leaf_size, bvh.triangle_count = (int(x) for x in arrays["meta"])
+        bvh.frames, bvh.order = arrays["frames"], arrays["order"]
+        levels = range(bvh.depth + 1)
+        bvh.lo = [arrays[f"lo{k}"] for k in levels]
+        bvh.hi = [arrays[f"hi{k}"] for k in levels]
+        bvh.rep = [arrays[f"rep{k}"] for k in levels]
+        return bvh
+
+    def closest(
+        self,
+        points: np.ndarray,
+        max_distance: float,
+        hint: Optional[np.ndarray] = None,
+        return_triangles: bool = False,
+    ) -> tuple[np.ndarray, ...]:
+        """Distance to, and location of, the nearest surface point for each query point.
+
+        Points with nothing within max_distance get max_distance and a NaN location.
+        hint (optional, NaN rows ignored) holds known surface points — e.g. each
+        point's previous nearest — which seed the search bound.
+        return_triangles adds the row in self.frames of the triangle holding each
+        nearest point (-1 where there is none, or the hint was never beaten).
+        """
+        points = np.asarray(points, dtype=np.float64)
+        n = len(points)
+        best2 = np.full(n, max_distance * max_distance)
+        best_pt = np.full((n, 3), np.nan)
+        best_tri = np.full(n, -1, dtype=np.int64)
+        if hint is not None:
+            d2 = ((points - hint) ** 2).sum(axis=1)
+            seeded = ~np.isnan(d2) & (d2 < best2)
+            best2[seeded] = d2[seeded]
+            best_pt[seeded] = hint[seeded]
+
+        pts = np.arange(n)
+        nodes = np.zeros(n, dtype=np.int64)
+        for level in range(self.depth + 1):
+            if level:
+                pts = np.repeat(pts, 2)
+                nodes = (nodes[:, None] * 2 + np.arange(2)).reshape(-1)
+            lb = _box_dist2(points[pts], self.lo[level][nodes], self.hi[level][nodes])
+            keep = lb <= best2[pts]
+            pts, nodes, lb = pts[keep], nodes[keep], lb[keep]
+            if not len(pts):
+                break
+            # Tighten each point's bound with a real surface point from its nearest
+            # surviving node, so distant siblings are pruned before reaching the leaves
+            rep = self.rep[level][nodes]
+            d2 = ((points[pts] - rep) ** 2).sum(axis=1)
+            starts = np.flatnonzero(np.r_[True, pts[1:] != pts[:-1]])
+            group_min = np.minimum.reduceat(d2, starts)
+            at_min = np.flatnonzero(d2 == np.repeat(group_min, np.diff(np.r_[starts, len(pts)])))
+            first = at_min[np.r_[True, pts[at_min[1:]] != pts[at_min[:-1]]]]
+            improved = group_min < best2[pts[starts]]
+            best2[pts[first[improved]]] = group_min[improved]
+            best_pt[pts[first[improved]]] = rep[first[improved]]
+            best_tri[pts[first[improved]]] = nodes[first[improved]] * (self.leaf_size << (self.depth - level))
+            keep = lb <= best2[pts]
+            pts, nodes, lb = pts[keep], nodes[keep], lb[keep]
+
+        if len(pts):
+            # Rank each point's candidate leaves nearest-first; round r visits every
+            # point's r-th leaf, so a point appears at most once per round
+            order = np.lexsort((lb, pts))
+            pts, nodes, lb = pts[order], nodes[order], lb[order]
+            starts = np.flatnonzero(np.r_[True, pts[1:] != pts[:-1]])
+            rank = np.arange(len(pts)) - np.repeat(starts, np.diff(np.r_[starts, len(pts)]))
+            by_rank = np.argsort(rank, kind="stable")
+            bounds = np.r_[0, np.cumsum(np.bincount(rank))]
+            offsets = np.arange(self.leaf_size)
+            points32 = points.astype(np.float32)
+            for r in range(len(bounds) - 1):
+                sel = by_rank[bounds[r]:bounds[r + 1]]
+                p, leaf = pts[sel], nodes[sel]
+                live = lb[sel] < best2[p]
+                if not live.any():
+                    # Later ranks are farther for every point — nothing left to improve
+                    break
+                p, leaf = p[live], leaf[live]
+                fr = self.frames[leaf[:, None] * self.leaf_size + offsets]
+                ab, ac = fr[..., 3:6], fr[..., 6:9]
+                ap = points32[p][:, None, :] - fr[..., 0:3]
+                v, w = nearest_barycentric(ap, ab, ac, fr[..., 9], fr[..., 10], fr[..., 11])
+                diff = ap - ab * v[..., None] - ac * w[..., None]
+                d2 = (diff * diff).sum(-1, dtype=np.float64)
+                d2 = np.where(np.isnan(d2), np.inf, d2)
+                j = d2.argmin(axis=1)
+                rows = np.arange(len(p))
+                d2 = d2[rows, j]
+                better = d2 < best2[p]
+                best2[p[better]] = d2[better]
+                best_pt[p[better]] = (points32[p] - diff[rows, j])[better]
+                best_tri[p[better]] = (leaf * self.leaf_size + j)[better]
+
+        if return_triangles:
+            return np.sqrt(best2), best_pt, best_tri
+        return np.sqrt(best2), best_pt
+
+
+class BayField:
+    """Bay scan BVH plus a coarse distance grid that rules out vertices far from the scan.
+
+    Grid cells are reach/2 wide and cover the scan's bounds padded by reach; each
+    holds the distance from its centre to the scan (capped), so
+    cell value − half the cell diagonal is a lower bound for any point inside it.
+    The scan is an open surface, so the grid is unsigned.
+    """
+
+    def __init__(self, bvh: TriangleBVH, grid: Optional[np.ndarray] = None,
+                 origin: Optional[np.ndarray] = None, cell: float = 0.0, reach: float = 0.0):
+        self.bvh = bvh
+        self.grid, self.origin, self.cell, self.reach = grid, origin, cell, reach
+
+    @classmethod
+    def build(cls, vertices: np.ndarray, faces: np.ndarray, reach: float) -> "BayField":
+        bvh = TriangleBVH(vertices, faces)
+        cell = reach / 2
+        origin = vertices.min(axis=0) - reach
+        shape = np.maximum(np.ceil((vertices.max(axis=0) + reach - origin) / cell).astype(int), 1)
+        centres = origin + (np.indices(shape).reshape(3, -1).T + 0.5) * cell
+        # Cells farther than reach + half diagonal never need an exact value
+        dist, _ = bvh.closest(centres, reach + cell * np.sqrt(3) / 2)
+        return cls(bvh, dist.reshape(shape).astype(np.float32), origin, cell, reach)
+
+    def lower_bound(self, points: np.ndarray) -> np.ndarray:
+        if self.grid is None:
+            return np.zeros(len(points))
+        idx = np.floor((points - self.origin) / self.cell).astype(np.int64)
+        inside = ((idx >= 0) & (idx < self.grid.shape)).all(axis=1)
+        # Outside the padded bounds a point is at least reach from every triangle
+        bound = np.full(len(points), self.reach)
+        bound[inside] = self.grid[tuple(idx[inside].T)] - self.cell * np.sqrt(3) / 2
+        return bound
+
+    def save(self, path: Path) -> None:
+        arrays = self.bvh.to_arrays()
+        if self.grid is not None:
+            arrays.update(grid=self.grid, origin=self.origin, cell_reach=np.array([self.cell, self.reach]))
+        tmp = path.with_suffix(".tmp.npz")
+        np.savez(tmp, **arrays)
+        tmp.replace(path)
+
+    @classmethod
+    def load(cls, path: Path) -> "BayField":
+        with np.load(path) as data:
+            arrays = {k: data[k] for k in data.files}
+        if "grid" not in arrays:
+            return cls(TriangleBVH.from_arrays(arrays))
+        cell, reach = (float(x) for x in arrays["cell_reach"])
+        return cls(TriangleBVH.from_arrays(arrays), arrays["grid"], arrays["origin"], cell, reach)
+
+
+def placement(position: Optional[dict]) -> tuple[np.ndarray, np.ndarray]:
+    """Rotation matrix and translation for Build.engine_position."""
+    position = position or {}
+
+    def _rot(axis: int, deg: float) -> np.ndarray:
+        t = np.radians(deg)
+        c, s = np.cos(t), np.sin(t)
+        i, j = [k for k in range(3) if k != axis]
+        m = np.eye(3)
+        m[i, i], m[i, j], m[j, i], m[j, j] = c, -s, s, c
+        return m
+
+    pitch = -float(position.get("rotation_deg") or 0.0)
+    rotation = (
+        _rot(1, float(position.get("yaw_deg") or 0.0))
+        @ _rot(0, pitch)
+        @ _rot(2, float(position.get("roll_deg") or 0.0))
+    )
+    translation = np.array([float(position.get(k) or 0.0) for k in ("x", "y", "z")])
+    return rotation, translation
+
+
+# ---------------------------------------------------------------------------
+# Evaluation
+# ---------------------------------------------------------------------------
+
+@dataclass
+class MeshPart:
+    name: str
+    vertices: np.ndarray
+    faces: np.ndarray
+    mesh_url: Optional[str] = None
+
+
+@dataclass
+class ClearanceResult:
+    # Signed clearance in inches per vertex, parts concatenated in input order
+    clearance_in: np.ndarray
+    zones: list[dict] = field(default_factory=list)
+    parts: list[dict] = field(default_factory=list)
+    # Vertices that needed a BVH query this evaluation (all of them on the first)
+    requeried: int = 0
+    incremental: bool = False
+    # "bvh" (exact queries) or "sdf" (precomputed bay distance field)
+    method: str = "bvh"
+
+    @property
+    def min_clearance_in(self) -> float:
+        return float(self.clearance_in.min()) if len(self.clearance_in) else settings.clearance_max_inches
+
+
+def severity(clearance_in: float) -> str:
+    if clearance_in < 0:
+        return "red"
+    if clearance_in < GREEN_ABOVE_INCHES:
+        return "yellow"
+    return "green"
+
+
+def _region_label(local_points: np.ndarray, lo: np.ndarray, hi: np.ndarray) -> str:
+    """Coarse location within the part's own bounding box, e.g. "front left lower"."""
+    rel = (local_points.mean(axis=0) - lo) / np.maximum(hi - lo, 1e-9)
+    names = (
+        ("rear", "middle", "front")[min(int(rel[2] * 3), 2)],
+        ("right", "center", "left")[min(int(rel[0] * 3), 2)],
+        ("lower", "mid-height", "upper")[min(int(rel[1] * 3), 2)],
+    )
+    return " ".join(names)
+
+
+def _signed_volume(vertices: np.ndarray, faces: np.ndarray) -> float:
+    a, b, c = vertices[faces[:, 0]], vertices[faces[:, 1]], vertices[faces[:, 2]]
+    return float(np.einsum("ij,ij->", a, np.cross(b, c))) / 6.0
+
+
+def connected_components(flagged: np.ndarray, vertices: np.ndarray, faces: np.ndarray) -> np.ndarray:
+    """Connected-component label per flagged vertex over mesh edges (-1 if unflagged).
+
+    Vertices sharing a position (split at hard edges / UV seams) count as connected.
+    """
+    labels = np.full(len(flagged), -1, dtype=np.int64)
+    idx = np.flatnonzero(flagged)
+    labels[idx] = idx
+    _, group = np.unique(np.round(vertices / WELD_METRES).astype(np.int64), axis=0, return_inverse=True)
+    group = group.reshape(-1)
+    first = np.full(group.max() + 1, len(vertices))
+    np.minimum.at(first, group, np.arange(len(vertices)))
+    welds = np.stack([np.arange(len(vertices)), first[group]], axis=1)
+    edges = np.concatenate([faces[:, [0, 1]], faces[:, [1, 2]], faces[:, [2, 0]], welds])
+    edges = edges[flagged[edges[:, 0]] & flagged[edges[:, 1]]]
+    a, b = edges[:, 0], edges[:, 1]
+    while True:
+        before = labels[idx].copy()
+        m = np.minimum(labels[a], labels[b])
+        np.minimum.at(labels, a, m)
+        np.minimum.at(labels, b, m)
+        labels[idx] = labels[labels[idx]]
+        if np.array_equal(before, labels[idx]):
+            return labels
+
+
+def _zones(part: MeshPart, local: np.ndarray, world: np.ndarray, clearance: np.ndarray) -> list[dict]:
+    flagged = clearance < GREEN_ABOVE_INCHES
+    if not flagged.any():
+        return []
+    labels = connected_components(flagged, local, part.faces)
+    lo, hi = local.min(axis=0), local.max(axis=0)
+    zones = []
+    for label in np.unique(labels[flagged]):
+        members = np.flatnonzero(labels == label)
+        worst = float(clearance[members].min())
+        zones.append({
+            "part": part.name,
+            "region": _region_label(local[members], lo, hi),
+            "clearance_inches": round(worst, 2),
+            "severity": severity(worst),
+            "vertex_count": int(len(members)),
+            "center": [round(float(c), 4) for c in world[members].mean(axis=0)],
+        })
+    return zones
+
+
+class ClearanceSession:
+    """Placed parts against one bay, keeping per-vertex state between evaluations.
+
+    Each vertex keeps a lower bound on its distance to the bay (exact when
+    within reach = cap + MARGIN_INCHES) and its nearest bay point. Moving the
+    parts displaces vertex i by d_i, so its distance is still at least
+    bound_i − d_i: vertices for which that stays at or above the cap keep the
+    capped value without a query, and the rest are re-queried with their
+    previous nearest point seeding the BVH search. Small nudges therefore only
+    touch the vertices near the bay, and those resolve in a few leaf visits.
+
+    Given a BaySDF (app/services/bay_sdf.py) instead, every evaluation is a
+    trilinear read per vertex and the sign is the field's own (behind the
+    scanned surface = negative).
+    """
+
+    def __init__(self, parts: list[MeshPart], bay, max_inches: Optional[float] = None):
+        from app.services.bay_sdf import BaySDF
+
+        # Set by _session_for: the (bay, engine, transmission, sdf) URLs and a per-session lock
+        self.key: tuple = ()
+        self.lock = None
+        self.parts = parts
+        self.sdf = bay if isinstance(bay, BaySDF) else None
+        self.bay = None if self.sdf else bay if isinstance(bay, BayField) else BayField(bay)
+        self.max_inches = settings.clearance_max_inches if max_inches is None else max_inches
+        self.reach = (self.max_inches + MARGIN_INCHES) * INCH
+
+        self.local = np.concatenate([np.asarray(p.vertices, dtype=np.float64) for p in parts])
+        normals = []
+        for part in parts:
+            v = np.asarray(part.vertices, dtype=np.float64)
+            n = vertex_normals(v, part.faces).astype(np.float64)
+            # Inward-wound mesh: flip so normals point out of the part
+            normals.append(-n if _signed_volume(v, part.faces) < 0 else n)
+        self.normals = np.concatenate(normals)
+        self.offsets = np.cumsum([0] + [len(p.vertices) for p in parts])
+
+        self.world: Optional[np.ndarray] = None
+        self.bound = np.zeros(len(self.local))
+        self.nearest = np.full((len(self.local), 3), np.nan)
+
+    @property
+    def bay_triangles(self) -> int:
+        return self.sdf.triangle_count if self.sdf else self.bay.bvh.triangle_count
+
+    def evaluate(self, position: Optional[dict]) -> ClearanceResult:
+        """Signed per-vertex clearance at position. CPU-bound — run in a thread."""
+        rotation, translation = placement(position)
+        world = self.local @ rotation.T + translation
+        incremental = self.world is not None
+        if self.sdf is not None:
+            self.world = world
+            clearance = self.sdf.clearance_inches(world, self.max_inches)
+            result = ClearanceResult(clearance_in=clearance, incremental=incremental, method="sdf")
+        else:
+            result = self._evaluate_bvh(world, rotation, incremental)
+
+        for part, start, end in zip(self.parts, self.offsets[:-1], self.offsets[1:]):
+            clearance = result.clearance_in[start:end]
+            result.zones.extend(_zones(part, self.local[start:end], world[start:end], clearance))
+            result.parts.append({
+                "part": part.name,
+                "mesh_url": part.mesh_url,
+                "offset": int(start),
+                "count": int(end - start),
+                "triangles": len(part.faces),
+            })
+        result.zones.sort(key=lambda z: (z["clearance_inches"], -z["vertex_count"]))
+        del result.zones[MAX_ZONES:]
+        return result
+
+    def _evaluate_bvh(self, world: np.ndarray, rotation: np.ndarray, incremental: bool) -> ClearanceResult:
+        cap = self.max_inches * INCH
+        if incremental:
+            self.bound -= np.linalg.norm(world - self.world, axis=1)
+            stale = np.flatnonzero(self.bound < cap)
+        else:
+            stale = np.arange(len(world))
+        self.world = world
+
+        # Coarse grid first; only vertices it cannot rule out go to the BVH
+        floor = self.bay.lower_bound(world[stale])
+        far = floor >= self.reach
+        self.bound[stale[far]] = floor[far]
+        self.nearest[stale[far]] = np.nan
+        query = stale[~far]
+        if len(query):
+            dist, nearest = self.bay.bvh.closest(world[query], self.reach, hint=self.nearest[query])
+            self.bound[query], self.nearest[query] = dist, nearest
+
+        hit = self.bound < cap
+        dist = np.minimum(self.bound, cap)
+        normals = self.normals @ rotation.T
+        # cos of the angle between the outward normal and the direction to the bay
+        to_bay = np.where(hit[:, None], self.nearest - world, 0.0)
+        facing = np.einsum("ij,ij->i", to_bay, normals) / np.maximum(dist, 1e-12)
+        clearance = np.where(hit & (facing < PENETRATION_COS), -dist, dist) / INCH
+        return ClearanceResult(clearance_in=clearance, requeried=len(query), incremental=incremental)
+
+
+def evaluate_clearance(
+    parts: list[MeshPart], bay, position: Optional[dict], max_inches: Optional[float] = None
+) -> ClearanceResult:
+    """One-off signed per-vertex clearance of the placed parts against the bay. CPU-bound."""
+    return ClearanceSession(parts, bay, max_inches).evaluate(position)
+
+
+def encode_clearances(clearance_in: np.ndarray, max_inches: float) -> bytes:
+    """int16 little-endian hundredths of an inch, clamped to ±max_inches."""
+    scaled = np.clip(np.round(clearance_in * 100), -max_inches * 100, max_inches * 100)
+    return scaled.astype("<i2").tobytes()
+
+
+# ---------------------------------------------------------------------------
+# Mesh fetching
+# ---------------------------------------------------------------------------
+
+async def fetch_mesh(url: str) -> Path:
+    """Download a stored mesh to a temp file. Only our own storage URLs are fetched.
+
+    The caller deletes the returned file.
+    """
+    import httpx
+    import shutil
+
+    suffix = Path(urlparse(url).path).suffix.lower()
+    local_prefix = settings.storage_local_url.rstrip("/") + "/"
+    if settings.storage_backend == "local" and url.startswith(local_prefix):
+        root = Path(settings.storage_local_path).resolve()
+        source = (root / url[len(local_prefix):]).resolve()
+        if not source.is_relative_to(root) or not source.is_file():
+            raise ClearanceUnavailable(f"Mesh not found in local storage: {url}")
+        tmp = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
+        tmp.close()
+        shutil.copyfile(source, tmp.name)
+        return Path(tmp.name)
+
+    public_prefix = settings.supabase_url.rstrip("/") + "/storage/v1/object/public/"
+    if not settings.supabase_url or not url.startswith(public_prefix):
+        raise ClearanceUnavailable(f"Mesh URL is not in this project's storage: {url}")
+
+    tmp = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
+    path = Path(tmp.name)
+    try:
+        size = 0
+        async with httpx.AsyncClient(timeout=60.0, follow_redirects=False) as client:
+            async with client.stream("GET", url) as resp:
+                resp.raise_for_status()
+                async for chunk in resp.aiter_bytes(1024 * 1024):
+                    size += len(chunk)
+                    if size > MAX_MESH_DOWNLOAD_BYTES:
+                        raise ClearanceUnavailable(f"Mesh too large: {url}")
+                    tmp.write(chunk)
+        tmp.close()
+    except BaseException:
+        tmp.close()
+        path.unlink(missing_ok=True)
+        raise
+    return path
+
+
+# ---------------------------------------------------------------------------
+# Caches
+# ---------------------------------------------------------------------------
+
+# Parsed meshes and bay fields persist under clearance_cache_path keyed by URL;
+# mesh uploads always get a fresh URL, so a changed mesh is a cache miss.
+# Sessions (per-build state) live in process memory, bounded by clearance_cache_builds.
+_bays: "OrderedDict[str, BayField]" = OrderedDict()
+_sessions: "OrderedDict[str, ClearanceSession]" = OrderedDict()
+_sdfs: "OrderedDict[str, BaySDF]" = OrderedDict()
+MAX_CACHED_BAYS = 4
+
+
+def _cache_file(kind: str, url: str) -> Path:
+    return Path(settings.clearance_cache_path) / f"{kind}-{hashlib.sha256(url.encode()).hexdigest()[:32]}.npz"
+
+
+def _remember(cache: OrderedDict, key, value, limit: int) -> None:
+    cache[key] = value
+    cache.move_to_end(key)
+    while len(cache) > limit:
+        cache.popitem(last=False)
+
+
+async def _download_mesh(name: str, url: str) -> tuple[np.ndarray, np.ndarray]:
+    import asyncio
+    import httpx
+
+    try:
+        path = await fetch_mesh(url)
+    except httpx.HTTPError as exc:
+        raise ClearanceUnavailable(f"Could not download {name} mesh: {exc}") from exc
+    try:
+        return await asyncio.to_thread(load_mesh, path)
+    except MeshFormatError as exc:
+        raise ClearanceUnavailable(f"Could not read {name} mesh: {exc}") from exc
+    finally:
+        path.unlink(missing_ok=True)
+
+
+async def load_mesh_part(name: str, url: str) -> MeshPart:
+    """A stored mesh, parsed once and kept as .npz under clearance_cache_path."""
+    import asyncio
+
+    cached = _cache_file("part", url)
+
+    def _read():
+        with np.load(cached) as data:
+            return data["vertices"], data["faces"]
+
+    def _write(vertices, faces):
+        cached.parent.mkdir(parents=True, exist_ok=True)
+        tmp = cached.with_suffix(".tmp.npz")
+        np.savez(tmp, vertices=vertices, faces=faces)
+        tmp.replace(cached)
+
+    if cached.is_file():
+        vertices, faces = await asyncio.to_thread(_read)
+    else:
+        vertices, faces = await _download_mesh(name, url)
+        await asyncio.to_thread(_write, vertices, faces)
+    return MeshPart(name=name, vertices=vertices, faces=faces, mesh_url=url)
+
+
+async def load_bay_field(url: str) -> BayField:
+    """The bay scan's BVH and distance grid: memory, then .npz cache, then download and build."""
+    import asyncio
+
+    bay = _bays.get(url)
+    if bay is not None:
+        _bays.move_to_end(url)
+        return bay
+    cached = _cache_file("bay", url)
+    if cached.is_file():
+        bay = await asyncio.to_thread(BayField.load, cached)
+    else:
+        vertices, faces = await _download_mesh("bay", url)
+        reach = (settings.clearance_max_inches + MARGIN_INCHES) * INCH
+
+        def _build() -> BayField:
+            built = BayField.build(vertices, faces, reach)
+            cached.parent.mkdir(parents=True, exist_ok=True)
+            built.save(cached)
+            return built
+
+        bay = await asyncio.to_thread(_build)
+    _remember(_bays, url, bay, MAX_CACHED_BAYS)
+    return bay
+
+
+async def load_bay_sdf(url: str) -> "BaySDF":
+    """A stored bay SDF. SDF keys are content hashes, so a cached copy never goes stale."""
+    import asyncio
+    import httpx
+    import shutil
+    from app.services.bay_sdf import BaySDF
+
+    sdf = _sdfs.get(url)
+    if sdf is not None:
+        _sdfs.move_to_end(url)
+        return sdf
+    cached = _cache_file("sdf", url)
+    if not cached.is_file():
+        try:
+            path = await fetch_mesh(url)
+        except httpx.HTTPError as exc:
+            raise ClearanceUnavailable(f"Could not download bay SDF: {exc}") from exc
+        cached.parent.mkdir(parents=True, exist_ok=True)
+        await asyncio.to_thread(shutil.move, path, cached)
+    sdf = await asyncio.to_thread(BaySDF.from_file, cached)
+    _remember(_sdfs, url, sdf, MAX_CACHED_BAYS)
+    return sdf
+
+
+async def _bay_for(bay_url: str, sdf_url: Optional[str]):
+    """The vehicle's BaySDF when it is current for this scan and cap, else its BayField."""
+    if sdf_url:
+        try:
+            sdf = await load_bay_sdf(sdf_url)
+        except (ClearanceUnavailable, OSError, ValueError) as exc:
+            logger.warning(f"Bay SDF {sdf_url} unusable, using exact queries: {exc}")
+        else:
+            if sdf.source_url == bay_url and sdf.band >= settings.clearance_max_inches * INCH:
+                return sdf
+    return await load_bay_field(bay_url)
+
+
+def invalidate_mesh(url: Optional[str]) -> None:
+    """Drop cached structures derived from a mesh URL (called when a mesh is replaced)."""
+    if not url:
+        return
+    for kind in ("bay", "part"):
+        _cache_file(kind, url).unlink(missing_ok=True)
+    _bays.pop(url, None)
+    for build_id in [b for b, session in _sessions.items() if url in session.key]:
+        del _sessions[build_id]
+
+
+def full_lod_url(lod_urls: Optional[dict], fallback: Optional[str]) -> Optional[str]:
+    return (lod_urls or {}).get("full") or fallback
+
+
+async def _session_for(
+    build: "Build", engine: "Engine", transmission: Optional["Transmission"], vehicle: "Vehicle"
+) -> ClearanceSession:
+    """The build's cached session, rebuilt when any of its mesh URLs changed."""
+    import asyncio
+
+    engine_url = full_lod_url(engine.mesh_lod_urls, engine.mesh_file_url)
+    bay_url = full_lod_url(vehicle.bay_scan_lod_urls, vehicle.bay_scan_mesh_url)
+    if not engine_url:
+        raise ClearanceUnavailable("Engine has no mesh")
+    if not bay_url:
+        raise ClearanceUnavailable("Vehicle has no bay scan mesh")
+    transmission_url = transmission.mesh_file_url if transmission else None
+    key = (bay_url, engine_url, transmission_url, vehicle.bay_sdf_url)
+
+    session = _sessions.get(build.id)
+    if session is not None and session.key == key:
+        _sessions.move_to_end(build.id)
+        return session
+
+    loads = [_bay_for(bay_url, vehicle.bay_sdf_url), load_mesh_part("engine", engine_url)]
+    if transmission_url:
+        loads.append(load_mesh_part("transmission", transmission_url))
+    bay, *parts = await asyncio.gather(*loads)
+    session = await asyncio.to_thread(ClearanceSession, parts, bay)
+    session.key = key
+    session.lock = asyncio.Lock()
+    _remember(_sessions, build.id, session, max(1, settings.clearance_cache_builds))
+    return session
+
+
+async def compute_build_clearance(
+    build: "Build",
+    engine: "Engine",
+    transmission: Optional["Transmission"],
+    vehicle: "Vehicle",
+) -> dict:
+    """Evaluate the build's placement and return the new collision_data payload.
+
+    Re-uses the build's cached session, so after the first evaluation only
+    vertices a move could have affected are re-queried. Raises
+    ClearanceUnavailable when the engine or bay scan has no usable mesh.
+    """
+    import asyncio
+    from app.services.storage import StorageService
+
+    started = time.perf_counter()
+    session = await _session_for(build, engine, transmission, vehicle)
+    async with session.lock:
+        result = await asyncio.to_thread(session.evaluate, build.engine_position)
+    max_inches = session.max_inches
+
+    encoded = encode_clearances(result.clearance_in, max_inches)
+    key = f"clearance/{build.id}/{hashlib.sha256(encoded).hexdigest()[:16]}.bin"
+    storage = StorageService()
+    url = await storage.upload_bytes(key, encoded, "application/octet-stream", bucket="meshes")
+    previous = ((build.collision_data or {}).get("vertex_clearance") or {}).get("key")
+    if previous and previous != key:
+        await storage.delete_file(previous, bucket="meshes")
+
+    return {
+        "engine_position": build.engine_position,
+        "evaluated_at": datetime.now(timezone.utc).isoformat(),
+        "min_clearance_inches": round(result.min_clearance_in, 2),
+        "collision_zones": result.zones,
+        "collisions": [
+            f"{z['part']} {z['region']}: {z['clearance_inches']:+.2f}\" clearance "
+            f"({'intersecting' if z['severity'] == 'red' else 'tight'})"
+            for z in result.zones
+        ],
+        "vertex_clearance": {
+            "url": url,
+            "key": key,
+            "encoding": "int16le, hundredths of an inch",
+            "max_inches": max_inches,
+            "parts": result.parts,
+        },
+        "stats": {
+            "bay_triangles": session.bay_triangles,
+            "method": result.method,
+            "part_triangles": sum(len(p.faces) for p in session.parts),
+            "incremental": result.incremental,
+            "requeried_vertices": result.requeried,
+            "seconds": round(time.perf_counter() - started, 3),
+        },
+    }
@@ -0,0 +1,115 @@
+"""
+Content-addressed storage for manual diagram images.
+
+Data flow:
+  RAGIndexer (batch of image-only pages) → DiagramStore.resolve_many(paths, db)
+    → sha256 each image (worker thread)
+    → one SELECT on diagram_assets for the whole batch
+    → hashes not seen before: StorageService.upload_many() to
+      manuals/diagrams/{hash[:2]}/{hash}{suffix}, then INSERT … ON CONFLICT DO NOTHING
+    → {path: public URL}
+
+An image shared across trims, years or re-indexes is uploaded once; later
+manuals only pay for the hash and a lookup.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import mimetypes
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.diagram_asset import DiagramAsset
+
+if TYPE_CHECKING:
+    from app.services.storage import StorageService
+
+DIAGRAM_BUCKET = "manuals"
+MAX_DIAGRAM_BYTES = 5 * 1024 * 1024
+
+
+def diagram_key(content_hash: str, suffix: str) -> str:
+    return f"diagrams/{content_hash[:2]}/{content_hash}{suffix.lower()}"
+
+
+def _hash_file(path: Path) -> Optional[tuple[str, int]]:
+    """(sha256, size) of an image, or None if it is unreadable or too large to store."""
+    try:
+        size = path.stat().st_size
+        if size > MAX_DIAGRAM_BYTES:
+            return None
+        digest = hashlib.sha256()
+        with open(path, "rb") as fh:
+            for block in iter(lambda: fh.read(1024 * 1024), b""):
+                digest.update(block)
+        return digest.hexdigest(), size
+    except OSError:
+        return None
+
+
+async def _insert_ignore(db: AsyncSession, rows: list[dict]) -> None:
+    """Insert asset rows, ignoring hashes another worker recorded concurrently."""
+    if db.bind.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    await db.execute(insert(DiagramAsset).values(rows).on_conflict_do_nothing(index_elements=["content_hash"]))
+
+
+class DiagramStore:
+    def __init__(self, storage_service: "StorageService"):
+        self.storage = storage_service
+
+    async def resolve_many(self, paths: list[Path], db: AsyncSession) -> dict[Path, Optional[str]]:
+        """Return a public URL for each image, uploading only content not stored before.
+
+        Paths that cannot be hashed, exceed MAX_DIAGRAM_BYTES or fail to upload
+        map to None (the caller stores a stub chunk for those).
+        """
+        hashed = await asyncio.gather(*(asyncio.to_thread(_hash_file, p) for p in paths))
+        by_hash: dict[str, tuple[Path, int]] = {}
+        path_hash: dict[Path, str] = {}
+        for path, result in zip(paths, hashed):
+            if result is None:
+                continue
+            content_hash, size = result
+            path_hash[path] = content_hash
+            by_hash.setdefault(content_hash, (path, size))
+
+        urls: dict[str, str] = {}
+        if by_hash:
+            rows = await db.execute(
+                select(DiagramAsset.content_hash, DiagramAsset.url)
+                .where(DiagramAsset.content_hash.in_(list(by_hash)))
+            )
+            urls = {h: url for h, url in rows.all()}
+
+        missing = [h for h in by_hash if h not in urls]
+        if missing:
+            items = []
+            for h in missing:
+                path, _ = by_hash[h]
+                content_type = mimetypes.guess_type(path.name)[0] or "image/png"
+                items.append((diagram_key(h, path.suffix), path, content_type))
+            uploaded = await self.storage.upload_many(items, bucket=DIAGRAM_BUCKET)
+
+            new_rows = []
+            for h, (key, _, content_type), url in zip(missing, items, uploaded):
+                if url is None:
+                    continue
+                urls[h] = url
+                new_rows.append({
+                    "content_hash": h,
+                    "storage_key": key,
+                    "url": url,
+                    "content_type": content_type,
+                    "size_bytes": by_hash[h][1],
+                })
+            if new_rows:
+                await _insert_ignore(db, new_rows)
+
+        return {path: urls.get(path_hash.get(path)) for path in paths}
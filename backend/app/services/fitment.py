@@ -0,0 +1,173 @@
+"""
+Batch fitment screening: rank many engines against one chassis.
+
+Data flow:
+  POST /api/fitment/screen (vehicle, optional transmission, filters)
+    → one column-only SELECT of the visible engines matching the filters
+    → EngineColumns.from_rows(): one float array per spec (NULL → NaN)
+    → screen_engines(): every check is a NumPy comparison over all candidates
+        bay length / width vs dimensions_l / dimensions_w
+        oil pan depth vs the vehicle's ground clearance
+        torque vs the transmission's rated capacity (transmission given only)
+    → np.lexsort ranking → FitmentScreen.ranked(limit)
+
+Thresholds match RULES in app/services/recommendations.py, so an engine
+screened as "tight" gets the matching warning in its build export.
+A missing spec on either side makes a check "unknown" rather than a pass.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Optional, Sequence
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from app.models.transmission import Transmission
+    from app.models.vehicle import Vehicle
+
+# Engine within this many inches of a bay dimension is a tight fit
+BAY_TOLERANCE_IN = 1.0
+# Oil pan deeper than this fraction of stock ground clearance risks contact
+OIL_PAN_GROUND_FRACTION = 0.6
+# Torque above this fraction of rated capacity needs upgraded internals
+TORQUE_WARN_RATIO = 0.85
+
+OK, TIGHT, FAIL, UNKNOWN = 0, 1, 2, 3
+STATE_NAMES = ("ok", "tight", "fail", "unknown")
+
+# Columns selected per engine; the first seven are returned as-is
+ENGINE_COLUMNS = (
+    "id", "make", "model", "variant", "engine_family", "power_hp",
+    "torque_lb_ft", "dimensions_l", "dimensions_w", "oil_pan_depth_in",
+)
+
+
+@dataclass
+class EngineColumns:
+    rows: Sequence[tuple]
+    power_hp: np.ndarray
+    torque_lb_ft: np.ndarray
+    length_in: np.ndarray
+    width_in: np.ndarray
+    oil_pan_depth_in: np.ndarray
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[tuple]) -> "EngineColumns":
+        """Rows in ENGINE_COLUMNS order, e.g. from select(*[getattr(Engine, c) ...])."""
+        cols = list(zip(*rows)) if rows else [()] * len(ENGINE_COLUMNS)
+        as_float = [np.array(c, dtype=np.float64) for c in cols[5:]]
+        return cls(rows, *as_float)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+
+def _value(x: Optional[float]) -> float:
+    return np.nan if x is None else float(x)
+
+
+def _grade(known: np.ndarray, fail: np.ndarray, tight: np.ndarray) -> np.ndarray:
+    state = np.where(fail, FAIL, np.where(tight, TIGHT, OK))
+    return np.where(known, state, UNKNOWN).astype(np.int8)
+
+
+@dataclass
+class FitmentScreen:
+    engines: EngineColumns
+    # Check name → per-engine state (OK / TIGHT / FAIL / UNKNOWN)
+    checks: dict[str, np.ndarray]
+    length_margin_in: np.ndarray
+    width_margin_in: np.ndarray
+    oil_pan_margin_in: np.ndarray
+    torque_ratio: Optional[np.ndarray]
+    status: np.ndarray
+    # Engine indices, best fit first
+    order: np.ndarray
+
+    @property
+    def ruled_out(self) -> np.ndarray:
+        return self.status == "no_fit"
+
+    def ranked(self, limit: int, include_no_fit: bool = False) -> list[dict]:
+        order = self.order if include_no_fit else self.order[~self.ruled_out[self.order]]
+        names = list(self.checks)
+        states = np.stack([self.checks[n] for n in names], axis=1)
+
+        def _num(arr: Optional[np.ndarray], i: int) -> Optional[float]:
+            if arr is None or np.isnan(arr[i]):
+                return None
+            return round(float(arr[i]), 2)
+
+        results = []
+        for i in order[:limit]:
+            engine_id, make, model, variant, family, power, torque = self.engines.rows[i][:7]
+            results.append({
+                "engine_id": engine_id,
+                "make": make,
+                "model": model,
+                "variant": variant,
+                "engine_family": family,
+                "power_hp": power,
+                "torque_lb_ft": torque,
+                "status": str(self.status[i]),
+                "checks": {n: STATE_NAMES[s] for n, s in zip(names, states[i])},
+                "length_margin_in": _num(self.length_margin_in, i),
+                "width_margin_in": _num(self.width_margin_in, i),
+                "oil_pan_margin_in": _num(self.oil_pan_margin_in, i),
+                "torque_ratio": _num(self.torque_ratio, i),
+            })
+        return results
+
+
+def screen_engines(
+    engines: EngineColumns,
+    vehicle: "Vehicle",
+    transmission: Optional["Transmission"] = None,
+) -> FitmentScreen:
+    """Grade every engine against the vehicle (and transmission) and rank them.
+
+    Ranking: fewest failed checks, then fewest unknown (a known tight fit
+    beats an unverified one), then fewest tight, then the most room in the
+    tighter of length/width, then most power.
+    """
+    checks: dict[str, np.ndarray] = {}
+
+    length_margin = _value(vehicle.engine_bay_length_in) - engines.length_in
+    checks["length"] = _grade(~np.isnan(length_margin), length_margin < 0, length_margin < BAY_TOLERANCE_IN)
+    width_margin = _value(vehicle.engine_bay_width_in) - engines.width_in
+    checks["width"] = _grade(~np.isnan(width_margin), width_margin < 0, width_margin < BAY_TOLERANCE_IN)
+
+    # A deep pan is a warning (low-profile pans and crossmember work exist), never a rule-out
+    pan_limit = _value(vehicle.stock_ground_clearance_in) * OIL_PAN_GROUND_FRACTION
+    pan_margin = pan_limit - engines.oil_pan_depth_in
+    checks["oil_pan"] = _grade(~np.isnan(pan_margin), np.zeros(len(engines), dtype=bool), pan_margin < 0)
+
+    torque_ratio = None
+    if transmission is not None:
+        capacity = _value(transmission.max_torque_capacity_lb_ft)
+        torque_ratio = engines.torque_lb_ft / capacity if capacity > 0 else np.full(len(engines), np.nan)
+        checks["torque"] = _grade(~np.isnan(torque_ratio), torque_ratio > 1.0, torque_ratio > TORQUE_WARN_RATIO)
+
+    states = np.stack(list(checks.values()), axis=1)
+    fails = (states == FAIL).sum(axis=1)
+    tights = (states == TIGHT).sum(axis=1)
+    unknowns = (states == UNKNOWN).sum(axis=1)
+    status = np.select(
+        [fails > 0, tights > 0, unknowns > 0], ["no_fit", "tight", "unverified"], default="fits"
+    )
+
+    room = np.nan_to_num(np.fmin(length_margin, width_margin), nan=-np.inf)
+    power = np.nan_to_num(engines.power_hp, nan=-1.0)
+    order = np.lexsort((-power, -room, tights, unknowns, fails))
+
+    return FitmentScreen(
+        engines=engines,
+        checks=checks,
+        length_margin_in=length_margin,
+        width_margin_in=width_margin,
+        oil_pan_margin_in=pan_margin,
+        torque_ratio=torque_ratio,
+        status=status,
+        order=order,
+    )
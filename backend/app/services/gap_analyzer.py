@@ -1,6 +1,8 @@
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Literal
+from typing import Literal, Optional
+
+from app.services.manual_index import ManualIndex
 
 
 # Critical specification paths to check relative to the manual root directory.
@@ -27,10 +29,24 @@ class GapReport:
 
 
 class GapAnalyzer:
-    def analyze(self, manual_dir: Path, make: str, model: str, year: int) -> GapReport:
+    def analyze(
+        self,
+        manual_dir: Path,
+        make: str,
+        model: str,
+        year: int,
+        index: Optional[ManualIndex] = None,
+    ) -> GapReport:
+        """Check every CRITICAL_CHECKS path against the manual's ManualIndex.
+
+        Pass the index the pipeline already built (it is shared with
+        RAGIndexer.index_manual); without one, the manual is walked here.
+        """
+        if index is None:
+            index = ManualIndex.build(manual_dir)
         report = GapReport()
         for key, path_fragment in CRITICAL_CHECKS.items():
-            result = self._check_path(manual_dir, path_fragment)
+            result = self._check_path(index, path_fragment)
             if result == "present":
                 report.present.append(key)
             elif result == "broken":
@@ -40,54 +56,15 @@ class GapAnalyzer:
         return report
 
     def _check_path(
-        self, manual_dir: Path, path_fragment: str
+        self, index: ManualIndex, path_fragment: str
     ) -> Literal["present", "missing", "broken"]:
-        """Check whether the path_fragment exists under manual_dir.
+        """Check whether the path_fragment exists in the manual.
 
-        Handles partial path matching (checks if any file/dir starts with fragment).
+        Handles partial path matching: without the exact path, any file/dir
+        named like the fragment's last part counts. A match with an
+        "Error parsing" page at or under it is broken.
         """
-        # Normalise separators and try direct path first
-        candidate = manual_dir / path_fragment
-        if candidate.exists():
-            # Check for "Error parsing" in any HTML under this path
-            if self._has_error(candidate):
-                return "broken"
-            return "present"
-
-        # Glob for a partial match anywhere in the tree
-        # Convert fragment separators to check directory structure
-        parts = [p for p in path_fragment.replace("\\", "/").split("/") if p]
-        if not parts:
+        match = index.find(path_fragment)
+        if match is None:
             return "missing"
-
-        last_part = parts[-1]
-        for match in manual_dir.rglob(last_part):
-            # Verify the full fragment appears in the relative path
-            rel = str(match.relative_to(manual_dir)).replace("\\", "/")
-            fragment_lower = path_fragment.lower().replace("\\", "/")
-            if fragment_lower in rel.lower() or last_part.lower() in rel.lower():
-                if self._has_error(match):
-                    return "broken"
-                return "present"
-
-        return "missing"
-
-    def _has_error(self, path: Path) -> bool:
-        """Return True if any index.html under path contains 'Error parsing'."""
-        if path.is_file():
-            if path.suffix.lower() == ".html":
-                try:
-                    text = path.read_text(encoding="utf-8", errors="ignore")
-                    return "Error parsing" in text
-                except OSError:
-                    return False
-            return False
-
-        for html_file in path.rglob("*.html"):
-            try:
-                text = html_file.read_text(encoding="utf-8", errors="ignore")
-                if "Error parsing" in text:
-                    return True
-            except OSError:
-                continue
-        return False
+        return "broken" if index.has_error(match) else "present"
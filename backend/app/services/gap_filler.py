@@ -1,15 +1,35 @@
+"""
+AI gap filling for specs missing from (or broken in) a downloaded manual.
+
+Data flow:
+  GapReport (missing + broken keys) → fill_gaps()
+    → every key at once, at most GAP_FILL_CONCURRENCY LLM calls in flight
+      (async Gemini / Anthropic clients — the event loop is never blocked)
+        → disk cache under GAP_FILL_CACHE_PATH, keyed by (vehicle, spec,
+          PROMPT_VERSION): a hit skips the LLM call
+        → miss: LLM → HTML table → FilledSpec → cache
+    → _write_spec() into the manual directory, results in report order
+"""
 from __future__ import annotations
 
+import asyncio
+import hashlib
+import json
 import textwrap
-from dataclasses import dataclass
+from dataclasses import asdict, dataclass
 from pathlib import Path
 from typing import Optional
 
 from app.config import get_settings
 from app.services.gap_analyzer import GapReport, CRITICAL_CHECKS
+from app.services.metrics import record_llm_usage, track_external
 
 settings = get_settings()
 
+# Bump whenever the prompt or the generated page changes: cached fills are
+# keyed by it, so older ones are simply never read again
+PROMPT_VERSION = 1
+
 # Map spec key → human-readable title for display in the generated HTML
 SPEC_TITLES = {
     "general_engine_specs": "General Engine Specifications",
@@ -34,6 +54,25 @@ class FilledSpec:
     source_note: str
 
 
+def _cache_file(spec_name: str, make: str, model: str, year: int) -> Path:
+    key = f"v{PROMPT_VERSION}|{year}|{make.strip().lower()}|{model.strip().lower()}|{spec_name}"
+    return Path(settings.gap_fill_cache_path) / f"{hashlib.sha256(key.encode()).hexdigest()[:32]}.json"
+
+
+def _read_cached(path: Path) -> Optional[FilledSpec]:
+    try:
+        return FilledSpec(**json.loads(path.read_text(encoding="utf-8")))
+    except (OSError, ValueError, TypeError):
+        return None
+
+
+def _write_cached(path: Path, filled: FilledSpec) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(asdict(filled)), encoding="utf-8")
+    tmp.replace(path)
+
+
 class GapFiller:
     def __init__(self):
         self._client = None
@@ -47,7 +86,7 @@ class GapFiller:
                 pass
         if self._provider is None and settings.anthropic_api_key:
             import anthropic
-            self._client = anthropic.Anthropic(api_key=settings.anthropic_api_key)
+            self._client = anthropic.AsyncAnthropic(api_key=settings.anthropic_api_key)
             self._provider = "anthropic"
 
     async def fill_gaps(
@@ -58,14 +97,19 @@ class GapFiller:
         model: str,
         year: int,
     ) -> list[FilledSpec]:
-        """Attempt to fill each missing/broken spec using Claude."""
+        """Attempt to fill each missing/broken spec using the LLM, concurrently."""
         if not self._client:
             return []
 
-        results: list[FilledSpec] = []
+        slots = asyncio.Semaphore(max(1, settings.gap_fill_concurrency))
+
+        async def _bounded(spec_name: str) -> Optional[FilledSpec]:
+            async with slots:
+                return await self._fill_one(spec_name, make, model, year)
+
         keys_to_fill = gap_report.missing + gap_report.broken
-        for spec_name in keys_to_fill:
-            filled = await self._fill_one(spec_name, make, model, year)
+        results: list[FilledSpec] = []
+        for filled in await asyncio.gather(*(_bounded(k) for k in keys_to_fill)):
             if filled:
                 self._write_spec(manual_dir, filled)
                 results.append(filled)
@@ -73,6 +117,19 @@ class GapFiller:
 
     async def _fill_one(
         self, spec_name: str, make: str, model: str, year: int
+    ) -> Optional[FilledSpec]:
+        cache_file = _cache_file(spec_name, make, model, year)
+        cached = await asyncio.to_thread(_read_cached, cache_file)
+        if cached is not None:
+            return cached
+
+        filled = await self._generate(spec_name, make, model, year)
+        if filled is not None:
+            await asyncio.to_thread(_write_cached, cache_file, filled)
+        return filled
+
+    async def _generate(
+        self, spec_name: str, make: str, model: str, year: int
     ) -> Optional[FilledSpec]:
         title = SPEC_TITLES.get(spec_name, spec_name.replace("_", " ").title())
         vehicle_str = f"{year} {make} {model}"
@@ -100,17 +157,21 @@ class GapFiller:
 
         try:
             if self._provider == "gemini":
-                response = self._client.models.generate_content(
-                    model="gemini-2.0-flash",
-                    contents=prompt,
-                )
+                with track_external("gemini"):
+                    response = await self._client.aio.models.generate_content(
+                        model="gemini-2.0-flash",
+                        contents=prompt,
+                    )
+                record_llm_usage("gemini", "gemini-2.0-flash", response)
                 body_html = response.text.strip()
             else:
-                response = self._client.messages.create(
-                    model="claude-sonnet-4-20250514",
-                    max_tokens=512,
-                    messages=[{"role": "user", "content": prompt}],
-                )
+                with track_external("anthropic"):
+                    response = await self._client.messages.create(
+                        model="claude-sonnet-4-20250514",
+                        max_tokens=512,
+                        messages=[{"role": "user", "content": prompt}],
+                    )
+                record_llm_usage("anthropic", "claude-sonnet-4-20250514", response)
                 body_html = response.content[0].text.strip()
         except Exception:
             return None
@@ -0,0 +1,206 @@
+"""
+Push delivery of ingest job status to SSE clients.
+
+Data flow:
+  run_pipeline / reindex → commit_job(db, job) or a progress tick
+    → job_events.publish(job_id, payload)
+        → local subscribers (SSE generators in this worker) get it immediately
+        → NOTIFY ingest_job_events (when the listener is running)
+            → every other worker's listener → its local subscribers
+  GET /status/{job_id}/stream → subscribe → one DB read → wait on the queue,
+    re-reading the job (or emitting a ": ping" comment) every sse_heartbeat_seconds
+
+Without a LISTEN connection (SQLite, or only the pgBouncer pooler URL) delivery
+is per-process, and processes that never start the listener (the manuals CLI,
+prepopulate_manuals.py) send no NOTIFY at all. A listener connection that drops
+is reopened with exponential backoff; NOTIFYs in either direction are lost
+meanwhile. The SSE route's heartbeat read covers all three.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import uuid
+from typing import Optional
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "ingest_job_events"
+# Postgres rejects NOTIFY payloads of 8000 bytes or more
+NOTIFY_MAX_BYTES = 7900
+QUEUE_SIZE = 64
+# Backoff between attempts to reopen a dropped LISTEN connection
+RECONNECT_MIN_SECONDS = 1.0
+RECONNECT_MAX_SECONDS = 60.0
+
+
+class JobEventBus:
+    """Per-process fan-out of job payloads, bridged across workers by LISTEN/NOTIFY."""
+
+    def __init__(self):
+        self._subscribers: dict[str, set[asyncio.Queue]] = {}
+        # Lets a listener ignore the echo of its own NOTIFYs
+        self._origin = uuid.uuid4().hex
+        self._conn = None
+        self._dsn: Optional[str] = None
+        self._outbox: Optional[asyncio.Queue] = None
+        self._sender: Optional[asyncio.Task] = None
+        self._reconnector: Optional[asyncio.Task] = None
+
+    @property
+    def listening(self) -> bool:
+        return self._conn is not None
+
+    # ---- subscribers ----
+
+    def subscribe(self, job_id: str) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self._subscribers.setdefault(job_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, job_id: str, queue: asyncio.Queue) -> None:
+        queues = self._subscribers.get(job_id)
+        if queues is None:
+            return
+        queues.discard(queue)
+        if not queues:
+            del self._subscribers[job_id]
+
+    def subscriber_count(self, job_id: str) -> int:
+        return len(self._subscribers.get(job_id, ()))
+
+    def _deliver(self, job_id: str, payload: dict) -> None:
+        for queue in self._subscribers.get(job_id, ()):
+            if queue.full():
+                # Each payload is a full snapshot, so a slow client only needs the newest
+                try:
+                    queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    pass
+            queue.put_nowait(payload)
+
+    # ---- publishing ----
+
+    def publish(self, job_id: str, payload: dict) -> None:
+        """Deliver to local subscribers now; queue a NOTIFY for other workers.
+
+        Synchronous so it can be called from progress callbacks; the NOTIFY
+        itself is sent by a background task on the listener connection.
+        """
+        self._deliver(job_id, payload)
+        if self._outbox is None:
+            return
+        message = json.dumps({"origin": self._origin, "job_id": job_id, "payload": payload})
+        if len(message.encode()) > NOTIFY_MAX_BYTES:
+            payload = {k: v for k, v in payload.items() if k != "stage_timings"}
+            message = json.dumps({"origin": self._origin, "job_id": job_id, "payload": payload})
+        try:
+            self._outbox.put_nowait(message)
+        except asyncio.QueueFull:
+            logger.warning("job_events outbox full; dropping NOTIFY for job %s", job_id)
+
+    async def _send_loop(self) -> None:
+        while True:
+            message = await self._outbox.get()
+            if self._conn is None:
+                # Reconnecting; subscribers elsewhere catch up on their next heartbeat read
+                continue
+            try:
+                await self._conn.execute("SELECT pg_notify($1, $2)", CHANNEL, message)
+            except Exception as exc:
+                logger.warning(f"job_events NOTIFY failed: {exc}")
+
+    def _on_notify(self, connection, pid, channel, message) -> None:
+        try:
+            data = json.loads(message)
+        except ValueError:
+            return
+        if data.get("origin") == self._origin:
+            return
+        self._deliver(data["job_id"], data["payload"])
+
+    # ---- lifecycle ----
+
+    async def _connect(self) -> None:
+        import asyncpg
+        conn = await asyncpg.connect(self._dsn, timeout=10)
+        try:
+            await conn.add_listener(CHANNEL, self._on_notify)
+            conn.add_termination_listener(self._on_terminated)
+        except Exception:
+            await conn.close()
+            raise
+        self._conn = conn
+
+    def _on_terminated(self, connection) -> None:
+        if connection is not self._conn or self._dsn is None:
+            return
+        logger.warning("job_events LISTEN connection lost; reconnecting")
+        self._conn = None
+        self._reconnector = asyncio.create_task(self._reconnect())
+
+    async def _reconnect(self) -> None:
+        delay = RECONNECT_MIN_SECONDS
+        while self._dsn is not None:
+            await asyncio.sleep(delay)
+            try:
+                await self._connect()
+            except Exception as exc:
+                logger.warning(f"job_events reconnect failed, retrying in {delay:.0f}s: {exc}")
+                delay = min(delay * 2, RECONNECT_MAX_SECONDS)
+                continue
+            logger.info("job_events LISTEN connection restored")
+            return
+
+    async def start(self, dsn: str) -> None:
+        """Open the LISTEN connection. Failures leave the bus in per-process mode;
+        a connection that drops later is reopened with exponential backoff."""
+        if self._conn is not None:
+            return
+        self._dsn = dsn
+        try:
+            await self._connect()
+        except Exception as exc:
+            logger.warning(f"job_events LISTEN unavailable, using in-process delivery only: {exc}")
+            self._dsn = None
+            self._conn = None
+            return
+        self._outbox = asyncio.Queue(maxsize=1000)
+        self._sender = asyncio.create_task(self._send_loop())
+
+    async def stop(self) -> None:
+        self._dsn = None
+        for task in (self._sender, self._reconnector):
+            if task is not None:
+                task.cancel()
+        self._sender = self._reconnector = None
+        self._outbox = None
+        if self._conn is not None:
+            try:
+                await self._conn.close()
+            except Exception:
+                pass
+            self._conn = None
+
+
+job_events = JobEventBus()
+
+
+def listen_dsn() -> Optional[str]:
+    """Plain asyncpg DSN for the LISTEN connection, or None when it can't work.
+
+    LISTEN needs a session that outlives a transaction, which pgBouncer in
+    transaction mode does not provide.
+    """
+    settings = get_settings()
+    if not settings.job_events_listen:
+        return None
+    url = settings.database_direct_url or (
+        "" if settings.database_pgbouncer else settings.database_url
+    )
+    if not url.startswith("postgresql"):
+        return None
+    return url.replace("postgresql+asyncpg://", "postgresql://", 1)
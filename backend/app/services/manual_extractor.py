@@ -5,6 +5,9 @@ from urllib.parse import unquote
 
 
 class ManualExtractor:
+    # Number of regular files written by the last extract_and_clean() call
+    files_extracted: int = 0
+
     def extract_and_clean(self, zip_path: Path, dest_dir: Path) -> Path:
         """Extract ZIP to dest_dir and rename all entries with URL-decoded names.
 
@@ -27,6 +30,7 @@ class ManualExtractor:
                         str(member_path) != str(dest_resolved):
                     raise ValueError(f"ZIP path traversal detected: {info.filename}")
             zf.extractall(dest_dir)
+            self.files_extracted = sum(1 for info in zf.infolist() if not info.is_dir())
 
         # Walk bottom-up so we rename children before parents
         for dirpath, dirnames, filenames in os.walk(dest_dir, topdown=False):
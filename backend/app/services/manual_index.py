@@ -0,0 +1,126 @@
+"""
+One pass over an extracted manual, shared by gap analysis and indexing.
+
+Data flow:
+  ManualIndex.build(manual_dir): one scandir walk, every HTML page read once
+    → names:  every file and directory by name (GapAnalyzer answers its
+              CRITICAL_CHECKS from here instead of an rglob per check)
+    → hashes: page_hash() of each HTML page (symlinks escaping the root
+              dropped); RAGIndexer.index_manual walks these and skips
+              unchanged pages without reading them again
+    → errors: pages holding charm.li's "Error parsing" placeholder
+  GapFiller writes a page → ManualIndex.add(relative_path)
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+from pathlib import Path
+from typing import Optional
+
+from app.config import get_settings
+
+settings = get_settings()
+
+ERROR_MARKER = b"Error parsing"
+
+
+def page_hash(raw: bytes, rel_path: str) -> str:
+    """Content hash of a manual page: its file path and bytes, plus the chunking
+    settings (changing them re-chunks every page)."""
+    h = hashlib.sha256(f"{settings.manual_chunk_tokens}:{settings.manual_chunk_overlap_tokens}:{rel_path}\0".encode())
+    h.update(raw)
+    return h.hexdigest()
+
+
+def path_section(html_path: Path, root: Path) -> str:
+    """A file's path relative to the manual root in 'A > B > C' form."""
+    try:
+        rel = html_path.relative_to(root)
+    except ValueError:
+        return str(html_path.stem)
+    return _section(rel.as_posix())
+
+
+def _section(rel: str) -> str:
+    *dirs, name = rel.split("/")
+    return " > ".join(dirs + [os.path.splitext(name)[0]])
+
+
+class ManualIndex:
+    def __init__(self, root: Path):
+        self.root = root
+        self._resolved_root = root.resolve()
+        self.names: dict[str, set[str]] = {}  # file/dir name → relative posix paths
+        self.hashes: dict[Path, str] = {}  # HTML page → page_hash
+        self.errors: set[str] = set()  # relative posix paths of "Error parsing" pages
+
+    @classmethod
+    def build(cls, root: Path) -> "ManualIndex":
+        """Walk root once. A missing directory gives an empty index.
+
+        Symlinked directories are listed but not descended into, so only a
+        symlinked page can point outside the manual; those are resolved.
+        """
+        index = cls(root)
+        stack = [(str(root), "")]
+        while stack:
+            dirpath, prefix = stack.pop()
+            try:
+                with os.scandir(dirpath) as entries:
+                    entries = list(entries)
+            except OSError:
+                continue
+            for entry in entries:
+                rel = prefix + entry.name
+                index._name(entry.name, rel)
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append((entry.path, rel + "/"))
+                elif entry.name.endswith(".html"):
+                    index._read(Path(entry.path), rel, entry.is_symlink())
+        return index
+
+    def _name(self, name: str, rel: str) -> None:
+        self.names.setdefault(name, set()).add(rel)
+
+    def _read(self, path: Path, rel: str, check_escape: bool = True) -> None:
+        try:
+            if check_escape:
+                path.resolve().relative_to(self._resolved_root)  # raises ValueError if outside root
+            raw = path.read_bytes()
+        except (ValueError, OSError):
+            return
+        self.hashes[path] = page_hash(raw, _section(rel))
+        if ERROR_MARKER in raw:
+            self.errors.add(rel)
+        else:
+            self.errors.discard(rel)
+
+    def add(self, relative_path: str) -> None:
+        """Record a page written after the walk (e.g. by GapFiller), with its parents."""
+        rel = relative_path.replace("\\", "/").strip("/")
+        parts = rel.split("/")
+        for i, name in enumerate(parts):
+            self._name(name, "/".join(parts[:i + 1]))
+        if rel.endswith(".html"):
+            self._read(self.root / rel, rel)
+
+    @property
+    def pages(self) -> list[Path]:
+        """HTML pages, sorted."""
+        return sorted(self.hashes)
+
+    def find(self, fragment: str) -> Optional[str]:
+        """Relative path for a CRITICAL_CHECKS fragment: the fragment itself if it
+        exists, otherwise the first path anywhere named like its last part."""
+        fragment = fragment.replace("\\", "/").strip("/")
+        if not fragment:
+            return None
+        matches = self.names.get(fragment.rsplit("/", 1)[-1], set())
+        if fragment in matches:
+            return fragment
+        return min(matches) if matches else None
+
+    def has_error(self, rel: str) -> bool:
+        """True if the page at rel, or any page under it, is an "Error parsing" page."""
+        return any(e == rel or e.startswith(rel + "/") for e in self.errors)
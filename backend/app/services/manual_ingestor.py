@@ -1,6 +1,8 @@
 from __future__ import annotations
 
+import asyncio
 import uuid
+from datetime import datetime, timezone
 from pathlib import Path
 from typing import Any, Callable, Optional
 
@@ -9,15 +11,101 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import get_settings
 from app.models.ingest_job import IngestJob
+from app.schemas.manual import IngestStatusResponse
 from app.services.charm_downloader import CharmDownloader
 from app.services.manual_extractor import ManualExtractor
+from app.services.manual_index import ManualIndex
 from app.services.gap_analyzer import GapAnalyzer
 from app.services.gap_filler import GapFiller
-from app.services.rag_indexer import RAGIndexer
+from app.services.job_events import job_events
+from app.services.rag_indexer import IndexStats, RAGIndexer
+from app.utils.http_cache import response_cache
 
 settings = get_settings()
 
 
+def _utc_now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _close_open_stage(timings: dict, now: datetime) -> None:
+    for entry in timings.values():
+        if entry.get("finished_at") is None:
+            entry["finished_at"] = now.isoformat()
+            started = datetime.fromisoformat(entry["started_at"])
+            entry["seconds"] = round((now - started).total_seconds(), 3)
+
+
+def begin_stage(job: IngestJob, stage: str) -> None:
+    """Move the job to ``stage``, closing the timing entry of the previous one.
+
+    stage_timings is a plain JSON column, so the dict is rebuilt and reassigned
+    rather than mutated in place (SQLAlchemy would not see the change).
+    """
+    now = _utc_now()
+    timings = {k: dict(v) for k, v in (job.stage_timings or {}).items()}
+    _close_open_stage(timings, now)
+    timings[stage] = {"started_at": now.isoformat(), "finished_at": None, "seconds": None}
+    if job.started_at is None:
+        job.started_at = now
+    job.stage = stage
+    job.stage_timings = timings
+
+
+def finish_job(job: IngestJob, status: str, error: Optional[str] = None) -> None:
+    """Mark the job complete/failed and close whichever stage was running."""
+    now = _utc_now()
+    timings = {k: dict(v) for k, v in (job.stage_timings or {}).items()}
+    _close_open_stage(timings, now)
+    job.stage_timings = timings
+    job.status = status
+    job.finished_at = now
+    if error is not None:
+        job.error = error
+    if status == "complete":
+        job.stage = "done"
+
+
+def record_index_stats(job: IngestJob, stats: IndexStats) -> None:
+    job.pages_parsed = stats.pages_parsed
+    job.pages_skipped = stats.pages_skipped
+    job.pages_removed = stats.pages_removed
+    job.vision_calls = stats.vision_calls
+    job.upsert_batches = stats.upsert_batches
+
+
+def job_status(job: IngestJob) -> IngestStatusResponse:
+    return IngestStatusResponse(
+        job_id=job.job_id,
+        status=job.status,
+        stage=job.stage,
+        chunks_indexed=job.chunks_indexed or 0,
+        gaps_filled=job.gaps_filled or 0,
+        error=job.error,
+        started_at=job.started_at,
+        finished_at=job.finished_at,
+        stage_timings=job.stage_timings,
+        bytes_downloaded=job.bytes_downloaded or 0,
+        files_extracted=job.files_extracted or 0,
+        pages_parsed=job.pages_parsed or 0,
+        pages_skipped=job.pages_skipped or 0,
+        pages_removed=job.pages_removed or 0,
+        vision_calls=job.vision_calls or 0,
+        upsert_batches=job.upsert_batches or 0,
+    )
+
+
+def publish_job(job: IngestJob) -> None:
+    """Push the job's current state to SSE subscribers (see job_events)."""
+    job_events.publish(job.job_id, job_status(job).model_dump(mode="json"))
+
+
+async def commit_job(db: AsyncSession, job: IngestJob) -> None:
+    """Commit the job row, then push the committed state to subscribers."""
+    await db.commit()
+    publish_job(job)
+
+
 class ManualIngestor:
     """Orchestrates the full manual ingestion pipeline.
 
@@ -31,8 +119,11 @@ class ManualIngestor:
 
     Data flow:
         POST /ingest → create_job() → start_ingest() → BackgroundTask: run_pipeline()
-            download (charm.li) → extract (ZIP) → analyze (gaps) → fill (AI)
-                → index (RAGIndexer) → update job status
+            download (charm.li) → extract (ZIP) → ManualIndex (one walk)
+                → analyze (gaps) → fill (AI) → index (RAGIndexer) → update job status
+        Every job commit (and each indexing batch) is pushed to SSE subscribers
+        through job_events; the status stream also re-reads the row on each
+        idle heartbeat, for updates that sent no NOTIFY or lost it.
     """
 
     async def create_job(self, job_id: str, db: AsyncSession) -> IngestJob:
@@ -98,7 +189,8 @@ class ManualIngestor:
                 return
 
             job.status = "running"
-            await db.commit()
+            job.started_at = _utc_now()
+            await commit_job(db, job)
 
             manual_dir: Optional[Path] = None
 
@@ -107,12 +199,12 @@ class ManualIngestor:
 
                 if manual_dir_override:
                     manual_dir = Path(manual_dir_override)
-                    job.stage = "analyzing"
-                    await db.commit()
+                    begin_stage(job, "analyzing")
+                    await commit_job(db, job)
                 else:
                     # --- Stage: downloading ---
-                    job.stage = "downloading"
-                    await db.commit()
+                    begin_stage(job, "downloading")
+                    await commit_job(db, job)
                     downloader = CharmDownloader()
                     zip_path = await downloader.find_and_download(
                         year, make, model, base_path / "zips",
@@ -120,36 +212,47 @@ class ManualIngestor:
                         variant_hint=variant_hint,
                     )
                     if not zip_path:
-                        job.status = "failed"
-                        job.error = f"Could not find or download manual for {year} {make} {model} from charm.li"
-                        await db.commit()
+                        finish_job(
+                            job, "failed",
+                            f"Could not find or download manual for {year} {make} {model} from charm.li",
+                        )
+                        await commit_job(db, job)
                         return
+                    try:
+                        job.bytes_downloaded = zip_path.stat().st_size
+                    except OSError:
+                        pass
 
                     # --- Stage: extracting ---
-                    job.stage = "extracting"
-                    await db.commit()
+                    begin_stage(job, "extracting")
+                    await commit_job(db, job)
                     extractor = ManualExtractor()
                     extract_dir = base_path / "extracted" / f"{make}_{year}_{model}"
                     manual_dir = extractor.extract_and_clean(zip_path, extract_dir)
+                    job.files_extracted = extractor.files_extracted
 
-                    job.stage = "analyzing"
-                    await db.commit()
+                    begin_stage(job, "analyzing")
+                    await commit_job(db, job)
 
                 # --- Stage: analyzing ---
+                # One walk of the manual, shared by gap analysis and indexing
+                manual_index = await asyncio.to_thread(ManualIndex.build, manual_dir)
                 analyzer = GapAnalyzer()
-                gap_report = analyzer.analyze(manual_dir, make, model, year)
+                gap_report = analyzer.analyze(manual_dir, make, model, year, index=manual_index)
 
                 # --- Stage: filling ---
-                job.stage = "filling"
-                await db.commit()
+                begin_stage(job, "filling")
+                await commit_job(db, job)
                 filler = GapFiller()
                 filled = await filler.fill_gaps(manual_dir, gap_report, make, model, year)
                 job.gaps_filled = len(filled)
-                await db.commit()
+                for spec in filled:
+                    manual_index.add(spec.relative_path)
+                await commit_job(db, job)
 
                 # --- Stage: indexing ---
-                job.stage = "indexing"
-                await db.commit()
+                begin_stage(job, "indexing")
+                await commit_job(db, job)
 
                 vision_extractor = None
                 if vision_extract:
@@ -160,6 +263,13 @@ class ManualIngestor:
                         pass
 
                 indexer = RAGIndexer()
+                stats = IndexStats()
+
+                def _progress(indexed: int) -> None:
+                    job.chunks_indexed = indexed
+                    record_index_stats(job, stats)
+                    publish_job(job)
+
                 count = await indexer.index_manual(
                     manual_dir, make, model, year, vehicle_id, db,
                     scope=scope,
@@ -167,16 +277,23 @@ class ManualIngestor:
                     transmission_id=transmission_id,
                     vision_extractor=vision_extractor,
                     session_factory=session_factory,
+                    stats=stats,
+                    progress=_progress,
+                    manual_index=manual_index,
                 )
                 job.chunks_indexed = count
-                job.status = "complete"
-                job.stage = "done"
-                await db.commit()
+                record_index_stats(job, stats)
+                finish_job(job, "complete")
+                await commit_job(db, job)
+
+                # Cached /api/manuals/chunks pages for this vehicle are now stale
+                response_cache.invalidate(
+                    f"manual_chunks:{vehicle_id}:" if vehicle_id else "manual_chunks:"
+                )
 
             except Exception as exc:
-                job.status = "failed"
-                job.error = str(exc)
-                await db.commit()
+                finish_job(job, "failed", str(exc))
+                await commit_job(db, job)
 
     async def get_status(self, job_id: str, db: AsyncSession) -> Optional[IngestJob]:
         """Look up job status from the database."""
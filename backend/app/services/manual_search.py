@@ -3,14 +3,122 @@
 Provides a single implementation of the PostgreSQL FTS pattern (with ILIKE
 fallback for SQLite in tests) used by the advisor tool-use loop, the Gemini
 pre-fetch RAG path, and the public /api/manuals/search endpoint.
+
+Rows are chunks of manual pages (app/services/chunker.py), so a search
+returns the matching part of a page; chunk_neighbors() expands one chunk to
+the parts around it.
+
+search_snippets() is search_chunks() plus, per hit, the passages around the
+matched terms with the terms in **bold** — ts_headline on PostgreSQL
+(computed only for the top `limit` rows), headline() on SQLite. The advisor
+sends these instead of each chunk's opening characters.
 """
 from __future__ import annotations
 
+import re
+from dataclasses import dataclass
+
 from sqlalchemy import select, and_, func
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.manual_chunk import ManualChunk
 
+# Passages per snippet, and words per passage (ts_headline MaxWords / MinWords)
+SNIPPET_FRAGMENTS = 2
+SNIPPET_MAX_WORDS = 35
+SNIPPET_MIN_WORDS = 15
+SNIPPET_DELIMITER = " … "
+
+# Subset of PostgreSQL's english stopwords: never highlighted, never matched
+_STOPWORDS = frozenset("""
+    a an and are as at be but by for from has have how i if in into is it its of on or
+    that the their then there these this to was what when where which while who why
+    will with you your do does can should my me
+""".split())
+_WORD = re.compile(r"\w+")
+_SUFFIXES = ("ing", "ed", "es", "s")
+
+
+@dataclass
+class SearchHit:
+    chunk: ManualChunk
+    snippet: str
+
+
+def _stem(word: str) -> str:
+    word = word.lower()
+    for suffix in _SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[: -len(suffix)]
+    return word
+
+
+def headline(
+    content: str,
+    query: str,
+    max_words: int = SNIPPET_MAX_WORDS,
+    min_words: int = SNIPPET_MIN_WORDS,
+    max_fragments: int = SNIPPET_FRAGMENTS,
+) -> str:
+    """Pure-Python ts_headline: up to max_fragments passages of about
+    max_words words, centred on the query terms (crudely stemmed, stopwords
+    dropped), terms in **bold**, joined by SNIPPET_DELIMITER. Falls back to
+    the first max_words words when nothing matches."""
+    terms = {_stem(w) for w in _WORD.findall(query) if w.lower() not in _STOPWORDS}
+    words = content.split()
+    hits = [
+        i for i, word in enumerate(words)
+        if any(_stem(w) in terms for w in _WORD.findall(word))
+    ]
+    if not hits:
+        return " ".join(words[:max_words])
+
+    # Greedy: the window covering the most new terms (then the tightest run of
+    # them), then the next best. Windows open a little before a match — the
+    # value (torque, clearance, part number) usually follows the term.
+    size = max(max_words, min_words)
+    lead = size // 4
+
+    def _window(i: int) -> tuple[int, int]:
+        lo = max(0, min(i - lead, len(words) - size))
+        return lo, min(len(words), lo + size)
+
+    def _terms(lo: int, hi: int) -> set[str]:
+        return {_stem(w) for j in hits if lo <= j < hi for w in _WORD.findall(words[j])} & terms
+
+    covered: set[str] = set()
+    windows: list[tuple[int, int]] = []
+    candidates = list(hits)
+    while candidates and len(windows) < max_fragments:
+        def _gain(i: int) -> tuple[int, int]:
+            lo, hi = _window(i)
+            new = _terms(lo, hi) - covered
+            last = max((j for j in hits if i <= j < hi and _terms(j, j + 1) & new), default=i)
+            return len(new), i - last
+
+        best = max(candidates, key=_gain)
+        if windows and _gain(best)[0] == 0:
+            break
+        lo, hi = _window(best)
+        windows.append((lo, hi))
+        covered |= _terms(lo, hi)
+        candidates = [i for i in candidates if not lo <= i < hi]
+
+    def _mark(word: str) -> str:
+        return _WORD.sub(lambda m: f"**{m.group()}**" if _stem(m.group()) in terms else m.group(), word)
+
+    hit_set = set(hits)
+    fragments: list[tuple[int, int]] = []
+    for lo, hi in sorted(windows):
+        if fragments and lo <= fragments[-1][1]:
+            fragments[-1] = (fragments[-1][0], max(hi, fragments[-1][1]))
+        else:
+            fragments.append((lo, hi))
+    return SNIPPET_DELIMITER.join(
+        " ".join(_mark(words[i]) if i in hit_set else words[i] for i in range(lo, hi))
+        for lo, hi in fragments
+    )
+
 
 async def search_chunks(
     db: AsyncSession,
@@ -65,3 +173,69 @@ async def search_chunks(
         return list(result.scalars().all())
     except Exception:
         return []
+
+
+async def chunk_neighbors(
+    db: AsyncSession,
+    chunk_id: str,
+    radius: int = 1,
+) -> list[ManualChunk]:
+    """The chunk plus up to `radius` chunks either side of it on the same page,
+    in page order. Empty if the chunk does not exist."""
+    chunk = await db.get(ManualChunk, chunk_id)
+    if chunk is None:
+        return []
+    if chunk.page_id is None:
+        return [chunk]
+    result = await db.execute(
+        select(ManualChunk)
+        .where(
+            ManualChunk.page_id == chunk.page_id,
+            ManualChunk.chunk_ordinal.between(chunk.chunk_ordinal - radius, chunk.chunk_ordinal + radius),
+        )
+        .order_by(ManualChunk.chunk_ordinal)
+    )
+    return list(result.scalars().all())
+
+
+async def search_snippets(
+    db: AsyncSession,
+    query: str,
+    scope_filter,
+    limit: int = 5,
+    max_fragments: int = SNIPPET_FRAGMENTS,
+) -> list[SearchHit]:
+    """search_chunks() with a query-centred snippet per hit (see headline())."""
+    base_where = scope_filter if scope_filter is not None else True
+
+    # --- PostgreSQL FTS path: rank, limit, then ts_headline only the top rows ---
+    try:
+        tsquery = func.plainto_tsquery("english", query)
+        tsvector = func.to_tsvector("english", ManualChunk.content)
+        top = (
+            select(ManualChunk.id, func.ts_rank(tsvector, tsquery).label("rank"))
+            .where(and_(base_where, tsvector.op("@@")(tsquery)))
+            .order_by(func.ts_rank(tsvector, tsquery).desc())
+            .limit(limit)
+            .subquery()
+        )
+        options = (
+            f"StartSel=**, StopSel=**, MaxWords={SNIPPET_MAX_WORDS}, MinWords={SNIPPET_MIN_WORDS}, "
+            f"MaxFragments={max_fragments}, FragmentDelimiter=\"{SNIPPET_DELIMITER}\""
+        )
+        stmt = (
+            select(ManualChunk, func.ts_headline("english", ManualChunk.content, tsquery, options))
+            .join(top, top.c.id == ManualChunk.id)
+            .order_by(top.c.rank.desc())
+        )
+        result = await db.execute(stmt)
+        return [SearchHit(chunk, snippet) for chunk, snippet in result.all()]
+    except Exception:
+        pass
+
+    # --- SQLite / FTS failure: search_chunks' fallback + headline() ---
+    chunks = await search_chunks(db, query, scope_filter, limit=limit)
+    return [
+        SearchHit(chunk, headline(chunk.content, query, max_fragments=max_fragments))
+        for chunk in chunks
+    ]
@@ -0,0 +1,478 @@
+"""
+Server-side mesh decimation and LOD generation.
+
+Data flow:
+  POST /api/files/upload/mesh (engine_id / vehicle_id) → BackgroundTask:
+    process_uploaded_mesh()
+      → load_mesh(): .obj / .stl / .glb → float32 vertices (N, 3), int64 faces (M, 3)
+      → build_lods(): clamp to the triangle budget (engine 100K, bay scan 200K),
+        then decimate to 50% and 25% of that
+      → to_glb() per level → StorageService.upload_many (meshes/lod/{stem}/{level}.glb)
+      → Engine.mesh_triangle_count / mesh_lod_urls
+        (Vehicle.bay_scan_triangle_count / bay_scan_lod_urls)
+      → bay scans only: generate_bay_sdf() → Vehicle.bay_sdf_url
+
+Decimation is quadric-error vertex clustering (Lindstrom 2000): vertices are
+binned into a uniform grid, each cell collapses to the point minimising the
+summed plane quadrics of its vertices, and degenerate / duplicate triangles
+are dropped. It is fully vectorised, so a 1M-triangle scan decimates in
+seconds without a native mesh library; the grid resolution is binary-searched
+to land just under the requested triangle count.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import struct
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+GLB_CONTENT_TYPE = "model/gltf-binary"
+LOD_LEVELS: tuple[tuple[str, float], ...] = (("full", 1.0), ("50", 0.5), ("25", 0.25))
+PROCESSABLE_EXTENSIONS = {".obj", ".stl", ".glb"}
+
+
+class MeshFormatError(ValueError):
+    """The file is not a mesh we can parse (unsupported format or malformed)."""
+
+
+# ---------------------------------------------------------------------------
+# Loading
+# ---------------------------------------------------------------------------
+
+def load_mesh(path: Path) -> tuple[np.ndarray, np.ndarray]:
+    suffix = path.suffix.lower()
+    if suffix == ".obj":
+        vertices, faces = _load_obj(path)
+    elif suffix == ".stl":
+        vertices, faces = _load_stl(path)
+    elif suffix == ".glb":
+        vertices, faces = _load_glb(path)
+    else:
+        raise MeshFormatError(f"Unsupported mesh format for processing: {suffix}")
+    if len(faces) == 0:
+        raise MeshFormatError("Mesh has no triangles")
+    if faces.min() < 0 or faces.max() >= len(vertices):
+        raise MeshFormatError("Face index out of range")
+    return vertices, faces
+
+
+def _load_obj(path: Path) -> tuple[np.ndarray, np.ndarray]:
+    vertices: list[list[str]] = []
+    faces: list[tuple[int, int, int]] = []
+    with open(path, "r", encoding="utf-8", errors="ignore") as fh:
+        for line in fh:
+            if line.startswith("v "):
+                vertices.append(line.split()[1:4])
+            elif line.startswith("f "):
+                n = len(vertices)
+                idx = []
+                for token in line.split()[1:]:
+                    i = int(token.split("/", 1)[0])
+                    idx.append(i - 1 if i > 0 else n + i)
+                # Fan-triangulate polygons
+                for k in range(1, len(idx) - 1):
+                    faces.append((idx[0], idx[k], idx[k + 1]))
+    try:
+        v = np.asarray(vertices, dtype=np.float32).reshape(-1, 3)
+    except ValueError as exc:
+        raise MeshFormatError(f"Malformed OBJ vertex: {exc}") from exc
+    return v, np.asarray(faces, dtype=np.int64).reshape(-1, 3)
+
+
+_STL_RECORD = np.dtype([("normal", "<f4", (3,)), ("v", "<f4", (3, 3)), ("attr", "<u2")])
+
+
+def _load_stl(path: Path) -> tuple[np.ndarray, np.ndarray]:
+    data = path.read_bytes()
+    triangles: Optional[np.ndarray] = None
+    if len(data) >= 84:
+        (count,) = struct.unpack_from("<I", data, 80)
+        if 84 + count * _STL_RECORD.itemsize == len(data):
+            triangles = np.frombuffer(data, dtype=_STL_RECORD, count=count, offset=84)["v"]
+    if triangles is None:
+        if not data.lstrip().startswith(b"solid"):
+            raise MeshFormatError("Not a binary or ASCII STL file")
+        coords = [
+            line.split()[1:4]
+            for line in data.decode("ascii", errors="ignore").splitlines()
+            if line.strip().startswith("vertex")
+        ]
+        triangles = np.asarray(coords, dtype=np.float32).reshape(-1, 3, 3)
+    # STL stores each triangle's corners separately — weld shared corners
+    vertices, inverse = np.unique(triangles.reshape(-1, 3), axis=0, return_inverse=True)
+    return vertices.astype(np.float32), inverse.reshape(-1, 3).astype(np.int64)
+
+
+_GLB_MAGIC = 0x46546C67
+_CHUNK_JSON = 0x4E4F534A
+_CHUNK_BIN = 0x004E4942
+_COMPONENT_DTYPES = {5120: "<i1", 5121: "<u1", 5122: "<i2", 5123: "<u2", 5125: "<u4", 5126: "<f4"}
+_TYPE_SIZES = {"SCALAR": 1, "VEC2": 2, "VEC3": 3, "VEC4": 4, "MAT4": 16}
+
+
+def _read_accessor(gltf: dict, bin_chunk: bytes, index: int) -> np.ndarray:
+    acc = gltf["accessors"][index]
+    if "bufferView" not in acc or "sparse" in acc:
+        raise MeshFormatError("Sparse or buffer-less accessors are not supported")
+    view = gltf["bufferViews"][acc["bufferView"]]
+    dtype = np.dtype(_COMPONENT_DTYPES[acc["componentType"]])
+    ncomp = _TYPE_SIZES[acc["type"]]
+    count = acc["count"]
+    offset = view.get("byteOffset", 0) + acc.get("byteOffset", 0)
+    itemsize = dtype.itemsize * ncomp
+    stride = view.get("byteStride") or itemsize
+    if stride == itemsize:
+        arr = np.frombuffer(bin_chunk, dtype=dtype, count=count * ncomp, offset=offset)
+    else:
+        raw = np.frombuffer(bin_chunk, dtype=np.uint8, count=stride * (count - 1) + itemsize, offset=offset)
+        rows = np.lib.stride_tricks.as_strided(raw, shape=(count, itemsize), strides=(stride, 1))
+        arr = np.ascontiguousarray(rows).view(dtype).reshape(-1)
+    return arr.reshape(count, ncomp) if ncomp > 1 else arr
+
+
+def _node_matrix(node: dict) -> np.ndarray:
+    if "matrix" in node:
+        return np.asarray(node["matrix"], dtype=np.float64).reshape(4, 4).T  # column-major
+    t = np.eye(4)
+    t[:3, 3] = node.get("translation", (0, 0, 0))
+    x, y, z, w = node.get("rotation", (0, 0, 0, 1))
+    r = np.eye(4)
+    r[:3, :3] = [
+        [1 - 2 * (y * y + z * z), 2 * (x * y - z * w), 2 * (x * z + y * w)],
+        [2 * (x * y + z * w), 1 - 2 * (x * x + z * z), 2 * (y * z - x * w)],
+        [2 * (x * z - y * w), 2 * (y * z + x * w), 1 - 2 * (x * x + y * y)],
+    ]
+    s = np.diag([*node.get("scale", (1, 1, 1)), 1.0])
+    return t @ r @ s
+
+
+def _load_glb(path: Path) -> tuple[np.ndarray, np.ndarray]:
+    data = path.read_bytes()
+    if len(data) < 20:
+        raise MeshFormatError("Truncated GLB")
+    magic, version, _length = struct.unpack_from("<III", data, 0)
+    if magic != _GLB_MAGIC or version != 2:
+        raise MeshFormatError("Not a glTF 2.0 binary")
+    gltf, bin_chunk, pos = None, b"", 12
+    while pos + 8 <= len(data):
+        chunk_len, chunk_type = struct.unpack_from("<II", data, pos)
+        body = data[pos + 8: pos + 8 + chunk_len]
+        if chunk_type == _CHUNK_JSON:
+            gltf = json.loads(body)
+        elif chunk_type == _CHUNK_BIN:
+            bin_chunk = body
+        pos += 8 + chunk_len
+    if gltf is None:
+        raise MeshFormatError("GLB has no JSON chunk")
+    if "KHR_draco_mesh_compression" in gltf.get("extensionsUsed", []):
+        raise MeshFormatError("Draco-compressed GLB is not supported")
+
+    all_vertices, all_faces, base = [], [], 0
+
+    def _add_mesh(mesh_index: int, world: np.ndarray) -> None:
+        nonlocal base
+        for prim in gltf["meshes"][mesh_index]["primitives"]:
+            if prim.get("mode", 4) != 4 or "POSITION" not in prim.get("attributes", {}):
+                continue
+            v = _read_accessor(gltf, bin_chunk, prim["attributes"]["POSITION"]).astype(np.float64)
+            v = v @ world[:3, :3].T + world[:3, 3]
+            if "indices" in prim:
+                f = _read_accessor(gltf, bin_chunk, prim["indices"]).astype(np.int64).reshape(-1, 3)
+            else:
+                f = np.arange(len(v), dtype=np.int64).reshape(-1, 3)
+            all_vertices.append(v.astype(np.float32))
+            all_faces.append(f + base)
+            base += len(v)
+
+    def _walk(node_index: int, parent: np.ndarray) -> None:
+        node = gltf["nodes"][node_index]
+        world = parent @ _node_matrix(node)
+        if "mesh" in node:
+            _add_mesh(node["mesh"], world)
+        for child in node.get("children", []):
+            _walk(child, world)
+
+    scenes = gltf.get("scenes") or []
+    if scenes:
+        for root in scenes[gltf.get("scene", 0)].get("nodes", []):
+            _walk(root, np.eye(4))
+    else:
+        for i in range(len(gltf.get("meshes", []))):
+            _add_mesh(i, np.eye(4))
+
+    if not all_faces:
+        raise MeshFormatError("GLB contains no triangle primitives")
+    return np.concatenate(all_vertices), np.concatenate(all_faces)
+
+
+# ---------------------------------------------------------------------------
+# Quadric-error vertex clustering
+# ---------------------------------------------------------------------------
+
+# Upper-triangle entries of the symmetric 4x4 plane quadric pp^T
+_Q_ROWS, _Q_COLS = np.triu_indices(4)
+
+
+def _vertex_quadrics(vertices: np.ndarray, faces: np.ndarray) -> np.ndarray:
+    """Area-weighted sum of incident face plane quadrics per vertex, shape (N, 10)."""
+    v = vertices.astype(np.float64)
+    p0, p1, p2 = v[faces[:, 0]], v[faces[:, 1]], v[faces[:, 2]]
+    normal = np.cross(p1 - p0, p2 - p0)
+    double_area = np.linalg.norm(normal, axis=1)
+    ok = double_area > 0
+    unit = np.zeros_like(normal)
+    unit[ok] = normal[ok] / double_area[ok, None]
+    plane = np.concatenate([unit, -np.einsum("ij,ij->i", unit, p0)[:, None]], axis=1)
+    q = plane[:, _Q_ROWS] * plane[:, _Q_COLS] * (0.5 * double_area)[:, None]
+
+    out = np.zeros((len(vertices), len(_Q_ROWS)))
+    corners = faces.reshape(-1)
+    for k in range(q.shape[1]):
+        out[:, k] = np.bincount(corners, weights=np.repeat(q[:, k], 3), minlength=len(vertices))
+    return out
+
+
+def _cluster(vertices: np.ndarray, faces: np.ndarray, resolution: int):
+    """Bin vertices into a resolution³ grid.
+
+    Returns (cell_of_vertex, n_cells, remapped unique faces, cell lower corners, cell size).
+    """
+    lo = vertices.min(axis=0)
+    extent = float((vertices.max(axis=0) - lo).max()) or 1.0
+    cell_size = extent / resolution
+    ijk = np.minimum(((vertices - lo) / cell_size).astype(np.int64), resolution - 1)
+    keys = (ijk[:, 0] * (resolution + 1) + ijk[:, 1]) * (resolution + 1) + ijk[:, 2]
+    _, first, cell_of_vertex = np.unique(keys, return_index=True, return_inverse=True)
+    cell_of_vertex = cell_of_vertex.reshape(-1)
+    n_cells = len(first)
+    cell_lo = lo + ijk[first] * cell_size
+
+    f = cell_of_vertex[faces]
+    keep = (f[:, 0] != f[:, 1]) & (f[:, 1] != f[:, 2]) & (f[:, 0] != f[:, 2])
+    f = f[keep]
+    # Drop triangles that collapsed onto the same three cells (either winding)
+    _, first = np.unique(np.sort(f, axis=1), axis=0, return_index=True)
+    f = f[np.sort(first)]
+    return cell_of_vertex, n_cells, f, cell_lo, cell_size
+
+
+def _cell_positions(vertices, quadrics, cell_of_vertex, n_cells, cell_lo, cell_size) -> np.ndarray:
+    """Quadric-optimal point per cell, regularised toward the cell mean and clamped to the cell."""
+    q = np.zeros((n_cells, quadrics.shape[1]))
+    for k in range(quadrics.shape[1]):
+        q[:, k] = np.bincount(cell_of_vertex, weights=quadrics[:, k], minlength=n_cells)
+    counts = np.bincount(cell_of_vertex, minlength=n_cells)[:, None]
+    mean = np.stack(
+        [np.bincount(cell_of_vertex, weights=vertices[:, i].astype(np.float64), minlength=n_cells) for i in range(3)],
+        axis=1,
+    ) / counts
+
+    full = np.zeros((n_cells, 4, 4))
+    full[:, _Q_ROWS, _Q_COLS] = q
+    full[:, _Q_COLS, _Q_ROWS] = q
+    a, b = full[:, :3, :3], full[:, :3, 3]
+    # Minimise x^T A x + 2 b^T x + lam |x - mean|^2: flat/degenerate cells fall back to the mean
+    lam = 1e-3 * np.trace(a, axis1=1, axis2=2) / 3 + 1e-12
+    rhs = -b + lam[:, None] * mean
+    pos = np.linalg.solve(a + lam[:, None, None] * np.eye(3), rhs[..., None])[..., 0]
+
+    return np.clip(pos, cell_lo, cell_lo + cell_size).astype(np.float32)
+
+
+def decimate(
+    vertices: np.ndarray, faces: np.ndarray, target_faces: int, quadrics: Optional[np.ndarray] = None
+) -> tuple[np.ndarray, np.ndarray]:
+    """Reduce a mesh to at most target_faces triangles (returned unchanged if already below)."""
+    if len(faces) <= target_faces:
+        return vertices, faces
+    if quadrics is None:
+        quadrics = _vertex_quadrics(vertices, faces)
+
+    lo_res, hi_res = 1, 2048
+    best = None
+    while lo_res <= hi_res:
+        res = (lo_res + hi_res) // 2
+        clustered = _cluster(vertices, faces, res)
+        if len(clustered[2]) <= target_faces:
+            best = clustered
+            lo_res = res + 1
+        else:
+            hi_res = res - 1
+    if best is None:
+        best = _cluster(vertices, faces, 1)
+
+    cell_of_vertex, n_cells, new_faces, cell_lo, cell_size = best
+    positions = _cell_positions(vertices, quadrics, cell_of_vertex, n_cells, cell_lo, cell_size)
+    # Compact away cells no surviving triangle references
+    used, remapped = np.unique(new_faces, return_inverse=True)
+    return positions[used], remapped.reshape(-1, 3)
+
+
+# ---------------------------------------------------------------------------
+# GLB output
+# ---------------------------------------------------------------------------
+
+def vertex_normals(vertices: np.ndarray, faces: np.ndarray) -> np.ndarray:
+    v = vertices.astype(np.float64)
+    face_n = np.cross(v[faces[:, 1]] - v[faces[:, 0]], v[faces[:, 2]] - v[faces[:, 0]])
+    normals = np.stack(
+        [np.bincount(faces.reshape(-1), weights=np.repeat(face_n[:, i], 3), minlength=len(v)) for i in range(3)],
+        axis=1,
+    )
+    length = np.linalg.norm(normals, axis=1, keepdims=True)
+    normals = np.divide(normals, length, out=np.zeros_like(normals), where=length > 0)
+    return normals.astype(np.float32)
+
+
+def _pad4(blob: bytes, fill: bytes = b"\x00") -> bytes:
+    return blob + fill * (-len(blob) % 4)
+
+
+def to_glb(vertices: np.ndarray, faces: np.ndarray) -> bytes:
+    """Serialise one indexed triangle mesh (positions + normals) as glTF 2.0 binary."""
+    positions = np.ascontiguousarray(vertices, dtype="<f4")
+    normals = vertex_normals(positions, faces).astype("<f4")
+    wide = len(positions) > 65535
+    indices = np.ascontiguousarray(faces, dtype="<u4" if wide else "<u2").reshape(-1)
+
+    index_blob = _pad4(indices.tobytes())
+    pos_blob, normal_blob = positions.tobytes(), normals.tobytes()
+    bin_chunk = index_blob + pos_blob + normal_blob
+
+    gltf = {
+        "asset": {"version": "2.0", "generator": "SwapSpec mesh_processor"},
+        "scene": 0,
+        "scenes": [{"nodes": [0]}],
+        "nodes": [{"mesh": 0}],
+        "meshes": [{"primitives": [{"attributes": {"POSITION": 1, "NORMAL": 2}, "indices": 0, "mode": 4}]}],
+        "buffers": [{"byteLength": len(bin_chunk)}],
+        "bufferViews": [
+            {"buffer": 0, "byteOffset": 0, "byteLength": indices.nbytes, "target": 34963},
+            {"buffer": 0, "byteOffset": len(index_blob), "byteLength": len(pos_blob), "target": 34962},
+            {"buffer": 0, "byteOffset": len(index_blob) + len(pos_blob), "byteLength": len(normal_blob), "target": 34962},
+        ],
+        "accessors": [
+            {"bufferView": 0, "componentType": 5125 if wide else 5123, "count": int(indices.size), "type": "SCALAR"},
+            {
+                "bufferView": 1, "componentType": 5126, "count": len(positions), "type": "VEC3",
+                "min": positions.min(axis=0).tolist(), "max": positions.max(axis=0).tolist(),
+            },
+            {"bufferView": 2, "componentType": 5126, "count": len(normals), "type": "VEC3"},
+        ],
+    }
+    json_chunk = _pad4(json.dumps(gltf, separators=(",", ":")).encode(), b" ")
+    total = 12 + 8 + len(json_chunk) + 8 + len(bin_chunk)
+    return b"".join([
+        struct.pack("<III", _GLB_MAGIC, 2, total),
+        struct.pack("<II", len(json_chunk), _CHUNK_JSON), json_chunk,
+        struct.pack("<II", len(bin_chunk), _CHUNK_BIN), bin_chunk,
+    ])
+
+
+# ---------------------------------------------------------------------------
+# LOD pipeline
+# ---------------------------------------------------------------------------
+
+@dataclass
+class MeshLODs:
+    source_triangles: int
+    # level → (glb bytes, triangle count), in LOD_LEVELS order
+    levels: dict[str, tuple[bytes, int]] = field(default_factory=dict)
+
+    @property
+    def triangle_count(self) -> int:
+        return self.levels["full"][1]
+
+
+def build_lods(path: Path, max_triangles: int) -> MeshLODs:
+    """Parse a mesh file and produce full / 50% / 25% GLB levels. CPU-bound — run in a thread."""
+    vertices, faces = load_mesh(path)
+    result = MeshLODs(source_triangles=len(faces))
+
+    full_v, full_f = decimate(vertices, faces, max_triangles)
+    quadrics = _vertex_quadrics(full_v, full_f)
+    for level, ratio in LOD_LEVELS:
+        if ratio == 1.0:
+            v, f = full_v, full_f
+        else:
+            v, f = decimate(full_v, full_f, max(1, int(len(full_f) * ratio)), quadrics=quadrics)
+        result.levels[level] = (to_glb(v, f), len(f))
+    return result
+
+
+async def process_uploaded_mesh(
+    local_path: Path,
+    stored_path: str,
+    mesh_url: str,
+    engine_id: Optional[str] = None,
+    vehicle_id: Optional[str] = None,
+) -> None:
+    """Background task: build LODs for an uploaded mesh and record them on the Engine / Vehicle.
+
+    Owns local_path and deletes it when done. Failures are logged — the
+    original upload stays usable as mesh_file_url / bay_scan_mesh_url.
+    """
+    import asyncio
+    from app.database import worker_session_maker
+    from app.models.engine import Engine
+    from app.models.vehicle import Vehicle
+    from app.services.bay_sdf import generate_bay_sdf
+    from app.services.clearance import invalidate_mesh
+    from app.services.storage import StorageService
+    from app.utils.http_cache import response_cache
+
+    budget = settings.mesh_engine_max_triangles if engine_id else settings.mesh_bay_max_triangles
+    try:
+        lods = await asyncio.to_thread(build_lods, local_path, budget)
+        stem = Path(stored_path).stem
+        items = [(f"lod/{stem}/{level}.glb", data, GLB_CONTENT_TYPE) for level, (data, _) in lods.levels.items()]
+        urls = await StorageService().upload_many(items, bucket="meshes")
+        if any(url is None for url in urls):
+            logger.warning(f"LOD upload failed for mesh {stored_path}")
+            return
+        lod_urls = dict(zip(lods.levels, urls))
+
+        async with worker_session_maker() as db:
+            if engine_id:
+                row = await db.get(Engine, engine_id)
+                if row is None:
+                    return
+                replaced = [row.mesh_file_url, *(row.mesh_lod_urls or {}).values()]
+                row.mesh_file_url = mesh_url
+                row.mesh_triangle_count = lods.triangle_count
+                row.mesh_lod_urls = lod_urls
+            else:
+                row = await db.get(Vehicle, vehicle_id)
+                if row is None:
+                    return
+                replaced = [row.bay_scan_mesh_url, *(row.bay_scan_lod_urls or {}).values()]
+                row.bay_scan_mesh_url = mesh_url
+                row.bay_scan_triangle_count = lods.triangle_count
+                row.bay_scan_lod_urls = lod_urls
+                # The old field describes the old scan; generate_bay_sdf fills it in below
+                row.bay_sdf_url = None
+            await db.commit()
+        response_cache.invalidate(f"engine:{engine_id}" if engine_id else f"vehicle:{vehicle_id}")
+        for url in replaced:
+            invalidate_mesh(url)
+        logger.info(
+            f"Mesh {stored_path}: {lods.source_triangles} → "
+            + ", ".join(f"{level}={tris}" for level, (_, tris) in lods.levels.items())
+        )
+        if vehicle_id:
+            await generate_bay_sdf(vehicle_id)
+    except MeshFormatError as exc:
+        logger.warning(f"Mesh {stored_path} not processed: {exc}")
+    except Exception as exc:
+        logger.error(f"Mesh processing failed for {stored_path}: {exc}")
+    finally:
+        local_path.unlink(missing_ok=True)
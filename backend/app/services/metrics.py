@@ -0,0 +1,348 @@
+"""
+In-process performance metrics with Prometheus text exposition.
+
+Data flow:
+  HTTP middleware (app.main) → start_request() sets a per-request RequestStats
+    → SQLAlchemy cursor events (install_db_instrumentation) append each query's
+      duration to the current RequestStats and the db_query histogram
+    → external API / LLM calls wrap themselves in track_external(service)
+      and report token usage via record_llm_usage(...)
+  → finish_request() observes route latency + per-request DB totals,
+    optionally logs slow requests with their query breakdown, and closes the
+    RequestStats (background tasks started by the request stop adding to it)
+  → GET /metrics renders everything via render_prometheus()
+
+Metrics are per process; scrape each worker (or run one worker per pod).
+No prometheus_client dependency — the text format is simple enough to emit.
+"""
+from __future__ import annotations
+
+import contextvars
+import logging
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+DB_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+EXTERNAL_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 500)
+
+
+# ---------------------------------------------------------------------------
+# Metric primitives
+# ---------------------------------------------------------------------------
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _fmt_bound(bound: float) -> str:
+    return "+Inf" if bound == float("inf") else repr(float(bound))
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labels: tuple[str, ...] = ()):
+        self.name, self.help, self.labels = name, help_text, labels
+        self._values: dict[tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def value(self, *label_values: str) -> float:
+        return self._values.get(label_values, 0.0)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for lv, v in sorted(self._values.items()):
+                lines.append(f"{self.name}{_fmt_labels(self.labels, lv)} {v}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labels: tuple[str, ...] = (), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.labels = name, help_text, labels
+        self.buckets = tuple(buckets) + (float("inf"),)
+        # label values → [bucket counts..., sum, count]
+        self._values: dict[tuple[str, ...], list[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str) -> None:
+        with self._lock:
+            row = self._values.get(label_values)
+            if row is None:
+                row = self._values[label_values] = [0.0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    row[i] += 1
+                    break
+            row[-2] += value
+            row[-1] += 1
+
+    def count(self, *label_values: str) -> int:
+        row = self._values.get(label_values)
+        return int(row[-1]) if row else 0
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for lv, row in sorted(self._values.items()):
+                cumulative = 0.0
+                for i, bound in enumerate(self.buckets):
+                    cumulative += row[i]
+                    le = f'le="{_fmt_bound(bound)}"'
+                    lines.append(f"{self.name}_bucket{_fmt_labels(self.labels, lv, le)} {cumulative}")
+                lines.append(f"{self.name}_sum{_fmt_labels(self.labels, lv)} {row[-2]}")
+                lines.append(f"{self.name}_count{_fmt_labels(self.labels, lv)} {row[-1]}")
+        return lines
+
+
+# ---------------------------------------------------------------------------
+# Registry
+# ---------------------------------------------------------------------------
+
+http_requests = Counter(
+    "swapspec_http_requests_total", "HTTP requests by route and status.", ("method", "route", "status"),
+)
+http_latency = Histogram(
+    "swapspec_http_request_duration_seconds", "HTTP request latency by route.", ("method", "route"),
+)
+http_db_queries = Histogram(
+    "swapspec_http_request_db_queries", "DB queries issued per HTTP request.", ("method", "route"),
+    buckets=COUNT_BUCKETS,
+)
+http_db_time = Histogram(
+    "swapspec_http_request_db_seconds", "Total DB time per HTTP request.", ("method", "route"),
+    buckets=DB_BUCKETS,
+)
+db_queries = Histogram(
+    "swapspec_db_query_duration_seconds", "DB statement latency by engine and operation.",
+    ("engine", "operation"), buckets=DB_BUCKETS,
+)
+external_calls = Histogram(
+    "swapspec_external_api_duration_seconds", "External API call latency.",
+    ("service", "outcome"), buckets=EXTERNAL_BUCKETS,
+)
+llm_tokens = Counter(
+    "swapspec_llm_tokens_total", "LLM tokens consumed.", ("provider", "model", "kind"),
+)
+
+_REGISTRY = [http_requests, http_latency, http_db_queries, http_db_time, db_queries, external_calls, llm_tokens]
+
+
+# ---------------------------------------------------------------------------
+# Per-request stats
+# ---------------------------------------------------------------------------
+
+@dataclass
+class RequestStats:
+    started: float = field(default_factory=time.perf_counter)
+    db_count: int = 0
+    db_seconds: float = 0.0
+    # (duration, normalized statement) — kept only for slow-request logging
+    queries: list[tuple[float, str]] = field(default_factory=list)
+    # Set by finish_request. BackgroundTasks run after the response but inherit
+    # the request's context; their queries are not counted against it.
+    closed: bool = False
+
+
+_current: contextvars.ContextVar[Optional[RequestStats]] = contextvars.ContextVar(
+    "swapspec_request_stats", default=None
+)
+
+
+def start_request() -> tuple[RequestStats, contextvars.Token]:
+    stats = RequestStats()
+    return stats, _current.set(stats)
+
+
+def finish_request(
+    stats: RequestStats,
+    token: contextvars.Token,
+    method: str,
+    route: str,
+    status_code: int,
+) -> float:
+    _current.reset(token)
+    stats.closed = True
+    elapsed = time.perf_counter() - stats.started
+    http_requests.inc(method, route, str(status_code))
+    http_latency.observe(elapsed, method, route)
+    http_db_queries.observe(stats.db_count, method, route)
+    http_db_time.observe(stats.db_seconds, method, route)
+
+    threshold_ms = settings.slow_request_log_ms
+    if threshold_ms and elapsed * 1000 >= threshold_ms:
+        top = sorted(stats.queries, reverse=True)[:5]
+        breakdown = "; ".join(f"{d * 1000:.1f}ms {q}" for d, q in top)
+        logger.warning(
+            f"Slow request {method} {route} → {status_code} in {elapsed * 1000:.0f}ms "
+            f"({stats.db_count} queries, {stats.db_seconds * 1000:.0f}ms DB). Top: {breakdown}"
+        )
+    stats.queries = []
+    return elapsed
+
+
+# ---------------------------------------------------------------------------
+# DB instrumentation
+# ---------------------------------------------------------------------------
+
+_WS = re.compile(r"\s+")
+
+
+def _operation(statement: str) -> str:
+    head = statement.lstrip()[:10].split(None, 1)
+    return head[0].upper() if head else "OTHER"
+
+
+def install_db_instrumentation(engines: dict) -> None:
+    """Attach cursor-execute timing hooks to each {name: AsyncEngine}."""
+    from sqlalchemy import event
+
+    for name, async_engine in engines.items():
+        sync_engine = async_engine.sync_engine
+        if getattr(sync_engine, "_swapspec_metrics", False):
+            continue
+        sync_engine._swapspec_metrics = True
+
+        event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(sync_engine, "after_cursor_execute", _make_after_cursor_execute(name))
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("swapspec_query_start", []).append(time.perf_counter())
+
+
+def _make_after_cursor_execute(engine_name: str):
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("swapspec_query_start")
+        if not starts:
+            return
+        duration = time.perf_counter() - starts.pop()
+        db_queries.observe(duration, engine_name, _operation(statement))
+        stats = _current.get()
+        if stats is not None and not stats.closed:
+            stats.db_count += 1
+            stats.db_seconds += duration
+            if settings.slow_request_log_ms:
+                stats.queries.append((duration, _WS.sub(" ", statement)[:160]))
+
+    return _after_cursor_execute
+
+
+# ---------------------------------------------------------------------------
+# External APIs / LLMs
+# ---------------------------------------------------------------------------
+
+class track_external:
+    """Time an outbound call; usable as ``with`` or ``async with``.
+
+        async with httpx.AsyncClient() as client, track_external("carquery"):
+            ...
+    """
+
+    def __init__(self, service: str):
+        self.service = service
+        self._start = 0.0
+
+    def __enter__(self) -> "track_external":
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        outcome = "ok" if exc_type is None else "error"
+        external_calls.observe(time.perf_counter() - self._start, self.service, outcome)
+
+    async def __aenter__(self) -> "track_external":
+        return self.__enter__()
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        self.__exit__(exc_type, exc, tb)
+
+
+def record_llm_usage(provider: str, model: str, response) -> None:
+    """Record token usage from an Anthropic or Gemini response object (best-effort)."""
+    try:
+        if provider == "anthropic":
+            usage = getattr(response, "usage", None)
+            counts = {
+                "input": getattr(usage, "input_tokens", None),
+                "output": getattr(usage, "output_tokens", None),
+            }
+        else:
+            usage = getattr(response, "usage_metadata", None)
+            counts = {
+                "input": getattr(usage, "prompt_token_count", None),
+                "output": getattr(usage, "candidates_token_count", None),
+            }
+        for kind, n in counts.items():
+            if isinstance(n, int) and n > 0:
+                llm_tokens.inc(provider, model, kind, amount=n)
+    except Exception:
+        pass
+
+
+# ---------------------------------------------------------------------------
+# Exposition
+# ---------------------------------------------------------------------------
+
+def _pool_lines() -> list[str]:
+    from app.database import pool_status
+
+    lines = [
+        "# HELP swapspec_db_pool_checked_out Connections currently checked out.",
+        "# TYPE swapspec_db_pool_checked_out gauge",
+    ]
+    pools = pool_status()
+    for name, p in pools.items():
+        if "checked_out" in p:
+            lines.append(f'swapspec_db_pool_checked_out{{pool="{name}"}} {p["checked_out"]}')
+    lines += [
+        "# HELP swapspec_db_pool_checkout_wait_seconds Time spent waiting for a pooled connection.",
+        "# TYPE swapspec_db_pool_checkout_wait_seconds histogram",
+    ]
+    for name, p in pools.items():
+        if "wait_buckets" not in p:
+            continue
+        cumulative = 0
+        for le, c in p["wait_buckets"].items():
+            cumulative += c
+            lines.append(f'swapspec_db_pool_checkout_wait_seconds_bucket{{pool="{name}",le="{le}"}} {cumulative}')
+        lines.append(f'swapspec_db_pool_checkout_wait_seconds_sum{{pool="{name}"}} {p["wait_seconds_total"]}')
+        lines.append(f'swapspec_db_pool_checkout_wait_seconds_count{{pool="{name}"}} {p["checkouts"]}')
+    lines += [
+        "# HELP swapspec_db_pool_checkout_timeouts_total Pool checkouts that timed out.",
+        "# TYPE swapspec_db_pool_checkout_timeouts_total counter",
+    ]
+    for name, p in pools.items():
+        if "timeouts" in p:
+            lines.append(f'swapspec_db_pool_checkout_timeouts_total{{pool="{name}"}} {p["timeouts"]}')
+    return lines
+
+
+def render_prometheus() -> str:
+    lines: list[str] = []
+    for metric in _REGISTRY:
+        lines.extend(metric.render())
+    try:
+        lines.extend(_pool_lines())
+    except Exception:
+        pass
+    return "\n".join(lines) + "\n"
@@ -1,51 +1,187 @@
-"""PDF ingestor: extracts text from uploaded PDF files and upserts as ManualChunk rows."""
+"""PDF ingestor: extracts text from uploaded PDF files and upserts as ManualChunk rows.
+
+Data flow:
+  POST /api/manuals/upload (.pdf) → PDFIngestor.ingest_pdf()
+    → page count (pypdf, in a thread)
+    → page ranges of PDF_PAGES_PER_TASK → _extract_range() in a process pool
+      of PDF_EXTRACT_WORKERS (pypdf is pure Python and CPU-bound)
+      (each page also split into chunks there, app/services/chunker.py)
+    → ranges consumed in page order as they finish → section paths
+      (optionally from detected headings, carried forward across pages)
+    → RAGIndexer.upsert_chunks() every ~PDF_UPSERT_BATCH chunks → commit
+"""
 from __future__ import annotations
 
+import asyncio
 import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
-from typing import Optional
+from typing import AsyncIterator, Optional
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.config import get_settings
+from app.services.chunker import chunk_blocks, is_heading, text_blocks
+
 logger = logging.getLogger(__name__)
+settings = get_settings()
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+_HEADING_LINES = 3
+
+
+def detect_heading(text: str) -> Optional[str]:
+    """Return the page's heading, if one of its first lines looks like one."""
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    for line in lines[:_HEADING_LINES]:
+        if is_heading(line):
+            return " ".join(line.split())
+    return None
+
+
+def _extract_range(
+    pdf_path: str, start: int, stop: int, detect_headings: bool,
+) -> list[tuple[int, str, Optional[str], list[str]]]:
+    """Runs in a pool process. Returns (page number, text, heading, chunks) for
+    pages [start, stop) that have text; page numbers are 1-based."""
+    from pypdf import PdfReader
+
+    reader = PdfReader(pdf_path)
+    pages = []
+    for i in range(start, stop):
+        try:
+            text = reader.pages[i].extract_text() or ""
+        except Exception as exc:
+            logger.debug("Failed to extract page %d from %s: %s", i + 1, pdf_path, exc)
+            continue
+        # Strip null bytes — PostgreSQL UTF-8 rejects \x00
+        text = text.replace("\x00", "").strip()
+        if text:
+            heading = detect_heading(text) if detect_headings else None
+            pages.append((i + 1, text, heading, chunk_blocks(text_blocks(text))))
+    return pages
+
+
+def _page_count(pdf_path: str) -> int:
+    from pypdf import PdfReader
+    return len(PdfReader(pdf_path).pages)
+
+
+def _extract_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # spawn: forking a process that holds event-loop and DB threads is unsafe
+        _pool = ProcessPoolExecutor(
+            max_workers=max(1, settings.pdf_extract_workers),
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _pool
+
+
+def shutdown_extract_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def page_ranges(page_count: int, per_task: int) -> list[tuple[int, int]]:
+    per_task = max(1, per_task)
+    return [(start, min(start + per_task, page_count)) for start in range(0, page_count, per_task)]
+
+
+class _Sections:
+    """Assigns section paths in page order; a detected heading applies to its
+    page and every following page until the next heading."""
+
+    def __init__(self):
+        self.heading: Optional[str] = None
+
+    def __call__(self, page: int, heading: Optional[str]) -> str:
+        if heading:
+            self.heading = heading
+        if self.heading:
+            return f"{self.heading} > Page {page}"
+        return f"Page {page}"
 
 
 class PDFIngestor:
-    def extract_text(self, pdf_path: Path) -> list[dict]:
+    def extract_text(self, pdf_path: Path, detect_headings: bool = False) -> list[dict]:
         """
-        Extract text from a PDF file page by page.
+        Extract text from a PDF file page by page, in this process.
 
         Returns a list of page dicts:
-            [{"page": 1, "content": "...", "section_path": "Page 1"}, ...]
+            [{"page": 1, "content": "...", "section_path": "Page 1", "chunks": [...]}, ...]
 
-        Falls back to an empty list on parse failure.
+        chunks is the page content split by app/services/chunker.py.
+        With detect_headings, section_path is "<heading> > Page N" under the
+        most recent heading. Falls back to an empty list on parse failure.
         """
         try:
-            from pypdf import PdfReader
+            import pypdf  # noqa: F401
         except ImportError:
             logger.error("pypdf not installed — PDF ingestion unavailable. Run: pip install pypdf>=4.0.0")
             return []
 
-        pages: list[dict] = []
         try:
-            reader = PdfReader(str(pdf_path))
-            for i, page in enumerate(reader.pages, start=1):
-                try:
-                    text = page.extract_text() or ""
-                    # Strip null bytes — PostgreSQL UTF-8 rejects \x00
-                    text = text.replace("\x00", "").strip()
-                    if text:
-                        pages.append({
-                            "page": i,
-                            "content": text,
-                            "section_path": f"Page {i}",
-                        })
-                except Exception as exc:
-                    logger.debug("Failed to extract page %d from %s: %s", i, pdf_path, exc)
+            pages = _extract_range(str(pdf_path), 0, _page_count(str(pdf_path)), detect_headings)
         except Exception as exc:
             logger.warning("Failed to parse PDF %s: %s", pdf_path, exc)
+            return []
+        section = _Sections()
+        return [
+            {"page": page, "content": text, "section_path": section(page, heading), "chunks": chunks}
+            for page, text, heading, chunks in pages
+        ]
 
-        return pages
+    async def iter_pages(self, pdf_path: Path, detect_headings: bool = False) -> AsyncIterator[dict]:
+        """Async, parallel extract_text: page ranges are extracted in the
+        process pool and yielded in page order as soon as each range (and every
+        range before it) is done. Small PDFs are read in a thread instead."""
+        try:
+            import pypdf  # noqa: F401
+        except ImportError:
+            logger.error("pypdf not installed — PDF ingestion unavailable. Run: pip install pypdf>=4.0.0")
+            return
+
+        path = str(pdf_path)
+        try:
+            page_count = await asyncio.to_thread(_page_count, path)
+        except Exception as exc:
+            logger.warning("Failed to parse PDF %s: %s", pdf_path, exc)
+            return
+
+        ranges = page_ranges(page_count, settings.pdf_pages_per_task)
+        loop = asyncio.get_running_loop()
+        if len(ranges) > 1:
+            pool = _extract_pool()
+            tasks = [
+                loop.run_in_executor(pool, _extract_range, path, start, stop, detect_headings)
+                for start, stop in ranges
+            ]
+        else:
+            tasks = [asyncio.ensure_future(asyncio.to_thread(_extract_range, path, 0, page_count, detect_headings))]
+
+        section = _Sections()
+        try:
+            for task in tasks:
+                try:
+                    pages = await task
+                except BrokenProcessPool:
+                    # A worker died (e.g. OOM); later uploads get a fresh pool
+                    shutdown_extract_pool()
+                    raise
+                except Exception as exc:
+                    logger.warning("Failed to extract a page range from %s: %s", pdf_path, exc)
+                    continue
+                for page, text, heading, chunks in pages:
+                    yield {"page": page, "content": text, "section_path": section(page, heading), "chunks": chunks}
+        finally:
+            for task in tasks:
+                task.cancel()
 
     async def ingest_pdf(
         self,
@@ -58,38 +194,46 @@ class PDFIngestor:
         engine_id: Optional[str],
         transmission_id: Optional[str],
         db: AsyncSession,
+        detect_headings: bool = False,
     ) -> int:
         """
-        Extract pages from a PDF and upsert them as ManualChunk rows.
+        Extract pages from a PDF and upsert their chunks as ManualChunk rows,
+        ~PDF_UPSERT_BATCH chunks (whole pages) per upsert + commit while
+        extraction continues.
 
         Returns the number of chunks written.
         """
+        from app.services.chunker import split_page
         from app.services.rag_indexer import RAGIndexer
 
-        pages = self.extract_text(pdf_path)
-        if not pages:
-            return 0
-
         indexer = RAGIndexer()
+        batch: list[dict] = []
         count = 0
-        for page in pages:
-            await indexer._upsert_chunk(
-                {
-                    "vehicle_make": make,
-                    "vehicle_model": model,
-                    "vehicle_year": year,
-                    "vehicle_id": vehicle_id,
-                    "section_path": f"Uploaded PDF > {page['section_path']}",
-                    "content": page["content"],
-                    "data_source": "user_uploaded",
-                    "confidence": "medium",
-                    "scope": scope,
-                    "engine_id": engine_id,
-                    "transmission_id": transmission_id,
-                },
-                db,
-            )
-            count += 1
-
-        await db.commit()
+
+        async def _flush():
+            nonlocal batch, count
+            chunks, batch = batch, []
+            await indexer.upsert_chunks(chunks, db)
+            await db.commit()
+            count += len(chunks)
+
+        async for page in self.iter_pages(pdf_path, detect_headings):
+            batch += split_page({
+                "vehicle_make": make,
+                "vehicle_model": model,
+                "vehicle_year": year,
+                "vehicle_id": vehicle_id,
+                "section_path": f"Uploaded PDF > {page['section_path']}",
+                "content": page["content"],
+                "data_source": "user_uploaded",
+                "confidence": "medium",
+                "scope": scope,
+                "engine_id": engine_id,
+                "transmission_id": transmission_id,
+            }, page["chunks"])
+            if len(batch) >= max(1, settings.pdf_upsert_batch):
+                await _flush()
+
+        if batch:
+            await _flush()
         return count
@@ -1,8 +1,35 @@
+"""
+Build report PDFs.
+
+Data flow:
+  GET /api/builds/{id}/export/pdf → PDFService.generate_build_report(BuildExport)
+    → sha256 of the export payload → in-memory LRU hit: return the cached bytes
+    → miss: render build_report.html (template compiled once, at import)
+    → WeasyPrint write_pdf() in a process pool of PDF_RENDER_WORKERS processes
+      (CPU-heavy and synchronous, so it never runs on the event loop)
+    → cache → bytes
+
+A cached report keeps the "generated" timestamp of its first render; any
+change to the build, its parts or its recommendations changes the payload
+and so renders afresh.
+"""
+import asyncio
+import hashlib
+import logging
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
 from datetime import datetime, timezone
+from typing import Optional
 from jinja2 import Environment, FileSystemLoader
+from app.config import get_settings
 from app.schemas.build import BuildExport
 
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
 # Try to import weasyprint, but handle missing system dependencies gracefully
 _weasyprint_available = False
 _weasyprint_error = None
@@ -13,20 +40,49 @@ try:
 except OSError as e:
     _weasyprint_error = str(e)
 
+_templates_path = Path(__file__).parent.parent / "templates"
+_env = Environment(loader=FileSystemLoader(str(_templates_path)))
+BUILD_REPORT_TEMPLATE = _env.get_template("build_report.html")
 
-class PDFService:
-    def __init__(self):
-        templates_path = Path(__file__).parent.parent / "templates"
-        templates_path.mkdir(parents=True, exist_ok=True)
-        self.env = Environment(loader=FileSystemLoader(str(templates_path)))
+_pool: Optional[ProcessPoolExecutor] = None
+_reports: "OrderedDict[str, bytes]" = OrderedDict()
+
+
+def _write_pdf(html_content: str) -> bytes:
+    """Runs in a pool process."""
+    return HTML(string=html_content).write_pdf()
+
+
+def _render_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # spawn: forking a process that holds event-loop and DB threads is unsafe
+        _pool = ProcessPoolExecutor(
+            max_workers=max(1, settings.pdf_render_workers),
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _pool
 
+
+def shutdown_render_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def payload_hash(export_data: BuildExport) -> str:
+    return hashlib.sha256(export_data.model_dump_json().encode()).hexdigest()
+
+
+class PDFService:
     @property
     def is_available(self) -> bool:
         """Check if PDF generation is available."""
         return _weasyprint_available
 
     async def generate_build_report(self, export_data: BuildExport) -> bytes:
-        """Generate a PDF build report from export data."""
+        """Generate a PDF build report from export data (cached by payload)."""
         if not _weasyprint_available:
             raise RuntimeError(
                 f"PDF generation is not available. WeasyPrint system dependencies are missing. "
@@ -35,7 +91,11 @@ class PDFService:
                 f"Original error: {_weasyprint_error}"
             )
 
-        template = self.env.get_template("build_report.html")
+        key = payload_hash(export_data)
+        cached = _reports.get(key)
+        if cached is not None:
+            _reports.move_to_end(key)
+            return cached
 
         # Prepare template context
         context = {
@@ -47,9 +107,21 @@ class PDFService:
             "recommendations": export_data.recommendations or [],
         }
 
-        # Render HTML
-        html_content = template.render(**context)
+        # Render HTML, then convert to PDF off the event loop
+        html_content = BUILD_REPORT_TEMPLATE.render(**context)
+        pdf_bytes = await self._render(html_content)
 
-        # Convert to PDF
-        pdf_bytes = HTML(string=html_content).write_pdf()
+        _reports[key] = pdf_bytes
+        while len(_reports) > max(0, settings.pdf_cache_entries):
+            _reports.popitem(last=False)
         return pdf_bytes
+
+    async def _render(self, html_content: str) -> bytes:
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(_render_pool(), _write_pdf, html_content)
+        except BrokenProcessPool as e:
+            # A worker died (e.g. OOM); start a fresh pool for the next export
+            logger.error(f"PDF render pool broke: {e}")
+            shutdown_render_pool()
+            raise RuntimeError("PDF rendering failed, please retry") from e
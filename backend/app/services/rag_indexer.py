@@ -1,7 +1,8 @@
 from __future__ import annotations
 
-import re
+import asyncio
 import uuid
+from dataclasses import dataclass
 from html.parser import HTMLParser
 from pathlib import Path
 from typing import TYPE_CHECKING, Any, Callable, Iterator, Optional
@@ -9,7 +10,13 @@ from typing import TYPE_CHECKING, Any, Callable, Iterator, Optional
 from sqlalchemy import select, and_, delete as sa_delete, text
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.config import get_settings
 from app.models.manual_chunk import ManualChunk
+from app.services.chunker import Block, chunk_blocks, html_blocks, page_id, split_page, text_blocks
+from app.services.diagram_store import DiagramStore
+from app.services.manual_index import ManualIndex, path_section
+
+settings = get_settings()
 
 if TYPE_CHECKING:
     from app.services.storage import StorageService
@@ -30,39 +37,37 @@ SOURCE_RANK: dict[str, int] = {
 }
 
 # Refresh the DB connection after this many chunks when a session_factory is provided.
-# Prevents pgBouncer from killing long-running indexing connections.
-_SESSION_REFRESH_EVERY = 500
+# Prevents pgBouncer from killing long-running indexing connections. Workers on a
+# direct (non-pooler) connection keep one session for the whole run (0 = never).
+_SESSION_REFRESH_EVERY = 0 if settings.database_direct_url else 500
 
+# Image-only pages collected before their diagram uploads run as one concurrent batch
+_IMAGE_BATCH = 16
 
-# ---------------------------------------------------------------------------
-# HTML parsers
-# ---------------------------------------------------------------------------
+# Sources index_manual writes from a manual directory. Only these are compared
+# against the pages found on disk; uploads and gap fills are never removed.
+MANUAL_SOURCES = ("charm_li", "charm_li_vision", "charm_li_image", "charm_li_stub")
 
-class _TextExtractor(HTMLParser):
-    """Minimal HTML tag stripper using stdlib html.parser."""
+# Stale pages deleted per statement
+_DELETE_BATCH = 500
 
-    def __init__(self):
-        super().__init__()
-        self._parts: list[str] = []
-        self._skip_tags = {"script", "style", "head"}
-        self._in_skip = 0
 
-    def handle_starttag(self, tag: str, attrs):
-        if tag.lower() in self._skip_tags:
-            self._in_skip += 1
+@dataclass
+class IndexStats:
+    """Throughput counters filled in by RAGIndexer.index_manual (copied onto IngestJob).
 
-    def handle_endtag(self, tag: str):
-        if tag.lower() in self._skip_tags and self._in_skip > 0:
-            self._in_skip -= 1
+    pages_skipped counts pages whose content hash matched the index;
+    pages_removed counts indexed pages no longer in the manual."""
+    pages_parsed: int = 0
+    pages_skipped: int = 0
+    pages_removed: int = 0
+    vision_calls: int = 0
+    upsert_batches: int = 0
 
-    def handle_data(self, data: str):
-        if not self._in_skip:
-            self._parts.append(data)
-
-    def get_text(self) -> str:
-        raw = " ".join(self._parts)
-        return re.sub(r"\s+", " ", raw).strip()
 
+# ---------------------------------------------------------------------------
+# HTML parsers
+# ---------------------------------------------------------------------------
 
 class _ImageSrcExtractor(HTMLParser):
     """Extracts the first <img src="..."> from an HTML file."""
@@ -131,6 +136,76 @@ def _resolve_image_path(html_path: Path, img_src: str) -> Optional[Path]:
     return None
 
 
+def _image_chunk(base: dict, image_url: str) -> dict:
+    """chunk_data for an image-only page whose diagram is stored at image_url."""
+    return {
+        **base,
+        "content": f"[Diagram: {base['section_path']}] — visual content only",
+        "data_source": "charm_li_image",
+        "confidence": "low",
+        "source_url": image_url,
+    }
+
+
+_UPSERT_SQL = """
+    INSERT INTO manual_chunks (
+        id, vehicle_make, vehicle_model, vehicle_year, vehicle_id,
+        section_path, content, page_id, chunk_ordinal, content_hash, data_source, confidence,
+        source_url, scope, engine_id, transmission_id, source_priority, created_at
+    ) VALUES (
+        :id, :vehicle_make, :vehicle_model, :vehicle_year, :vehicle_id,
+        :section_path, :content, :page_id, :chunk_ordinal, :content_hash, :data_source, :confidence,
+        :source_url, :scope, :engine_id, :transmission_id, :source_priority, NOW()
+    )
+    ON CONFLICT (
+        vehicle_make, vehicle_model, vehicle_year, section_path, scope,
+        COALESCE(engine_id, ''), COALESCE(transmission_id, ''), chunk_ordinal
+    ) DO UPDATE SET
+        content        = EXCLUDED.content,
+        page_id        = EXCLUDED.page_id,
+        data_source    = EXCLUDED.data_source,
+        confidence     = EXCLUDED.confidence,
+        source_url     = COALESCE(EXCLUDED.source_url, manual_chunks.source_url),
+        vehicle_id     = COALESCE(EXCLUDED.vehicle_id, manual_chunks.vehicle_id),
+        source_priority = EXCLUDED.source_priority
+    WHERE EXCLUDED.source_priority >= manual_chunks.source_priority
+"""
+
+# Chunks left over from a page that used to split into more chunks
+_TRIM_SQL = """
+    DELETE FROM manual_chunks
+    WHERE page_id = :page_id AND chunk_ordinal >= :chunk_count AND source_priority <= :source_priority
+"""
+
+# Records that a page was indexed from this content, including rows the
+# precedence check kept (so an unchanged page is skipped next time either way)
+_STAMP_SQL = """
+    UPDATE manual_chunks SET content_hash = :content_hash WHERE page_id = :page_id
+"""
+
+
+def _upsert_params(chunk_data: dict) -> dict:
+    return {
+        "id": str(uuid.uuid4()),
+        "vehicle_make": chunk_data["vehicle_make"],
+        "vehicle_model": chunk_data["vehicle_model"],
+        "vehicle_year": chunk_data["vehicle_year"],
+        "vehicle_id": chunk_data.get("vehicle_id"),
+        "section_path": chunk_data["section_path"],
+        "content": chunk_data["content"],
+        "page_id": chunk_data.get("page_id") or page_id(chunk_data),
+        "chunk_ordinal": chunk_data.get("chunk_ordinal", 0),
+        "content_hash": chunk_data.get("content_hash"),
+        "data_source": chunk_data["data_source"],
+        "confidence": chunk_data.get("confidence", "high"),
+        "source_url": chunk_data.get("source_url"),
+        "scope": chunk_data.get("scope", "chassis"),
+        "engine_id": chunk_data.get("engine_id"),
+        "transmission_id": chunk_data.get("transmission_id"),
+        "source_priority": SOURCE_RANK.get(chunk_data.get("data_source", ""), 0),
+    }
+
+
 # ---------------------------------------------------------------------------
 # RAGIndexer
 # ---------------------------------------------------------------------------
@@ -150,42 +225,151 @@ class RAGIndexer:
         storage_service: Optional["StorageService"] = None,
         vision_extractor: Optional["VisionExtractor"] = None,
         session_factory: Optional[Callable[[], Any]] = None,
+        stats: Optional[IndexStats] = None,
+        progress: Optional[Callable[[int], None]] = None,
+        full: bool = False,
+        manual_index: Optional[ManualIndex] = None,
     ) -> int:
         """Walk HTML files, extract text, upsert chunks. Returns count of chunks written.
 
+        manual_index is the ManualIndex the pipeline built for gap analysis
+        (pages and their hashes); without one, manual_dir is walked here.
+
+        Incremental: every page's content hash (manual_index.page_hash) is stored on its
+        chunks. A page whose hash is already in the index is skipped without
+        being parsed or written; full=True re-processes every page. After the
+        walk, pages indexed from this manual that the walk no longer produced
+        are deleted (MANUAL_SOURCES only — uploads and gap fills stay).
+
         Vision pipeline (per image-only page, len(text) < 20):
           1. If vision_extractor available and section is a diagram category:
              → VisionExtractor.extract() → store as charm_li_vision
           2. Else if storage_service available:
-             → upload image to Supabase Storage → store as charm_li_image
+             → DiagramStore (content-addressed, deduped via DiagramAsset)
+               → store as charm_li_image
           3. Else:
              → store as charm_li_stub (placeholder, no image URL)
 
-        When session_factory is provided, a fresh DB connection is opened every
-        _SESSION_REFRESH_EVERY chunks to avoid pgBouncer idle-connection timeouts
-        on long-running indexing jobs.
+        When session_factory is provided (and the worker goes through the pooler),
+        a fresh DB connection is opened every _SESSION_REFRESH_EVERY chunks to
+        avoid pgBouncer idle-connection timeouts on long-running indexing jobs.
+
+        stats (IndexStats) accumulates pages parsed, vision calls and commit
+        batches; progress(count) is called after each committed batch.
 
         Data flow:
-            _walk_htmls() → _extract_text() / _parse_breadcrumb_path()
-                → image detection → vision / storage upload
-                    → _upsert_chunk() → commit every 50 chunks
+            _indexed_pages() → {content_hash: page_ids} (one query)
+            ManualIndex pages and their hashes → unchanged: skip (not read again)
+                → html_blocks() / _parse_breadcrumb_path()
+                → image detection → batch of _IMAGE_BATCH pages
+                    → vision / concurrent storage uploads (asyncio.gather)
+                → chunk_blocks() / split_page() (app/services/chunker.py)
+                    → upsert_chunks() per page → commit every 50 chunks
+            → _remove_pages(indexed − seen)
         """
         from app.services.vision_extractor import is_vision_category
 
         count = 0
         current_db = db
+        if stats is None:
+            stats = IndexStats()
+
+        if manual_index is None:
+            manual_index = await asyncio.to_thread(ManualIndex.build, manual_dir)
+
+        # Pages already indexed from this manual, and the ones this walk produces
+        unchanged: dict[str, set[str]] = {}
+        indexed: set[str] = set()
+        for pid, content_hash in await self._indexed_pages(
+            make, model, year, scope, engine_id, transmission_id, db,
+        ):
+            indexed.add(pid)
+            if content_hash and not full:
+                unchanged.setdefault(content_hash, set()).add(pid)
+        seen: set[str] = set()
+        walked = 0
 
         async def _maybe_refresh_session():
             nonlocal current_db
-            if session_factory is None or count % _SESSION_REFRESH_EVERY != 0:
+            if (session_factory is None or not _SESSION_REFRESH_EVERY
+                    or count % _SESSION_REFRESH_EVERY != 0):
                 return
             await current_db.commit()
-            await current_db.close()
+            # The caller's session stays open — it still owns their objects
+            # (e.g. the IngestJob row); commit already returned its connection.
+            if current_db is not db:
+                await current_db.close()
             current_db = session_factory()
             await current_db.__aenter__()
 
-        for html_path in self._walk_htmls(manual_dir):
-            text = self._extract_text(html_path)
+        async def _write(chunk_data: dict, blocks: Optional[list[Block]] = None):
+            nonlocal count
+            if blocks is None:
+                blocks = text_blocks(chunk_data["content"])
+            chunks = split_page(chunk_data, chunk_blocks(blocks))
+            seen.add(chunks[0]["page_id"])
+            await self.upsert_chunks(chunks, current_db)
+            for _ in chunks:
+                count += 1
+                if count % 50 == 0:
+                    await current_db.commit()
+                    stats.upsert_batches += 1
+                    if progress:
+                        progress(count)
+                await _maybe_refresh_session()
+
+        # Image-only pages are handled _IMAGE_BATCH at a time: vision runs per
+        # page, then every page still needing an image is resolved through the
+        # content-addressed DiagramStore in one lookup + one concurrent upload.
+        pending_images: list[tuple[Path, str, str]] = []
+        diagram_store = DiagramStore(storage_service) if storage_service is not None else None
+
+        async def _flush_images():
+            batch = list(pending_images)
+            pending_images.clear()
+            results = await asyncio.gather(*(
+                self._handle_image_page(
+                    image_path=image_path,
+                    section_path=section_path,
+                    make=make,
+                    model=model,
+                    year=year,
+                    vehicle_id=vehicle_id,
+                    scope=scope,
+                    engine_id=engine_id,
+                    transmission_id=transmission_id,
+                    vision_extractor=vision_extractor,
+                    stats=stats,
+                )
+                for image_path, section_path, _ in batch
+            ))
+            if diagram_store is not None:
+                stub_paths = [
+                    image_path for (image_path, _, _), chunk in zip(batch, results)
+                    if chunk["data_source"] == "charm_li_stub"
+                ]
+                urls = await diagram_store.resolve_many(stub_paths, current_db) if stub_paths else {}
+                for i, (image_path, _, _) in enumerate(batch):
+                    if urls.get(image_path):
+                        results[i] = _image_chunk(results[i], urls[image_path])
+            for (_, _, content_hash), chunk_data in zip(batch, results):
+                await _write({**chunk_data, "content_hash": content_hash})
+
+        for html_path in manual_index.pages:
+            walked += 1
+            content_hash = manual_index.hashes[html_path]
+            if content_hash in unchanged:
+                seen |= unchanged[content_hash]
+                stats.pages_skipped += 1
+                continue
+
+            try:
+                raw = html_path.read_bytes()
+            except OSError:
+                continue
+            blocks = html_blocks(raw.decode("utf-8", errors="ignore"))
+            text = " ".join(block.text for block in blocks)
+            stats.pages_parsed += 1
 
             section_path = (
                 self._parse_breadcrumb_path(html_path)
@@ -198,51 +382,40 @@ class RAGIndexer:
             if len(text) < 20 and img_src:
                 image_path = _resolve_image_path(html_path, img_src)
                 if image_path:
-                    chunk_data = await self._handle_image_page(
-                        image_path=image_path,
-                        section_path=section_path,
-                        make=make,
-                        model=model,
-                        year=year,
-                        vehicle_id=vehicle_id,
-                        scope=scope,
-                        engine_id=engine_id,
-                        transmission_id=transmission_id,
-                        vision_extractor=vision_extractor,
-                        storage_service=storage_service,
-                    )
-                    await self._upsert_chunk(chunk_data, current_db)
-                    count += 1
-                    if count % 50 == 0:
-                        await current_db.commit()
-                    await _maybe_refresh_session()
+                    pending_images.append((image_path, section_path, content_hash))
+                    if len(pending_images) >= _IMAGE_BATCH:
+                        await _flush_images()
                 continue
 
             if len(text) < 20:
                 continue
 
-            await self._upsert_chunk(
-                {
-                    "vehicle_make": make,
-                    "vehicle_model": model,
-                    "vehicle_year": year,
-                    "vehicle_id": vehicle_id,
-                    "section_path": section_path,
-                    "content": text,
-                    "data_source": "charm_li",
-                    "confidence": "high",
-                    "scope": scope,
-                    "engine_id": engine_id,
-                    "transmission_id": transmission_id,
-                },
-                current_db,
-            )
-            count += 1
-            if count % 50 == 0:
-                await current_db.commit()
-            await _maybe_refresh_session()
+            await _write({
+                "vehicle_make": make,
+                "vehicle_model": model,
+                "vehicle_year": year,
+                "vehicle_id": vehicle_id,
+                "section_path": section_path,
+                "content": text,
+                "data_source": "charm_li",
+                "confidence": "high",
+                "scope": scope,
+                "engine_id": engine_id,
+                "transmission_id": transmission_id,
+                "content_hash": content_hash,
+            }, blocks)
+
+        if pending_images:
+            await _flush_images()
+
+        # Set difference: indexed pages the manual no longer produces. An empty
+        # walk (missing or unreadable directory) removes nothing.
+        if walked:
+            stats.pages_removed = await self._remove_pages(indexed - seen, current_db)
 
         await current_db.commit()
+        if count % 50:
+            stats.upsert_batches += 1
         if session_factory is not None and current_db is not db:
             await current_db.close()
         return count
@@ -259,14 +432,15 @@ class RAGIndexer:
         engine_id: Optional[str],
         transmission_id: Optional[str],
         vision_extractor: Optional["VisionExtractor"],
-        storage_service: Optional["StorageService"],
+        stats: Optional[IndexStats] = None,
     ) -> dict:
         """Build chunk_data for an image-only manual page.
 
         Priority:
           1. vision_extractor + is_vision_category → charm_li_vision
-          2. storage_service upload              → charm_li_image
-          3. fallback                            → charm_li_stub
+          2. fallback                              → charm_li_stub
+        index_manual then turns stubs into charm_li_image chunks through the
+        DiagramStore, the only path that uploads diagrams.
         """
         from app.services.vision_extractor import is_vision_category
 
@@ -284,6 +458,8 @@ class RAGIndexer:
         # --- Path 1: Vision extraction ---
         if vision_extractor is not None and is_vision_category(section_path):
             vehicle_str = f"{year} {make} {model}"
+            if stats is not None:
+                stats.vision_calls += 1
             extracted = vision_extractor.extract(image_path, section_path, vehicle_str)
             if extracted:
                 return {
@@ -294,29 +470,7 @@ class RAGIndexer:
                     "source_url": None,
                 }
 
-        # --- Path 2: Upload image to Supabase Storage ---
-        image_url = None
-        if storage_service is not None:
-            try:
-                img_bytes = image_path.read_bytes()
-                if len(img_bytes) <= 5 * 1024 * 1024:
-                    storage_key = f"manuals/{make}/{year}/{model}/{image_path.name}"
-                    image_url = await storage_service.upload_bytes(
-                        storage_key, img_bytes, "image/png", bucket="manuals"
-                    )
-            except Exception:
-                pass
-
-        if image_url:
-            return {
-                **base,
-                "content": f"[Diagram: {section_path}] — visual content only",
-                "data_source": "charm_li_image",
-                "confidence": "low",
-                "source_url": image_url,
-            }
-
-        # --- Path 3: Stub ---
+        # --- Path 2: Stub ---
         return {
             **base,
             "content": f"[Diagram: {section_path}] — visual content only",
@@ -327,30 +481,7 @@ class RAGIndexer:
 
     def _walk_htmls(self, manual_dir: Path) -> Iterator[Path]:
         """Yield .html files under manual_dir, rejecting symlinks that escape the directory."""
-        root = manual_dir.resolve()
-        for html_path in sorted(manual_dir.rglob("*.html")):
-            try:
-                resolved = html_path.resolve()
-                resolved.relative_to(root)  # raises ValueError if outside root
-            except (ValueError, OSError):
-                continue
-            yield html_path
-
-    def _extract_text(self, html_path: Path) -> str:
-        """Strip HTML tags and return clean plain text."""
-        try:
-            raw = html_path.read_text(encoding="utf-8", errors="ignore")
-        except OSError:
-            return ""
-        extractor = _TextExtractor()
-        try:
-            extractor.feed(raw)
-        except Exception:
-            return ""
-        text = extractor.get_text()
-        text = "".join(c for c in text if ord(c) >= 32 or c in "\n\t")
-        text = text.encode("utf-8", errors="ignore").decode("utf-8")
-        return text
+        yield from ManualIndex.build(manual_dir).pages
 
     def _parse_breadcrumb_path(self, html_path: Path) -> Optional[str]:
         """Return semantic 'A > B > C' from charm.li breadcrumb, or None if not found."""
@@ -373,12 +504,7 @@ class RAGIndexer:
 
         Fallback used when breadcrumb is not present (gap-filled sections, user uploads).
         """
-        try:
-            rel = html_path.relative_to(root)
-        except ValueError:
-            return str(html_path.stem)
-        parts = list(rel.parts[:-1]) + [html_path.stem]
-        return " > ".join(parts)
+        return path_section(html_path, root)
 
     async def _upsert_chunk(self, chunk_data: dict, db: AsyncSession) -> None:
         """Insert or update a ManualChunk using INSERT ... ON CONFLICT DO UPDATE.
@@ -394,46 +520,7 @@ class RAGIndexer:
 
         # --- PostgreSQL path: atomic INSERT ... ON CONFLICT DO UPDATE ---
         try:
-            await db.execute(
-                text("""
-                    INSERT INTO manual_chunks (
-                        id, vehicle_make, vehicle_model, vehicle_year, vehicle_id,
-                        section_path, content, data_source, confidence, source_url,
-                        scope, engine_id, transmission_id, source_priority, created_at
-                    ) VALUES (
-                        :id, :vehicle_make, :vehicle_model, :vehicle_year, :vehicle_id,
-                        :section_path, :content, :data_source, :confidence, :source_url,
-                        :scope, :engine_id, :transmission_id, :source_priority, NOW()
-                    )
-                    ON CONFLICT (
-                        vehicle_make, vehicle_model, vehicle_year, section_path, scope,
-                        COALESCE(engine_id, ''), COALESCE(transmission_id, '')
-                    ) DO UPDATE SET
-                        content        = EXCLUDED.content,
-                        data_source    = EXCLUDED.data_source,
-                        confidence     = EXCLUDED.confidence,
-                        source_url     = COALESCE(EXCLUDED.source_url, manual_chunks.source_url),
-                        vehicle_id     = COALESCE(EXCLUDED.vehicle_id, manual_chunks.vehicle_id),
-                        source_priority = EXCLUDED.source_priority
-                    WHERE EXCLUDED.source_priority >= manual_chunks.source_priority
-                """),
-                {
-                    "id": str(uuid.uuid4()),
-                    "vehicle_make": chunk_data["vehicle_make"],
-                    "vehicle_model": chunk_data["vehicle_model"],
-                    "vehicle_year": chunk_data["vehicle_year"],
-                    "vehicle_id": chunk_data.get("vehicle_id"),
-                    "section_path": chunk_data["section_path"],
-                    "content": chunk_data["content"],
-                    "data_source": chunk_data["data_source"],
-                    "confidence": chunk_data.get("confidence", "high"),
-                    "source_url": chunk_data.get("source_url"),
-                    "scope": chunk_data.get("scope", "chassis"),
-                    "engine_id": chunk_data.get("engine_id"),
-                    "transmission_id": chunk_data.get("transmission_id"),
-                    "source_priority": new_priority,
-                },
-            )
+            await db.execute(text(_UPSERT_SQL), _upsert_params(chunk_data))
             return
         except Exception:
             pass
@@ -451,6 +538,7 @@ class RAGIndexer:
             ManualChunk.scope == scope,
             ManualChunk.engine_id.is_(None) if not engine_id else ManualChunk.engine_id == engine_id,
             ManualChunk.transmission_id.is_(None) if not transmission_id else ManualChunk.transmission_id == transmission_id,
+            ManualChunk.chunk_ordinal == chunk_data.get("chunk_ordinal", 0),
         ]
 
         result = await db.execute(select(ManualChunk).where(and_(*filters)))
@@ -460,6 +548,9 @@ class RAGIndexer:
             if new_priority < existing.source_priority:
                 return
             existing.content = chunk_data["content"]
+            existing.page_id = chunk_data.get("page_id") or page_id(chunk_data)
+            if chunk_data.get("content_hash"):
+                existing.content_hash = chunk_data["content_hash"]
             existing.data_source = chunk_data["data_source"]
             existing.confidence = chunk_data.get("confidence", "high")
             existing.source_priority = new_priority
@@ -472,10 +563,86 @@ class RAGIndexer:
             chunk = ManualChunk(
                 id=str(uuid.uuid4()),
                 source_priority=new_priority,
-                **{k: v for k, v in chunk_data.items()},
+                **{"page_id": page_id(chunk_data), **chunk_data},
             )
             db.add(chunk)
 
+    async def upsert_chunks(self, chunks: list[dict], db: AsyncSession) -> None:
+        """Upsert a batch of chunks with _upsert_chunk's precedence rules.
+
+        chunks must hold every chunk of each page they touch (split_page()
+        output): afterwards, chunks of those pages numbered past the new count
+        are deleted unless they come from a higher-precedence source.
+
+        On PostgreSQL the whole batch is one executemany round trip; SQLite
+        (test environments) falls back to _upsert_chunk per chunk.
+        """
+        if not chunks:
+            return
+        params = [_upsert_params(c) for c in chunks]
+        try:
+            await db.execute(text(_UPSERT_SQL), params)
+        except Exception:
+            for chunk_data in chunks:
+                await self._upsert_chunk(chunk_data, db)
+            await db.flush()
+
+        pages: dict[str, dict] = {}
+        for p in params:
+            page = pages.setdefault(p["page_id"], {
+                "page_id": p["page_id"], "chunk_count": 0, "source_priority": p["source_priority"],
+            })
+            page["chunk_count"] = max(page["chunk_count"], p["chunk_ordinal"] + 1)
+        await db.execute(text(_TRIM_SQL), list(pages.values()))
+
+        stamps = {p["page_id"]: p["content_hash"] for p in params if p["content_hash"]}
+        if stamps:
+            await db.execute(
+                text(_STAMP_SQL),
+                [{"page_id": pid, "content_hash": h} for pid, h in stamps.items()],
+            )
+
+    async def _indexed_pages(
+        self,
+        make: str,
+        model: str,
+        year: int,
+        scope: str,
+        engine_id: Optional[str],
+        transmission_id: Optional[str],
+        db: AsyncSession,
+    ) -> list[tuple[str, Optional[str]]]:
+        """(page_id, content_hash) of every page index_manual wrote for this manual."""
+        result = await db.execute(
+            select(ManualChunk.page_id, ManualChunk.content_hash)
+            .where(
+                ManualChunk.vehicle_make == make,
+                ManualChunk.vehicle_model == model,
+                ManualChunk.vehicle_year == year,
+                ManualChunk.scope == scope,
+                ManualChunk.engine_id == engine_id if engine_id else ManualChunk.engine_id.is_(None),
+                ManualChunk.transmission_id == transmission_id if transmission_id else ManualChunk.transmission_id.is_(None),
+                ManualChunk.data_source.in_(MANUAL_SOURCES),
+                ManualChunk.page_id.is_not(None),
+            )
+            .distinct()
+        )
+        return [tuple(row) for row in result.all()]
+
+    async def _remove_pages(self, page_ids: set[str], db: AsyncSession) -> int:
+        """Delete the MANUAL_SOURCES chunks of these pages. Returns the page count."""
+        ids = sorted(page_ids)
+        for i in range(0, len(ids), _DELETE_BATCH):
+            await db.execute(
+                sa_delete(ManualChunk).where(
+                    ManualChunk.page_id.in_(ids[i:i + _DELETE_BATCH]),
+                    ManualChunk.data_source.in_(MANUAL_SOURCES),
+                )
+            )
+        if ids:
+            await db.commit()
+        return len(ids)
+
     async def clear_stale_chunks(
         self,
         make: str,
@@ -0,0 +1,310 @@
+"""
+Declarative fitment recommendation rules.
+
+Data flow:
+  build export (JSON or PDF) → recommendations_for(engine, vehicle, transmission, build)
+    → spec_vector(): the specs the rules read, flattened into one tuple
+    → LRU memo keyed by (spec vector, collision version)
+    → miss: evaluate_many([vector]) → messages, then the build's top collisions
+
+  admin analytics → evaluate_many(vectors)
+    → one float / object column per spec → each compiled rule is a single
+      NumPy predicate over every build → (builds × rules) match matrix
+
+RULES is plain data: a name, a condition tuple and a message template.
+_compile() turns each condition into a column predicate once, at import.
+The vector holds the entity ids, so an edited spec or a different engine
+makes a new memo key and never serves stale text.
+
+Specs are "missing" when falsy (None, 0, ""), matching the truthiness checks
+the rules were first written with.
+"""
+from __future__ import annotations
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from types import SimpleNamespace
+from typing import TYPE_CHECKING, Any, Callable, Optional, Sequence
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from app.models.build import Build
+    from app.models.engine import Engine
+    from app.models.transmission import Transmission
+    from app.models.vehicle import Vehicle
+
+# Specs the rules read, per entity. Text fields are kept as objects; the rest are floats.
+SPEC_ATTRS: dict[str, tuple[str, ...]] = {
+    "engine": (
+        "id", "fuel_pressure_psi", "fuel_flow_lph", "cooling_btu_min", "weight", "balance_type",
+        "compression_ratio", "can_bus_protocol", "oil_pan_depth_in", "dimensions_l", "dimensions_w",
+        "torque_lb_ft", "displacement_liters", "valve_train",
+    ),
+    "vehicle": (
+        "id", "stock_ground_clearance_in", "driveline_angle_deg", "engine_bay_length_in", "engine_bay_width_in",
+    ),
+    "transmission": ("id", "max_torque_capacity_lb_ft"),
+}
+TEXT_ATTRS = frozenset({"id", "balance_type", "can_bus_protocol", "valve_train"})
+SPEC_FIELDS: tuple[str, ...] = tuple(f"{entity}.{attr}" for entity, attrs in SPEC_ATTRS.items() for attr in attrs)
+
+# Label used in the data-completeness message, in message order
+CRITICAL_ENGINE_SPECS = {
+    "engine.displacement_liters": "displacement",
+    "engine.compression_ratio": "compression ratio",
+    "engine.valve_train": "valve train type",
+    "engine.can_bus_protocol": "CAN bus protocol",
+}
+MAX_COLLISION_MESSAGES = 3
+MEMO_SIZE = 1024
+
+
+@dataclass(frozen=True)
+class Rule:
+    name: str
+    # Condition tuple, see _compile()
+    when: tuple
+    # str.format template over the entities' specs ({engine.torque_lb_ft}) and derived values
+    message: str
+    # Extra template values from the flattened specs (only called when the rule fires)
+    derive: Optional[Callable[[dict[str, Any]], dict[str, Any]]] = None
+
+
+def _torque_pct(specs: dict[str, Any]) -> dict[str, Any]:
+    ratio = specs["engine.torque_lb_ft"] / specs["transmission.max_torque_capacity_lb_ft"]
+    return {"torque_pct": int(ratio * 100)}
+
+
+def _missing_critical(specs: dict[str, Any]) -> dict[str, Any]:
+    return {"missing_critical": ", ".join(label for f, label in CRITICAL_ENGINE_SPECS.items() if not specs[f])}
+
+
+RULES: tuple[Rule, ...] = (
+    Rule(
+        "fuel_pressure",
+        ("gt", "engine.fuel_pressure_psi", 40),
+        "High-pressure fuel system required: {engine.fuel_pressure_psi} psi. "
+        "Consider returnless fuel system with proper regulator.",
+    ),
+    Rule(
+        "fuel_flow",
+        ("gt", "engine.fuel_flow_lph", 200),
+        "High fuel flow requirement: {engine.fuel_flow_lph} lph. "
+        "Upgrade fuel pump and verify fuel line sizing.",
+    ),
+    Rule(
+        "cooling",
+        ("gt", "engine.cooling_btu_min", 10000),
+        "Significant cooling capacity needed: {engine.cooling_btu_min} BTU/min. "
+        "Consider aluminum radiator with electric fans.",
+    ),
+    Rule(
+        "engine_weight",
+        ("gt", "engine.weight", 500),
+        "Engine weight: {engine.weight} lbs. "
+        "Verify frame mounting and consider weight distribution.",
+    ),
+    Rule(
+        "external_balance",
+        ("equals", "engine.balance_type", "external"),
+        "CRITICAL: Engine uses external balance. Flywheel/flexplate MUST match "
+        "the engine's external balance specification. Using the wrong one will "
+        "cause severe vibration and potential crankshaft damage.",
+    ),
+    Rule(
+        "compression",
+        ("gt", "engine.compression_ratio", 10.5),
+        "Compression ratio: {engine.compression_ratio}:1. Premium fuel (91+ octane) "
+        "recommended to prevent detonation.",
+    ),
+    Rule(
+        "can_bus",
+        ("present", "engine.can_bus_protocol"),
+        "CAN bus protocol: {engine.can_bus_protocol}. Wiring harness must be "
+        "compatible or a standalone ECU/CAN translator may be needed.",
+    ),
+    Rule(
+        "oil_pan_depth",
+        ("gt_field", "engine.oil_pan_depth_in", "vehicle.stock_ground_clearance_in", 0.6, 0.0),
+        "Oil pan depth ({engine.oil_pan_depth_in}\") may conflict with "
+        "vehicle ground clearance ({vehicle.stock_ground_clearance_in}\"). "
+        "Consider a low-profile oil pan or crossmember modification.",
+    ),
+    Rule(
+        "driveline_angle",
+        ("gt", "vehicle.driveline_angle_deg", 3.0),
+        "Driveline angle: {vehicle.driveline_angle_deg}°. Angles over 3° may cause "
+        "U-joint vibration. Consider an adjustable crossmember or transmission mount.",
+    ),
+    Rule(
+        "bay_length",
+        ("gt_field", "engine.dimensions_l", "vehicle.engine_bay_length_in", 1.0, -1.0),
+        "Tight length fitment: engine is {engine.dimensions_l}\" vs bay "
+        "{vehicle.engine_bay_length_in}\". May need firewall or radiator "
+        "support modifications.",
+    ),
+    Rule(
+        "bay_width",
+        ("gt_field", "engine.dimensions_w", "vehicle.engine_bay_width_in", 1.0, -1.0),
+        "Tight width fitment: engine is {engine.dimensions_w}\" vs bay "
+        "{vehicle.engine_bay_width_in}\". Check header/exhaust manifold clearance "
+        "to frame rails and steering components.",
+    ),
+    Rule(
+        "torque_capacity",
+        ("ratio_gt", "engine.torque_lb_ft", "transmission.max_torque_capacity_lb_ft", 0.85),
+        "Engine torque ({engine.torque_lb_ft} lb-ft) is at "
+        "{torque_pct}% of transmission capacity "
+        "({transmission.max_torque_capacity_lb_ft} lb-ft). "
+        "Consider upgrading internals or choosing a higher-capacity unit.",
+        derive=_torque_pct,
+    ),
+    Rule(
+        "missing_engine_specs",
+        ("all", ("present", "engine.id"), ("any_missing", tuple(CRITICAL_ENGINE_SPECS))),
+        "Missing critical engine specs: {missing_critical}. "
+        "Consider using the Enrich endpoint or adding these manually for "
+        "more accurate recommendations.",
+        derive=_missing_critical,
+    ),
+)
+
+Predicate = Callable[[dict[str, np.ndarray]], np.ndarray]
+
+
+def _compile(cond: tuple) -> Predicate:
+    """Condition tuple → predicate over spec columns (one bool per row).
+
+    ("gt", field, value)                      field > value
+    ("gt_field", field, other, scale, offset) field > other * scale + offset
+    ("ratio_gt", num, den, value)             num / den > value
+    ("equals", field, text)                   case-insensitive text match
+    ("present", field)                        field is set
+    ("any_missing", fields)                   at least one field unset
+    ("all", cond, ...)                        every condition holds
+    Comparisons with a missing (NaN) side are false.
+    """
+    op, *args = cond
+    if op == "gt":
+        field, value = args
+        return lambda c: c[field] > value
+    if op == "gt_field":
+        field, other, scale, offset = args
+        return lambda c: c[field] > c[other] * scale + offset
+    if op == "ratio_gt":
+        num, den, value = args
+        return lambda c: c[num] / c[den] > value
+    if op == "equals":
+        field, text = args
+        text = text.lower()
+        return lambda c: np.array([v is not None and v.lower() == text for v in c[field]], dtype=bool)
+    if op == "present":
+        (field,) = args
+        return lambda c: _present(c[field])
+    if op == "any_missing":
+        (fields,) = args
+        return lambda c: np.logical_or.reduce([~_present(c[f]) for f in fields])
+    if op == "all":
+        parts = [_compile(part) for part in args]
+        return lambda c: np.logical_and.reduce([p(c) for p in parts])
+    raise ValueError(f"Unknown rule condition {op!r}")
+
+
+def _present(column: np.ndarray) -> np.ndarray:
+    if column.dtype == object:
+        return np.array([v is not None for v in column], dtype=bool)
+    return ~np.isnan(column)
+
+
+_COMPILED: tuple[Predicate, ...] = tuple(_compile(rule.when) for rule in RULES)
+
+
+def spec_vector(
+    engine: Optional["Engine"],
+    vehicle: Optional["Vehicle"],
+    transmission: Optional["Transmission"],
+) -> tuple:
+    """The specs RULES read, in SPEC_FIELDS order; missing entities and falsy specs are None."""
+    entities = {"engine": engine, "vehicle": vehicle, "transmission": transmission}
+    return tuple(
+        (getattr(entities[entity], attr) or None) if entities[entity] is not None else None
+        for entity, attrs in SPEC_ATTRS.items()
+        for attr in attrs
+    )
+
+
+def _columns(vectors: Sequence[Sequence]) -> dict[str, np.ndarray]:
+    out = {}
+    for field, values in zip(SPEC_FIELDS, zip(*vectors)):
+        if field.split(".", 1)[1] in TEXT_ATTRS:
+            out[field] = np.array(values, dtype=object)
+        else:
+            # Falsy specs read as missing, as they did in the original checks
+            out[field] = np.array([v or np.nan for v in values], dtype=np.float64)
+    return out
+
+
+def match_matrix(vectors: Sequence[Sequence]) -> np.ndarray:
+    """(len(vectors), len(RULES)) bool matrix: which rule fires for which spec vector."""
+    if not vectors:
+        return np.zeros((0, len(RULES)), dtype=bool)
+    columns = _columns(vectors)
+    return np.stack([pred(columns) for pred in _COMPILED], axis=1)
+
+
+def _render(rule: Rule, vector: Sequence) -> str:
+    specs = dict(zip(SPEC_FIELDS, vector))
+    scope: dict[str, Any] = {
+        entity: SimpleNamespace(**{attr: specs[f"{entity}.{attr}"] for attr in attrs})
+        for entity, attrs in SPEC_ATTRS.items()
+    }
+    if rule.derive:
+        scope.update(rule.derive(specs))
+    return rule.message.format_map(scope)
+
+
+def evaluate_many(vectors: Sequence[Sequence]) -> list[list[str]]:
+    """Spec-rule messages for many spec vectors at once, in RULES order per vector."""
+    matches = match_matrix(vectors)
+    return [
+        [_render(rule, vector) for rule, hit in zip(RULES, row) if hit]
+        for vector, row in zip(vectors, matches)
+    ]
+
+
+def collision_version(build: Optional["Build"]) -> tuple:
+    """The part of collision_data the recommendations read (its top collisions, as text)."""
+    collisions = ((build.collision_data or {}).get("collisions") or []) if build is not None else []
+    return tuple(str(c) for c in collisions[:MAX_COLLISION_MESSAGES])
+
+
+_memo: "OrderedDict[tuple, tuple[str, ...]]" = OrderedDict()
+
+
+def recommendations_for(
+    engine: Optional["Engine"],
+    vehicle: Optional["Vehicle"],
+    transmission: Optional["Transmission"],
+    build: Optional["Build"],
+) -> list[str]:
+    """Recommendations for one build: spec rules, then its top collisions. Memoized."""
+    vector = spec_vector(engine, vehicle, transmission)
+    collisions = collision_version(build)
+    key = (vector, collisions)
+    cached = _memo.get(key)
+    if cached is None:
+        messages = evaluate_many([vector])[0]
+        messages.extend(f"Fitment issue detected: {collision}" for collision in collisions)
+        cached = _memo[key] = tuple(messages)
+        if len(_memo) > MEMO_SIZE:
+            _memo.popitem(last=False)
+    else:
+        _memo.move_to_end(key)
+    return list(cached)
+
+
+def rule_counts(vectors: Sequence[Sequence]) -> dict[str, int]:
+    """How many of the spec vectors each rule fires for (admin analytics)."""
+    totals = match_matrix(vectors).sum(axis=0)
+    return {rule.name: int(n) for rule, n in zip(RULES, totals)}
@@ -1,57 +1,295 @@
+"""
+Object storage for uploads, meshes and manual diagrams.
+
+Data flow:
+  StorageService (async facade used by routers / RAGIndexer)
+    → bounded by a per-event-loop semaphore (storage_max_concurrency)
+    → backend selected by STORAGE_BACKEND:
+        supabase — SDK calls run in worker threads so they never block the
+                   event loop; files ≥ storage_resumable_threshold_mb go through
+                   the TUS resumable endpoint in 6 MB chunks and resume from
+                   the server's offset after a dropped chunk
+        local    — files under storage_local_path, served at /storage (dev/tests)
+    → stream_file() reads private objects back in chunks (supabase: through a
+      60 s signed URL) for routes that check ownership first
+"""
+import asyncio
+import base64
+import shutil
 import uuid
+import weakref
 from pathlib import Path
+from typing import AsyncIterator, Optional, Union
+
+import httpx
 from fastapi import UploadFile
+
 from app.config import get_settings
+from app.services.metrics import track_external
 from app.services.supabase_client import get_supabase_client
+from app.utils.uploads import SpooledUpload, spool_upload
 
 settings = get_settings()
 
+MB = 1024 * 1024
+# Supabase's TUS endpoint requires every chunk except the last to be exactly 6 MB
+TUS_CHUNK_BYTES = 6 * MB
+TUS_MAX_RETRIES = 3
+# Private downloads (stream_file): read size, and lifetime of the Supabase signed URL
+STREAM_CHUNK_BYTES = 1 * MB
+SIGNED_URL_SECONDS = 60
 
-class StorageService:
+# Buckets whose files are linked by public URL (get_url / upload_bytes). Anything
+# else — the "exports" bucket of bulk export ZIPs — is private: served only
+# through routes that check ownership, and never mounted by the local backend.
+PUBLIC_BUCKETS = ("uploads", "meshes", "manuals")
+
+_slots: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+
+
+def _upload_slots() -> asyncio.Semaphore:
+    """Process-wide cap on concurrent storage calls (one semaphore per event loop)."""
+    loop = asyncio.get_running_loop()
+    sem = _slots.get(loop)
+    if sem is None:
+        sem = _slots[loop] = asyncio.Semaphore(max(1, settings.storage_max_concurrency))
+    return sem
+
+
+class SupabaseStorageBackend:
     def __init__(self):
         self.supabase = get_supabase_client()
 
-    async def save_file(self, file: UploadFile, bucket: str = "uploads") -> str:
-        """Upload file to Supabase Storage and return the storage path."""
-        ext = Path(file.filename).suffix if file.filename else ".bin"
-        unique_name = f"{uuid.uuid4()}{ext}"
+    async def upload(
+        self, bucket: str, path: str, data: Union[bytes, Path], content_type: str, upsert: bool
+    ) -> None:
+        if isinstance(data, Path) and data.stat().st_size >= settings.storage_resumable_threshold_mb * MB:
+            await self._upload_resumable(bucket, path, data, content_type, upsert)
+            return
 
-        content = await file.read()
+        options = {"content-type": content_type}
+        if upsert:
+            options["upsert"] = "true"
 
-        self.supabase.storage.from_(bucket).upload(
-            path=unique_name,
-            file=content,
-            file_options={"content-type": file.content_type or "application/octet-stream"},
-        )
+        def _upload():
+            if isinstance(data, Path):
+                # An open handle is sent as a streamed multipart body
+                with open(data, "rb") as fh:
+                    self.supabase.storage.from_(bucket).upload(path=path, file=fh, file_options=options)
+            else:
+                self.supabase.storage.from_(bucket).upload(path=path, file=data, file_options=options)
 
-        return unique_name
+        async with track_external("supabase_storage"):
+            await asyncio.to_thread(_upload)
 
-    def get_url(self, path: str, bucket: str = "uploads") -> str:
-        """Get public URL for a stored file."""
-        res = self.supabase.storage.from_(bucket).get_public_url(path)
-        return res
+    async def _upload_resumable(
+        self, bucket: str, path: str, local_path: Path, content_type: str, upsert: bool
+    ) -> None:
+        """TUS upload: create the upload, PATCH 6 MB chunks, HEAD to resume after a failure."""
+        key = settings.supabase_anon_key
+        endpoint = settings.supabase_url.rstrip("/") + "/storage/v1/upload/resumable"
+        headers = {"authorization": f"Bearer {key}", "apikey": key, "tus-resumable": "1.0.0"}
+        metadata = {"bucketName": bucket, "objectName": path, "contentType": content_type, "cacheControl": "3600"}
+        size = local_path.stat().st_size
 
-    async def upload_bytes(
-        self, path: str, data: bytes, content_type: str, bucket: str = "uploads"
-    ) -> str:
-        """Upload raw bytes to Supabase Storage. Returns public URL."""
-        self.supabase.storage.from_(bucket).upload(
-            path, data, {"content-type": content_type, "upsert": "true"}
-        )
+        async with httpx.AsyncClient(timeout=60.0) as client, track_external("supabase_storage_tus"):
+            resp = await client.post(endpoint, headers={
+                **headers,
+                "upload-length": str(size),
+                "upload-metadata": ",".join(
+                    f"{k} {base64.b64encode(v.encode()).decode()}" for k, v in metadata.items()
+                ),
+                "x-upsert": "true" if upsert else "false",
+            })
+            resp.raise_for_status()
+            location = resp.headers["location"]
+
+            offset, retries = 0, 0
+            with open(local_path, "rb") as fh:
+                while offset < size:
+                    fh.seek(offset)
+                    chunk = await asyncio.to_thread(fh.read, TUS_CHUNK_BYTES)
+                    try:
+                        resp = await client.patch(location, content=chunk, headers={
+                            **headers,
+                            "upload-offset": str(offset),
+                            "content-type": "application/offset+octet-stream",
+                        })
+                        resp.raise_for_status()
+                        offset = int(resp.headers["upload-offset"])
+                        retries = 0
+                    except httpx.HTTPError:
+                        retries += 1
+                        if retries > TUS_MAX_RETRIES:
+                            raise
+                        await asyncio.sleep(2 ** retries)
+                        head = await client.head(location, headers=headers)
+                        head.raise_for_status()
+                        offset = int(head.headers["upload-offset"])
+
+    def public_url(self, bucket: str, path: str) -> str:
+        # Pure string formatting in the SDK — no network call
         return self.supabase.storage.from_(bucket).get_public_url(path)
 
-    def file_exists(self, path: str, bucket: str = "uploads") -> bool:
-        """Check if file exists in Supabase Storage."""
+    async def stream(self, bucket: str, path: str) -> AsyncIterator[bytes]:
+        # A short-lived signed URL keeps private buckets private and lets httpx stream the body
+        async with track_external("supabase_storage"):
+            signed = await asyncio.to_thread(
+                self.supabase.storage.from_(bucket).create_signed_url, path, SIGNED_URL_SECONDS
+            )
+        url = signed.get("signedURL") or signed.get("signedUrl")
+        async with httpx.AsyncClient(timeout=60.0) as client:
+            async with client.stream("GET", url) as resp:
+                if resp.status_code in (400, 404):
+                    raise FileNotFoundError(f"{bucket}/{path}")
+                resp.raise_for_status()
+                async for chunk in resp.aiter_bytes(STREAM_CHUNK_BYTES):
+                    yield chunk
+
+    async def exists(self, bucket: str, path: str) -> bool:
         try:
-            self.supabase.storage.from_(bucket).list(path="", search=path)
-            return True
+            async with track_external("supabase_storage"):
+                return bool(await asyncio.to_thread(self.supabase.storage.from_(bucket).exists, path))
         except Exception:
             return False
 
-    def delete_file(self, path: str, bucket: str = "uploads") -> bool:
-        """Delete a file from Supabase Storage."""
+    async def delete(self, bucket: str, path: str) -> bool:
         try:
-            self.supabase.storage.from_(bucket).remove([path])
+            async with track_external("supabase_storage"):
+                await asyncio.to_thread(self.supabase.storage.from_(bucket).remove, [path])
             return True
         except Exception:
             return False
+
+
+class LocalStorageBackend:
+    """Filesystem backend for local development and tests."""
+
+    def __init__(self, root: Optional[Path] = None, base_url: Optional[str] = None):
+        self.root = Path(root or settings.storage_local_path)
+        self.base_url = (base_url or settings.storage_local_url).rstrip("/")
+
+    def _target(self, bucket: str, path: str) -> Path:
+        target = (self.root / bucket / path).resolve()
+        if not target.is_relative_to((self.root / bucket).resolve()):
+            raise ValueError(f"Storage path escapes bucket: {path}")
+        return target
+
+    async def upload(
+        self, bucket: str, path: str, data: Union[bytes, Path], content_type: str, upsert: bool
+    ) -> None:
+        target = self._target(bucket, path)
+        if target.exists() and not upsert:
+            raise FileExistsError(f"{bucket}/{path} already exists")
+
+        def _write():
+            target.parent.mkdir(parents=True, exist_ok=True)
+            if isinstance(data, Path):
+                shutil.copyfile(data, target)
+            else:
+                target.write_bytes(data)
+
+        await asyncio.to_thread(_write)
+
+    def public_url(self, bucket: str, path: str) -> str:
+        return f"{self.base_url}/{bucket}/{path}"
+
+    async def stream(self, bucket: str, path: str) -> AsyncIterator[bytes]:
+        target = self._target(bucket, path)
+        fh = await asyncio.to_thread(open, target, "rb")  # FileNotFoundError if missing
+        try:
+            while chunk := await asyncio.to_thread(fh.read, STREAM_CHUNK_BYTES):
+                yield chunk
+        finally:
+            fh.close()
+
+    async def exists(self, bucket: str, path: str) -> bool:
+        return self._target(bucket, path).is_file()
+
+    async def delete(self, bucket: str, path: str) -> bool:
+        target = self._target(bucket, path)
+        if not target.is_file():
+            return False
+        await asyncio.to_thread(target.unlink)
+        return True
+
+
+def get_storage_backend():
+    if settings.storage_backend == "local":
+        return LocalStorageBackend()
+    return SupabaseStorageBackend()
+
+
+class StorageService:
+    """Async storage facade. Every call is non-blocking and counts against the upload cap."""
+
+    def __init__(self, backend=None):
+        self.backend = backend or get_storage_backend()
+
+    async def save_file(
+        self, file: UploadFile, bucket: str = "uploads", max_bytes: int = 1024 * MB
+    ) -> str:
+        """Upload file to storage and return the storage path."""
+        upload = await spool_upload(file, max_bytes, suffix=Path(file.filename or "").suffix)
+        try:
+            return await self.save_spooled(upload, bucket=bucket)
+        finally:
+            upload.unlink()
+
+    async def save_spooled(self, upload: SpooledUpload, bucket: str = "uploads") -> str:
+        """Upload an already-spooled file under a fresh unique name. Returns the storage path."""
+        ext = Path(upload.filename).suffix or ".bin"
+        unique_name = f"{uuid.uuid4()}{ext}"
+        await self.upload_path(unique_name, upload.path, upload.content_type, bucket=bucket)
+        return unique_name
+
+    async def upload_path(
+        self, path: str, local_path: Path, content_type: str, bucket: str = "uploads", upsert: bool = False
+    ) -> None:
+        """Stream a local file to storage without reading it into memory."""
+        async with _upload_slots():
+            await self.backend.upload(bucket, path, Path(local_path), content_type, upsert)
+
+    def get_url(self, path: str, bucket: str = "uploads") -> str:
+        """Get public URL for a stored file."""
+        return self.backend.public_url(bucket, path)
+
+    async def upload_bytes(
+        self, path: str, data: bytes, content_type: str, bucket: str = "uploads"
+    ) -> str:
+        """Upload raw bytes (overwriting). Returns public URL."""
+        async with _upload_slots():
+            await self.backend.upload(bucket, path, data, content_type, True)
+        return self.backend.public_url(bucket, path)
+
+    async def upload_many(
+        self, items: list[tuple[str, Union[bytes, Path], str]], bucket: str = "uploads"
+    ) -> list[Optional[str]]:
+        """Upload (path, data, content_type) items concurrently, overwriting.
+
+        Returns public URLs in input order; an item that failed yields None
+        instead of failing the batch. Concurrency is bounded by the shared cap.
+        """
+        async def _one(path: str, data: Union[bytes, Path], content_type: str) -> Optional[str]:
+            try:
+                async with _upload_slots():
+                    await self.backend.upload(bucket, path, data, content_type, True)
+                return self.backend.public_url(bucket, path)
+            except Exception:
+                return None
+
+        return list(await asyncio.gather(*(_one(*item) for item in items)))
+
+    def stream_file(self, path: str, bucket: str = "uploads") -> AsyncIterator[bytes]:
+        """Read a stored file in chunks, for serving private objects through an
+        authenticated route. Not bounded by the upload cap: a slow client would hold a slot."""
+        return self.backend.stream(bucket, path)
+
+    async def file_exists(self, path: str, bucket: str = "uploads") -> bool:
+        """Check if file exists in storage."""
+        return await self.backend.exists(bucket, path)
+
+    async def delete_file(self, path: str, bucket: str = "uploads") -> bool:
+        """Delete a file from storage."""
+        async with _upload_slots():
+            return await self.backend.delete(bucket, path)
@@ -0,0 +1,209 @@
+"""
+Bearer-token verification for Supabase (and local-dev) access tokens.
+
+Data flow:
+  get_current_user → TokenVerifier.resolve_user_id(token)
+    → token cache hit? return user_id
+    → local verify: HS256 with SUPABASE_JWT_SECRET, or RS256/ES256 against the
+      project JWKS (fetched once, cached, refetched on unknown kid / TTL)
+    → token not locally verifiable (opaque, no secret configured)?
+      supabase.auth.get_user(token) in a worker thread
+    → cache token → user_id until min(TTL, token exp)
+
+A token that fails signature/expiry checks locally is rejected outright — we
+never fall back to the network for a token we know is bad.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+from typing import Optional
+
+import httpx
+import jwt
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+_ASYMMETRIC_ALGS = {"RS256", "RS384", "RS512", "ES256", "ES384", "ES512", "EdDSA"}
+
+
+class InvalidToken(ValueError):
+    """Raised when a token is definitively invalid (bad signature, expired, unknown user)."""
+
+
+class JWKSCache:
+    """Caches the Supabase project's signing keys, keyed by kid.
+
+    Keys are refreshed after ``ttl_seconds`` or when a token names a kid we have
+    not seen (key rotation). Refetches on unknown kids are rate-limited so a
+    flood of forged kids cannot turn into a flood of JWKS requests.
+    """
+
+    MIN_REFRESH_INTERVAL = 30.0
+
+    def __init__(self, jwks_url: str, ttl_seconds: int):
+        self.jwks_url = jwks_url
+        self.ttl_seconds = ttl_seconds
+        self._keys: dict[str, jwt.PyJWK] = {}
+        self._fetched_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+
+    def _age(self) -> float:
+        return float("inf") if self._fetched_at is None else time.monotonic() - self._fetched_at
+
+    async def get_key(self, kid: str) -> Optional[jwt.PyJWK]:
+        stale = self._age() > self.ttl_seconds
+        if kid in self._keys and not stale:
+            return self._keys[kid]
+        if stale or self._age() > self.MIN_REFRESH_INTERVAL:
+            await self._refresh()
+        return self._keys.get(kid)
+
+    async def _refresh(self) -> None:
+        async with self._lock:
+            # Another coroutine may have refreshed while we waited for the lock
+            if self._age() < 1.0:
+                return
+            try:
+                async with httpx.AsyncClient(timeout=5.0) as client:
+                    resp = await client.get(self.jwks_url)
+                    resp.raise_for_status()
+                    jwk_set = jwt.PyJWKSet.from_dict(resp.json())
+                self._keys = {k.key_id: k for k in jwk_set.keys if k.key_id}
+            except Exception as exc:
+                # Keep serving the previous key set; remote fallback covers the gap
+                logger.warning(f"JWKS refresh from {self.jwks_url} failed: {exc}")
+            self._fetched_at = time.monotonic()
+
+
+class TokenVerifier:
+    """Resolves bearer tokens to user IDs with local verification and a TTL cache."""
+
+    def __init__(self):
+        settings = get_settings()
+        self.local_dev = settings.local_dev
+        self.jwt_secret = settings.supabase_jwt_secret
+        self.audience = settings.supabase_jwt_audience or None
+        self.cache_ttl = settings.auth_cache_ttl_seconds
+        self.jwks: Optional[JWKSCache] = None
+        if settings.supabase_url:
+            self.jwks = JWKSCache(
+                settings.supabase_url.rstrip("/") + "/auth/v1/.well-known/jwks.json",
+                settings.supabase_jwks_ttl_seconds,
+            )
+        # sha256(token) → (user_id, expires_at monotonic)
+        self._tokens: dict[str, tuple[str, float]] = {}
+        self._tokens_lock = threading.Lock()
+
+    # ---- cache ----
+
+    @staticmethod
+    def _cache_key(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def _cache_get(self, key: str) -> Optional[str]:
+        with self._tokens_lock:
+            hit = self._tokens.get(key)
+            if hit is None:
+                return None
+            if time.monotonic() >= hit[1]:
+                del self._tokens[key]
+                return None
+            return hit[0]
+
+    def _cache_put(self, key: str, user_id: str, token_exp: Optional[float]) -> None:
+        if self.cache_ttl <= 0:
+            return
+        ttl = float(self.cache_ttl)
+        if token_exp is not None:
+            ttl = min(ttl, token_exp - time.time())
+        if ttl <= 0:
+            return
+        with self._tokens_lock:
+            if len(self._tokens) > 10_000:
+                now = time.monotonic()
+                self._tokens = {k: v for k, v in self._tokens.items() if v[1] > now}
+            self._tokens[key] = (user_id, time.monotonic() + ttl)
+
+    def forget_user(self, user_id: str) -> None:
+        """Drop cached tokens for a user (role change, deletion)."""
+        with self._tokens_lock:
+            self._tokens = {k: v for k, v in self._tokens.items() if v[0] != user_id}
+
+    # ---- verification ----
+
+    async def _verify_locally(self, token: str) -> Optional[tuple[str, Optional[float]]]:
+        """Return (user_id, exp) if the token verifies locally, None if we can't tell.
+
+        Raises InvalidToken when the token is a JWT we can check and it fails.
+        """
+        try:
+            header = jwt.get_unverified_header(token)
+        except jwt.PyJWTError:
+            return None  # not a JWT — let the remote check decide
+
+        alg = header.get("alg")
+        key = None
+        if alg == "HS256" and self.jwt_secret:
+            key = self.jwt_secret
+        elif alg in _ASYMMETRIC_ALGS and self.jwks and header.get("kid"):
+            jwk = await self.jwks.get_key(header["kid"])
+            key = jwk.key if jwk else None
+        if key is None:
+            return None
+
+        try:
+            payload = jwt.decode(
+                token, key, algorithms=[alg],
+                audience=self.audience,
+                options={"verify_aud": self.audience is not None, "require": ["exp", "sub"]},
+            )
+        except jwt.PyJWTError as exc:
+            raise InvalidToken(str(exc)) from exc
+        return payload["sub"], float(payload["exp"])
+
+    async def _verify_remote(self, token: str) -> str:
+        from app.services.supabase_client import get_supabase_client
+        supabase = get_supabase_client()
+        # The Supabase SDK is synchronous — keep its network call off the event loop
+        user_response = await asyncio.to_thread(supabase.auth.get_user, token)
+        if not user_response or not user_response.user:
+            raise InvalidToken("Invalid token")
+        return user_response.user.id
+
+    async def resolve_user_id(self, token: str) -> str:
+        key = self._cache_key(token)
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
+
+        if self.local_dev:
+            from app.services.local_auth import local_get_user
+            result = local_get_user(token)
+            if not result:
+                raise InvalidToken("Invalid token")
+            user_id, exp = result["user_id"], None
+        else:
+            local = await self._verify_locally(token)
+            if local is not None:
+                user_id, exp = local
+            else:
+                user_id, exp = await self._verify_remote(token), None
+
+        self._cache_put(key, user_id, exp)
+        return user_id
+
+
+_verifier: Optional[TokenVerifier] = None
+
+
+def get_token_verifier() -> TokenVerifier:
+    global _verifier
+    if _verifier is None:
+        _verifier = TokenVerifier()
+    return _verifier
@@ -1,6 +1,7 @@
 import httpx
 from typing import Optional
 from app.schemas.vehicle import VINDecodeResponse
+from app.services.metrics import track_external
 
 
 class VINDecoderService:
@@ -14,7 +15,7 @@ class VINDecoderService:
             return VINDecodeResponse(raw_data={"error": "VIN must be 17 characters"})
 
         try:
-            async with httpx.AsyncClient() as client:
+            async with httpx.AsyncClient() as client, track_external("nhtsa"):
                 response = await client.get(
                     f"{self.NHTSA_API_URL}/{vin}",
                     params={"format": "json"},
@@ -7,6 +7,8 @@ import os
 from pathlib import Path
 from typing import Optional
 
+from app.services.metrics import record_llm_usage, track_external
+
 logger = logging.getLogger(__name__)
 
 # Section path substrings that indicate visual-only content worth vision-extracting
@@ -114,26 +116,28 @@ class VisionExtractor:
         )
 
         try:
-            response = self._client.messages.create(
-                model="claude-haiku-4-5-20251001",
-                max_tokens=1024,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "image",
-                                "source": {
-                                    "type": "base64",
-                                    "media_type": media_type,
-                                    "data": b64,
+            with track_external("anthropic"):
+                response = self._client.messages.create(
+                    model="claude-haiku-4-5-20251001",
+                    max_tokens=1024,
+                    messages=[
+                        {
+                            "role": "user",
+                            "content": [
+                                {
+                                    "type": "image",
+                                    "source": {
+                                        "type": "base64",
+                                        "media_type": media_type,
+                                        "data": b64,
+                                    },
                                 },
-                            },
-                            {"type": "text", "text": prompt},
-                        ],
-                    }
-                ],
-            )
+                                {"type": "text", "text": prompt},
+                            ],
+                        }
+                    ],
+                )
+            record_llm_usage("anthropic", "claude-haiku-4-5-20251001", response)
             text = response.content[0].text.strip()
             if text == "[NO EXTRACTABLE CONTENT]" or not text:
                 return None
@@ -1,8 +1,12 @@
+import threading
+import time
+from collections import OrderedDict
 from typing import Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import inspect, select
+from sqlalchemy.orm import make_transient_to_detached
 from app.database import get_db
 from app.models.user import User
 from app.config import get_settings
@@ -11,22 +15,85 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 oauth2_scheme_optional = OAuth2PasswordBearer(tokenUrl="/api/auth/login", auto_error=False)
 
 
-def _resolve_user_id(token: str) -> str:
-    """Resolve a token to a user ID using local auth or Supabase."""
-    settings = get_settings()
-    if settings.local_dev:
-        from app.services.local_auth import local_get_user
-        result = local_get_user(token)
-        if not result:
-            raise ValueError("Invalid token")
-        return result["user_id"]
+async def _resolve_user_id(token: str) -> str:
+    """Resolve a token to a user ID (local JWT verification, cached; remote fallback)."""
+    from app.services.token_verifier import get_token_verifier
+    return await get_token_verifier().resolve_user_id(token)
 
-    from app.services.supabase_client import get_supabase_client
-    supabase = get_supabase_client()
-    user_response = supabase.auth.get_user(token)
-    if not user_response or not user_response.user:
-        raise ValueError("Invalid token")
-    return user_response.user.id
+
+class UserRowCache:
+    """Thread-safe TTL + LRU cache of User column snapshots, per worker.
+
+    Lets a cached token skip the users SELECT. invalidate_user() only reaches
+    this worker; the others keep a snapshot for up to ttl_seconds.
+    """
+
+    def __init__(self, ttl_seconds: int, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        # user_id → (column snapshot, expires_at monotonic)
+        self._entries: "OrderedDict[str, tuple[dict, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: str) -> Optional[dict]:
+        with self._lock:
+            hit = self._entries.get(user_id)
+            if hit is None:
+                return None
+            if time.monotonic() >= hit[1]:
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return hit[0]
+
+    def set(self, user_id: str, snapshot: dict) -> None:
+        if self.ttl_seconds <= 0 or self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[user_id] = (snapshot, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def pop(self, user_id: str) -> None:
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+settings = get_settings()
+_user_rows = UserRowCache(settings.auth_cache_ttl_seconds, settings.auth_cache_max_users)
+
+
+async def _load_user(db: AsyncSession, user_id: str) -> Optional[User]:
+    """Fetch the User row, reusing a short-lived snapshot when one is cached.
+
+    Cached snapshots are merged into the request session with load=False, so the
+    returned instance is session-bound exactly like a freshly selected row.
+    """
+    snapshot = _user_rows.get(user_id)
+    if snapshot is not None:
+        user = User(**snapshot)
+        make_transient_to_detached(user)
+        return await db.merge(user, load=False)
+
+    result = await db.execute(select(User).where(User.id == user_id))
+    user = result.scalar_one_or_none()
+    if user is not None:
+        _user_rows.set(user_id, {attr.key: getattr(user, attr.key) for attr in inspect(User).column_attrs})
+    return user
+
+
+def invalidate_user(user_id: str) -> None:
+    """Forget cached tokens and the row snapshot for a user (role/plan changes).
+
+    This worker only: other workers pick the change up within auth_cache_ttl_seconds.
+    """
+    from app.services.token_verifier import get_token_verifier
+    _user_rows.pop(user_id)
+    get_token_verifier().forget_user(user_id)
 
 
 async def get_current_user(
@@ -40,12 +107,11 @@ async def get_current_user(
     )
 
     try:
-        user_id = _resolve_user_id(token)
+        user_id = await _resolve_user_id(token)
     except Exception:
         raise credentials_exception
 
-    result = await db.execute(select(User).where(User.id == user_id))
-    user = result.scalar_one_or_none()
+    user = await _load_user(db, user_id)
     if user is None:
         raise credentials_exception
     return user
@@ -58,12 +124,11 @@ async def get_optional_user(
     if not token:
         return None
     try:
-        user_id = _resolve_user_id(token)
+        user_id = await _resolve_user_id(token)
     except Exception:
         return None
 
-    result = await db.execute(select(User).where(User.id == user_id))
-    return result.scalar_one_or_none()
+    return await _load_user(db, user_id)
 
 
 async def get_admin_user(
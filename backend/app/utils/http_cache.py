@@ -0,0 +1,152 @@
+"""
+HTTP response caching for read-mostly endpoints.
+
+Data flow:
+  route handler → cached_json(request, key, producer, cache_control)
+    → ResponseCache hit? reuse serialized body + ETag
+    → miss: await producer() → serialize once → store under key
+    → If-None-Match matches ETag → 304 (no body), else 200 with body
+
+ETags are strong validators computed from the serialized response body.
+The catalog tables carry no row-version column, so hashing the exact bytes
+we would send is the only value that changes exactly when the payload does.
+
+The in-process cache is per worker. Write routes call
+response_cache.invalidate(...) with the key prefix of whatever they touched;
+other workers converge within response_cache_ttl_seconds.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional
+
+from fastapi import Request, Response
+from pydantic import BaseModel
+
+from app.config import get_settings
+
+settings = get_settings()
+
+# Cache-Control presets. Catalog rows can be edited by admins at any time, so
+# clients must revalidate (cheap 304); external spec lookups change rarely.
+CACHE_REVALIDATE = "no-cache"
+CACHE_SHORT = "public, max-age=60"
+CACHE_LONG = "public, max-age=3600"
+# Payloads that must not outlive the request (e.g. an upstream outage's empty result)
+CACHE_NONE = "no-store"
+
+
+@dataclass
+class CachedResponse:
+    body: bytes
+    etag: str
+    stored_at: float
+
+
+def make_etag(body: bytes) -> str:
+    """Strong ETag for a serialized response body."""
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Evaluate an If-None-Match header against our ETag (RFC 9110 §13.1.2)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+class ResponseCache:
+    """Thread-safe TTL + LRU cache of serialized JSON responses."""
+
+    def __init__(self, ttl_seconds: int, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if time.monotonic() - entry.stored_at > self.ttl_seconds:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, body: bytes) -> CachedResponse:
+        entry = CachedResponse(body=body, etag=make_etag(body), stored_at=time.monotonic())
+        if self.max_entries <= 0:
+            return entry
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def invalidate(self, *prefixes: str) -> int:
+        """Drop every entry whose key starts with one of the given prefixes."""
+        with self._lock:
+            doomed = [k for k in self._entries if k.startswith(prefixes)]
+            for k in doomed:
+                del self._entries[k]
+        return len(doomed)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+response_cache = ResponseCache(
+    ttl_seconds=settings.response_cache_ttl_seconds,
+    max_entries=settings.response_cache_max_entries if settings.response_cache_enabled else 0,
+)
+
+
+def conditional_response(request: Request, entry: CachedResponse, cache_control: str) -> Response:
+    """Return 304 if the client already holds this representation, else the full body."""
+    headers = {"ETag": entry.etag, "Cache-Control": cache_control}
+    if etag_matches(request.headers.get("if-none-match"), entry.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
+
+
+async def cached_json(
+    request: Request,
+    key: Optional[str],
+    producer: Callable[[], Awaitable[BaseModel]],
+    cache_control: str = CACHE_REVALIDATE,
+    cacheable: Optional[Callable[[BaseModel], bool]] = None,
+) -> Response:
+    """Serve a pydantic payload with ETag/Cache-Control, reusing the shared cache.
+
+    producer is only awaited on a cache miss. HTTPExceptions it raises (404 etc.)
+    propagate unchanged and nothing is stored. Pass key=None to skip the shared
+    cache but still get ETag handling. A payload for which cacheable() is false
+    is neither stored nor cacheable downstream (Cache-Control: no-store).
+    """
+    entry = response_cache.get(key) if key else None
+    if entry is None:
+        payload = await producer()
+        body = payload.model_dump_json().encode()
+        if cacheable is not None and not cacheable(payload):
+            key, cache_control = None, CACHE_NONE
+        entry = response_cache.set(key, body) if key else CachedResponse(
+            body=body, etag=make_etag(body), stored_at=time.monotonic()
+        )
+    return conditional_response(request, entry, cache_control)
@@ -0,0 +1,86 @@
+"""
+Constant-memory handling of multipart uploads.
+
+Data flow:
+  UploadFile (Starlette has already spooled the part to its own temp file)
+    → spool_upload(): read UPLOAD_CHUNK_BYTES at a time
+        → enforce max_bytes as bytes arrive (413 + cleanup on overflow)
+        → update sha256 incrementally
+        → append to a NamedTemporaryFile we own
+    → SpooledUpload(path, size_bytes, sha256)
+    → StorageService.upload_path() streams the file to storage / background
+      tasks read it from disk; caller unlinks it when done
+
+No step ever holds more than one chunk of the payload in memory, so peak
+memory per upload is independent of file size.
+"""
+import asyncio
+import hashlib
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+
+from fastapi import HTTPException, UploadFile
+
+UPLOAD_CHUNK_BYTES = 1024 * 1024  # 1 MB
+
+
+@dataclass
+class SpooledUpload:
+    path: Path
+    filename: str
+    content_type: str
+    size_bytes: int
+    sha256: str
+
+    def unlink(self) -> None:
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def _too_large(max_bytes: int) -> HTTPException:
+    return HTTPException(
+        status_code=413,
+        detail=f"File too large (max {max_bytes // (1024 * 1024)} MB)",
+    )
+
+
+async def spool_upload(file: UploadFile, max_bytes: int, suffix: str = "") -> SpooledUpload:
+    """Copy an upload to a temp file in chunks, sizing and hashing it on the way.
+
+    Raises 413 as soon as the running size passes max_bytes; the partial temp
+    file is removed before the exception propagates.
+    """
+    if file.size is not None and file.size > max_bytes:
+        raise _too_large(max_bytes)
+
+    digest = hashlib.sha256()
+    size = 0
+    tmp = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
+    path = Path(tmp.name)
+    try:
+        while True:
+            chunk = await file.read(UPLOAD_CHUNK_BYTES)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_bytes:
+                raise _too_large(max_bytes)
+            digest.update(chunk)
+            await asyncio.to_thread(tmp.write, chunk)
+        tmp.flush()
+    except BaseException:
+        tmp.close()
+        path.unlink(missing_ok=True)
+        raise
+    tmp.close()
+
+    return SpooledUpload(
+        path=path,
+        filename=file.filename or "upload",
+        content_type=file.content_type or "application/octet-stream",
+        size_bytes=size,
+        sha256=digest.hexdigest(),
+    )
@@ -0,0 +1,134 @@
+"""
+Benchmark for the clearance engine (app/services/clearance.py).
+
+Builds a synthetic ~200K-triangle engine bay (noisy open tub, like a LiDAR
+scan) and a ~100K-triangle engine (superellipsoid block), places the engine
+close to the floor and one frame rail, and times BVH / distance-grid
+construction, a full clearance evaluation, and incremental re-evaluations
+after small position nudges (the PUT engine_position path). Then builds the
+bay's sparse signed distance field (the background job) and times the same
+evaluation as SDF reads.
+
+Usage (from backend/):
+    python -m benchmarks.bench_clearance [--bay 200000] [--engine 100000] [--repeat 3] [--voxel-mm 10]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.services.bay_sdf import BaySDF
+from app.services.clearance import INCH, MARGIN_INCHES, BayField, ClearanceSession, MeshPart, evaluate_clearance
+from app.config import get_settings
+
+
+def _grid(nu: int, nv: int, fn) -> tuple[np.ndarray, np.ndarray]:
+    u, v = np.meshgrid(np.linspace(0, 1, nu), np.linspace(0, 1, nv), indexing="ij")
+    vertices = fn(u.reshape(-1), v.reshape(-1))
+    idx = np.arange(nu * nv).reshape(nu, nv)
+    a, b, c, d = idx[:-1, :-1], idx[1:, :-1], idx[:-1, 1:], idx[1:, 1:]
+    faces = np.concatenate([np.stack([a, b, d], -1), np.stack([a, d, c], -1)]).reshape(-1, 3)
+    return vertices, faces
+
+
+def bay_mesh(triangles: int, seed: int = 0) -> tuple[np.ndarray, np.ndarray]:
+    """Open tub 1.0 m wide, 0.8 m tall, 1.2 m long with ~3 mm scan noise."""
+    rng = np.random.default_rng(seed)
+    w, h, length = 1.0, 0.8, 1.2
+    panels = [
+        lambda u, v: np.stack([(u - 0.5) * w, np.zeros_like(u), (v - 0.5) * length], -1),  # floor
+        lambda u, v: np.stack([np.full_like(u, -w / 2), u * h, (v - 0.5) * length], -1),  # right rail
+        lambda u, v: np.stack([np.full_like(u, w / 2), u * h, (v - 0.5) * length], -1),  # left rail
+        lambda u, v: np.stack([(u - 0.5) * w, v * h, np.full_like(u, -length / 2)], -1),  # firewall
+    ]
+    n = int(np.sqrt(triangles / len(panels) / 2)) + 1
+    vertices, faces = [], []
+    for panel in panels:
+        v, f = _grid(n, n, panel)
+        faces.append(f + sum(len(x) for x in vertices))
+        vertices.append(v + rng.normal(scale=0.003, size=v.shape))
+    return np.concatenate(vertices).astype(np.float32), np.concatenate(faces)
+
+
+def engine_mesh(triangles: int) -> tuple[np.ndarray, np.ndarray]:
+    """Rounded block 0.6 × 0.55 × 0.7 m centred on the origin."""
+    n = int(np.sqrt(triangles / 2)) + 1
+
+    def _superellipsoid(u, v):
+        theta, phi = u * 2 * np.pi, (v - 0.5) * np.pi
+        e = 0.3
+
+        def spow(x):
+            return np.sign(x) * np.abs(x) ** e
+
+        return np.stack([
+            0.30 * spow(np.cos(phi)) * spow(np.cos(theta)),
+            0.275 * spow(np.sin(phi)),
+            0.35 * spow(np.cos(phi)) * spow(np.sin(theta)),
+        ], -1)
+
+    return tuple(x.astype(t) for x, t in zip(_grid(n, n, _superellipsoid), (np.float32, np.int64)))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bay", type=int, default=200_000)
+    parser.add_argument("--engine", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--voxel-mm", type=float, default=get_settings().bay_sdf_voxel_mm)
+    args = parser.parse_args()
+
+    bay_v, bay_f = bay_mesh(args.bay)
+    eng_v, eng_f = engine_mesh(args.engine)
+    print(f"bay: {len(bay_f):,} triangles   engine: {len(eng_f):,} triangles / {len(eng_v):,} vertices")
+
+    t0 = time.perf_counter()
+    reach = (get_settings().clearance_max_inches + MARGIN_INCHES) * INCH
+    bay = BayField.build(bay_v, bay_f, reach)
+    print(f"BVH + distance grid build: {time.perf_counter() - t0:.2f}s (depth {bay.bvh.depth})")
+
+    # 0.3" above the floor, 0.2" into the right rail, 3.5° driveline angle
+    position = {"x": -0.5 + 0.30 - 0.005, "y": 0.275 + 0.008, "z": 0.0, "rotation_deg": 3.5}
+    parts = [MeshPart("engine", eng_v, eng_f)]
+    for i in range(args.repeat):
+        t0 = time.perf_counter()
+        result = evaluate_clearance(parts, bay, position)
+        elapsed = time.perf_counter() - t0
+        print(
+            f"full evaluation {i + 1}: {elapsed:.2f}s   min clearance {result.min_clearance_in:+.2f}\"   "
+            f"zones {[(z['region'], z['clearance_inches'], z['severity']) for z in result.zones[:4]]}"
+        )
+
+    session = ClearanceSession(parts, bay)
+    session.evaluate(position)
+    for step in range(1, 6):
+        # Nudge a tenth of an inch up and a quarter degree of pitch at a time
+        nudged = {**position, "y": position["y"] + step * 0.1 * INCH, "rotation_deg": 3.5 - step * 0.25}
+        t0 = time.perf_counter()
+        result = session.evaluate(nudged)
+        elapsed = time.perf_counter() - t0
+        print(
+            f"nudge {step}: {elapsed:.2f}s   re-queried {result.requeried:,} of {len(result.clearance_in):,} "
+            f"vertices   min clearance {result.min_clearance_in:+.2f}\""
+        )
+
+    t0 = time.perf_counter()
+    sdf = BaySDF.build(bay_v, bay_f, reach, args.voxel_mm / 1000)
+    size = len(sdf.to_bytes())
+    print(
+        f"SDF build ({args.voxel_mm:g} mm voxels): {time.perf_counter() - t0:.2f}s   "
+        f"{sdf.stored_bricks:,} of {sdf.index.size:,} bricks stored, {size / 1e6:.1f} MB compressed"
+    )
+    exact = evaluate_clearance(parts, bay, position)
+    for i in range(args.repeat):
+        t0 = time.perf_counter()
+        result = evaluate_clearance(parts, sdf, position)
+        elapsed = time.perf_counter() - t0
+        print(
+            f"SDF evaluation {i + 1}: {elapsed * 1000:.0f}ms   min clearance {result.min_clearance_in:+.2f}\"   "
+            f"max |Δ| vs exact within 1\": "
+            f"{abs(result.clearance_in - exact.clearance_in)[exact.clearance_in < 1].max():.3f}\""
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Benchmark for batch fitment screening (app/services/fitment.py).
+
+Builds a synthetic catalog of engine rows (as the column SELECT returns them,
+with ~15% of specs missing) and times turning them into arrays, screening
+them against one chassis and transmission, and ranking the top 50.
+
+Usage (from backend/):
+    python -m benchmarks.bench_fitment [--engines 10000] [--repeat 5]
+"""
+import argparse
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+from app.services.fitment import EngineColumns, screen_engines
+
+
+def catalog(n: int, seed: int = 0) -> list[tuple]:
+    rng = np.random.default_rng(seed)
+
+    def _spec(low: float, high: float) -> list:
+        values = np.round(rng.uniform(low, high, n), 1)
+        return [None if missing else float(v) for v, missing in zip(values, rng.random(n) < 0.15)]
+
+    length, width, pan = _spec(18, 36), _spec(16, 32), _spec(2, 7)
+    power = rng.integers(90, 800, n)
+    torque = [None if t is None else int(t) for t in _spec(80, 750)]
+    return [
+        (f"engine-{i}", "Make", f"Model {i}", None, f"family-{i % 40}", int(power[i]),
+         torque[i], length[i], width[i], pan[i])
+        for i in range(n)
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--engines", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rows = catalog(args.engines)
+    vehicle = SimpleNamespace(engine_bay_length_in=30.0, engine_bay_width_in=27.0, stock_ground_clearance_in=6.0)
+    transmission = SimpleNamespace(max_torque_capacity_lb_ft=450)
+    print(f"catalog: {len(rows):,} engines")
+
+    for i in range(args.repeat):
+        t0 = time.perf_counter()
+        engines = EngineColumns.from_rows(rows)
+        t1 = time.perf_counter()
+        screen = screen_engines(engines, vehicle, transmission)
+        t2 = time.perf_counter()
+        top = screen.ranked(50)
+        t3 = time.perf_counter()
+        print(
+            f"run {i + 1}: arrays {(t1 - t0) * 1e3:.1f}ms   screen {(t2 - t1) * 1e3:.2f}ms   "
+            f"rank top 50 {(t3 - t2) * 1e3:.2f}ms   "
+            f"{int((~screen.ruled_out).sum()):,} candidates, best {top[0]['model'] if top else '-'}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Benchmark for uploaded-PDF page extraction (app/services/pdf_ingestor.py).
+
+Writes a synthetic factory-manual PDF (a heading every dozen pages, ~45 lines
+of body text per page) and times extracting it serially in one process
+(PDFIngestor.extract_text) against the page-range process pool
+(PDFIngestor.iter_pages), with heading detection on.
+
+Usage (from backend/):
+    python -m benchmarks.bench_pdf_ingest [--pages 1500] [--workers 4] [--per-task 50]
+"""
+import argparse
+import asyncio
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from pypdf import PdfWriter
+from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject
+
+from app.services import pdf_ingestor
+
+SYSTEMS = ["ENGINE MECHANICAL", "COOLING SYSTEM", "FUEL SYSTEM", "IGNITION", "TRANSMISSION", "BRAKES", "WIRING"]
+WORDS = ("remove install bolt torque gasket bracket harness connector clamp hose "
+         "sensor inspect replace tighten specification clearance bearing seal").split()
+
+
+def _escape(line: str) -> str:
+    return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def synthetic_manual(path: Path, pages: int, seed: int = 0) -> None:
+    rng = random.Random(seed)
+    writer = PdfWriter()
+    font = DictionaryObject({
+        NameObject("/Type"): NameObject("/Font"),
+        NameObject("/Subtype"): NameObject("/Type1"),
+        NameObject("/BaseFont"): NameObject("/Helvetica"),
+    })
+    for n in range(pages):
+        lines = []
+        if n % 12 == 0:
+            lines.append(f"SECTION {n // 12 + 1} - {SYSTEMS[(n // 12) % len(SYSTEMS)]}")
+        lines += [" ".join(rng.choices(WORDS, k=12)).capitalize() + "." for _ in range(45)]
+        lines.append(f"Page {n + 1}")
+        ops = ["BT", "/F1 9 Tf", "11 TL", "50 760 Td"] + [f"({_escape(line)}) Tj T*" for line in lines] + ["ET"]
+
+        page = writer.add_blank_page(width=612, height=792)
+        page[NameObject("/Resources")] = DictionaryObject({
+            NameObject("/Font"): DictionaryObject({NameObject("/F1"): font}),
+        })
+        content = DecodedStreamObject()
+        content.set_data("\n".join(ops).encode("latin-1"))
+        page[NameObject("/Contents")] = writer._add_object(content)
+    with open(path, "wb") as f:
+        writer.write(f)
+
+
+async def _parallel(path: Path) -> list[dict]:
+    return [page async for page in pdf_ingestor.PDFIngestor().iter_pages(path, detect_headings=True)]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=1500)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--per-task", type=int, default=50)
+    args = parser.parse_args()
+
+    pdf_ingestor.settings.pdf_extract_workers = args.workers
+    pdf_ingestor.settings.pdf_pages_per_task = args.per_task
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "manual.pdf"
+        t0 = time.perf_counter()
+        synthetic_manual(path, args.pages)
+        print(f"synthetic manual: {args.pages:,} pages, {path.stat().st_size / 1e6:.1f} MB "
+              f"(written in {time.perf_counter() - t0:.1f}s)")
+
+        t0 = time.perf_counter()
+        serial = pdf_ingestor.PDFIngestor().extract_text(path, detect_headings=True)
+        t_serial = time.perf_counter() - t0
+        print(f"serial:   {t_serial:.2f}s   {len(serial):,} pages")
+
+        # First run includes spawning the pool; the second is the steady state
+        for label in ("parallel (cold pool)", "parallel (warm pool)"):
+            t0 = time.perf_counter()
+            pages = asyncio.run(_parallel(path))
+            elapsed = time.perf_counter() - t0
+            print(f"{label}: {elapsed:.2f}s   {len(pages):,} pages   {t_serial / elapsed:.1f}x")
+        assert pages == serial
+        sections = {p["section_path"].split(" > ")[0] for p in pages}
+        print(f"sections detected: {len(sections)} (e.g. {pages[-1]['section_path']!r})")
+        pdf_ingestor.shutdown_extract_pool()
+
+
+if __name__ == "__main__":
+    main()
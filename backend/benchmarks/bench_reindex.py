@@ -0,0 +1,89 @@
+"""
+Benchmark for re-indexing a charm.li manual (app/services/rag_indexer.py).
+
+Writes a synthetic N-page HTML manual, indexes it into an in-memory SQLite DB,
+then times an unchanged re-index (every page skipped by content hash), a
+re-index after editing and deleting a handful of pages, and a forced full
+re-index.
+
+Usage (from backend/):
+    python -m benchmarks.bench_reindex [--pages 20000] [--changed 20]
+"""
+import argparse
+import asyncio
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.services.rag_indexer import IndexStats, RAGIndexer
+
+SYSTEMS = ["Engine Mechanical", "Cooling System", "Fuel System", "Ignition", "Transmission", "Brakes", "Wiring"]
+WORDS = ("remove install bolt torque gasket bracket harness connector clamp hose "
+         "sensor inspect replace tighten specification clearance bearing seal").split()
+
+
+def _page(rng: random.Random, n: int) -> str:
+    body = "".join(
+        f"<p>{' '.join(rng.choices(WORDS, k=14)).capitalize()}.</p>" for _ in range(8)
+    )
+    return f"<html><body><h2>Procedure {n}</h2>{body}</body></html>"
+
+
+def synthetic_manual(root: Path, pages: int, seed: int = 0) -> None:
+    rng = random.Random(seed)
+    for n in range(pages):
+        folder = root / SYSTEMS[n % len(SYSTEMS)] / f"Group {n // 100}"
+        folder.mkdir(parents=True, exist_ok=True)
+        (folder / f"page{n}.html").write_text(_page(rng, n))
+
+
+async def _run(root: Path, pages: int, changed: int) -> None:
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    Session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def _index(label: str, **kwargs) -> None:
+        stats = IndexStats()
+        async with Session() as db:
+            t0 = time.perf_counter()
+            count = await RAGIndexer().index_manual(root, "Toyota", "Supra", 1993, None, db, stats=stats, **kwargs)
+            elapsed = time.perf_counter() - t0
+        print(f"{label:<22} {elapsed:7.2f}s   {count:,} chunks written, {stats.pages_parsed:,} parsed, "
+              f"{stats.pages_skipped:,} skipped, {stats.pages_removed:,} removed")
+
+    await _index("initial index")
+    await _index("unchanged re-index")
+
+    files = sorted(root.rglob("*.html"))
+    rng = random.Random(1)
+    for path in rng.sample(files, changed):
+        path.write_text(_page(rng, -1))
+    for path in rng.sample(files, changed):
+        path.unlink(missing_ok=True)
+    await _index(f"{changed} edited, ~{changed} gone")
+    await _index("full re-index", full=True)
+    await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=20000)
+    parser.add_argument("--changed", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp) / "manual"
+        t0 = time.perf_counter()
+        synthetic_manual(root, args.pages)
+        print(f"synthetic manual: {args.pages:,} pages (written in {time.perf_counter() - t0:.1f}s)")
+        asyncio.run(_run(root, args.pages, args.changed))
+
+
+if __name__ == "__main__":
+    main()
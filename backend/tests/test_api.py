@@ -2,6 +2,11 @@
 Basic API tests for SwapSpec backend.
 Run with: pytest tests/
 """
+import hashlib
+import os
+import uuid
+from pathlib import Path
+
 import pytest
 from unittest.mock import MagicMock, patch, AsyncMock
 from httpx import AsyncClient, ASGITransport
@@ -87,6 +92,64 @@ async def test_health(client: AsyncClient):
     assert response.json()["status"] == "healthy"
 
 
+@pytest.mark.anyio
+async def test_health_db_reports_pools(client: AsyncClient):
+    """/health/db exposes per-profile pool checkout stats."""
+    response = await client.get("/health/db")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["db"] == "connected"
+    assert set(data["pools"]) == {"api", "worker"}
+    assert data["pools"]["api"]["checkouts"] >= 1
+    assert "wait_buckets" in data["pools"]["api"]
+
+
+@pytest.mark.anyio
+async def test_metrics_endpoint(client: AsyncClient):
+    """/metrics exposes route latency, per-request DB stats and pool gauges in Prometheus format."""
+    from app.services.metrics import track_external
+
+    assert (await client.get("/api/engines")).status_code == 200
+    with track_external("carquery"):
+        pass
+
+    response = await client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    assert 'swapspec_http_requests_total{method="GET",route="/api/engines",status="200"}' in body
+    assert 'swapspec_http_request_duration_seconds_bucket{method="GET",route="/api/engines",le="+Inf"}' in body
+    assert 'swapspec_http_request_db_queries_count{method="GET",route="/api/engines"}' in body
+    assert 'swapspec_db_query_duration_seconds_count{engine="api",operation="SELECT"}' in body
+    assert 'swapspec_external_api_duration_seconds_count{service="carquery",outcome="ok"}' in body
+    assert 'swapspec_db_pool_checkout_wait_seconds_count{pool="api"}' in body
+
+
+def test_request_stats_stop_collecting_after_finish():
+    """Queries run after the middleware finished (BackgroundTasks share the
+    request's context) are not added to its RequestStats."""
+    from types import SimpleNamespace
+    from app.services import metrics
+
+    after = metrics._make_after_cursor_execute("worker")
+    conn = SimpleNamespace(info={})
+
+    def _query(sql: str) -> None:
+        metrics._before_cursor_execute(conn, None, sql, None, None, False)
+        after(conn, None, sql, None, None, False)
+
+    with patch.object(metrics.settings, "slow_request_log_ms", 1):
+        stats, token = metrics.start_request()
+        _query("SELECT 1")
+        metrics.finish_request(stats, token, "POST", "/api/manuals/ingest", 202)
+        token = metrics._current.set(stats)  # as seen from a background task
+        try:
+            _query("INSERT INTO manual_chunks VALUES (1)")
+        finally:
+            metrics._current.reset(token)
+    assert stats.closed and stats.db_count == 1 and stats.queries == []
+
+
 @pytest.mark.anyio
 async def test_register_user(client: AsyncClient):
     """Test user registration."""
@@ -119,6 +182,46 @@ async def test_login(client: AsyncClient):
     assert data["token_type"] == "bearer"
 
 
+@pytest.mark.anyio
+async def test_token_verifier_local_hs256():
+    """HS256 tokens verify locally without a Supabase round trip; bad signatures are rejected."""
+    import time
+    import jwt
+    from app.services.token_verifier import TokenVerifier, InvalidToken
+
+    verifier = TokenVerifier()
+    verifier.local_dev = False
+    verifier.jwt_secret = "test-jwt-secret-for-hs256-verification"
+    claims = {"sub": FAKE_USER_ID, "aud": "authenticated", "exp": int(time.time()) + 300}
+    good = jwt.encode(claims, verifier.jwt_secret, algorithm="HS256")
+    forged = jwt.encode(claims, "some-other-secret-of-sufficient-len", algorithm="HS256")
+
+    with patch("app.services.supabase_client.get_supabase_client") as mock_client:
+        assert await verifier.resolve_user_id(good) == FAKE_USER_ID
+        with pytest.raises(InvalidToken):
+            await verifier.resolve_user_id(forged)
+        mock_client.assert_not_called()
+
+
+@pytest.mark.anyio
+async def test_token_verifier_caches_remote_fallback():
+    """Opaque tokens fall back to supabase.auth.get_user once, then hit the cache."""
+    from app.services.token_verifier import TokenVerifier
+
+    verifier = TokenVerifier()
+    verifier.local_dev = False
+    mock_supabase = _make_mock_supabase()
+    with patch("app.services.supabase_client.get_supabase_client", return_value=mock_supabase):
+        assert await verifier.resolve_user_id(FAKE_ACCESS_TOKEN) == FAKE_USER_ID
+        assert await verifier.resolve_user_id(FAKE_ACCESS_TOKEN) == FAKE_USER_ID
+    assert mock_supabase.auth.get_user.call_count == 1
+
+    verifier.forget_user(FAKE_USER_ID)
+    with patch("app.services.supabase_client.get_supabase_client", return_value=mock_supabase):
+        await verifier.resolve_user_id(FAKE_ACCESS_TOKEN)
+    assert mock_supabase.auth.get_user.call_count == 2
+
+
 @pytest.mark.anyio
 async def test_list_engines_empty(client: AsyncClient):
     """Test listing engines when empty."""
@@ -191,6 +294,100 @@ async def test_create_and_get_engine(client: AsyncClient):
     assert get_response.json()["displacement_liters"] == 6.2
 
 
+@pytest.mark.anyio
+async def test_get_engine_etag_conditional(client: AsyncClient):
+    """GET by id returns a strong ETag; If-None-Match with it yields 304."""
+    headers = {"Authorization": f"Bearer {FAKE_ACCESS_TOKEN}"}
+
+    create_response = await client.post(
+        "/api/engines",
+        json={"make": "Toyota", "model": "1JZ-GTE", "power_hp": 276},
+        headers=headers,
+    )
+    assert create_response.status_code == 201
+    engine_id = create_response.json()["id"]
+
+    first = await client.get(f"/api/engines/{engine_id}")
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    assert etag.startswith('"') and etag.endswith('"')
+    assert first.headers["cache-control"] == "no-cache"
+    assert first.json()["model"] == "1JZ-GTE"
+
+    second = await client.get(f"/api/engines/{engine_id}", headers={"If-None-Match": etag})
+    assert second.status_code == 304
+    assert second.headers["etag"] == etag
+    assert second.content == b""
+
+    stale = await client.get(f"/api/engines/{engine_id}", headers={"If-None-Match": '"stale"'})
+    assert stale.status_code == 200
+
+    missing = await client.get("/api/engines/does-not-exist")
+    assert missing.status_code == 404
+
+
+def test_response_cache_invalidation_and_lru():
+    """Prefix invalidation drops matching keys; capacity evicts least-recently used."""
+    from app.utils.http_cache import ResponseCache
+
+    cache = ResponseCache(ttl_seconds=60, max_entries=2)
+    a = cache.set("engine:a", b'{"id":"a"}')
+    cache.set("engine:b", b'{"id":"b"}')
+    assert cache.get("engine:a").etag == a.etag  # touch a so b is LRU
+    cache.set("vehicle:c", b'{"id":"c"}')
+    assert cache.get("engine:b") is None
+    assert cache.invalidate("engine:") == 1
+    assert cache.get("engine:a") is None
+    assert cache.get("vehicle:c") is not None
+
+
+@pytest.mark.anyio
+async def test_admin_update_user_drops_cached_row(client: AsyncClient):
+    """PATCH /api/admin/users/{id} saves the change and forgets the cached User row."""
+    from app.database import async_session_maker
+    from app.models.user import User, UserRole
+    from app.utils.auth import _user_rows
+
+    headers = {"Authorization": f"Bearer {FAKE_ACCESS_TOKEN}"}
+    async with async_session_maker() as session:
+        session.add(User(id="admin-target-1", email="target@example.com"))
+        (await session.get(User, FAKE_USER_ID)).role = UserRole.admin
+        await session.commit()
+    _user_rows.pop(FAKE_USER_ID)
+    _user_rows.set("admin-target-1", {"id": "admin-target-1", "email": "target@example.com"})
+
+    try:
+        response = await client.patch(
+            "/api/admin/users/admin-target-1", json={"account_type": "professional"}, headers=headers
+        )
+        assert response.status_code == 200
+        assert response.json()["account_type"] == "professional"
+        assert _user_rows.get("admin-target-1") is None
+    finally:
+        async with async_session_maker() as session:
+            (await session.get(User, FAKE_USER_ID)).role = UserRole.user
+            await session.commit()
+        _user_rows.pop(FAKE_USER_ID)
+
+
+def test_user_row_cache_is_bounded_and_expires():
+    """Auth snapshots are capped LRU-first and dropped once past their TTL."""
+    from app.utils.auth import UserRowCache
+
+    cache = UserRowCache(ttl_seconds=60, max_entries=2)
+    cache.set("a", {"id": "a"})
+    cache.set("b", {"id": "b"})
+    assert cache.get("a") == {"id": "a"}  # touch a so b is LRU
+    cache.set("c", {"id": "c"})
+    assert cache.get("b") is None and len(cache) == 2
+    cache.pop("a")
+    assert cache.get("a") is None
+
+    with patch("app.utils.auth.time.monotonic", return_value=10**9):
+        assert cache.get("c") is None
+    assert len(cache) == 0
+
+
 @pytest.mark.anyio
 async def test_create_engine_with_data_sources(client: AsyncClient):
     """Test that engine creation properly tracks data sources."""
@@ -364,6 +561,29 @@ async def test_spec_lookup_vehicle(client: AsyncClient):
     assert "confidence" in data
 
 
+@pytest.mark.anyio
+async def test_spec_lookup_empty_result_not_cached(client: AsyncClient):
+    """An empty lookup (e.g. CarQuery down) is sent no-store and retried next time."""
+    from app.routers import specs
+    from app.services.spec_lookup import SpecLookupResult
+
+    params = {"make": "Nissan", "model": "RB26", "year": 1995}
+    outage = AsyncMock(return_value=SpecLookupResult())
+    with patch.object(specs.spec_lookup, "lookup_engine_specs", outage):
+        response = await client.get("/api/specs/lookup/engine", params=params)
+    assert response.status_code == 200
+    assert response.json()["specs"] == {}
+    assert response.headers["cache-control"] == "no-store"
+
+    found = AsyncMock(return_value=SpecLookupResult(specs={"power_hp": 276}, sources={"power_hp": "carquery"}))
+    with patch.object(specs.spec_lookup, "lookup_engine_specs", found):
+        response = await client.get("/api/specs/lookup/engine", params=params)
+        assert response.json()["specs"] == {"power_hp": 276}
+        assert response.headers["cache-control"] == "public, max-age=3600"
+        await client.get("/api/specs/lookup/engine", params=params)
+    assert found.await_count == 1
+
+
 @pytest.mark.anyio
 async def test_list_vehicles_unauthenticated_sees_only_approved(client: AsyncClient):
     """Test that unauthenticated users only see approved vehicles."""
@@ -409,6 +629,221 @@ async def test_list_vehicles_authenticated_sees_own_pending(client: AsyncClient)
     assert created["id"] in vehicle_ids
 
 
+@pytest.mark.anyio
+async def test_manual_search_routes_to_replica(client: AsyncClient, tmp_path):
+    """/api/manuals/search reads from the replica, except for a client that just
+    wrote: its write response pins that client (and only it) to the primary."""
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+    import app.database as database
+    from app.models.manual_chunk import ManualChunk
+
+    replica = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'replica.db'}")
+    async with replica.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    replica_maker = async_sessionmaker(replica, class_=AsyncSession, expire_on_commit=False)
+    async with replica_maker() as session:
+        session.add(ManualChunk(
+            vehicle_make="Datsun", vehicle_model="240Z", vehicle_year=1972,
+            section_path="Engine > Torque", content="replica-only cylinder head torque 58 ft-lb",
+        ))
+        await session.commit()
+
+    params = {"q": "replica-only", "make": "Datsun", "model": "240Z", "year": 1972}
+    headers = {"Authorization": f"Bearer {FAKE_ACCESS_TOKEN}"}
+    try:
+        with patch.object(database, "read_session_maker", replica_maker), \
+             patch.object(database.replica_router, "enabled", True):
+            client.cookies.clear()
+            from_replica = await client.get("/api/manuals/search", params=params)
+            assert from_replica.status_code == 200
+            assert from_replica.json()["total"] == 1
+            assert database.PRIMARY_COOKIE not in from_replica.cookies
+
+            # Client A writes → its response carries the pin cookie
+            write = await client.post(
+                "/api/vehicles", json={"year": 1971, "make": "Datsun", "model": "510"}, headers=headers
+            )
+            assert write.status_code == 201
+            assert database.PRIMARY_COOKIE in write.cookies
+
+            # A keeps reading its own writes from the primary...
+            from_primary = await client.get("/api/manuals/search", params=params)
+            assert from_primary.json()["total"] == 0
+
+            # ...while client B, without the cookie, still uses the replica
+            client.cookies.clear()
+            other_client = await client.get("/api/manuals/search", params=params)
+            assert other_client.json()["total"] == 1
+    finally:
+        client.cookies.clear()
+        await replica.dispose()
+
+
+@pytest.mark.anyio
+async def test_manual_chunk_neighbors(client: AsyncClient):
+    """A chunk expands to the chunks around it on the same page, in order."""
+    from app.database import async_session_maker
+    from app.models.manual_chunk import ManualChunk
+
+    chunks = [
+        ManualChunk(
+            vehicle_make="Datsun", vehicle_model="240Z", vehicle_year=1972,
+            section_path="Engine > Specs", content=f"part {i}", page_id="page-240z-specs", chunk_ordinal=i,
+        )
+        for i in range(5)
+    ]
+    async with async_session_maker() as session:
+        session.add_all(chunks)
+        await session.commit()
+
+    response = await client.get(f"/api/manuals/chunks/{chunks[2].id}/neighbors", params={"radius": 1})
+    assert response.status_code == 200
+    assert [c["content"] for c in response.json()["chunks"]] == ["part 1", "part 2", "part 3"]
+    assert response.json()["chunks"][0]["page_id"] == "page-240z-specs"
+
+    missing = await client.get("/api/manuals/chunks/no-such-chunk/neighbors")
+    assert missing.status_code == 404
+
+
+@pytest.mark.anyio
+async def test_ingest_status_stream_pushes_updates(client: AsyncClient):
+    """The SSE stream reads the job once, then relays published updates until it finishes."""
+    import asyncio
+    import json
+    from app.database import async_session_maker
+    from app.models.ingest_job import IngestJob
+    from app.services.job_events import job_events
+    from app.services.manual_ingestor import finish_job, job_status, publish_job
+
+    async with async_session_maker() as session:
+        job = IngestJob(job_id="sse-job-1", status="running", stage="indexing")
+        session.add(job)
+        await session.commit()
+
+    headers = {"Authorization": f"Bearer {FAKE_ACCESS_TOKEN}"}
+    request = asyncio.create_task(
+        client.get("/api/manuals/status/sse-job-1/stream", headers=headers)
+    )
+    for _ in range(100):
+        if job_events.subscriber_count("sse-job-1"):
+            break
+        await asyncio.sleep(0.01)
+    assert job_events.subscriber_count("sse-job-1") == 1
+
+    job.chunks_indexed = 50
+    publish_job(job)
+    finish_job(job, "complete")
+    publish_job(job)
+
+    response = await asyncio.wait_for(request, timeout=5)
+    events = [json.loads(line[6:]) for line in response.text.splitlines() if line.startswith("data: ")]
+    assert [(e["status"], e["chunks_indexed"]) for e in events] == [
+        ("running", 0), ("running", 50), ("complete", 50),
+    ]
+    assert job_events.subscriber_count("sse-job-1") == 0
+
+
+@pytest.mark.anyio
+async def test_ingest_status_stream_rereads_without_notify(client: AsyncClient):
+    """A job updated by a process that sends no NOTIFY (e.g. the manuals CLI)
+    still reaches the stream on the next heartbeat, even with the listener up."""
+    import asyncio
+    import json
+    from app.database import async_session_maker
+    from app.models.ingest_job import IngestJob
+    from app.routers import manuals
+    from app.services.job_events import JobEventBus
+
+    async with async_session_maker() as session:
+        session.add(IngestJob(job_id="sse-job-cli", status="running", stage="indexing"))
+        await session.commit()
+
+    headers = {"Authorization": f"Bearer {FAKE_ACCESS_TOKEN}"}
+    with patch.object(JobEventBus, "listening", True), \
+         patch.object(manuals.get_settings(), "sse_heartbeat_seconds", 0.05):
+        request = asyncio.create_task(
+            client.get("/api/manuals/status/sse-job-cli/stream", headers=headers)
+        )
+        await asyncio.sleep(0.2)
+        async with async_session_maker() as session:
+            job = await session.get(IngestJob, "sse-job-cli")
+            job.status, job.stage = "complete", "done"
+            await session.commit()
+        response = await asyncio.wait_for(request, timeout=5)
+
+    events = [json.loads(line[6:]) for line in response.text.splitlines() if line.startswith("data: ")]
+    assert [e["status"] for e in events] == ["running", "complete"]
+    assert ": ping" in response.text
+
+
+@pytest.mark.anyio
+async def test_job_event_bus_reconnects_dropped_listener():
+    """A LISTEN connection that drops is reopened with backoff after failed attempts."""
+    import asyncio
+    from app.services import job_events as job_events_module
+    from app.services.job_events import JobEventBus
+
+    class _FakeConn:
+        def __init__(self):
+            self.on_terminate = None
+
+        async def add_listener(self, channel, callback):
+            pass
+
+        def add_termination_listener(self, callback):
+            self.on_terminate = callback
+
+        async def close(self):
+            pass
+
+    conns = [_FakeConn(), _FakeConn()]
+    attempts = iter([conns[0], OSError("primary restarting"), conns[1]])
+
+    async def _connect(dsn, timeout):
+        result = next(attempts)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    bus = JobEventBus()
+    with patch("asyncpg.connect", _connect), \
+         patch.object(job_events_module, "RECONNECT_MIN_SECONDS", 0.01):
+        await bus.start("postgresql://db/app")
+        assert bus._conn is conns[0]
+        conns[0].on_terminate(conns[0])
+        assert not bus.listening
+        for _ in range(100):
+            if bus.listening:
+                break
+            await asyncio.sleep(0.01)
+        assert bus._conn is conns[1]
+        await bus.stop()
+    assert not bus.listening
+
+
+def test_job_event_bus_keeps_latest_and_ignores_own_notify():
+    import asyncio
+    import json
+    from app.services.job_events import JobEventBus, QUEUE_SIZE
+
+    bus = JobEventBus()
+    queue = bus.subscribe("j")
+    for i in range(QUEUE_SIZE + 5):
+        bus.publish("j", {"n": i})
+    assert queue.qsize() == QUEUE_SIZE
+    drained = [queue.get_nowait()["n"] for _ in range(QUEUE_SIZE)]
+    assert drained[-1] == QUEUE_SIZE + 4
+
+    # NOTIFY echoes of our own publishes are dropped; other workers' are delivered
+    bus._on_notify(None, 0, "ingest_job_events", json.dumps({"origin": bus._origin, "job_id": "j", "payload": {"n": -1}}))
+    assert queue.empty()
+    bus._on_notify(None, 0, "ingest_job_events", json.dumps({"origin": "other", "job_id": "j", "payload": {"n": -2}}))
+    assert queue.get_nowait() == {"n": -2}
+
+    bus.unsubscribe("j", queue)
+    assert bus.subscriber_count("j") == 0
+
+
 @pytest.mark.anyio
 async def test_vin_decode(client: AsyncClient):
     """Test VIN decoding endpoint."""
@@ -449,6 +884,38 @@ async def test_file_upload(client: AsyncClient):
     assert "stored_path" in data
     assert "url" in data
     assert data["size_bytes"] == 12
+    assert data["sha256"] == hashlib.sha256(b"test content").hexdigest()
+
+
+@pytest.mark.anyio
+async def test_spool_upload_enforces_limit_incrementally():
+    """Oversized uploads are rejected mid-stream and leave no temp file behind."""
+    import io
+    from fastapi import HTTPException, UploadFile
+    from app.utils import uploads
+
+    payload = b"x" * (3 * 1024 + 10)
+    with patch.object(uploads, "UPLOAD_CHUNK_BYTES", 1024):
+        spooled = await uploads.spool_upload(UploadFile(io.BytesIO(payload), filename="a.bin"), 4096)
+        assert spooled.size_bytes == len(payload)
+        assert spooled.sha256 == hashlib.sha256(payload).hexdigest()
+        assert spooled.path.read_bytes() == payload
+        spooled.unlink()
+        assert not spooled.path.exists()
+
+        created = []
+        real_ntf = uploads.tempfile.NamedTemporaryFile
+
+        def _tracking_ntf(*args, **kwargs):
+            tmp = real_ntf(*args, **kwargs)
+            created.append(tmp.name)
+            return tmp
+
+        with patch.object(uploads.tempfile, "NamedTemporaryFile", _tracking_ntf):
+            with pytest.raises(HTTPException) as exc:
+                await uploads.spool_upload(UploadFile(io.BytesIO(payload), filename="a.bin"), 2048)
+        assert exc.value.status_code == 413
+        assert created and not any(os.path.exists(p) for p in created)
 
 
 @pytest.mark.anyio
@@ -479,6 +946,39 @@ async def test_mesh_upload_valid(client: AsyncClient):
     assert response.status_code == 200
     data = response.json()
     assert data["filename"] == "model.obj"
+    assert data["lod_status"] is None
+
+
+@pytest.mark.anyio
+async def test_mesh_upload_queues_lods_for_engine(client: AsyncClient):
+    """A mesh attached to an engine is queued for LOD generation."""
+    headers = {"Authorization": f"Bearer {FAKE_ACCESS_TOKEN}"}
+    engine = await client.post(
+        "/api/engines", json={"make": "Nissan", "model": "RB26DETT"}, headers=headers
+    )
+    engine_id = engine.json()["id"]
+
+    obj_content = b"v 0 0 0\nv 1 0 0\nv 0 1 0\nf 1 2 3\n"
+    with patch("app.routers.files.process_uploaded_mesh") as process:
+        response = await client.post(
+            "/api/files/upload/mesh",
+            files={"file": ("engine.obj", obj_content, "application/octet-stream")},
+            data={"engine_id": engine_id},
+            headers=headers,
+        )
+    assert response.status_code == 200
+    assert response.json()["lod_status"] == "queued"
+    process.assert_called_once()
+    assert process.call_args.kwargs["engine_id"] == engine_id
+    Path(process.call_args.args[0]).unlink(missing_ok=True)
+
+    missing = await client.post(
+        "/api/files/upload/mesh",
+        files={"file": ("engine.obj", obj_content, "application/octet-stream")},
+        data={"engine_id": str(uuid.uuid4())},
+        headers=headers,
+    )
+    assert missing.status_code == 404
 
 
 # ============================================================
@@ -585,6 +1085,23 @@ async def test_clear_chat_history(client: AsyncClient, build_with_auth):
 # ============================================================
 
 
+@pytest.mark.anyio
+async def test_local_storage_mount_serves_public_buckets_only(tmp_path):
+    """STORAGE_BACKEND=local serves meshes/manuals/uploads statically, never export ZIPs."""
+    from fastapi import FastAPI
+    from app.main import mount_local_storage
+
+    for bucket, name in [("meshes", "bay.glb"), ("exports", "u1/job.zip")]:
+        (tmp_path / bucket / name).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / bucket / name).write_bytes(b"data")
+    local_app = FastAPI()
+    mount_local_storage(local_app, str(tmp_path), "/storage")
+
+    async with AsyncClient(transport=ASGITransport(app=local_app), base_url="http://test") as ac:
+        assert (await ac.get("/storage/meshes/bay.glb")).status_code == 200
+        assert (await ac.get("/storage/exports/u1/job.zip")).status_code == 404
+
+
 @pytest.mark.anyio
 async def test_build_export_json(client: AsyncClient, build_with_auth):
     """Test JSON build export includes new spec fields."""
@@ -626,3 +1143,181 @@ async def test_build_export_pdf(client: AsyncClient, build_with_auth):
         assert response.content[:4] == b"%PDF"
     else:
         assert "WeasyPrint" in response.json()["detail"]
+
+
+# ============================================================
+# Clearance Tests
+# ============================================================
+
+
+@pytest.mark.anyio
+async def test_build_clearance_requires_meshes(client: AsyncClient, build_with_auth):
+    """Clearance needs both an engine mesh and a bay scan."""
+    build_id = build_with_auth["build_id"]
+    headers = build_with_auth["headers"]
+
+    response = await client.post(f"/api/builds/{build_id}/clearance", headers=headers)
+    assert response.status_code == 400
+    assert "mesh" in response.json()["detail"]
+
+    response = await client.post("/api/builds/does-not-exist/clearance", headers=headers)
+    assert response.status_code == 404
+
+
+@pytest.mark.anyio
+async def test_vehicle_point_clearance_needs_distance_field(client: AsyncClient):
+    """Point clearance is served from the bay SDF; scans without one report 409."""
+    headers = {"Authorization": f"Bearer {FAKE_ACCESS_TOKEN}"}
+    bare = await client.post(
+        "/api/vehicles", json={"year": 1989, "make": "Mazda", "model": "RX-7"}, headers=headers
+    )
+    points = {"points": [[0.0, 0.1, 0.2]]}
+    response = await client.post(f"/api/vehicles/{bare.json()['id']}/clearance", json=points)
+    assert response.status_code == 400
+
+    scanned = await client.post(
+        "/api/vehicles",
+        json={"year": 1989, "make": "Mazda", "model": "RX-7", "bay_scan_mesh_url": "/storage/meshes/rx7.glb"},
+        headers=headers,
+    )
+    vehicle_id = scanned.json()["id"]
+    assert scanned.json()["bay_sdf_url"] is None
+    response = await client.post(f"/api/vehicles/{vehicle_id}/clearance", json=points)
+    assert response.status_code == 409
+    response = await client.post(f"/api/vehicles/{vehicle_id}/clearance", json={"points": []})
+    assert response.status_code == 422
+
+    with patch("app.routers.vehicles.generate_bay_sdf") as generate:
+        response = await client.post(f"/api/vehicles/{vehicle_id}/bay-sdf", headers=headers)
+    assert response.status_code == 202
+    generate.assert_called_once_with(vehicle_id)
+
+
+@pytest.mark.anyio
+async def test_fitment_screen_ranks_engines(client: AsyncClient):
+    """Screening grades each engine against the bay and ranks the roomiest first."""
+    headers = {"Authorization": f"Bearer {FAKE_ACCESS_TOKEN}"}
+    vehicle = await client.post(
+        "/api/vehicles",
+        json={
+            "year": 1972, "make": "Datsun", "model": "240Z",
+            "engine_bay_length_in": 30.0, "engine_bay_width_in": 26.0, "stock_ground_clearance_in": 6.0,
+        },
+        headers=headers,
+    )
+    vehicle_id = vehicle.json()["id"]
+    specs = {
+        "Roomy": {"dimensions_l": 24.0, "dimensions_w": 20.0, "oil_pan_depth_in": 3.0, "torque_lb_ft": 250},
+        "Snug": {"dimensions_l": 29.5, "dimensions_w": 20.0, "oil_pan_depth_in": 3.0, "torque_lb_ft": 250},
+        "Huge": {"dimensions_l": 32.0, "dimensions_w": 20.0, "oil_pan_depth_in": 3.0, "torque_lb_ft": 250},
+        "Mystery": {"torque_lb_ft": 400},
+    }
+    for model, spec in specs.items():
+        response = await client.post(
+            "/api/engines", json={"make": "Screenco", "model": model, "power_hp": 300, **spec}, headers=headers
+        )
+        assert response.status_code == 201
+    trans = await client.post(
+        "/api/transmissions",
+        json={"make": "Screenco", "model": "T5", "max_torque_capacity_lb_ft": 300},
+        headers=headers,
+    )
+
+    response = await client.post(
+        "/api/fitment/screen", json={"vehicle_id": vehicle_id, "make": "Screenco"}, headers=headers
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["screened"] == 4 and data["candidates"] == 3
+    assert [r["model"] for r in data["results"]] == ["Roomy", "Snug", "Mystery"]
+    roomy, snug, mystery = data["results"]
+    assert roomy["status"] == "fits" and roomy["length_margin_in"] == 6.0
+    assert snug["status"] == "tight" and snug["checks"]["length"] == "tight"
+    assert mystery["status"] == "unverified" and mystery["checks"]["width"] == "unknown"
+
+    response = await client.post(
+        "/api/fitment/screen",
+        json={
+            "vehicle_id": vehicle_id, "transmission_id": trans.json()["id"],
+            "make": "Screenco", "include_no_fit": True,
+        },
+        headers=headers,
+    )
+    results = {r["model"]: r for r in response.json()["results"]}
+    assert [r["model"] for r in response.json()["results"]][-2:] == ["Huge", "Mystery"]
+    assert results["Huge"]["checks"]["length"] == "fail"
+    assert results["Mystery"]["checks"]["torque"] == "fail" and results["Mystery"]["torque_ratio"] == 1.33
+    assert results["Roomy"]["checks"]["torque"] == "ok"
+
+    response = await client.post("/api/fitment/screen", json={"vehicle_id": str(uuid.uuid4())})
+    assert response.status_code == 404
+
+
+@pytest.mark.anyio
+async def test_bulk_export_job(client: AsyncClient, build_with_auth, tmp_path):
+    """Bulk export zips the builds' JSON (and PDFs), reports progress via polling,
+    and serves the ZIP only to its owner until it expires."""
+    import io
+    import json
+    import zipfile
+    from app.database import async_session_maker
+    from app.models.export_job import ExportJob
+    from app.services import build_export
+    from app.services.storage import LocalStorageBackend
+
+    headers = build_with_auth["headers"]
+    build_id = build_with_auth["build_id"]
+    backend = LocalStorageBackend(root=tmp_path, base_url="/storage")
+
+    with patch("app.services.storage.get_storage_backend", return_value=backend):
+        response = await client.post(
+            "/api/builds/export-jobs",
+            json={"build_ids": [build_id, str(uuid.uuid4())], "include_pdf": False},
+            headers=headers,
+        )
+        assert response.status_code == 202
+        job_id = response.json()["job_id"]
+        assert response.json()["builds_total"] == 1
+
+        status_response = await client.get(f"/api/builds/export-jobs/{job_id}", headers=headers)
+        job = status_response.json()
+        assert job["status"] == "complete", job
+        assert job["builds_done"] == 1
+        assert job["download_url"] == f"/api/builds/export-jobs/{job_id}/download"
+        assert {"loading", "packaging", "uploading"} <= set(job["stage_timings"])
+
+        download = await client.get(job["download_url"], headers=headers)
+        assert download.status_code == 200
+        assert download.headers["content-type"] == "application/zip"
+        assert "no-store" in download.headers["cache-control"]
+        with zipfile.ZipFile(io.BytesIO(download.content)) as zf:
+            assert zf.namelist() == ["builds.json"]
+            combined = json.loads(zf.read("builds.json"))
+        assert [b["build"]["id"] for b in combined] == [build_id]
+        assert "recommendations" in combined[0]
+        assert list((tmp_path / "exports").rglob("*.zip"))[0].name == f"{job_id}.zip"
+
+        # No token, or someone else's job: no download
+        assert (await client.get(job["download_url"])).status_code in (401, 403)
+        async with async_session_maker() as session:
+            other = ExportJob(user_id=str(uuid.uuid4()), build_ids=[build_id], status="complete",
+                              result_key=f"{FAKE_USER_ID}/{job_id}.zip")
+            session.add(other)
+            await session.commit()
+        response = await client.get(f"/api/builds/export-jobs/{other.job_id}/download", headers=headers)
+        assert response.status_code == 404
+
+        # Past retention: gone from the poll, the download and the bucket
+        with patch.object(build_export.settings, "export_retention_hours", 0):
+            assert (await client.get(job["download_url"], headers=headers)).status_code == 410
+            assert await build_export.purge_expired_exports() == 1
+        job = (await client.get(f"/api/builds/export-jobs/{job_id}", headers=headers)).json()
+        assert job["status"] == "expired" and job["download_url"] is None
+        assert not list((tmp_path / "exports").rglob("*.zip"))
+
+    response = await client.post(
+        "/api/builds/export-jobs", json={"build_ids": [str(uuid.uuid4())], "include_pdf": False}, headers=headers
+    )
+    assert response.status_code == 404
+    response = await client.get(f"/api/builds/export-jobs/{uuid.uuid4()}", headers=headers)
+    assert response.status_code == 404
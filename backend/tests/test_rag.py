@@ -4,10 +4,26 @@ Tests for the agentic RAG pipeline.
 Covers:
   - _parse_breadcrumb_path: semantic section_path extraction from charm.li HTML
   - _walk_htmls: symlink rejection, HTML-only filtering
+  - ManualIndex: one walk answering GapAnalyzer checks, shared with index_manual
+  - GapFiller: bounded concurrent LLM calls, results cached per vehicle/spec/prompt version
   - _upsert_chunk: source priority precedence (SQLite fallback path)
-  - _handle_image_page: vision / storage-upload / stub routing
+  - _handle_image_page: vision / stub routing
+  - index_manual: diagram uploads batched and run concurrently
+  - StorageService: local backend, bounded concurrent upload_many
+  - DiagramStore: content-addressed diagram dedup across manuals / re-indexes
+  - mesh_processor: decimation budget, OBJ/STL/GLB round-trip, LOD pipeline
+  - clearance: BVH nearest-point queries, signed clearance + zones, build payload
+  - bay_sdf: sparse signed distance field accuracy, storage round-trip, SDF job
+  - recommendations: rule messages, memo keying, batch evaluation
+  - PDFService: report cache keyed by export payload
+  - run_export_job: bulk export ZIP (PDFs + combined JSON) and job progress
+  - index_manual: content-hash skip of unchanged pages, stale pages by set difference
+  - app.cli manuals: bounded concurrency, checkpoint resume, summary, host throttle
+  - PDFIngestor: heading detection, page ranges in the process pool, batched upserts
+  - chunker: heading/table-aware chunks with overlap, stale-chunk trim, neighbors
   - _execute_fetch_diagram: SSRF guard (HTTPS, host, private-IP layers)
   - search_chunks: ILIKE fallback on SQLite + scope filter
+  - search_snippets / headline: query-centred passages sent to the advisor
   - run_pipeline: regression — no TypeError from vision= parameter mismatch
 """
 import uuid
@@ -143,6 +159,122 @@ class TestWalkHtmls:
         assert len(files) == 1
 
 
+# ---------------------------------------------------------------------------
+# ManualIndex — one walk shared by GapAnalyzer and index_manual
+# ---------------------------------------------------------------------------
+
+class TestManualIndex:
+    def test_gap_checks_answered_from_one_walk(self, tmp_path):
+        from app.services.gap_analyzer import CRITICAL_CHECKS, GapAnalyzer
+        from app.services.manual_index import ManualIndex
+
+        def _page(rel: str, body: str) -> None:
+            path = tmp_path / rel / "index.html"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(f"<html><body>{body}</body></html>")
+
+        _page(CRITICAL_CHECKS["general_engine_specs"], "<p>Bore 86 mm</p>")
+        _page(CRITICAL_CHECKS["ecu_wiring_pt1"] + "/Page 2", "<p>Error parsing diagram</p>")
+        # Not at the expected path, but named like its last part
+        _page("Repair and Diagnosis/Other/Fuel Pressure", "<p>43 psi</p>")
+
+        with patch.object(Path, "rglob", side_effect=AssertionError("per-check tree walk")):
+            index = ManualIndex.build(tmp_path)
+            report = GapAnalyzer().analyze(tmp_path, "Toyota", "Supra", 1993, index=index)
+        assert {"general_engine_specs", "fuel_pressure_specs"} <= set(report.present)
+        assert "ecu_wiring_pt1" in report.broken
+        assert "transmission_specs" in report.missing
+        assert len(index.pages) == 3
+
+        # A page GapFiller writes after the walk
+        _page(CRITICAL_CHECKS["transmission_specs"], "<table><tr><td>Capacity</td><td>2.5 qt</td></tr></table>")
+        index.add(CRITICAL_CHECKS["transmission_specs"] + "/index.html")
+        report = GapAnalyzer().analyze(tmp_path, "Toyota", "Supra", 1993, index=index)
+        assert "transmission_specs" in report.present and len(index.pages) == 4
+
+    @pytest.mark.anyio
+    async def test_index_manual_reuses_the_pipeline_index(self, tmp_path, sqlite_db):
+        from app.services.manual_index import ManualIndex
+        from app.services.rag_indexer import IndexStats, RAGIndexer
+
+        for i in range(3):
+            (tmp_path / f"page{i}.html").write_text(f"<html><body><p>Step {i}: torque to spec.</p></body></html>")
+        index = ManualIndex.build(tmp_path)
+
+        with patch.object(ManualIndex, "build", side_effect=AssertionError("walked again")):
+            count = await RAGIndexer().index_manual(
+                tmp_path, "Toyota", "Supra", 1993, None, sqlite_db, manual_index=index,
+            )
+            assert count == 3
+            # Unchanged pages are skipped on their indexed hash, without a read
+            stats = IndexStats()
+            with patch.object(Path, "read_bytes", side_effect=AssertionError("page re-read")):
+                await RAGIndexer().index_manual(
+                    tmp_path, "Toyota", "Supra", 1993, None, sqlite_db, stats=stats, manual_index=index,
+                )
+        assert stats.pages_skipped == 3
+
+
+# ---------------------------------------------------------------------------
+# GapFiller — concurrent async LLM calls, result cache
+# ---------------------------------------------------------------------------
+
+class TestGapFiller:
+    @pytest.mark.anyio
+    async def test_fills_concurrently_and_reuses_cached_results(self, tmp_path):
+        import asyncio
+        from app.services import gap_filler
+        from app.services.gap_analyzer import GapReport
+        from app.services.gap_filler import GapFiller
+
+        in_flight = {"now": 0, "peak": 0}
+
+        async def _create(**kwargs):
+            in_flight["now"] += 1
+            in_flight["peak"] = max(in_flight["peak"], in_flight["now"])
+            await asyncio.sleep(0.02)
+            in_flight["now"] -= 1
+            if "Thermostat" in kwargs["messages"][0]["content"]:
+                raise RuntimeError("rate limited")
+            table = "<table><tr><th>Specification</th><th>Value</th></tr><tr><td>Torque</td><td>65 ft-lb</td></tr></table>"
+            return MagicMock(content=[MagicMock(text=table)], usage=None)
+
+        def _filler() -> GapFiller:
+            filler = GapFiller()
+            filler._provider = "anthropic"
+            filler._client = MagicMock()
+            filler._client.messages.create = AsyncMock(side_effect=_create)
+            return filler
+
+        report = GapReport(
+            missing=["general_engine_specs", "engine_mount_specs", "thermostat_specs", "transfer_case"],
+            broken=["ecu_wiring_pt1"],
+        )
+        with patch.object(gap_filler.settings, "gap_fill_concurrency", 2), \
+             patch.object(gap_filler.settings, "gap_fill_cache_path", str(tmp_path / "cache")):
+            filler = _filler()
+            filled = await filler.fill_gaps(tmp_path / "manual", report, "Toyota", "Supra", 1993)
+            assert in_flight["peak"] == 2 and filler._client.messages.create.await_count == 5
+            # Report order, with the failed call dropped (and not cached)
+            assert [f.spec_name for f in filled] == [
+                "general_engine_specs", "engine_mount_specs", "transfer_case", "ecu_wiring_pt1",
+            ]
+            assert (tmp_path / "manual" / filled[0].relative_path).is_file()
+
+            # Re-ingesting the same vehicle: only the uncached spec goes to the LLM
+            again = _filler()
+            refilled = await again.fill_gaps(tmp_path / "manual2", report, "TOYOTA", "Supra", 1993)
+            assert again._client.messages.create.await_count == 1
+            assert refilled == filled
+            assert (tmp_path / "manual2" / filled[0].relative_path).is_file()
+
+            # A new prompt version regenerates everything
+            with patch.object(gap_filler, "PROMPT_VERSION", gap_filler.PROMPT_VERSION + 1):
+                bumped = _filler()
+                await bumped.fill_gaps(tmp_path / "manual3", report, "Toyota", "Supra", 1993)
+            assert bumped._client.messages.create.await_count == 5
+
+
 # ---------------------------------------------------------------------------
 # Source precedence — _upsert_chunk (SQLite fallback path)
 # ---------------------------------------------------------------------------
@@ -282,7 +414,6 @@ class TestHandleImagePage:
             result = await _make_indexer()._handle_image_page(
                 **self._base_kwargs(img),
                 vision_extractor=mock_ve,
-                storage_service=None,
             )
 
         assert result["data_source"] == "charm_li_vision"
@@ -290,58 +421,958 @@ class TestHandleImagePage:
 
     @pytest.mark.anyio
     async def test_vision_skips_non_vision_category(self, tmp_path):
-        """Even with a vision_extractor, non-vision categories fall through to storage."""
+        """Even with a vision_extractor, non-vision categories fall through to a stub
+        (index_manual resolves stubs through the DiagramStore)."""
         img = tmp_path / "text_page.png"
         img.write_bytes(b"\x89PNG\r\n" + b"fake")
 
         mock_ve = MagicMock()
-        mock_ss = MagicMock()
-        mock_ss.upload_bytes = AsyncMock(return_value="https://fake.supabase.co/img.png")
 
         with patch("app.services.vision_extractor.is_vision_category", return_value=False):
             result = await _make_indexer()._handle_image_page(
                 **self._base_kwargs(img),
                 vision_extractor=mock_ve,
-                storage_service=mock_ss,
             )
 
         mock_ve.extract.assert_not_called()
-        assert result["data_source"] == "charm_li_image"
+        assert result["data_source"] == "charm_li_stub"
 
     @pytest.mark.anyio
-    async def test_storage_upload_path(self, tmp_path):
-        img = tmp_path / "diagram.png"
-        img.write_bytes(b"\x89PNG\r\n" + b"x" * 100)
-
-        mock_ss = MagicMock()
-        mock_ss.upload_bytes = AsyncMock(
-            return_value="https://fake.supabase.co/manuals/diagram.png"
-        )
+    async def test_stub_fallback_path(self, tmp_path):
+        img = tmp_path / "stub.png"
+        img.write_bytes(b"\x89PNG\r\n" + b"fake")
 
         with patch("app.services.vision_extractor.is_vision_category", return_value=False):
             result = await _make_indexer()._handle_image_page(
                 **self._base_kwargs(img),
                 vision_extractor=None,
-                storage_service=mock_ss,
             )
 
-        assert result["data_source"] == "charm_li_image"
-        assert result["source_url"] == "https://fake.supabase.co/manuals/diagram.png"
+        assert result["data_source"] == "charm_li_stub"
+        assert result["source_url"] is None
+
 
+class _SlowLocalBackend:
+    """LocalStorageBackend that records how many uploads are in flight at once."""
+
+    def __init__(self, root):
+        from app.services.storage import LocalStorageBackend
+        self.inner = LocalStorageBackend(root=root, base_url="/storage")
+        self.active = 0
+        self.peak = 0
+        self.uploads = 0
+
+    async def upload(self, *args):
+        import asyncio
+        self.uploads += 1
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(0.02)
+        await self.inner.upload(*args)
+        self.active -= 1
+
+    def public_url(self, bucket, path):
+        return self.inner.public_url(bucket, path)
+
+
+class TestStorageUploads:
     @pytest.mark.anyio
-    async def test_stub_fallback_path(self, tmp_path):
-        img = tmp_path / "stub.png"
-        img.write_bytes(b"\x89PNG\r\n" + b"fake")
+    async def test_local_backend_roundtrip(self, tmp_path):
+        from app.services.storage import LocalStorageBackend, StorageService
+
+        storage = StorageService(LocalStorageBackend(root=tmp_path, base_url="/storage"))
+        url = await storage.upload_bytes("a/b.png", b"png", "image/png", bucket="manuals")
+        assert url == "/storage/manuals/a/b.png"
+        assert (tmp_path / "manuals" / "a" / "b.png").read_bytes() == b"png"
+        assert await storage.file_exists("a/b.png", bucket="manuals")
+        assert await storage.delete_file("a/b.png", bucket="manuals")
+        assert not await storage.file_exists("a/b.png", bucket="manuals")
+        with pytest.raises(ValueError):
+            await storage.upload_bytes("../escape.png", b"x", "image/png", bucket="manuals")
+
+    @pytest.mark.anyio
+    async def test_upload_many_is_bounded(self, tmp_path):
+        from app.services import storage as storage_mod
+
+        backend = _SlowLocalBackend(tmp_path)
+        svc = storage_mod.StorageService(backend)
+        items = [(f"d/{i}.png", b"x", "image/png") for i in range(10)]
+        with patch.object(storage_mod.settings, "storage_max_concurrency", 3), \
+             patch.object(storage_mod, "_slots", type(storage_mod._slots)()):
+            urls = await svc.upload_many(items, bucket="manuals")
+        assert urls == [f"/storage/manuals/d/{i}.png" for i in range(10)]
+        assert backend.peak == 3
+
+    @pytest.mark.anyio
+    async def test_index_manual_uploads_diagrams_concurrently(self, tmp_path, sqlite_db):
+        from sqlalchemy import select
+        from app.models.manual_chunk import ManualChunk
+        from app.services.storage import StorageService
+
+        manual_dir = tmp_path / "manual"
+        manual_dir.mkdir()
+        for i in range(4):
+            (manual_dir / f"fig{i}.png").write_bytes(b"\x89PNG" + bytes([i]))
+            (manual_dir / f"page{i}.html").write_text(f'<html><body><img src="fig{i}.png"></body></html>')
 
+        backend = _SlowLocalBackend(tmp_path / "store")
         with patch("app.services.vision_extractor.is_vision_category", return_value=False):
-            result = await _make_indexer()._handle_image_page(
-                **self._base_kwargs(img),
-                vision_extractor=None,
-                storage_service=None,
+            count = await _make_indexer().index_manual(
+                manual_dir, "Toyota", "Supra", 1993, None, sqlite_db,
+                storage_service=StorageService(backend),
             )
 
-        assert result["data_source"] == "charm_li_stub"
-        assert result["source_url"] is None
+        assert count == 4
+        assert backend.peak > 1
+        rows = (await sqlite_db.execute(select(ManualChunk))).scalars().all()
+        assert {r.data_source for r in rows} == {"charm_li_image"}
+        assert all(r.source_url.startswith("/storage/manuals/diagrams/") for r in rows)
+        assert len({r.source_url for r in rows}) == 4
+
+
+class TestDiagramDedup:
+    @pytest.mark.anyio
+    async def test_shared_diagrams_uploaded_once(self, tmp_path, sqlite_db):
+        """Identical images across manuals (and re-indexes) hit storage only once."""
+        from sqlalchemy import func, select
+        from app.models.diagram_asset import DiagramAsset
+        from app.services.storage import StorageService
+
+        def _manual(name, images):
+            d = tmp_path / name
+            d.mkdir()
+            for i, data in enumerate(images):
+                (d / f"fig{i}.png").write_bytes(data)
+                (d / f"page{i}.html").write_text(f'<html><body><img src="fig{i}.png"></body></html>')
+            return d
+
+        shared = b"\x89PNG shared wiring diagram"
+        supra = _manual("supra", [shared, b"\x89PNG supra only"])
+        soarer = _manual("soarer", [shared, shared])
+
+        backend = _SlowLocalBackend(tmp_path / "store")
+        storage = StorageService(backend)
+        indexer = _make_indexer()
+        with patch("app.services.vision_extractor.is_vision_category", return_value=False):
+            await indexer.index_manual(supra, "Toyota", "Supra", 1993, None, sqlite_db, storage_service=storage)
+            await indexer.index_manual(soarer, "Toyota", "Soarer", 1992, None, sqlite_db, storage_service=storage)
+            assert backend.uploads == 2
+            await indexer.index_manual(supra, "Toyota", "Supra", 1993, None, sqlite_db, storage_service=storage)
+            assert backend.uploads == 2
+
+        assert (await sqlite_db.execute(select(func.count()).select_from(DiagramAsset))).scalar() == 2
+        stored = list((tmp_path / "store" / "manuals" / "diagrams").rglob("*.png"))
+        assert len(stored) == 2
+
+
+# ---------------------------------------------------------------------------
+# mesh_processor
+# ---------------------------------------------------------------------------
+
+def _grid_mesh(n: int):
+    """Wavy n×n height-field: 2·(n-1)² triangles."""
+    import numpy as np
+
+    xs, ys = np.meshgrid(np.linspace(0, 1, n), np.linspace(0, 1, n))
+    vertices = np.stack([xs, ys, 0.1 * np.sin(6 * xs) * np.cos(6 * ys)], axis=-1).reshape(-1, 3)
+    idx = np.arange(n * n).reshape(n, n)
+    a, b, c, d = idx[:-1, :-1], idx[:-1, 1:], idx[1:, :-1], idx[1:, 1:]
+    faces = np.concatenate([np.stack([a, b, d], -1), np.stack([a, d, c], -1)]).reshape(-1, 3)
+    return vertices, faces
+
+
+class TestMeshLODs:
+    def test_decimate_respects_budget(self):
+        from app.services.mesh_processor import decimate
+
+        vertices, faces = _grid_mesh(120)
+        v, f = decimate(vertices, faces, 5_000)
+        assert 0 < len(f) <= 5_000
+        # Clustered vertices stay within the source bounds
+        assert (v.min(axis=0) >= vertices.min(axis=0) - 1e-6).all()
+        assert (v.max(axis=0) <= vertices.max(axis=0) + 1e-6).all()
+
+    def test_obj_stl_glb_roundtrip(self, tmp_path):
+        import numpy as np
+        from app.services.mesh_processor import load_mesh, to_glb
+
+        vertices, faces = _grid_mesh(5)
+        obj = tmp_path / "grid.obj"
+        obj.write_text(
+            "".join(f"v {x} {y} {z}\n" for x, y, z in vertices)
+            + "".join(f"f {a + 1} {b + 1} {c + 1}\n" for a, b, c in faces)
+        )
+        v_obj, f_obj = load_mesh(obj)
+        assert len(f_obj) == len(faces)
+
+        tris = vertices[faces].astype("<f4")
+        stl = tmp_path / "grid.stl"
+        stl.write_bytes(
+            b"\0" * 80 + np.uint32(len(faces)).tobytes()
+            + b"".join(b"\0" * 12 + t.tobytes() + b"\0\0" for t in tris)
+        )
+        v_stl, f_stl = load_mesh(stl)
+        assert len(f_stl) == len(faces)
+        assert len(v_stl) == len(vertices)  # shared corners welded
+
+        glb = tmp_path / "grid.glb"
+        glb.write_bytes(to_glb(v_obj, f_obj))
+        v_glb, f_glb = load_mesh(glb)
+        assert np.allclose(v_glb[f_glb], v_obj[f_obj], atol=1e-5)
+
+    @pytest.mark.anyio
+    async def test_process_uploaded_mesh_records_lods(self, tmp_path, sqlite_db):
+        from contextlib import asynccontextmanager
+        from app.models.engine import Engine
+        from app.services import mesh_processor
+        from app.services.mesh_processor import to_glb
+        from app.services.storage import LocalStorageBackend
+
+        engine = Engine(make="Toyota", model="2JZ-GTE")
+        sqlite_db.add(engine)
+        await sqlite_db.commit()
+
+        src = tmp_path / "upload.glb"
+        src.write_bytes(to_glb(*_grid_mesh(60)))
+
+        @asynccontextmanager
+        async def _session():
+            yield sqlite_db
+
+        backend = LocalStorageBackend(root=tmp_path / "store", base_url="/storage")
+        with patch("app.database.worker_session_maker", _session), \
+             patch("app.services.storage.get_storage_backend", return_value=backend), \
+             patch.object(mesh_processor.settings, "mesh_engine_max_triangles", 2_000):
+            await mesh_processor.process_uploaded_mesh(
+                src, "abc.glb", "/storage/meshes/abc.glb", engine_id=engine.id,
+            )
+
+        await sqlite_db.refresh(engine)
+        assert engine.mesh_file_url == "/storage/meshes/abc.glb"
+        assert 0 < engine.mesh_triangle_count <= 2_000
+        assert engine.mesh_lod_urls == {
+            level: f"/storage/meshes/lod/abc/{level}.glb" for level in ("full", "50", "25")
+        }
+        assert (tmp_path / "store" / "meshes" / "lod" / "abc" / "25.glb").is_file()
+        assert not src.exists()
+
+
+# ---------------------------------------------------------------------------
+# clearance
+# ---------------------------------------------------------------------------
+
+def _box_mesh(size, n: int = 8):
+    """Closed axis-aligned box centred on the origin, each side an n×n grid, outward wound."""
+    import numpy as np
+
+    half = np.asarray(size, dtype=float) / 2
+    u, v = np.meshgrid(np.linspace(-1, 1, n), np.linspace(-1, 1, n), indexing="ij")
+    idx = np.arange(n * n).reshape(n, n)
+    quad = np.stack([idx[:-1, :-1], idx[1:, :-1], idx[1:, 1:], idx[:-1, 1:]], -1).reshape(-1, 4)
+    grid_faces = np.concatenate([quad[:, [0, 1, 2]], quad[:, [0, 2, 3]]])
+    vertices, faces = [], []
+    for axis in range(3):
+        for sign in (-1.0, 1.0):
+            a, b = [k for k in range(3) if k != axis]
+            pts = np.zeros((n * n, 3))
+            pts[:, axis], pts[:, a], pts[:, b] = sign, u.reshape(-1), v.reshape(-1)
+            f = grid_faces.copy()
+            normal = np.cross(pts[f[0, 1]] - pts[f[0, 0]], pts[f[0, 2]] - pts[f[0, 0]])
+            if normal[axis] * sign < 0:
+                f = f[:, ::-1]
+            faces.append(f + sum(len(x) for x in vertices))
+            vertices.append(pts * half)
+    return np.concatenate(vertices), np.concatenate(faces)
+
+
+class TestClearance:
+    def test_bvh_matches_brute_force(self):
+        import numpy as np
+        from app.services.clearance import TriangleBVH, closest_points_on_triangles
+
+        rng = np.random.default_rng(7)
+        vertices = rng.random((600, 3))
+        faces = rng.integers(0, 600, (400, 3))
+        points = rng.random((200, 3))
+
+        dist, nearest = TriangleBVH(vertices, faces).closest(points, 0.15)
+        cand = closest_points_on_triangles(points[:, None, :], vertices[faces][None])
+        brute = np.minimum(np.linalg.norm(cand - points[:, None, :], axis=2).min(axis=1), 0.15)
+        assert np.allclose(dist, brute, atol=1e-6)
+        hit = brute < 0.15
+        assert np.allclose(np.linalg.norm(nearest[hit] - points[hit], axis=1), brute[hit], atol=1e-6)
+        assert np.isnan(nearest[~hit]).all()
+
+    def test_clearance_sign_and_zones(self):
+        from app.services.clearance import INCH, MeshPart, TriangleBVH, evaluate_clearance
+
+        floor = _grid_mesh(40)
+        floor[0][:, 2] = 0.0
+        bay = TriangleBVH(floor[0] * 2 - [0.5, 0.5, 0], floor[1])
+        # Box 0.4 m on a side; the floor is the z=0 plane (box z is "up" here)
+        vertices, faces = _box_mesh((0.4, 0.4, 0.4))
+        part = [MeshPart("engine", vertices, faces)]
+
+        above = evaluate_clearance(part, bay, {"x": 0.5, "y": 0.5, "z": 0.2 + 0.5 * INCH})
+        assert abs(above.min_clearance_in - 0.5) < 0.01
+        assert [z["severity"] for z in above.zones] == ["yellow"]
+
+        sunk = evaluate_clearance(part, bay, {"x": 0.5, "y": 0.5, "z": 0.2 - 0.25 * INCH})
+        assert abs(sunk.min_clearance_in + 0.25) < 0.01
+        red = [z for z in sunk.zones if z["severity"] == "red"]
+        assert len(red) == 1 and red[0]["part"] == "engine"
+        # Bottom face (8×8) plus the bottom row of each side face (4×8)
+        assert red[0]["vertex_count"] == 96
+
+        clear = evaluate_clearance(part, bay, {"x": 0.5, "y": 0.5, "z": 0.5})
+        assert clear.zones == []
+        assert (clear.clearance_in == 2.0).all()
+
+    def test_incremental_matches_full_evaluation(self, tmp_path):
+        import numpy as np
+        from app.services.clearance import INCH, BayField, ClearanceSession, MeshPart, evaluate_clearance
+
+        floor_v, floor_f = _grid_mesh(40)
+        floor_v[:, 2] = 0.0
+        bay = BayField.build(floor_v * 2 - [0.5, 0.5, 0], floor_f, reach=3 * INCH)
+        part = [MeshPart("engine", *_box_mesh((0.4, 0.4, 0.4), n=12))]
+
+        session = ClearanceSession(part, bay)
+        first = session.evaluate({"x": 0.5, "y": 0.5, "z": 0.2 + 0.5 * INCH})
+        assert not first.incremental
+        for z, roll in ((0.2 + 0.4 * INCH, 0.0), (0.2 - 0.1 * INCH, 1.5), (0.2 + 0.3 * INCH, -0.5)):
+            position = {"x": 0.5, "y": 0.5, "z": z, "roll_deg": roll}
+            moved = session.evaluate(position)
+            full = evaluate_clearance(part, bay, position)
+            assert moved.incremental
+            # Only the bottom of the box is near the floor
+            assert moved.requeried < len(moved.clearance_in) / 2
+            assert np.allclose(moved.clearance_in, full.clearance_in, atol=1e-6)
+            assert moved.zones == full.zones
+
+        # The persisted form answers queries identically
+        bay.save(tmp_path / "bay.npz")
+        loaded = BayField.load(tmp_path / "bay.npz")
+        position = {"x": 0.5, "y": 0.5, "z": 0.2}
+        assert np.array_equal(
+            evaluate_clearance(part, loaded, position).clearance_in,
+            evaluate_clearance(part, bay, position).clearance_in,
+        )
+
+    @pytest.mark.anyio
+    async def test_compute_build_clearance_payload(self, tmp_path):
+        from types import SimpleNamespace
+        import numpy as np
+        from app.services import clearance
+        from app.services.mesh_processor import to_glb
+        from app.services.storage import LocalStorageBackend
+
+        meshes = tmp_path / "meshes"
+        meshes.mkdir()
+        floor_v, floor_f = _grid_mesh(20)
+        floor_v[:, 2] = 0.0
+        (meshes / "bay.glb").write_bytes(to_glb((floor_v * 2 - [0.5, 0.5, 0]).astype(np.float32), floor_f))
+        box_v, box_f = _box_mesh((0.4, 0.4, 0.4))
+        (meshes / "engine.glb").write_bytes(to_glb(box_v.astype(np.float32), box_f))
+
+        build = SimpleNamespace(
+            id="b1", engine_position={"x": 0.5, "y": 0.5, "z": 0.195}, collision_data=None,
+        )
+        engine = SimpleNamespace(mesh_lod_urls={"full": "/storage/meshes/engine.glb"}, mesh_file_url=None)
+        vehicle = SimpleNamespace(
+            bay_scan_lod_urls=None, bay_scan_mesh_url="/storage/meshes/bay.glb", bay_sdf_url=None,
+        )
+
+        backend = LocalStorageBackend(root=tmp_path, base_url="/storage")
+        with patch.object(clearance.settings, "storage_backend", "local"), \
+             patch.object(clearance.settings, "storage_local_path", str(tmp_path)), \
+             patch.object(clearance.settings, "clearance_cache_path", str(tmp_path / "cache")), \
+             patch("app.services.storage.get_storage_backend", return_value=backend):
+            data = await clearance.compute_build_clearance(build, engine, None, vehicle)
+            assert not data["stats"]["incremental"]
+
+            # Nudge: served from the cached session, and the old vertex file is replaced
+            build.collision_data = data
+            build.engine_position = {"x": 0.5, "y": 0.5, "z": 0.196}
+            nudged = await clearance.compute_build_clearance(build, engine, None, vehicle)
+            assert nudged["stats"]["incremental"]
+            assert nudged["stats"]["requeried_vertices"] < len(box_v)
+            assert not (tmp_path / "meshes" / data["vertex_clearance"]["key"]).exists()
+            assert len(list((tmp_path / "cache").glob("*.npz"))) == 2
+
+            # Replacing the bay mesh drops its cached structures and the session
+            clearance.invalidate_mesh("/storage/meshes/bay.glb")
+            assert "b1" not in clearance._sessions
+            assert len(list((tmp_path / "cache").glob("bay-*.npz"))) == 0
+            build.engine_position = {"x": 0.5, "y": 0.5, "z": 0.195}
+
+            with pytest.raises(clearance.ClearanceUnavailable):
+                await clearance.compute_build_clearance(
+                    build, SimpleNamespace(mesh_lod_urls=None, mesh_file_url=None), None, vehicle,
+                )
+            with pytest.raises(clearance.ClearanceUnavailable):
+                await clearance.compute_build_clearance(
+                    build, SimpleNamespace(mesh_lod_urls=None, mesh_file_url="https://evil.example/x.glb"),
+                    None, vehicle,
+                )
+
+        assert data["min_clearance_inches"] < 0
+        assert data["collision_zones"][0]["severity"] == "red"
+        assert data["collisions"][0].startswith("engine ")
+        vc = nudged["vertex_clearance"]
+        assert vc["parts"] == [{
+            "part": "engine", "mesh_url": "/storage/meshes/engine.glb",
+            "offset": 0, "count": len(box_v), "triangles": len(box_f),
+        }]
+        values = np.frombuffer((tmp_path / "meshes" / vc["key"]).read_bytes(), dtype="<i2")
+        assert len(values) == len(box_v)
+        assert values.min() == round(nudged["min_clearance_inches"] * 100)
+
+
+# ---------------------------------------------------------------------------
+# bay signed distance fields
+# ---------------------------------------------------------------------------
+
+def _tub_mesh(size, n: int = 8):
+    """_box_mesh without its +z side: an open tub, like a bay scan."""
+    vertices, faces = _box_mesh(size, n)
+    return vertices, faces[: len(faces) * 5 // 6]
+
+
+class TestBaySDF:
+    def test_matches_exact_signed_distance(self, tmp_path):
+        import numpy as np
+        from app.services.bay_sdf import BaySDF
+        from app.services.clearance import INCH, TriangleBVH
+
+        vertices, faces = _tub_mesh((0.4, 0.4, 0.4))
+        band = 2 * INCH
+        # Wound inside-out on purpose: orientation comes from the geometry
+        sdf = BaySDF.build(vertices, faces[:, ::-1], band, voxel=0.01, source_url="/storage/meshes/tub.glb")
+        assert 0 < sdf.stored_bricks < sdf.index.size
+
+        rng = np.random.default_rng(3)
+        points = rng.uniform([-0.26, -0.26, -0.26], [0.26, 0.26, 0.1], (4000, 3))
+        dist, _ = TriangleBVH(vertices, faces).closest(points, band)
+        inside = (np.abs(points) < 0.2).all(axis=1)
+        expected = np.where(inside, dist, -dist)
+        sampled = sdf.sample(points)
+        assert np.abs(sampled - expected).max() < 0.1 * INCH
+        assert np.abs(sampled - expected).mean() < 0.01 * INCH
+        # Far outside the field: clamped to the band
+        assert np.allclose(sdf.sample(np.array([[0.0, 0.0, 5.0], [0.0, 0.0, -5.0]])), [band, -band])
+
+        path = tmp_path / "tub.npz"
+        path.write_bytes(sdf.to_bytes())
+        loaded = BaySDF.from_file(path)
+        assert loaded.source_url == "/storage/meshes/tub.glb"
+        assert loaded.triangle_count == len(faces)
+        assert np.array_equal(loaded.sample(points), sampled)
+
+    def test_session_uses_sdf(self):
+        import numpy as np
+        from app.services.bay_sdf import BaySDF
+        from app.services.clearance import INCH, BayField, ClearanceSession, MeshPart
+
+        tub_v, tub_f = _tub_mesh((0.6, 0.6, 0.6), n=12)
+        sdf = BaySDF.build(tub_v, tub_f, 3 * INCH, voxel=0.015)
+        part = [MeshPart("engine", *_box_mesh((0.3, 0.3, 0.3)))]
+        # Resting 0.5" above the tub floor (z = -0.3)
+        position = {"x": 0.0, "y": 0.0, "z": -0.15 + 0.5 * INCH}
+
+        fast = ClearanceSession(part, sdf).evaluate(position)
+        exact = ClearanceSession(part, BayField.build(tub_v, tub_f, 3 * INCH)).evaluate(position)
+        assert fast.method == "sdf" and exact.method == "bvh"
+        assert np.abs(fast.clearance_in - exact.clearance_in).max() < 0.05
+        assert [z["severity"] for z in fast.zones] == [z["severity"] for z in exact.zones] == ["yellow"]
+
+        sunk = ClearanceSession(part, sdf).evaluate({**position, "z": -0.15 - 0.25 * INCH})
+        assert abs(sunk.min_clearance_in + 0.25) < 0.02
+
+    @pytest.mark.anyio
+    async def test_generate_bay_sdf_records_url(self, tmp_path, sqlite_db):
+        from contextlib import asynccontextmanager
+        import numpy as np
+        from app.models.vehicle import Vehicle
+        from app.services import bay_sdf, clearance
+        from app.services.mesh_processor import to_glb
+        from app.services.storage import LocalStorageBackend
+
+        (tmp_path / "meshes").mkdir()
+        tub_v, tub_f = _tub_mesh((0.4, 0.4, 0.4))
+        (tmp_path / "meshes" / "tub.glb").write_bytes(to_glb(tub_v.astype(np.float32), tub_f))
+        vehicle = Vehicle(year=1991, make="Mazda", model="Miata", bay_scan_mesh_url="/storage/meshes/tub.glb")
+        sqlite_db.add(vehicle)
+        await sqlite_db.commit()
+
+        @asynccontextmanager
+        async def _session():
+            yield sqlite_db
+
+        backend = LocalStorageBackend(root=tmp_path, base_url="/storage")
+        with patch("app.database.worker_session_maker", _session), \
+             patch("app.services.storage.get_storage_backend", return_value=backend), \
+             patch.object(clearance.settings, "storage_backend", "local"), \
+             patch.object(clearance.settings, "storage_local_path", str(tmp_path)), \
+             patch.object(clearance.settings, "clearance_cache_path", str(tmp_path / "cache")), \
+             patch.object(bay_sdf.settings, "bay_sdf_voxel_mm", 20.0):
+            url = await bay_sdf.generate_bay_sdf(vehicle.id)
+            await sqlite_db.refresh(vehicle)
+            assert url and vehicle.bay_sdf_url == url
+            assert url.startswith("/storage/meshes/sdf/")
+
+            sdf = await clearance.load_bay_sdf(url)
+            assert sdf.source_url == "/storage/meshes/tub.glb"
+            assert sdf.sample(np.array([[0.0, 0.0, 0.0]]))[0] > 0
+
+
+# ---------------------------------------------------------------------------
+# Recommendations — declarative fitment rules
+# ---------------------------------------------------------------------------
+
+class TestRecommendations:
+    def _specs(self, **engine):
+        from types import SimpleNamespace
+        base = dict(
+            id="e1", fuel_pressure_psi=58.0, fuel_flow_lph=None, cooling_btu_min=None, weight=None,
+            balance_type="External", compression_ratio=None, can_bus_protocol=None, oil_pan_depth_in=None,
+            dimensions_l=33.5, dimensions_w=None, torque_lb_ft=424, displacement_liters=6.2, valve_train="OHV",
+        )
+        base.update(engine)
+        vehicle = SimpleNamespace(
+            id="v1", stock_ground_clearance_in=None, driveline_angle_deg=None,
+            engine_bay_length_in=34.0, engine_bay_width_in=None,
+        )
+        transmission = SimpleNamespace(id="t1", max_torque_capacity_lb_ft=450)
+        return SimpleNamespace(**base), vehicle, transmission
+
+    def test_messages_in_rule_order(self):
+        from types import SimpleNamespace
+        from app.services.recommendations import recommendations_for
+
+        engine, vehicle, transmission = self._specs()
+        build = SimpleNamespace(collision_data={"collisions": ["a", "b", "c", "d"]})
+        messages = recommendations_for(engine, vehicle, transmission, build)
+        assert messages[0].startswith("High-pressure fuel system required: 58.0 psi.")
+        assert messages[1].startswith("CRITICAL: Engine uses external balance.")
+        assert messages[2].startswith('Tight length fitment: engine is 33.5" vs bay 34.0".')
+        assert "is at 94% of transmission capacity (450 lb-ft)" in messages[3]
+        assert messages[4].startswith("Missing critical engine specs: compression ratio, CAN bus protocol.")
+        assert messages[5:] == ["Fitment issue detected: a", "Fitment issue detected: b", "Fitment issue detected: c"]
+
+    def test_memo_keys_on_specs_and_collisions(self):
+        from types import SimpleNamespace
+        from app.services import recommendations
+
+        engine, vehicle, transmission = self._specs(id="memo-engine")
+        build = SimpleNamespace(collision_data=None)
+        with patch.object(recommendations, "evaluate_many", wraps=recommendations.evaluate_many) as evaluate:
+            first = recommendations.recommendations_for(engine, vehicle, transmission, build)
+            first.append("caller mutation")
+            again = recommendations.recommendations_for(engine, vehicle, transmission, build)
+            assert evaluate.call_count == 1 and "caller mutation" not in again
+
+            engine.torque_lb_ft = 200
+            edited = recommendations.recommendations_for(engine, vehicle, transmission, build)
+            build.collision_data = {"collisions": ["engine oil pan: -0.20\" clearance (intersecting)"]}
+            collided = recommendations.recommendations_for(engine, vehicle, transmission, build)
+            assert evaluate.call_count == 3
+        assert not any("transmission capacity" in m for m in edited)
+        assert collided[-1].startswith("Fitment issue detected: engine oil pan")
+
+    def test_batch_matches_single_evaluation(self):
+        from app.services.recommendations import RULES, evaluate_many, match_matrix, rule_counts, spec_vector
+
+        specs = [self._specs(), self._specs(balance_type="internal", torque_lb_ft=None), self._specs(fuel_pressure_psi=0)]
+        vectors = [spec_vector(*s) for s in specs] + [spec_vector(None, None, None)]
+        matrix = match_matrix(vectors)
+        assert matrix.shape == (4, len(RULES)) and not matrix[3].any()
+        batch = evaluate_many(vectors)
+        assert batch[:3] == [evaluate_many([v])[0] for v in vectors[:3]]
+        counts = rule_counts(vectors)
+        assert counts["fuel_pressure"] == 2 and counts["external_balance"] == 2 and counts["torque_capacity"] == 2
+
+
+class TestPDFReportCache:
+    @pytest.mark.anyio
+    async def test_reuses_render_for_same_payload(self):
+        from datetime import datetime, timezone
+        from app.schemas.build import BuildExport
+        from app.services import pdf_service
+
+        def _export(recommendations):
+            build = {
+                "id": "b1", "user_id": "u1", "vehicle_id": "v1", "engine_id": "e1",
+                "status": "draft", "created_at": datetime(2026, 1, 1, tzinfo=timezone.utc),
+            }
+            return BuildExport(build=build, vehicle={"make": "Mazda"}, engine={"make": "Honda"},
+                               recommendations=recommendations)
+
+        service = pdf_service.PDFService()
+        render = AsyncMock(side_effect=[b"%PDF-1", b"%PDF-2"])
+        with patch.object(pdf_service, "_weasyprint_available", True), \
+             patch.object(pdf_service, "_reports", pdf_service.OrderedDict()), \
+             patch.object(pdf_service.PDFService, "_render", render):
+            first = await service.generate_build_report(_export(["a"]))
+            again = await service.generate_build_report(_export(["a"]))
+            changed = await service.generate_build_report(_export(["a", "b"]))
+        assert first == again == b"%PDF-1" and changed == b"%PDF-2"
+        assert render.await_count == 2
+        assert "Honda" in render.await_args_list[0].args[0]
+
+
+class TestBulkExport:
+    @pytest.mark.anyio
+    async def test_export_job_zips_pdfs_and_json(self, tmp_path, sqlite_db):
+        import io
+        import json
+        import zipfile
+        from contextlib import asynccontextmanager
+        from app.models.build import Build
+        from app.models.engine import Engine
+        from app.models.export_job import ExportJob
+        from app.models.user import User
+        from app.models.vehicle import Vehicle
+        from app.services import build_export
+        from app.services.storage import LocalStorageBackend
+
+        sqlite_db.add(User(id="u1", email="shop@example.com"))
+        engine = Engine(make="Honda", model="K24", torque_lb_ft=170)
+        vehicles = [Vehicle(year=1990 + i, make="Mazda", model="Miata") for i in range(3)]
+        sqlite_db.add_all([engine, *vehicles])
+        await sqlite_db.flush()
+        builds = [Build(user_id="u1", vehicle_id=v.id, engine_id=engine.id) for v in vehicles]
+        sqlite_db.add_all(builds)
+        await sqlite_db.flush()
+        job = ExportJob(user_id="u1", build_ids=[b.id for b in reversed(builds)], builds_total=3)
+        sqlite_db.add(job)
+        await sqlite_db.commit()
+
+        @asynccontextmanager
+        async def _session():
+            yield sqlite_db
+
+        render = AsyncMock(side_effect=lambda export: f"%PDF {export.build.id}".encode())
+        backend = LocalStorageBackend(root=tmp_path, base_url="/storage")
+        with patch("app.database.worker_session_maker", _session), \
+             patch("app.services.storage.get_storage_backend", return_value=backend), \
+             patch("app.services.pdf_service.PDFService.generate_build_report", render), \
+             patch.object(build_export, "PROGRESS_EVERY", 1):
+            await build_export.run_export_job(job.job_id)
+
+        await sqlite_db.refresh(job)
+        assert job.status == "complete" and job.builds_done == 3
+        assert job.result_key == f"u1/{job.job_id}.zip"
+        assert render.await_count == 3
+        with zipfile.ZipFile(io.BytesIO((tmp_path / "exports" / "u1" / f"{job.job_id}.zip").read_bytes())) as zf:
+            names = zf.namelist()
+            combined = json.loads(zf.read("builds.json"))
+            pdfs = [zf.read(n) for n in names if n.startswith("pdf/")]
+        assert [b["build"]["id"] for b in combined] == job.build_ids
+        assert names[1].startswith("pdf/001_1992_Mazda_Miata_")
+        assert pdfs == [f"%PDF {b}".encode() for b in job.build_ids]
+
+
+# ---------------------------------------------------------------------------
+# Incremental re-index — content hashes, stale pages by set difference
+# ---------------------------------------------------------------------------
+
+class TestIncrementalReindex:
+    @pytest.mark.anyio
+    async def test_skips_unchanged_pages_and_removes_vanished_ones(self, tmp_path, sqlite_db):
+        from sqlalchemy import select
+        from app.models.manual_chunk import ManualChunk
+        from app.services.rag_indexer import IndexStats, RAGIndexer
+
+        manual_dir = tmp_path / "manual"
+        manual_dir.mkdir()
+        for i in range(5):
+            (manual_dir / f"page{i}.html").write_text(
+                f"<html><body><p>Procedure {i}: torque the bolts to {20 + i} ft-lb.</p></body></html>"
+            )
+        # Same vehicle, not from this manual: never treated as stale
+        sqlite_db.add(ManualChunk(
+            vehicle_make="Toyota", vehicle_model="Supra", vehicle_year=1993,
+            section_path="Uploaded PDF > Page 1", content="Owner notes.",
+            data_source="user_uploaded", scope="chassis", source_priority=5,
+        ))
+        await sqlite_db.commit()
+
+        async def _index(**kwargs) -> tuple[int, IndexStats]:
+            stats = IndexStats()
+            count = await RAGIndexer().index_manual(
+                manual_dir, "Toyota", "Supra", 1993, None, sqlite_db, stats=stats, **kwargs,
+            )
+            return count, stats
+
+        count, stats = await _index()
+        assert count == 5 and stats.pages_parsed == 5
+
+        upserts = AsyncMock()
+        with patch.object(RAGIndexer, "upsert_chunks", upserts):
+            count, stats = await _index()
+        assert count == 0 and stats.pages_skipped == 5 and stats.pages_removed == 0
+        upserts.assert_not_awaited()
+
+        (manual_dir / "page1.html").write_text("<html><body><p>Revised: torque to 25 ft-lb.</p></body></html>")
+        (manual_dir / "page3.html").unlink()
+        count, stats = await _index()
+        assert (count, stats.pages_parsed, stats.pages_skipped, stats.pages_removed) == (1, 1, 3, 1)
+
+        sqlite_db.expunge_all()
+        rows = (await sqlite_db.execute(select(ManualChunk))).scalars().all()
+        contents = {r.section_path: r.content for r in rows}
+        assert "page3" not in contents and contents["page1"].startswith("Revised")
+        assert "Uploaded PDF > Page 1" in contents
+        assert all(r.content_hash for r in rows if r.data_source == "charm_li")
+
+        count, stats = await _index(full=True)
+        assert count == 4 and stats.pages_skipped == 0
+
+
+# ---------------------------------------------------------------------------
+# Manuals CLI — bounded concurrency, checkpoint/resume, JSON summary
+# ---------------------------------------------------------------------------
+
+class TestManualsCLI:
+    @pytest.mark.anyio
+    async def test_run_manuals_bounds_concurrency_and_serializes_shared_manuals(self, tmp_path):
+        import asyncio
+        from app.cli import Checkpoint, ManualWork, run_manuals, summarize
+        from datetime import datetime, timezone
+
+        work = [ManualWork(f"k{i}", f"Manual {i}", f"m{i}") for i in range(4)]
+        # An engine donor manual that is also a chassis manual: must not overlap
+        work += [ManualWork("k4", "Donor A", "shared"), ManualWork("k5", "Donor B", "shared")]
+        active: dict[str, int] = {}
+        peak = {"all": 0, "shared": 0}
+
+        async def _worker(item, run, changed):
+            active[item.manual] = active.get(item.manual, 0) + 1
+            peak["all"] = max(peak["all"], sum(active.values()))
+            peak["shared"] = max(peak["shared"], active.get("shared", 0))
+            await asyncio.sleep(0.02)
+            active[item.manual] -= 1
+            if item.key == "k2":
+                raise RuntimeError("not on charm.li")
+            run.chunks = 10
+            changed()
+
+        checkpoint = Checkpoint(tmp_path / "ck.json", "reindex", {"full": False})
+        runs = await run_manuals(work, _worker, 3, checkpoint)
+
+        assert peak == {"all": 3, "shared": 1}
+        assert [r.status for r in runs] == ["ok", "ok", "failed", "ok", "ok", "ok"]
+        assert runs[2].error == "not on charm.li"
+        reloaded = Checkpoint(tmp_path / "ck.json", "reindex", {"full": False})
+        reloaded.load()
+        assert sorted(reloaded.done) == ["k0", "k1", "k3", "k4", "k5"]
+        # Different options never resume from this checkpoint
+        other = Checkpoint(tmp_path / "ck.json", "reindex", {"full": True})
+        other.load()
+        assert other.done == {}
+
+        summary = summarize("reindex", runs, datetime.now(timezone.utc), 0.1, 3)
+        assert summary["manuals"] == {"total": 6, "ok": 5, "failed": 1, "skipped": 0, "resumed": 0}
+        assert summary["chunks"] == 50 and summary["throughput"]["chunks_per_second"] == 500.0
+
+    def test_reindex_command_resumes_from_checkpoint(self, tmp_path):
+        import asyncio
+        import json
+        from contextlib import asynccontextmanager
+        from sqlalchemy.pool import NullPool
+        from app import cli
+        from app.database import Base
+
+        for name in ("Toyota_1993_Supra", "Mazda_1990_Miata"):
+            manual_dir = tmp_path / "extracted" / name
+            manual_dir.mkdir(parents=True)
+            for i in range(2):
+                (manual_dir / f"page{i}.html").write_text(
+                    f"<html><body><p>{name} step {i}: torque the bolts to spec.</p></body></html>"
+                )
+        (tmp_path / "extracted" / "notes").mkdir()
+
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'cli.db'}", poolclass=NullPool)
+
+        async def _create():
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+
+        asyncio.run(_create())
+        Session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+        @asynccontextmanager
+        async def _session():
+            async with Session() as session:
+                yield session
+
+        summary_path = tmp_path / "summary.json"
+        argv = ["manuals", "reindex", "--no-progress", "-j", "2", "--summary", str(summary_path)]
+        with patch("app.database.worker_session_maker", _session), \
+             patch.object(cli.settings, "manuals_storage_path", str(tmp_path)):
+            assert cli.main(argv) == 0
+            summary = json.loads(summary_path.read_text())
+            assert summary["manuals"]["ok"] == 2 and summary["chunks"] == 4
+            assert not (tmp_path / ".cli_reindex_checkpoint.json").exists()
+
+            # An interrupted run: Mazda finished, Toyota did not
+            checkpoint = cli.Checkpoint(tmp_path / ".cli_reindex_checkpoint.json", "reindex", {"full": False})
+            checkpoint.record(cli.ManualRun("reindex:Mazda_1990_Miata", "1990 Mazda Miata", status="ok"))
+            assert cli.main(argv) == 0
+            summary = json.loads(summary_path.read_text())
+
+        assert summary["manuals"] == {"total": 2, "ok": 1, "failed": 0, "skipped": 0, "resumed": 1}
+        [result] = summary["results"]
+        assert result["label"] == "1993 Toyota Supra" and result["pages_skipped"] == 2
+        assert result["chunks"] == 0
+
+    @pytest.mark.anyio
+    async def test_host_throttle_spaces_request_starts(self):
+        import asyncio
+        from app.services.charm_downloader import HostThrottle
+
+        throttle = HostThrottle(max_concurrency=2, min_interval=0.03)
+        loop = asyncio.get_running_loop()
+        starts = []
+
+        async def _request():
+            async with throttle.slot():
+                starts.append(loop.time())
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(*(_request() for _ in range(4)))
+        gaps = [b - a for a, b in zip(starts, starts[1:])]
+        assert len(starts) == 4 and min(gaps) >= 0.025
+
+
+# ---------------------------------------------------------------------------
+# PDFIngestor — parallel page extraction, heading section paths
+# ---------------------------------------------------------------------------
+
+class TestPDFIngest:
+    def test_detect_heading(self):
+        from app.services.pdf_ingestor import detect_heading
+
+        assert detect_heading("SECTION 6A - ENGINE MECHANICAL\nRemove the bolts.") == "SECTION 6A - ENGINE MECHANICAL"
+        assert detect_heading("12\n6.2 Cooling System\nDrain the coolant.") == "6.2 Cooling System"
+        assert detect_heading("Drain the coolant into a clean pan before removing the hose.") is None
+        assert detect_heading("Page 4 of 90\nTighten to spec.") is None
+
+    @pytest.mark.anyio
+    async def test_ingest_streams_ranges_into_batched_upserts(self, tmp_path, sqlite_db):
+        from sqlalchemy import select
+        from app.models.manual_chunk import ManualChunk
+        from app.services import pdf_ingestor
+        from app.services.rag_indexer import RAGIndexer
+        from benchmarks.bench_pdf_ingest import synthetic_manual
+
+        path = tmp_path / "manual.pdf"
+        synthetic_manual(path, 30)
+        ingestor = pdf_ingestor.PDFIngestor()
+        serial = ingestor.extract_text(path, detect_headings=True)
+        upserts = AsyncMock(wraps=RAGIndexer().upsert_chunks)
+        try:
+            with patch.object(pdf_ingestor.settings, "pdf_pages_per_task", 8), \
+                 patch.object(pdf_ingestor.settings, "pdf_upsert_batch", 10), \
+                 patch.object(RAGIndexer, "upsert_chunks", upserts):
+                parallel = [page async for page in ingestor.iter_pages(path, detect_headings=True)]
+                count = await ingestor.ingest_pdf(
+                    path, "Mazda", "Miata", 1992, "chassis", None, None, None, sqlite_db,
+                    detect_headings=True,
+                )
+        finally:
+            pdf_ingestor.shutdown_extract_pool()
+
+        assert parallel == serial and count == sum(len(p["chunks"]) for p in serial)
+        # Whole pages per upsert, ~10 chunks at a time
+        per_page = {f"Uploaded PDF > {p['section_path']}": len(p["chunks"]) for p in serial}
+        batches = [call.args[0] for call in upserts.await_args_list]
+        assert len(batches) > 1 and all(len(b) >= 10 for b in batches[:-1])
+        for batch in batches:
+            paths = {c["section_path"] for c in batch}
+            assert sum(per_page[p] for p in paths) == len(batch)
+        assert serial[13]["section_path"] == "SECTION 2 - COOLING SYSTEM > Page 14"
+        rows = (await sqlite_db.execute(select(ManualChunk.section_path))).scalars().all()
+        assert len(rows) == count
+        assert "Uploaded PDF > SECTION 1 - ENGINE MECHANICAL > Page 12" in rows
+
+
+# ---------------------------------------------------------------------------
+# chunker — heading/table-aware page chunks, overlap, neighbors
+# ---------------------------------------------------------------------------
+
+class TestChunker:
+    def test_headings_start_chunks_and_tables_stay_whole(self):
+        from app.services.chunker import chunk_blocks, html_blocks
+
+        html = (
+            '<html><head><title>t</title></head><body><a class="breadcrumb-part">Engine</a>'
+            "<h2>Cylinder Head Torque</h2><p>Tighten in sequence. Use new bolts.</p>"
+            "<table><tr><th>Step</th><th>Torque</th></tr><tr><td>1</td><td>22 ft-lb</td></tr></table>"
+            "<h3>Valve Clearance</h3><div>Intake 0.2 mm.<br>Exhaust 0.3 mm.</div></body></html>"
+        )
+        chunks = chunk_blocks(html_blocks(html), max_tokens=40, overlap_tokens=8)
+        assert chunks == [
+            "Engine\nCylinder Head Torque\nTighten in sequence. Use new bolts.\nStep | Torque\n1 | 22 ft-lb",
+            "Valve Clearance\nIntake 0.2 mm.\nExhaust 0.3 mm.",
+        ]
+
+    def test_long_sections_overlap_and_long_tables_repeat_header(self):
+        from app.services.chunker import Block, chunk_blocks, count_tokens, text_blocks
+
+        text = "ENGINE SPECIFICATIONS\n" + " ".join(f"Sentence {i} about torque." for i in range(30))
+        chunks = chunk_blocks(text_blocks(text), max_tokens=40, overlap_tokens=12)
+        assert len(chunks) > 3 and all(count_tokens(c) <= 40 for c in chunks)
+        assert all(c.startswith("ENGINE SPECIFICATIONS\n") for c in chunks)
+        # Each chunk picks up where the last one left off, repeating its tail
+        assert chunks[1].split("\n")[1].startswith(chunks[0].rsplit(". ", 2)[1])
+
+        table = Block("table", "Step | Torque\n" + "\n".join(f"{i} | {i * 3} ft-lb" for i in range(40)))
+        parts = chunk_blocks([table], max_tokens=40)
+        assert len(parts) > 1 and all(p.startswith("Step | Torque\n") for p in parts)
+        assert sum(p.count("ft-lb") for p in parts) == 40
+
+    @pytest.mark.anyio
+    async def test_reindex_trims_stale_chunks_and_expands_neighbors(self, tmp_path, sqlite_db):
+        from sqlalchemy import select
+        from app.models.manual_chunk import ManualChunk
+        from app.services import chunker
+        from app.services.manual_search import chunk_neighbors
+
+        manual_dir = tmp_path / "manual"
+        manual_dir.mkdir()
+        page = manual_dir / "specs.html"
+
+        def _write(sentences: int):
+            body = " ".join(f"Bolt {i} torque is {i + 20} ft-lb." for i in range(sentences))
+            page.write_text(f"<html><body><h1>TORQUE SPECS</h1><p>{body}</p></body></html>")
+
+        async def _rows():
+            result = await sqlite_db.execute(select(ManualChunk).order_by(ManualChunk.chunk_ordinal))
+            return result.scalars().all()
+
+        with patch.object(chunker.settings, "manual_chunk_tokens", 40), \
+             patch.object(chunker.settings, "manual_chunk_overlap_tokens", 0):
+            _write(20)
+            count = await _make_indexer().index_manual(manual_dir, "Toyota", "Supra", 1993, None, sqlite_db)
+            rows = await _rows()
+            assert count == len(rows) > 3
+            assert len({r.page_id for r in rows}) == 1
+            assert [r.chunk_ordinal for r in rows] == list(range(count))
+            assert {r.section_path for r in rows} == {"specs"}
+
+            around = await chunk_neighbors(sqlite_db, rows[2].id, radius=1)
+            assert [c.chunk_ordinal for c in around] == [1, 2, 3]
+
+            _write(6)
+            await _make_indexer().index_manual(manual_dir, "Toyota", "Supra", 1993, None, sqlite_db)
+            await sqlite_db.commit()
+            sqlite_db.expunge_all()
+            shorter = await _rows()
+            assert 0 < len(shorter) < count
+            assert shorter[0].page_id == rows[0].page_id
+            assert "Bolt 19" not in " ".join(r.content for r in shorter)
 
 
 # ---------------------------------------------------------------------------
@@ -411,7 +1442,7 @@ class TestSsrfGuard:
 
 
 # ---------------------------------------------------------------------------
-# search_chunks — ILIKE fallback on SQLite
+# search_chunks — ILIKE fallback on SQLite, snippets
 # ---------------------------------------------------------------------------
 
 class TestSearchChunks:
@@ -486,6 +1517,40 @@ class TestSearchChunks:
         )
         assert results == []
 
+    def test_headline_centres_passages_on_query_terms(self):
+        from app.services.manual_search import SNIPPET_DELIMITER, headline
+
+        content = (
+            "General information about the cylinder head and gaskets. " * 6
+            + "Cylinder head bolt torque: step 1 22 ft-lb, step 2 an additional 90 degrees. "
+            + "Camshaft cap bolts are tightened in sequence. " * 6
+            + "Spark plug gap 0.044 in."
+        )
+        snippet = headline(content, "what is the head bolt torque and spark plug gap", max_words=20)
+        first, second = snippet.split(SNIPPET_DELIMITER)
+        assert "**torque**: step 1 22 ft-lb" in first
+        assert second.endswith("**Spark** **plug** **gap** 0.044 in.")
+        assert "**the**" not in snippet and len(snippet.split()) < 45
+        assert headline("Nothing relevant here at all.", "torque", max_words=3) == "Nothing relevant here"
+
+    @pytest.mark.anyio
+    async def test_advisor_search_sends_snippets(self, sqlite_db):
+        from app.models.manual_chunk import ManualChunk
+        from app.services.advisor import AdvisorService
+
+        content = "Boilerplate safety notice. " * 80 + "Flywheel bolt torque is 83 ft-lb."
+        sqlite_db.add(ManualChunk(
+            vehicle_make="Toyota", vehicle_model="Supra", vehicle_year=1993, vehicle_id=None,
+            section_path="Clutch > Flywheel", content=content, scope="chassis", source_priority=2,
+        ))
+        await sqlite_db.commit()
+
+        build = MagicMock(vehicle_id=None, engine_id=None, transmission_id=None)
+        with patch.object(AdvisorService, "__init__", lambda self: None):
+            result = await AdvisorService()._execute_search_tool("Flywheel bolt torque", "chassis", build, sqlite_db)
+        assert "**Flywheel** **bolt** **torque** is 83 ft-lb." in result
+        assert len(result) < len(content) // 4
+
 
 # ---------------------------------------------------------------------------
 # run_pipeline regression — no TypeError from vision= kwarg
@@ -539,3 +1604,57 @@ class TestRunPipelineRegression:
                 pass
 
         await engine.dispose()
+
+
+# ---------------------------------------------------------------------------
+# Ingest telemetry — stage timings and throughput counters on IngestJob
+# ---------------------------------------------------------------------------
+
+class TestIngestTelemetry:
+    @pytest.mark.anyio
+    async def test_pipeline_records_stage_timings(self, tmp_path):
+        from app.database import Base
+        from app.models.ingest_job import IngestJob
+        from app.services.manual_ingestor import ManualIngestor
+
+        engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        Session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+        job_id = str(uuid.uuid4())
+        async with Session() as s:
+            s.add(IngestJob(job_id=job_id))
+            await s.commit()
+
+        async def _fake_index(*args, stats=None, **kwargs):
+            stats.pages_parsed = 7
+            stats.vision_calls = 2
+            stats.upsert_batches = 1
+            return 5
+
+        with (
+            patch("app.services.manual_ingestor.GapAnalyzer") as mock_ga,
+            patch("app.services.manual_ingestor.GapFiller") as mock_gf,
+            patch("app.services.manual_ingestor.RAGIndexer") as mock_ri,
+        ):
+            mock_ga.return_value.analyze.return_value = MagicMock(missing=[], present=[], broken=[])
+            mock_gf.return_value.fill_gaps = AsyncMock(return_value=[])
+            mock_ri.return_value.index_manual = AsyncMock(side_effect=_fake_index)
+
+            await ManualIngestor().run_pipeline(
+                job_id, 1993, "Toyota", "Supra", None, Session,
+                manual_dir_override=str(tmp_path), vision_extract=False,
+            )
+
+        async with Session() as s:
+            job = await s.get(IngestJob, job_id)
+        await engine.dispose()
+
+        assert job.status == "complete"
+        assert job.started_at is not None and job.finished_at is not None
+        assert set(job.stage_timings) == {"analyzing", "filling", "indexing"}
+        for timing in job.stage_timings.values():
+            assert timing["finished_at"] is not None
+            assert timing["seconds"] >= 0
+        assert (job.chunks_indexed, job.pages_parsed, job.vision_calls, job.upsert_batches) == (5, 7, 2, 1)